@@ -1,5 +1,6 @@
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -104,6 +105,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Anonymous clients poll their submissions with the access token header
+CORS_ALLOW_HEADERS = (*default_headers, 'x-submission-token')
+
 CSRF_TRUSTED_ORIGINS = [
     "https://pump-project-deploy.vercel.app",
     "http://localhost:5173",
@@ -121,3 +125,47 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('EMAIL_HOST_USER', '')
+
+# Quotation reference numbers: values reserved per worker per DB round trip
+REFERENCE_NUMBER_BLOCK_SIZE = int(os.environ.get('REFERENCE_NUMBER_BLOCK_SIZE', 20))
+
+# Generated documents are kept in memory up to this size, then spooled to disk
+GENERATED_DOCUMENT_SPOOL_SIZE = int(os.environ.get('GENERATED_DOCUMENT_SPOOL_SIZE', 1024 * 1024))
+
+# Converted quotation PDFs are reused for identical requests from the same customer on the same day
+QUOTATION_PDF_CACHE_DIR = os.environ.get('QUOTATION_PDF_CACHE_DIR', os.path.join(BASE_DIR, 'quotation_pdf_cache'))
+QUOTATION_PDF_CACHE_MAX_FILES = int(os.environ.get('QUOTATION_PDF_CACHE_MAX_FILES', 500))
+
+# Energy optimization analysis runs in a background thread pool after submission
+ENERGY_ANALYSIS_WORKERS = int(os.environ.get('ENERGY_ANALYSIS_WORKERS', 2))
+ENERGY_ANALYSIS_EAGER = os.environ.get('ENERGY_ANALYSIS_EAGER', '').lower() in ('1', 'true', 'yes')
+# Seconds after which a running analysis is considered abandoned and may be claimed again
+ENERGY_ANALYSIS_CLAIM_TIMEOUT = int(os.environ.get('ENERGY_ANALYSIS_CLAIM_TIMEOUT', 3600))
+
+# Upper bound on pumps accepted by a single fleet analysis request
+FLEET_ANALYSIS_MAX_PUMPS = int(os.environ.get('FLEET_ANALYSIS_MAX_PUMPS', 20000))
+
+# Upper bound on parameter sets accepted by a single batch SRC request
+SRC_BATCH_MAX_SETS = int(os.environ.get('SRC_BATCH_MAX_SETS', 50000))
+
+# Cached energy analysis results: lifetime in seconds and size bounds for LRU eviction
+ENERGY_ANALYSIS_CACHE_TTL = int(os.environ.get('ENERGY_ANALYSIS_CACHE_TTL', 7 * 24 * 3600))
+ENERGY_ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ENERGY_ANALYSIS_CACHE_MAX_ENTRIES', 200))
+ENERGY_ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ENERGY_ANALYSIS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Largest what-if grid (product of all sweep axis lengths) evaluated per request
+ENERGY_SWEEP_MAX_POINTS = int(os.environ.get('ENERGY_SWEEP_MAX_POINTS', 20000))
+
+# 'specs' returns chart specs for the frontend and renders PNGs only on demand; 'images' always renders PNGs
+ENERGY_PLOT_MODE = os.environ.get('ENERGY_PLOT_MODE', 'specs')
+
+# Energy optimization plots render in a pool of worker processes (0 renders inline);
+# each worker holds its own matplotlib import, so the default stays small
+ENERGY_PLOT_WORKERS = int(os.environ.get('ENERGY_PLOT_WORKERS', min(os.cpu_count() or 1, 2)))
+ENERGY_PLOT_TIMEOUT = int(os.environ.get('ENERGY_PLOT_TIMEOUT', 60))
+
+# Per-plot images rendered on request are kept here, one folder per submission
+ENERGY_PLOT_CACHE_DIR = os.environ.get('ENERGY_PLOT_CACHE_DIR', os.path.join(BASE_DIR, 'energy_optimization', 'plot_cache'))
+# Size bounds for LRU eviction of the plot image cache
+ENERGY_PLOT_CACHE_MAX_FILES = int(os.environ.get('ENERGY_PLOT_CACHE_MAX_FILES', 2000))
+ENERGY_PLOT_CACHE_MAX_BYTES = int(os.environ.get('ENERGY_PLOT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     PumpMake, PumpModel, PumpSize, PartNumber, PartName, MaterialOfConstruction, 
     ReverseEngineeringSubmission, ReverseEngineeringDocument, EnergyOptimizationSubmission,
-    InventoryDatabase
+    InventoryDatabase, ReferenceNumberSequence, IssuedReferenceNumber,
+    PrerenderedQuotation, EnergyAnalysisResult, LibraryPumpCurve
 )
 
 @admin.register(PumpMake)
@@ -40,9 +41,18 @@ class PartNameAdmin(admin.ModelAdmin):
     ordering = ['name']
 
 
+@admin.register(LibraryPumpCurve)
+class LibraryPumpCurveAdmin(admin.ModelAdmin):
+    list_display = ['pump_make', 'pump_model', 'pump_size', 'speed', 'impeller_diameter', 'bep_flow', 'bep_head', 'bep_efficiency', 'updated_at']
+    list_filter = ['pump_make', 'pump_model', 'pump_size']
+    search_fields = ['pump_make__name', 'pump_model__name', 'pump_size__size']
+    readonly_fields = ['bep_flow', 'bep_head', 'bep_efficiency', 'max_flow', 'created_at', 'updated_at']
+    ordering = ['pump_make__name', 'pump_model__name', 'pump_size__size', 'speed']
+
+
 @admin.register(MaterialOfConstruction)
 class MaterialOfConstructionAdmin(admin.ModelAdmin):
-    list_display = ['moc', 'pump_make', 'pump_model', 'pump_size', 'part_number', 'part_name', 'qty_available', 'unit_price', 'updated_at']
+    list_display = ['moc', 'pump_make', 'pump_model', 'pump_size', 'part_number', 'part_name', 'qty_available', 'unit_price', 'quotation_request_count', 'updated_at']
     list_filter = ['pump_make', 'pump_model', 'pump_size', 'part_number', 'part_name', 'qty_available', 'created_at']
     search_fields = ['moc', 'pump_make__name', 'pump_model__name', 'pump_size__size', 'part_number__part_no', 'part_name__name']
     ordering = ['pump_make__name', 'pump_model__name', 'pump_size__size', 'part_number__part_no', 'part_name__name', 'moc']
@@ -109,10 +119,11 @@ class ReverseEngineeringDocumentAdmin(admin.ModelAdmin):
 
 @admin.register(EnergyOptimizationSubmission)
 class EnergyOptimizationSubmissionAdmin(admin.ModelAdmin):
-    list_display = ['id', 'project_type', 'da_tank_height', 'boiler_drum_height', 'flow_qnp', 'head_hnp', 'efficiency', 'user', 'created_at']
-    list_filter = ['project_type', 'created_at', 'user']
+    list_display = ['id', 'project_type', 'da_tank_height', 'boiler_drum_height', 'flow_qnp', 'head_hnp', 'efficiency', 'analysis_status', 'user', 'created_at']
+    list_filter = ['project_type', 'analysis_status', 'created_at', 'user']
     search_fields = ['project_type', 'user__official_email', 'user__full_name']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'analysis_status', 'analysis_stage', 'stage_status',
+                       'analysis_error', 'analysis_started_at', 'analysis_finished_at']
     ordering = ['-created_at']
     
     fieldsets = (
@@ -127,7 +138,11 @@ class EnergyOptimizationSubmissionAdmin(admin.ModelAdmin):
             'fields': ('flow_qnp', 'head_hnp', 'bkw_bkwnp', 'efficiency')
         }),
         ('File Uploads', {
-            'fields': ('qhnp_file', 'qhact_file', 'qhmod_file')
+            'fields': ('qhnp_file', 'library_curve', 'qhact_file', 'qhmod_file')
+        }),
+        ('Analysis', {
+            'fields': ('analysis_status', 'analysis_stage', 'stage_status', 'analysis_error',
+                      'analysis_started_at', 'analysis_finished_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -144,3 +159,38 @@ class InventoryDatabaseAdmin(admin.ModelAdmin):
     list_display = ['part_no', 'part_name', 'moc', 'availability', 'unit_price']
     search_fields = ['part_name', 'part_no', 'moc']
     ordering = ['part_no']
+
+
+@admin.register(ReferenceNumberSequence)
+class ReferenceNumberSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'next_value', 'updated_at']
+    search_fields = ['prefix']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['prefix']
+
+
+@admin.register(IssuedReferenceNumber)
+class IssuedReferenceNumberAdmin(admin.ModelAdmin):
+    list_display = ['reference_number', 'prefix', 'sequence_value', 'source', 'worker_pid', 'issued_at']
+    list_filter = ['source', 'issued_at']
+    search_fields = ['reference_number', 'prefix']
+    readonly_fields = ['reference_number', 'prefix', 'sequence_value', 'source', 'worker_pid', 'issued_at']
+    ordering = ['-issued_at']
+
+
+@admin.register(PrerenderedQuotation)
+class PrerenderedQuotationAdmin(admin.ModelAdmin):
+    list_display = ['material', 'material_updated_at', 'template_signature', 'rendered_at']
+    readonly_fields = ['material', 'material_updated_at', 'template_signature', 'rendered_at']
+    exclude = ['body']
+    ordering = ['-rendered_at']
+
+
+@admin.register(EnergyAnalysisResult)
+class EnergyAnalysisResultAdmin(admin.ModelAdmin):
+    list_display = ['input_hash', 'calculator_version', 'size_bytes', 'hit_count', 'created_at', 'last_used_at']
+    list_filter = ['calculator_version']
+    search_fields = ['input_hash']
+    readonly_fields = ['input_hash', 'calculator_version', 'size_bytes', 'hit_count', 'created_at', 'last_used_at']
+    exclude = ['qh_curve_data', 'pump_curve', 'calculation_results', 'plot_images', 'plot_specs', 'proposal_data']
+    ordering = ['-last_used_at']
@@ -0,0 +1,132 @@
+"""
+Energy Analysis Result Cache
+Reuses calculation results, plots and proposal for submissions with identical inputs
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .energy_calculations import CALCULATOR_VERSION
+from .models import EnergyAnalysisResult, EnergyOptimizationSubmission
+
+CACHED_FIELDS = ['qh_curve_data', 'pump_curve', 'calculation_results', 'plot_images', 'plot_specs', 'proposal_data']
+
+
+def _file_digest(field_file) -> str:
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()
+
+
+def compute_input_hash(calc_data: Dict, submission: Optional[EnergyOptimizationSubmission] = None) -> str:
+    """
+    Canonical hash of the analysis inputs
+
+    calc_data is serialized with sorted keys, so field order does not matter
+    and equal values from Decimal or string form inputs hash the same. The
+    uploaded Q-H curve file, if any, is included by content, and so is a
+    referenced library curve (by its stored coefficients).
+    """
+    payload = {
+        'version': CALCULATOR_VERSION,
+        'calc_data': calc_data,
+        'qhnp_file': _file_digest(submission.qhnp_file) if submission is not None and submission.qhnp_file else None,
+    }
+    if submission is not None and submission.library_curve_id and not submission.qhnp_file:
+        payload['library_curve'] = submission.library_curve.curve
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def get_cached_result(input_hash: str) -> Optional[EnergyAnalysisResult]:
+    """Return the cached analysis for a hash, or None if missing, stale or expired"""
+    ttl = getattr(settings, 'ENERGY_ANALYSIS_CACHE_TTL', 7 * 24 * 3600)
+    cached = EnergyAnalysisResult.objects.filter(
+        input_hash=input_hash,
+        calculator_version=CALCULATOR_VERSION,
+        created_at__gte=timezone.now() - timedelta(seconds=ttl)
+    ).first()
+    if cached is not None:
+        EnergyAnalysisResult.objects.filter(id=cached.id).update(
+            hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+        )
+    return cached
+
+
+def store_result(input_hash: str, submission: EnergyOptimizationSubmission) -> EnergyAnalysisResult:
+    """Save the outputs of a completed analysis and evict old entries"""
+    outputs = {field: getattr(submission, field) for field in CACHED_FIELDS}
+    size_bytes = len(json.dumps(outputs, default=str))
+    result, _ = EnergyAnalysisResult.objects.update_or_create(
+        input_hash=input_hash,
+        defaults={
+            **outputs,
+            'calculator_version': CALCULATOR_VERSION,
+            'size_bytes': size_bytes,
+            'last_used_at': timezone.now(),
+        }
+    )
+    evict_results()
+    return result
+
+
+def evict_results():
+    """
+    Drop expired and outdated entries, then the least recently used ones
+    until the cache fits ENERGY_ANALYSIS_CACHE_MAX_ENTRIES and _MAX_BYTES
+    """
+    ttl = getattr(settings, 'ENERGY_ANALYSIS_CACHE_TTL', 7 * 24 * 3600)
+    max_entries = getattr(settings, 'ENERGY_ANALYSIS_CACHE_MAX_ENTRIES', 200)
+    max_bytes = getattr(settings, 'ENERGY_ANALYSIS_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+    EnergyAnalysisResult.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=ttl)).delete()
+    EnergyAnalysisResult.objects.exclude(calculator_version=CALCULATOR_VERSION).delete()
+
+    entries = EnergyAnalysisResult.objects.order_by('-last_used_at').values_list('id', 'size_bytes')
+    total_count = len(entries)
+    total_bytes = EnergyAnalysisResult.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+    if total_count <= max_entries and total_bytes <= max_bytes:
+        return
+
+    kept_bytes = 0
+    evicted_ids = []
+    for index, (entry_id, size_bytes) in enumerate(entries):
+        kept_bytes += size_bytes
+        # The most recently used entry is always kept
+        if index and (index >= max_entries or kept_bytes > max_bytes):
+            evicted_ids.append(entry_id)
+    if evicted_ids:
+        EnergyAnalysisResult.objects.filter(id__in=evicted_ids).delete()
+
+
+def apply_cached_result(submission: EnergyOptimizationSubmission, cached: EnergyAnalysisResult):
+    """Copy cached outputs onto a submission and mark its analysis completed"""
+    from .energy_analysis_pipeline import apply_calculation_results
+
+    now = timezone.now()
+    for field in CACHED_FIELDS:
+        setattr(submission, field, getattr(cached, field))
+    apply_calculation_results(submission, cached.calculation_results or {})
+    submission.plots_generated = bool(cached.plot_images or cached.plot_specs)
+    submission.proposal_generated = bool(cached.proposal_data)
+    submission.analysis_status = 'completed'
+    submission.analysis_stage = EnergyOptimizationSubmission.ANALYSIS_STAGES[-1]
+    submission.analysis_error = ''
+    submission.analysis_started_at = now
+    submission.analysis_finished_at = now
+    submission.stage_status = {
+        stage: {'status': 'completed', 'cached': True, 'finished_at': now.isoformat()}
+        for stage in EnergyOptimizationSubmission.ANALYSIS_STAGES
+    }
+    submission.save()
@@ -0,0 +1,350 @@
+"""
+Pump Curve File Ingestion
+Reads Q-H test-bench exports (CSV, XLSX, XLS) into NumPy arrays with header and unit detection
+"""
+
+import csv
+import io
+import math
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Column names recognised for each curve quantity (compared after units are stripped)
+COLUMN_ALIASES = {
+    'q': ['q', 'qnp', 'flow', 'flow rate', 'flowrate', 'capacity', 'volume flow', 'discharge'],
+    'h': ['h', 'hnp', 'head', 'total head', 'tdh', 'differential head', 'pump head'],
+}
+
+# Leading words that identify a quantity in longer names ("Flow Q", "Head Total")
+COLUMN_KEYWORDS = {
+    'q': ['flow', 'capacity'],
+    'h': ['head', 'tdh'],
+}
+
+# Unit -> factor to m³/hr
+FLOW_UNITS = {
+    'm3/h': 1.0,
+    'cmh': 1.0,
+    'm3/s': 3600.0,
+    'm3/min': 60.0,
+    'l/s': 3.6,
+    'lps': 3.6,
+    'l/min': 0.06,
+    'lpm': 0.06,
+    'gpm': 0.2271247,
+    'usgpm': 0.2271247,
+    'igpm': 0.2727654,
+}
+
+# Unit -> factor to m
+HEAD_UNITS = {
+    'm': 1.0,
+    'mwc': 1.0,
+    'mlc': 1.0,
+    'ft': 0.3048,
+    'feet': 0.3048,
+}
+
+UNIT_FACTORS = {'q': FLOW_UNITS, 'h': HEAD_UNITS}
+CANONICAL_UNITS = {'q': 'm3/h', 'h': 'm'}
+
+# Rows searched for a header before the data starts
+HEADER_SEARCH_ROWS = 20
+
+MAX_CURVE_POINTS = 100000
+
+XLSX_SIGNATURE = b'PK\x03\x04'
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+class CurveFileError(ValueError):
+    """Raised for curve files that cannot be read"""
+
+
+class CurveData:
+    """
+    Q-H points read from a curve file
+
+    q (m³/hr) and h (m) are contiguous float64 arrays in file order; columns
+    and units record the header names and units found in the file.
+    """
+
+    def __init__(self, q: np.ndarray, h: np.ndarray, file_format: str,
+                 columns: Dict[str, Optional[str]], units: Dict[str, str]):
+        self.q = q
+        self.h = h
+        self.file_format = file_format
+        self.columns = columns
+        self.units = units
+
+    def __len__(self):
+        return len(self.q)
+
+    def to_points(self) -> List[Dict]:
+        """Points as [{'q': ..., 'h': ...}]"""
+        return [{'q': q, 'h': h} for q, h in zip(self.q.tolist(), self.h.tolist())]
+
+
+def sniff_format(head: bytes, name: str = '') -> str:
+    """'xlsx', 'xls' or 'csv' from the first bytes of a file (the name only breaks ties)"""
+    if head.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if head.startswith(XLS_SIGNATURE):
+        return 'xls'
+    if b'\x00' in head[:1024]:
+        raise CurveFileError(f"Unsupported curve file format{f' ({name})' if name else ''}")
+    return 'csv'
+
+
+def _normalize_unit(unit: str) -> str:
+    unit = unit.lower().replace('³', '3').replace('^', '').replace(' ', '')
+    unit = unit.replace('/hr', '/h').replace('/hour', '/h').replace('/sec', '/s')
+    return unit.replace('cu.m', 'm3').replace('cum', 'm3')
+
+
+def parse_column_header(header) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Curve quantity ('q', 'h' or None) and unit of a header cell
+
+    Units are read from brackets ("Flow (m³/hr)", "Head [ft]") or after a
+    comma ("Head, ft").
+    """
+    if not isinstance(header, str) or not header.strip():
+        return None, None
+    text = header.strip()
+    unit = None
+    match = re.search(r'[\(\[]\s*([^\)\]]+?)\s*[\)\]]', text)
+    if match:
+        unit = match.group(1)
+        text = text[:match.start()] + text[match.end():]
+    elif ',' in text:
+        text, unit = text.split(',', 1)
+    name = re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+    for quantity, aliases in COLUMN_ALIASES.items():
+        if name in aliases or name.split(' ')[0] in COLUMN_KEYWORDS[quantity]:
+            return quantity, _normalize_unit(unit) if unit else None
+    return None, None
+
+
+# Digit grouping: "1,250", "12,500,000", lakh style "1,25,000" or "1.250.000"
+THOUSANDS_COMMA_RE = re.compile(r'^[+-]?(\d{1,3}(,\d{3})+|\d{1,2}(,\d{2})+,\d{3})$')
+THOUSANDS_DOT_RE = re.compile(r'^[+-]?\d{1,3}(\.\d{3}){2,}$')
+
+
+def parse_number(value) -> Optional[float]:
+    """
+    Finite float from a cell, or None for blanks and text
+
+    Text may use either separator convention. With both present the last
+    one is the decimal point ("1,250.5", "1.250,5"). A lone comma followed
+    by groups of exactly three digits separates thousands ("1,250");
+    otherwise it is a decimal comma ("12,5", "1250,75"). Lakh grouping
+    ("1,25,000") is recognised as well.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        text = str(value).strip().replace('\u00a0', '').replace(' ', '')
+        if ',' in text and '.' in text:
+            grouping = ',' if text.rfind(',') < text.rfind('.') else '.'
+            text = text.replace(grouping, '')
+        elif THOUSANDS_COMMA_RE.match(text):
+            text = text.replace(',', '')
+        elif THOUSANDS_DOT_RE.match(text):
+            text = text.replace('.', '')
+        text = text.replace(',', '.')
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+    return number if math.isfinite(number) else None
+
+
+def _locate_columns(rows: Sequence[Sequence]) -> Tuple[int, Dict[str, int], Dict[str, Optional[str]], Dict[str, str]]:
+    """
+    Find the header row (if any) among the first rows
+
+    Returns:
+        (index of the first data row, column index per quantity, header name
+        per quantity, unit per quantity)
+    """
+    for row_index, row in enumerate(rows):
+        found = {}
+        for column_index, cell in enumerate(row):
+            quantity, unit = parse_column_header(cell)
+            if quantity and quantity not in found:
+                found[quantity] = (column_index, cell, unit)
+        if len(found) == 2:
+            indices = {quantity: found[quantity][0] for quantity in CANONICAL_UNITS}
+            headers = {quantity: str(found[quantity][1]).strip() for quantity in CANONICAL_UNITS}
+            units = {}
+            for quantity in CANONICAL_UNITS:
+                unit = found[quantity][2] or CANONICAL_UNITS[quantity]
+                if unit not in UNIT_FACTORS[quantity]:
+                    raise CurveFileError(f"Unknown unit '{unit}' in column '{headers[quantity]}'")
+                units[quantity] = unit
+            return row_index + 1, indices, headers, units
+
+        # Numeric data before any recognised header: first two columns are Q and H
+        if len(row) >= 2 and parse_number(row[0]) is not None and parse_number(row[1]) is not None:
+            return row_index, {'q': 0, 'h': 1}, {'q': None, 'h': None}, dict(CANONICAL_UNITS)
+
+    raise CurveFileError('No Q and H columns found: add a header such as "Flow (m3/hr)" and "Head (m)"')
+
+
+def _collect(rows: Iterable[Sequence], indices: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Q and H arrays from data rows; rows missing either value are skipped"""
+    q_index, h_index = indices['q'], indices['h']
+    width = max(q_index, h_index) + 1
+    q_values = []
+    h_values = []
+    for row in rows:
+        if len(row) < width:
+            continue
+        q = parse_number(row[q_index])
+        h = parse_number(row[h_index])
+        if q is None or h is None:
+            continue
+        q_values.append(q)
+        h_values.append(h)
+        if len(q_values) > MAX_CURVE_POINTS:
+            raise CurveFileError(f'Curve files may contain at most {MAX_CURVE_POINTS} points')
+    return np.array(q_values, dtype=np.float64), np.array(h_values, dtype=np.float64)
+
+
+def _read_rows(rows: Iterator[Sequence], file_format: str) -> CurveData:
+    head_rows = []
+    for row in rows:
+        head_rows.append(row)
+        if len(head_rows) >= HEADER_SEARCH_ROWS:
+            break
+    if not head_rows:
+        raise CurveFileError('Curve file is empty')
+
+    start, indices, headers, units = _locate_columns(head_rows)
+
+    def data_rows():
+        yield from head_rows[start:]
+        yield from rows
+
+    q, h = _collect(data_rows(), indices)
+    if len(q) < 2:
+        raise CurveFileError('Curve file must contain at least 2 Q-H points')
+    if units['q'] != CANONICAL_UNITS['q']:
+        q *= FLOW_UNITS[units['q']]
+    if units['h'] != CANONICAL_UNITS['h']:
+        h *= HEAD_UNITS[units['h']]
+    return CurveData(q, h, file_format, headers, units)
+
+
+def csv_rows(data: bytes) -> Iterator[List[str]]:
+    """Rows of a CSV file, with the delimiter sniffed from the first lines"""
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+    sample = text[:4096]
+    lines = [line for line in sample.splitlines()[:HEADER_SEARCH_ROWS] if line.strip()]
+    if lines and all(';' in line for line in lines):
+        # Decimal commas make semicolon exports look comma separated to the sniffer
+        return csv.reader(io.StringIO(text, newline=''), delimiter=';')
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(io.StringIO(text, newline=''), dialect)
+
+
+def _csv_file_rows(file: BinaryIO) -> Iterator[List[str]]:
+    return csv_rows(file.read())
+
+
+def _xlsx_rows(file: BinaryIO) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML, and the ZIP members are
+    # read from the file as needed rather than from a copy in memory
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _xls_rows(file: BinaryIO) -> Iterator[list]:
+    try:
+        import xlrd
+    except ImportError:
+        raise CurveFileError('Reading .xls files requires the xlrd package; save the file as .xlsx or .csv')
+    workbook = xlrd.open_workbook(file_contents=file.read(), on_demand=True)
+    sheet = workbook.sheet_by_index(0)
+    for row_index in range(sheet.nrows):
+        yield sheet.row_values(row_index)
+
+
+ROW_READERS = {'csv': _csv_file_rows, 'xlsx': _xlsx_rows, 'xls': _xls_rows}
+
+
+@contextmanager
+def _open_source(source) -> Iterator[Tuple[BinaryIO, str]]:
+    """Seekable binary file and name for a path, upload or FieldFile, rewound to the start"""
+    if isinstance(source, (str, Path)):
+        with open(source, 'rb') as handle:
+            yield handle, str(source)
+        return
+
+    name = getattr(source, 'name', '') or ''
+    # Stored FieldFiles come back closed
+    reopened = getattr(source, 'closed', False) and hasattr(source, 'open')
+    if reopened:
+        source.open('rb')
+    try:
+        seekable = hasattr(source, 'seek') and getattr(source, 'seekable', lambda: True)()
+        if seekable:
+            source.seek(0)
+            # read(0) tells text-mode files apart without consuming anything
+            sample = source.read(0)
+        if not seekable or isinstance(sample, str):
+            # Text or one-way streams are buffered once
+            data = source.read()
+            yield io.BytesIO(data.encode() if isinstance(data, str) else data), name
+        else:
+            yield source, name
+    finally:
+        if reopened:
+            source.close()
+
+
+def read_curve_file(source) -> CurveData:
+    """
+    Read Q-H points from an uploaded file, model FileField or path
+
+    XLSX files are read straight from the file object; only CSV and XLS
+    files are loaded into memory whole.
+
+    Args:
+        source: File-like object, FieldFile or filesystem path
+
+    Returns:
+        CurveData with Q in m³/hr and H in m
+
+    Raises:
+        CurveFileError: The file cannot be read or has no usable Q-H columns
+    """
+    with _open_source(source) as (file, name):
+        file_format = sniff_format(file.read(2048), name)
+        file.seek(0)
+        try:
+            return _read_rows(iter(ROW_READERS[file_format](file)), file_format)
+        except CurveFileError:
+            raise
+        except Exception as e:
+            raise CurveFileError(f'Could not read {file_format.upper()} curve file: {str(e)}')
@@ -0,0 +1,313 @@
+"""
+Pump Curve Library
+Stores fitted manufacturer curves per make, model and size, with an in-memory index of their best efficiency points
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.db.models import Max
+
+from .curve_ingestion import CurveFileError, read_curve_file
+from .models import LibraryPumpCurve, PumpMake, PumpModel, PumpSize
+from .pump_curve import PumpCurve, PumpCurveError
+
+
+# Default allowed BEP deviation from the duty point, as a fraction of flow and of head
+DEFAULT_BEP_TOLERANCE = 0.2
+MAX_BEP_TOLERANCE = 2.0
+
+DEFAULT_MATCH_LIMIT = 10
+MAX_MATCH_LIMIT = 100
+
+
+class LibraryError(ValueError):
+    """Raised for library curves that cannot be stored or looked up"""
+
+
+class BepIndex:
+    """
+    Best efficiency points of the library in log-flow / log-head space
+
+    Points are sorted by log flow, so a query bisects to the flow window
+    and filters only the curves inside it by head. Distances are in log
+    units, which treats a 10% miss the same at 5 m³/hr as at 5000.
+    """
+
+    def __init__(self, ids: List[int], flows: List[float], heads: List[float]):
+        log_flow = np.log(np.asarray(flows, dtype=float))
+        order = np.argsort(log_flow, kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.log_flow = log_flow[order]
+        self.log_head = np.log(np.asarray(heads, dtype=float))[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, flow: float, head: float, tolerance: float = DEFAULT_BEP_TOLERANCE,
+              limit: int = DEFAULT_MATCH_LIMIT) -> List[Tuple[int, float]]:
+        """
+        Curves whose BEP lies within the tolerance of (flow, head), nearest first
+
+        Returns:
+            [(curve id, distance)] with distance in log units
+        """
+        if flow <= 0 or head <= 0:
+            raise LibraryError('Duty flow and head must be positive')
+        window = np.log1p(tolerance)
+        log_flow, log_head = np.log(flow), np.log(head)
+
+        start = np.searchsorted(self.log_flow, log_flow - window, side='left')
+        stop = np.searchsorted(self.log_flow, log_flow + window, side='right')
+        flow_offset = self.log_flow[start:stop] - log_flow
+        head_offset = self.log_head[start:stop] - log_head
+        inside = np.flatnonzero(np.abs(head_offset) <= window)
+
+        distance = np.hypot(flow_offset[inside], head_offset[inside])
+        nearest = inside[np.argsort(distance, kind='stable')[:limit]]
+        return [(int(self.ids[start + index]), float(np.hypot(flow_offset[index], head_offset[index])))
+                for index in nearest]
+
+    def affinity_candidates(self, flow: float, head: float, ratio_low: float, ratio_high: float,
+                            tolerance: float = DEFAULT_BEP_TOLERANCE) -> np.ndarray:
+        """
+        Curves whose BEP some speed or trim ratio in [ratio_low, ratio_high] brings near (flow, head)
+
+        Under the affinity laws a BEP moves along H ∝ Q², so log H − 2·log Q
+        is unchanged by speed and trim and only the flow window widens. The
+        result is a superset: callers check their exact ratios.
+        """
+        if flow <= 0 or head <= 0:
+            raise LibraryError('Duty flow and head must be positive')
+        window = np.log1p(tolerance)
+        log_flow = np.log(flow)
+
+        start = np.searchsorted(self.log_flow, log_flow - np.log(ratio_high) - window, side='left')
+        stop = np.searchsorted(self.log_flow, log_flow - np.log(ratio_low) + window, side='right')
+        invariant = self.log_head[start:stop] - 2 * self.log_flow[start:stop]
+        # Flow and head both within the window bound the invariant by three windows
+        inside = np.abs(invariant - (np.log(head) - 2 * log_flow)) <= 3 * window
+        return self.ids[start:stop][inside]
+
+
+class LibraryCurveSet:
+    """
+    Coefficients of every library curve as padded matrices, one row per curve
+
+    Rows are evaluated together by Horner's rule, so candidates are scored
+    in a few array operations instead of one PumpCurve per curve. The BEP
+    index over the rows (its ids are row numbers) prunes them first.
+    """
+
+    def __init__(self, rows: List[Tuple[int, float, float, Dict]]):
+        """
+        Args:
+            rows: (curve id, BEP flow, BEP head, PumpCurve dict) per curve
+        """
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        curves = [row[3] for row in rows]
+        self.speed = np.array([curve.get('speed') or np.nan for curve in curves], dtype=float)
+        self.diameter = np.array([curve.get('diameter') or np.nan for curve in curves], dtype=float)
+        self.q_max = np.array([curve.get('q_max') or 0.0 for curve in curves], dtype=float)
+        self.head = self._matrix([curve.get('head') for curve in curves])
+        self.efficiency = self._matrix([curve.get('efficiency') for curve in curves])
+        self.power = self._matrix([curve.get('power') for curve in curves])
+        self.index = BepIndex(list(range(len(rows))), [row[1] for row in rows], [row[2] for row in rows])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _matrix(coefficients: List[Optional[List[float]]]) -> np.ndarray:
+        """Coefficient rows padded with zeros; NaN rows for curves without one"""
+        width = max([len(values) for values in coefficients if values] or [1])
+        matrix = np.full((len(coefficients), width), np.nan)
+        for row, values in enumerate(coefficients):
+            if values:
+                matrix[row] = 0.0
+                matrix[row, :len(values)] = values
+        return matrix
+
+
+def evaluate_rows(coefficients: np.ndarray, q) -> np.ndarray:
+    """Row-wise polynomial values: coefficients (n, d) at flows shaped (n,) or (n, m)"""
+    q = np.asarray(q, dtype=float)
+    columns = coefficients.T[::-1]
+    if q.ndim == 2:
+        columns = columns[:, :, None]
+    result = np.zeros(q.shape)
+    for column in columns:
+        result = result * q + column
+    return result
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(name: str, build):
+    """
+    Value built from the library, rebuilt when curves were added, changed or removed
+
+    The library's row count and last update are checked on every call (two
+    index-only queries; combined into one aggregate they scan the table);
+    the rows themselves are only read when these changed.
+    """
+    key = (
+        LibraryPumpCurve.objects.count(),
+        LibraryPumpCurve.objects.aggregate(updated=Max('updated_at'))['updated'],
+    )
+    with _cache_lock:
+        cached = _cache.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, build())
+            _cache[name] = cached
+        return cached[1]
+
+
+def _build_bep_index() -> BepIndex:
+    rows = LibraryPumpCurve.objects.filter(bep_flow__gt=0, bep_head__gt=0).values_list('id', 'bep_flow', 'bep_head')
+    ids, flows, heads = zip(*rows) if rows else ((), (), ())
+    return BepIndex(list(ids), list(flows), list(heads))
+
+
+def get_bep_index() -> BepIndex:
+    """BEP index of the library"""
+    return _cached('bep_index', _build_bep_index)
+
+
+def get_curve_set() -> LibraryCurveSet:
+    """Coefficient matrices of the library"""
+    return _cached('curve_set', lambda: LibraryCurveSet(list(
+        LibraryPumpCurve.objects.filter(bep_flow__gt=0, bep_head__gt=0).values_list(
+            'id', 'bep_flow', 'bep_head', 'curve'
+        )
+    )))
+
+
+def library_pump_curve(entry: LibraryPumpCurve) -> PumpCurve:
+    """PumpCurve of a library entry"""
+    curve = PumpCurve.from_dict(entry.curve)
+    curve.source = 'library'
+    return curve
+
+
+def serialize_library_curve(entry: LibraryPumpCurve, include_curve: bool = True) -> Dict:
+    data = {
+        'id': entry.id,
+        'pump_make': entry.pump_make.name,
+        'pump_model': entry.pump_model.name,
+        'pump_size': entry.pump_size.size,
+        'speed': entry.speed,
+        'impeller_diameter': entry.impeller_diameter or None,
+        'bep': {'flow': entry.bep_flow, 'head': entry.bep_head, 'efficiency': entry.bep_efficiency},
+        'max_flow': entry.max_flow,
+        'updated_at': entry.updated_at.isoformat(),
+    }
+    if include_curve:
+        data['curve'] = entry.curve
+    return data
+
+
+def fit_library_curve(file, speed: float, bep_flow: float, bep_efficiency: float,
+                      impeller_diameter: Optional[float] = None) -> PumpCurve:
+    """
+    Fit a manufacturer Q-H curve file, shaping efficiency and power from the rated BEP
+
+    Library power curves are for water (SG 1); users scale them by their SG.
+
+    Raises:
+        LibraryError: The file cannot be read or fitted
+    """
+    if speed <= 0:
+        raise LibraryError('Curve speed is required')
+    if bep_flow <= 0 or not 0 < bep_efficiency <= 100:
+        raise LibraryError('Best efficiency flow and efficiency are required')
+    try:
+        points = read_curve_file(file)
+        curve = PumpCurve.fit(points.q, points.h, speed=speed, diameter=impeller_diameter, source='library')
+    except (CurveFileError, PumpCurveError) as e:
+        raise LibraryError(str(e))
+    curve.set_efficiency(bep_flow, bep_efficiency)
+    return curve
+
+
+def store_library_curve(make: str, model: str, size: str, curve: PumpCurve, source_file=None) -> LibraryPumpCurve:
+    """
+    Create or replace the library curve of a make, model, size, speed and diameter
+
+    The make, model and size are created if they are not catalogued yet.
+
+    Raises:
+        LibraryError: Missing names or a curve without speed or efficiency
+    """
+    make, model, size = (str(value or '').strip() for value in (make, model, size))
+    if not (make and model and size):
+        raise LibraryError('Pump make, model and size are required')
+    if not curve.speed:
+        raise LibraryError('Curve speed is required')
+    bep = curve.best_efficiency_point()
+    if bep is None or bep['h'] <= 0:
+        raise LibraryError('Curve needs an efficiency curve with a best efficiency point')
+
+    curve.source = 'library'
+    defaults = {
+        'curve': curve.to_dict(),
+        'bep_flow': bep['q'],
+        'bep_head': bep['h'],
+        'bep_efficiency': bep['efficiency'],
+        'max_flow': curve.q_max,
+    }
+    if source_file is not None:
+        defaults['source_file'] = source_file
+
+    entry, _ = LibraryPumpCurve.objects.update_or_create(
+        pump_make=PumpMake.objects.get_or_create(name=make)[0],
+        pump_model=PumpModel.objects.get_or_create(name=model)[0],
+        pump_size=PumpSize.objects.get_or_create(size=size)[0],
+        speed=curve.speed,
+        impeller_diameter=curve.diameter or 0,
+        defaults=defaults
+    )
+    return entry
+
+
+def find_pumps_near_duty(flow: float, head: float, tolerance: float = DEFAULT_BEP_TOLERANCE,
+                         limit: int = DEFAULT_MATCH_LIMIT) -> List[Dict]:
+    """
+    Main function to find library pumps whose BEP is near a duty point
+
+    Args:
+        flow: Duty flow (m³/hr)
+        head: Duty head (m)
+        tolerance: Allowed BEP deviation as a fraction of flow and of head
+        limit: Largest number of pumps returned
+
+    Returns:
+        Library curves nearest first, each with its BEP distance, the BEP
+        flow and head relative to the duty point and the curve head at the
+        duty flow
+    """
+    if not 0 < tolerance <= MAX_BEP_TOLERANCE:
+        raise LibraryError(f'tolerance must be between 0 and {MAX_BEP_TOLERANCE}')
+    if not 1 <= limit <= MAX_MATCH_LIMIT:
+        raise LibraryError(f'limit must be between 1 and {MAX_MATCH_LIMIT}')
+
+    matches = get_bep_index().query(flow, head, tolerance, limit)
+    entries = LibraryPumpCurve.objects.select_related('pump_make', 'pump_model', 'pump_size').in_bulk(
+        [curve_id for curve_id, _ in matches]
+    )
+
+    results = []
+    for curve_id, distance in matches:
+        entry = entries.get(curve_id)
+        if entry is None:
+            continue
+        data = serialize_library_curve(entry, include_curve=False)
+        data['distance'] = round(distance, 6)
+        data['flow_ratio'] = round(entry.bep_flow / flow, 4)
+        data['head_ratio'] = round(entry.bep_head / head, 4)
+        data['head_at_duty'] = round(float(library_pump_curve(entry).head(flow)), 3)
+        results.append(data)
+    return results
@@ -0,0 +1,325 @@
+"""
+Energy Optimization Analysis Pipeline
+Runs the parse → calculate → plot → proposal stages for a submission in the background
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EnergyOptimizationSubmission
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def build_calc_data(submission: EnergyOptimizationSubmission) -> Dict:
+    """
+    Convert submission fields to the float dict used by the calculation modules
+    """
+    return {
+        'project_type': submission.project_type,
+        'da_tank_height': float(submission.da_tank_height or 0),
+        'boiler_drum_height': float(submission.boiler_drum_height or 0),
+        'da_tank_pressure': float(submission.da_tank_pressure or 0),
+        'boiler_drum_pressure': float(submission.boiler_drum_pressure or 0),
+        'feed_water_temp': float(submission.feed_water_temp) if submission.feed_water_temp is not None else None,
+        'specific_gravity': float(submission.specific_gravity or 0),
+        'actual_flow_24hrs': float(submission.actual_flow_24hrs or 0),
+        'actual_flow_required': float(submission.actual_flow_required or 0),
+        'actual_speed_n2': float(submission.actual_speed_n2 or 0),
+        'actual_discharge_pressure': float(submission.actual_discharge_pressure or 0),
+        'actual_suction_pressure': float(submission.actual_suction_pressure or 0),
+        'actual_power_consumption': float(submission.actual_power_consumption or 0),
+        'flow_qnp': float(submission.flow_qnp or 0),
+        'head_hnp': float(submission.head_hnp or 0),
+        'bkw_bkwnp': float(submission.bkw_bkwnp or 0),
+        'efficiency': float(submission.efficiency or 0),
+        'speed_n1': float(submission.speed_n1 or 0),
+    }
+
+
+def apply_calculation_results(submission: EnergyOptimizationSubmission, calculation_results: Dict):
+    """Copy calculation results and their headline figures onto the submission"""
+    submission.calculation_results = calculation_results
+    submission.calculated_efficiency_before = calculation_results.get('efficiency_before', 0)
+    submission.calculated_efficiency_after = calculation_results.get('efficiency_after', 0)
+    submission.power_saving_kwh = calculation_results.get('power_saving', 0)
+    submission.cost_saving_per_day = calculation_results.get('daily_cost_saving', 0)
+    submission.co2_reduction_kg = calculation_results.get('annual_co2_reduction', 0)
+    submission.trees_saved = calculation_results.get('annual_trees_saved', 0)
+    submission.payback_period_days = calculation_results.get('payback_period_days', 0)
+    submission.analysis_completed = True
+
+
+class AnalysisStageError(Exception):
+    """Raised when a stage produces no usable output"""
+
+
+def _stage_parse(submission: EnergyOptimizationSubmission, calc_data: Dict):
+    """Process the uploaded Q-H curve file or referenced library curve, if any, and fit the pump curve"""
+    from .curve_library import library_pump_curve
+    from .pump_curve import PumpCurveError, build_pump_curve
+    from .qh_curve_processor import process_library_curve, process_qh_curve_file
+
+    # In specs mode the Q-H/SRC plot becomes plot11 of the specs and is rendered on demand
+    with_plot = _plot_mode() == 'images'
+
+    # An uploaded file takes precedence over a referenced library curve
+    library_curve = None
+    if not submission.qhnp_file and submission.library_curve_id:
+        library_curve = library_pump_curve(submission.library_curve)
+        submission.qh_curve_data = process_library_curve(library_curve, calc_data, with_plot)
+    elif not submission.qhnp_file:
+        print("No Q-H curve file uploaded, using calculated curves only")
+        submission.qh_curve_data = None
+    else:
+        try:
+            submission.qh_curve_data = process_qh_curve_file(submission.qhnp_file, calc_data, with_plot)
+        except Exception as qh_error:
+            # A bad curve file does not stop the analysis; calculated curves are used instead
+            print(f"Q-H curve processing failed: {str(qh_error)}")
+            submission.qh_curve_data = {"error": f"Q-H curve processing failed: {str(qh_error)}"}
+
+    try:
+        submission.pump_curve = build_pump_curve(calc_data, submission.qh_curve_data, library_curve).to_dict()
+    except PumpCurveError as curve_error:
+        print(f"Pump curve could not be fitted: {str(curve_error)}")
+        submission.pump_curve = None
+
+
+def _stage_calculate(submission: EnergyOptimizationSubmission, calc_data: Dict):
+    """Run the energy optimization calculations and copy headline results to the submission"""
+    from .energy_calculations import calculate_energy_optimization
+    from .pump_curve import PumpCurve
+    from .qh_curve_processor import qh_src_plot_data
+    from .plot_specs import QH_SRC_PLOT
+
+    pump_curve = PumpCurve.from_dict(submission.pump_curve) if submission.pump_curve else None
+    calculation_results = calculate_energy_optimization(calc_data, pump_curve)
+    if not calculation_results or 'error' in calculation_results:
+        raise AnalysisStageError(f"Calculations failed: {(calculation_results or {}).get('error', 'no results')}")
+
+    qh_curve_data = submission.qh_curve_data
+    if qh_curve_data and qh_curve_data.get('success'):
+        calculation_results['qh_curve_data'] = qh_curve_data
+        calculation_results[f'plot{QH_SRC_PLOT}_data'] = qh_src_plot_data(qh_curve_data)
+
+    apply_calculation_results(submission, calculation_results)
+
+
+def _plot_mode() -> str:
+    return getattr(settings, 'ENERGY_PLOT_MODE', 'specs')
+
+
+def _render_plot_images(submission: EnergyOptimizationSubmission) -> Dict:
+    from .plot_rendering import render_energy_optimization_plots
+
+    plot_images = render_energy_optimization_plots(submission.calculation_results or {})
+    errors = plot_images.pop('errors', None)
+    if not any(plot_images.values()):
+        raise AnalysisStageError(f"No plots could be rendered: {errors}")
+    if errors:
+        print(f"Submission {submission.id}: some plots failed: {errors}")
+    return plot_images
+
+
+def _stage_plot(submission: EnergyOptimizationSubmission, calc_data: Dict):
+    """
+    Build chart specs for the analysis plots; PNGs are rendered here only
+    when ENERGY_PLOT_MODE is 'images', otherwise on demand
+    """
+    from .plot_specs import build_plot_specs
+
+    submission.plot_specs = build_plot_specs(submission.calculation_results or {})
+    if _plot_mode() == 'images':
+        submission.plot_images = _render_plot_images(submission)
+    else:
+        submission.plot_images = None
+    submission.plots_generated = True
+
+
+def ensure_plot_images(submission: EnergyOptimizationSubmission) -> Dict:
+    """
+    Render and store the PNG plots of a completed analysis if they were not
+    rendered yet (e.g. for a proposal export)
+    """
+    if not submission.plot_images:
+        submission.plot_images = _render_plot_images(submission)
+        submission.save(update_fields=['plot_images', 'updated_at'])
+    return submission.plot_images
+
+
+def _stage_proposal(submission: EnergyOptimizationSubmission, calc_data: Dict):
+    """Build the optimization proposal"""
+    from .proposal_generator import generate_energy_optimization_proposal
+
+    submission.proposal_data = generate_energy_optimization_proposal(calc_data, submission.calculation_results or {})
+    submission.proposal_generated = True
+
+
+STAGE_HANDLERS = {
+    'parse': (_stage_parse, ['qh_curve_data', 'pump_curve']),
+    'calculate': (_stage_calculate, [
+        'calculation_results', 'calculated_efficiency_before', 'calculated_efficiency_after',
+        'power_saving_kwh', 'cost_saving_per_day', 'co2_reduction_kg', 'trees_saved',
+        'payback_period_days', 'analysis_completed'
+    ]),
+    'plot': (_stage_plot, ['plot_specs', 'plot_images', 'plots_generated']),
+    'proposal': (_stage_proposal, ['proposal_data', 'proposal_generated']),
+}
+
+
+def _set_stage_status(submission: EnergyOptimizationSubmission, stage: str, stage_status: str, **extra):
+    entry = dict(submission.stage_status.get(stage, {}))
+    entry['status'] = stage_status
+    entry.update(extra)
+    submission.stage_status = {**submission.stage_status, stage: entry}
+
+
+def claim_submission(submission_id: int, restart: bool = False) -> bool:
+    """
+    Mark a submission's analysis as running unless another worker holds it
+
+    The claim is a single conditional UPDATE, so of two workers picking up
+    the same submission only one wins. A running claim older than
+    ENERGY_ANALYSIS_CLAIM_TIMEOUT is treated as abandoned by a worker that
+    died and may be taken over.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'ENERGY_ANALYSIS_CLAIM_TIMEOUT', 3600))
+    fields = {
+        'analysis_status': 'running',
+        'analysis_error': '',
+        'analysis_started_at': now,
+        'analysis_finished_at': None,
+        'updated_at': now,
+    }
+    if restart:
+        fields['stage_status'] = {}
+    claimable = (~Q(analysis_status='running') | Q(analysis_started_at__isnull=True) |
+                 Q(analysis_started_at__lt=stale_before))
+    return EnergyOptimizationSubmission.objects.filter(claimable, id=submission_id).update(**fields) == 1
+
+
+def run_energy_analysis(submission_id: int, restart: bool = False) -> Optional[EnergyOptimizationSubmission]:
+    """
+    Run all analysis stages for a submission, recording each stage's status
+
+    Stages that already completed are skipped unless restart is True, so a
+    failed or interrupted run resumes where it stopped. Submissions whose
+    inputs match a cached analysis reuse it without running any stage. A
+    submission another worker is already analysing is left alone.
+
+    Args:
+        submission_id: EnergyOptimizationSubmission primary key
+        restart: Re-run every stage from the beginning
+
+    Returns:
+        The updated submission, or None if it does not exist or is already
+        being analysed
+    """
+    if not claim_submission(submission_id, restart=restart):
+        if EnergyOptimizationSubmission.objects.filter(id=submission_id).exists():
+            print(f"Submission {submission_id}: analysis already running elsewhere")
+        else:
+            print(f"Energy optimization submission {submission_id} not found")
+        return None
+    submission = EnergyOptimizationSubmission.objects.get(id=submission_id)
+
+    from .analysis_cache import apply_cached_result, compute_input_hash, get_cached_result, store_result
+
+    calc_data = build_calc_data(submission)
+    input_hash = compute_input_hash(calc_data, submission)
+    if not restart:
+        cached = get_cached_result(input_hash)
+        if cached is not None:
+            print(f"Submission {submission_id}: reusing cached analysis {input_hash[:12]}")
+            apply_cached_result(submission, cached)
+            return submission
+
+    for stage in EnergyOptimizationSubmission.ANALYSIS_STAGES:
+        if submission.stage_status.get(stage, {}).get('status') == 'completed':
+            continue
+
+        handler, output_fields = STAGE_HANDLERS[stage]
+        started_at = timezone.now()
+        submission.analysis_stage = stage
+        _set_stage_status(submission, stage, 'running', started_at=started_at.isoformat(), error='')
+        submission.save(update_fields=['analysis_stage', 'stage_status', 'updated_at'])
+
+        try:
+            print(f"Submission {submission_id}: running {stage} stage...")
+            handler(submission, calc_data)
+        except Exception as stage_error:
+            error_details = traceback.format_exc()
+            print(f"Submission {submission_id}: {stage} stage failed: {error_details}")
+            finished_at = timezone.now()
+            _set_stage_status(submission, stage, 'failed', finished_at=finished_at.isoformat(),
+                              error=str(stage_error))
+            submission.analysis_status = 'failed'
+            submission.analysis_error = f'{stage} stage failed: {str(stage_error)}'
+            submission.analysis_finished_at = finished_at
+            submission.save(update_fields=['analysis_status', 'analysis_error', 'analysis_finished_at',
+                                           'stage_status', 'updated_at'])
+            return submission
+
+        finished_at = timezone.now()
+        _set_stage_status(submission, stage, 'completed', finished_at=finished_at.isoformat(),
+                          duration_ms=round((finished_at - started_at).total_seconds() * 1000))
+        submission.save(update_fields=output_fields + ['stage_status', 'updated_at'])
+
+    submission.analysis_status = 'completed'
+    submission.analysis_finished_at = timezone.now()
+    submission.save(update_fields=['analysis_status', 'analysis_finished_at', 'updated_at'])
+
+    try:
+        store_result(input_hash, submission)
+    except Exception as e:
+        print(f"Could not cache analysis for submission {submission_id}: {str(e)}")
+    return submission
+
+
+def _run_in_worker(submission_id: int, restart: bool):
+    close_old_connections()
+    try:
+        run_energy_analysis(submission_id, restart=restart)
+    except Exception as e:
+        print(f"Background analysis for submission {submission_id} crashed: {str(e)}")
+        traceback.print_exc()
+    finally:
+        connections.close_all()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide analysis worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ENERGY_ANALYSIS_WORKERS', 2),
+                    thread_name_prefix='energy-analysis'
+                )
+    return _executor
+
+
+def enqueue_energy_analysis(submission_id: int, restart: bool = False):
+    """
+    Queue the analysis of a submission once the current transaction commits
+
+    With ENERGY_ANALYSIS_EAGER enabled the analysis runs inline instead,
+    which is useful for local debugging.
+    """
+    if getattr(settings, 'ENERGY_ANALYSIS_EAGER', False):
+        transaction.on_commit(lambda: run_energy_analysis(submission_id, restart=restart))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, submission_id, restart))
@@ -9,29 +9,49 @@ from typing import Dict, List, Tuple, Optional
 import pandas as pd
 import numpy as np
 
+from .pump_curve import DUTY_SHUTOFF_RATIO, PumpCurve
+from .series_encoding import constant_series, linear_series
+from .water_properties import liquid_specific_gravity, pressure_head, resolve_specific_gravity
+
+
+GRAVITY = 9.81  # m/s²
+WATER_DENSITY = 1000  # kg/m³
+KWH_TO_TREES = 0.04  # 1 kWh = 0.04 trees
+KWH_TO_CO2_MIN = 0.5  # kg CO2 per kWh (minimum)
+KWH_TO_CO2_MAX = 0.9  # kg CO2 per kWh (maximum)
+KWH_TO_CO2_AVG = 0.7  # kg CO2 per kWh (average)
+TREND_DAYS = 365  # Length of the time-series plots
+COST_PER_KWH = 0.12  # $0.12 per kWh (example rate)
+INVESTMENT_COST = 50000  # $50,000 example investment
+
+# Bump whenever calculation, plot or proposal output changes so cached analyses are recomputed
+CALCULATOR_VERSION = '9'
+
 
 class EnergyOptimizationCalculator:
     """
     Main calculator class for energy optimization analysis
     """
     
-    def __init__(self, submission_data: Dict):
+    def __init__(self, submission_data: Dict, pump_curve: Optional[PumpCurve] = None):
         """
         Initialize calculator with submission data
         
         Args:
             submission_data: Dictionary containing all form data
+            pump_curve: Fitted pump curve; the nameplate curve is used if omitted
         """
-        self.data = submission_data
+        self.data = dict(submission_data)
         self.results = {}
+        self.pump_curve = pump_curve
         
         # Constants for calculations
-        self.GRAVITY = 9.81  # m/s²
-        self.WATER_DENSITY = 1000  # kg/m³
-        self.KWH_TO_TREES = 0.04  # 1 kWh = 0.04 trees
-        self.KWH_TO_CO2_MIN = 0.5  # kg CO2 per kWh (minimum)
-        self.KWH_TO_CO2_MAX = 0.9  # kg CO2 per kWh (maximum)
-        self.KWH_TO_CO2_AVG = 0.7  # kg CO2 per kWh (average)
+        self.GRAVITY = GRAVITY
+        self.WATER_DENSITY = WATER_DENSITY
+        self.KWH_TO_TREES = KWH_TO_TREES
+        self.KWH_TO_CO2_MIN = KWH_TO_CO2_MIN
+        self.KWH_TO_CO2_MAX = KWH_TO_CO2_MAX
+        self.KWH_TO_CO2_AVG = KWH_TO_CO2_AVG
         
     def calculate_all(self) -> Dict:
         """
@@ -41,9 +61,10 @@ class EnergyOptimizationCalculator:
             Dictionary containing all calculation results
         """
         try:
-            # Basic calculations
+            self._resolve_specific_gravity()
+            
+            # Basic calculations (efficiency also stores head_developed)
             self._calculate_pump_efficiency()
-            self._calculate_head_developed()
             self._calculate_power_requirements()
             self._calculate_energy_savings()
             self._calculate_cost_savings()
@@ -59,6 +80,40 @@ class EnergyOptimizationCalculator:
             print(f"Error in calculations: {str(e)}")
             return {"error": str(e)}
     
+    def _resolve_specific_gravity(self):
+        """
+        Without an entered specific gravity it is taken from the water table
+
+        Raises:
+            WaterPropertyError: The feed water temperature is outside the table
+        """
+        self.data['specific_gravity'] = liquid_specific_gravity(self.data)
+    
+    def calculate_baseline(self) -> Dict:
+        """
+        Calculate the current operating point without the savings projections
+        
+        Returns:
+            Dictionary with head, efficiencies, brake power and hydraulic power
+            (kW) of the existing pump at its duty point
+        """
+        self._resolve_specific_gravity()
+        self._calculate_pump_efficiency()
+        self._calculate_power_requirements()
+        
+        q_act = float(self.data.get('actual_flow_required', 0))
+        h_act = self.results.get('head_developed', 0)
+        sg = float(self.data.get('specific_gravity', 1.0))
+        hydraulic_power = (q_act * h_act * sg * self.WATER_DENSITY * self.GRAVITY) / 1000 if q_act > 0 and h_act > 0 else 0
+        
+        return {
+            'head_developed': h_act,
+            'efficiency_before': self.results.get('efficiency_before', 0),
+            'efficiency_after': self.results.get('efficiency_after', 0),
+            'power_before': self.results.get('power_before', 0),
+            'hydraulic_power': hydraulic_power,
+        }
+    
     def _calculate_pump_efficiency(self):
         """Calculate pump efficiency before and after optimization"""
         try:
@@ -98,13 +153,11 @@ class EnergyOptimizationCalculator:
             # Static head
             static_head = h2 - h1
             
-            # Pressure head difference
-            pressure_head = ((p2 - p1) * 10) / (sg * self.GRAVITY)  # Convert kg/cm² to meters
-            
-            # Total head
-            total_head = static_head + pressure_head
+            # Pressure head difference (kg/cm² to meters of liquid)
+            total_head = static_head + pressure_head(p2 - p1, sg)
             
             self.results['head_developed'] = round(total_head, 2)
+            self.results['specific_gravity'] = round(sg, 4)
             return total_head
             
         except Exception as e:
@@ -172,7 +225,7 @@ class EnergyOptimizationCalculator:
             daily_energy_saving = self.results.get('daily_energy_saving', 0)
             
             # Cost per kWh (can be made configurable)
-            cost_per_kwh = 0.12  # $0.12 per kWh (example rate)
+            cost_per_kwh = COST_PER_KWH
             
             # Daily cost saving
             daily_cost_saving = daily_energy_saving * cost_per_kwh
@@ -221,7 +274,7 @@ class EnergyOptimizationCalculator:
             annual_cost_saving = self.results.get('annual_cost_saving', 0)
             
             # Estimated investment cost (can be made configurable)
-            investment_cost = 50000  # $50,000 example investment
+            investment_cost = INVESTMENT_COST
             
             if annual_cost_saving > 0:
                 payback_period_days = (investment_cost / annual_cost_saving) * 365
@@ -279,6 +332,16 @@ class EnergyOptimizationCalculator:
         except Exception as e:
             print(f"Error generating plot data: {str(e)}")
     
+    def _get_pump_curve(self) -> PumpCurve:
+        """Fitted pump curve, built from the nameplate values on first use"""
+        if self.pump_curve is None:
+            self.pump_curve = PumpCurve.from_nameplate(
+                float(self.data.get('flow_qnp', 60)),
+                float(self.data.get('head_hnp', 910)),
+                speed=float(self.data.get('speed_n1', 2965))
+            )
+        return self.pump_curve
+    
     def _generate_qh_curve_data(self, src_data: Dict) -> Dict:
         """Generate Q-H curve data for Plot 1"""
         try:
@@ -287,19 +350,11 @@ class EnergyOptimizationCalculator:
             
             # Generate pump curve points
             q_points = np.linspace(0, q_np * 1.2, 20)
-            h_points = []
-            
-            for q in q_points:
-                # Simplified pump curve equation: H = H_np * (1 - (Q/Q_np)^2)
-                if q <= q_np:
-                    h = h_np * (1 - (q/q_np)**2)
-                else:
-                    h = h_np * (1 - (q/q_np)**2) * 0.5  # Steep drop after rated point
-                h_points.append(max(h, 0))
+            h_points = self._get_pump_curve().head(q_points)
             
             return {
                 'q_points': q_points.tolist(),
-                'h_points': h_points,
+                'h_points': h_points.tolist(),
                 'src1_points': src_data.get('src1', []),
                 'src2_points': src_data.get('src2', []),
                 'flow_points': src_data.get('flow_points', []),
@@ -315,7 +370,6 @@ class EnergyOptimizationCalculator:
         """Generate Q-H curve data for Plot 2 (different speeds)"""
         try:
             q_np = float(self.data.get('flow_qnp', 60))
-            h_np = float(self.data.get('head_hnp', 910))
             n1 = float(self.data.get('speed_n1', 2965))
             n2 = float(self.data.get('actual_speed_n2', 2900))
             
@@ -323,24 +377,19 @@ class EnergyOptimizationCalculator:
             q_points = np.linspace(0, q_np * 1.2, 20)
             
             # Original speed curve
-            h_points_n1 = []
-            for q in q_points:
-                if q <= q_np:
-                    h = h_np * (1 - (q/q_np)**2)
-                else:
-                    h = h_np * (1 - (q/q_np)**2) * 0.5
-                h_points_n1.append(max(h, 0))
+            pump_curve = self._get_pump_curve()
+            h_points_n1 = pump_curve.head(q_points)
             
             # Different speed curve (affinity laws)
             speed_ratio = n2 / n1
-            h_points_n2 = [h * (speed_ratio**2) for h in h_points_n1]
-            q_points_n2 = [q * speed_ratio for q in q_points]
+            q_points_n2 = q_points * speed_ratio
+            h_points_n2 = pump_curve.at_speed(n2).head(q_points_n2)
             
             return {
                 'q_points_n1': q_points.tolist(),
-                'h_points_n1': h_points_n1,
-                'q_points_n2': q_points_n2,
-                'h_points_n2': h_points_n2,
+                'h_points_n1': h_points_n1.tolist(),
+                'q_points_n2': q_points_n2.tolist(),
+                'h_points_n2': h_points_n2.tolist(),
                 'src1_points': src_data.get('src1', []),
                 'src3_points': src_data.get('src3', []),
                 'flow_points': src_data.get('flow_points', []),
@@ -363,18 +412,20 @@ class EnergyOptimizationCalculator:
             
             # Generate modified pump curve (improved efficiency)
             q_points_mod = np.linspace(0, q_act * 1.2, 20)
-            h_points_mod = []
             
-            for q in q_points_mod:
-                # Modified pump curve with better efficiency
-                h = h_act * (1 + 0.1 * (1 - (q/q_act)**2))
-                h_points_mod.append(max(h, h_act * 0.8))
+            # Modified pump curve with better efficiency
+            if q_act > 0:
+                h_points_mod = PumpCurve.from_duty_point(q_act, h_act).head(q_points_mod)
+            else:
+                # No required flow: the replacement curve reduces to its shutoff head
+                h_points_mod = np.full(q_points_mod.shape, h_act * DUTY_SHUTOFF_RATIO)
+            h_points_mod = np.maximum(h_points_mod, h_act * 0.8)
             
             return {
                 'q_points_req': q_points.tolist(),
                 'h_points_req': h_points,
                 'q_points_mod': q_points_mod.tolist(),
-                'h_points_mod': h_points_mod,
+                'h_points_mod': h_points_mod.tolist(),
                 'duty_point': {'q': q_act, 'h': h_act},
                 'title': 'Qreq–Hreq Curve with SRC (modified/replacement pump Curve)'
             }
@@ -407,17 +458,12 @@ class EnergyOptimizationCalculator:
             power_after = self.results.get('power_after', 0)
             power_saving = self.results.get('power_saving', 0)
             
-            # Generate 365 days of data
-            days = list(range(1, 366))
-            bkw1_data = [power_before] * 365
-            bkw2_data = [power_after] * 365
-            saving_data = [power_saving] * 365
-            
+            # 365 days of constant power data
             return {
-                'days': days,
-                'bkw1': bkw1_data,
-                'bkw2': bkw2_data,
-                'saving': saving_data,
+                'days': linear_series(1, TREND_DAYS),
+                'bkw1': constant_series(power_before, TREND_DAYS),
+                'bkw2': constant_series(power_after, TREND_DAYS),
+                'saving': constant_series(power_saving, TREND_DAYS),
                 'title': 'BKW1, BKW2, and Saving vs Time (days)'
             }
             
@@ -432,17 +478,12 @@ class EnergyOptimizationCalculator:
             power_before = self.results.get('power_before', 0)
             power_after = self.results.get('power_after', 0)
             
-            # Generate cumulative data
-            days = list(range(1, 366))
-            consumption_before = [power_before * 24] * 365
-            consumption_after = [power_after * 24] * 365
-            saving_cumulative = [daily_energy_saving * day for day in days]
-            
+            # Daily consumption is constant, savings accumulate linearly
             return {
-                'days': days,
-                'consumption_before': consumption_before,
-                'consumption_after': consumption_after,
-                'saving_cumulative': saving_cumulative,
+                'days': linear_series(1, TREND_DAYS),
+                'consumption_before': constant_series(power_before * 24, TREND_DAYS),
+                'consumption_after': constant_series(power_after * 24, TREND_DAYS),
+                'saving_cumulative': linear_series(daily_energy_saving, TREND_DAYS),
                 'title': 'Power Consumption (Before, After) and Saving vs Time (days)'
             }
             
@@ -458,15 +499,11 @@ class EnergyOptimizationCalculator:
             power_before = self.results.get('power_before', 0)
             power_after = self.results.get('power_after', 0)
             
-            # Generate cost data
-            days = list(range(1, 366))
-            cost_before = [power_before * 24 * cost_per_kwh] * 365
-            cost_after = [power_after * 24 * cost_per_kwh] * 365
-            
+            # Daily running cost
             return {
-                'days': days,
-                'cost_before': cost_before,
-                'cost_after': cost_after,
+                'days': linear_series(1, TREND_DAYS),
+                'cost_before': constant_series(power_before * 24 * cost_per_kwh, TREND_DAYS),
+                'cost_after': constant_series(power_after * 24 * cost_per_kwh, TREND_DAYS),
                 'title': 'Cost of Pump Running (Before, After) vs Time (days)'
             }
             
@@ -481,15 +518,11 @@ class EnergyOptimizationCalculator:
             investment_cost = self.results.get('investment_cost', 50000)
             payback_period_days = self.results.get('payback_period_days', 0)
             
-            # Generate cumulative savings
-            days = list(range(1, 366))
-            cumulative_savings = [daily_cost_saving * day for day in days]
-            investment_line = [investment_cost] * 365
-            
+            # Cumulative savings against the flat investment line
             return {
-                'days': days,
-                'cumulative_savings': cumulative_savings,
-                'investment_line': investment_line,
+                'days': linear_series(1, TREND_DAYS),
+                'cumulative_savings': linear_series(daily_cost_saving, TREND_DAYS),
+                'investment_line': constant_series(investment_cost, TREND_DAYS),
                 'payback_day': payback_period_days,
                 'break_even_point': {'day': payback_period_days, 'amount': investment_cost},
                 'title': 'Money Saved vs Time (days) with Investment Cost Curve'
@@ -504,14 +537,11 @@ class EnergyOptimizationCalculator:
         try:
             daily_trees_saved = self.results.get('daily_trees_saved', 0)
             
-            # Generate cumulative trees saved
-            days = list(range(1, 366))
-            cumulative_trees = [daily_trees_saved * day for day in days]
-            
+            # Cumulative trees saved
             return {
-                'days': days,
-                'cumulative_trees': cumulative_trees,
-                'daily_trees': [daily_trees_saved] * 365,
+                'days': linear_series(1, TREND_DAYS),
+                'cumulative_trees': linear_series(daily_trees_saved, TREND_DAYS),
+                'daily_trees': constant_series(daily_trees_saved, TREND_DAYS),
                 'title': 'Number of Trees Saved vs Time (days)'
             }
             
@@ -524,14 +554,11 @@ class EnergyOptimizationCalculator:
         try:
             daily_co2_reduction = self.results.get('daily_co2_reduction', 0)
             
-            # Generate cumulative CO2 reduction
-            days = list(range(1, 366))
-            cumulative_co2 = [daily_co2_reduction * day for day in days]
-            
+            # Cumulative CO2 reduction
             return {
-                'days': days,
-                'cumulative_co2': cumulative_co2,
-                'daily_co2': [daily_co2_reduction] * 365,
+                'days': linear_series(1, TREND_DAYS),
+                'cumulative_co2': linear_series(daily_co2_reduction, TREND_DAYS),
+                'daily_co2': constant_series(daily_co2_reduction, TREND_DAYS),
                 'title': 'CO₂ Reduction (kg) vs Time (days)'
             }
             
@@ -540,15 +567,226 @@ class EnergyOptimizationCalculator:
             return {'error': str(e)}
 
 
-def calculate_energy_optimization(submission_data: Dict) -> Dict:
+def calculate_energy_optimization(submission_data: Dict, pump_curve: Optional[PumpCurve] = None) -> Dict:
     """
     Main function to calculate energy optimization results
     
     Args:
         submission_data: Dictionary containing all form data
+        pump_curve: Fitted pump curve of the submission, if any
         
     Returns:
         Dictionary containing all calculation results
     """
-    calculator = EnergyOptimizationCalculator(submission_data)
+    calculator = EnergyOptimizationCalculator(submission_data, pump_curve)
     return calculator.calculate_all()
+
+
+# Submission parameters used by the batch calculator, with the same defaults
+# the scalar calculator falls back to for missing fields
+BATCH_PARAMETER_DEFAULTS = {
+    'da_tank_height': 0.0,
+    'boiler_drum_height': 0.0,
+    'da_tank_pressure': 0.0,
+    'boiler_drum_pressure': 0.0,
+    # Not entered: NaN, as 0 °C is a valid temperature
+    'feed_water_temp': np.nan,
+    # Not entered: taken from the water table at the feed water temperature
+    'specific_gravity': 0.0,
+    'actual_flow_required': 0.0,
+    'actual_power_consumption': 0.0,
+    'efficiency': 0.0,
+}
+
+BATCH_RESULT_FIELDS = [
+    'head_developed', 'efficiency_before', 'efficiency_after',
+    'power_before', 'power_after', 'power_saving',
+    'daily_energy_saving', 'annual_energy_saving',
+    'daily_cost_saving', 'annual_cost_saving',
+    'daily_trees_saved', 'annual_trees_saved',
+    'daily_co2_reduction', 'annual_co2_reduction',
+    'payback_period_days', 'payback_period_years',
+]
+
+
+def round_half_even(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Round an array exactly like Python's round() does for each element
+
+    np.round scales by 10**digits first, which can land on the other side of
+    a .5 boundary; only those borderline elements are re-rounded in Python.
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * (10.0 ** digits)
+    rounded = np.round(values, digits)
+    with np.errstate(invalid='ignore'):
+        borderline = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+        borderline |= np.abs(scaled) >= 2.0 ** 50
+    borderline &= np.isfinite(values)
+    for index in np.flatnonzero(borderline):
+        rounded[index] = round(float(values[index]), digits)
+    return rounded
+
+
+class BatchEnergyOptimizationCalculator:
+    """
+    Vectorized counterpart of EnergyOptimizationCalculator
+
+    Computes the headline results (head, efficiency, power, savings, CO2 and
+    payback) for many pumps in one pass over NumPy arrays. Every step follows
+    the scalar calculator, including its intermediate rounding, so each row
+    matches what calculate_energy_optimization() returns for that pump.
+    Plot data is not generated here.
+    """
+
+    def __init__(self, parameters: Dict):
+        """
+        Initialize calculator with parameter arrays
+
+        Args:
+            parameters: Dictionary of equal-length sequences keyed by submission
+                field name; missing fields use the scalar calculator's defaults
+        """
+        size = None
+        self.data = {}
+        for name, default in BATCH_PARAMETER_DEFAULTS.items():
+            if name in parameters:
+                values = np.asarray(parameters[name], dtype=float)
+                if size is not None and values.shape != (size,):
+                    raise ValueError(f"Parameter '{name}' has {values.size} values, expected {size}")
+                size = values.size
+                self.data[name] = values
+        if size is None:
+            size = 0
+        for name, default in BATCH_PARAMETER_DEFAULTS.items():
+            if name not in self.data:
+                self.data[name] = np.full(size, default)
+        self.data['specific_gravity'] = resolve_specific_gravity(
+            self.data['specific_gravity'], self.data['feed_water_temp'], self.data['da_tank_pressure']
+        )
+        self.size = size
+        self.results = {}
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'BatchEnergyOptimizationCalculator':
+        """
+        Build a calculator from a list of submission dictionaries (empty or
+        None values fall back to the field defaults)
+        """
+        parameters = {}
+        for name, default in BATCH_PARAMETER_DEFAULTS.items():
+            values = []
+            for record in records:
+                value = record.get(name)
+                values.append(default if value in (None, '') else float(value))
+            parameters[name] = values
+        return cls(parameters)
+
+    def calculate_all(self) -> Dict[str, np.ndarray]:
+        """
+        Perform the energy optimization calculations for every pump
+
+        Returns:
+            Dictionary of result arrays keyed by result name
+        """
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            self._calculate_head_and_efficiency()
+            self._calculate_power_requirements()
+            self._calculate_savings()
+        return self.results
+
+    def _calculate_head_and_efficiency(self):
+        h1 = self.data['da_tank_height']
+        h2 = self.data['boiler_drum_height']
+        p1 = self.data['da_tank_pressure']
+        p2 = self.data['boiler_drum_pressure']
+        sg = self.data['specific_gravity']
+        q_act = self.data['actual_flow_required']
+        power_actual = self.data['actual_power_consumption']
+
+        total_head = (h2 - h1) + pressure_head(p2 - p1, sg)
+
+        hydraulic_power = (q_act * total_head * sg * WATER_DENSITY * GRAVITY) / 1000
+        measured = (q_act > 0) & (power_actual > 0)
+        efficiency_before = np.where(measured, (hydraulic_power / power_actual) * 100, self.data['efficiency'])
+        efficiency_after = np.minimum(efficiency_before * 1.15, 85)
+
+        self.results['head_developed'] = round_half_even(total_head, 2)
+        self.results['efficiency_before'] = round_half_even(efficiency_before, 2)
+        self.results['efficiency_after'] = round_half_even(efficiency_after, 2)
+
+    def _calculate_power_requirements(self):
+        q_act = self.data['actual_flow_required']
+        sg = self.data['specific_gravity']
+        h_act = self.results['head_developed']
+        efficiency_before = self.results['efficiency_before']
+        efficiency_after = self.results['efficiency_after']
+
+        hydraulic_power = (q_act * h_act * sg * WATER_DENSITY * GRAVITY) / 1000
+        power_before = np.where(efficiency_before > 0, hydraulic_power / (efficiency_before / 100),
+                                self.data['actual_power_consumption'])
+        power_after = np.where(efficiency_after > 0, hydraulic_power / (efficiency_after / 100), power_before)
+
+        # Without a duty point the scalar path leaves power results at 0
+        has_duty = (q_act > 0) & (h_act > 0)
+        self.results['power_before'] = np.where(has_duty, round_half_even(power_before, 2), 0.0)
+        self.results['power_after'] = np.where(has_duty, round_half_even(power_after, 2), 0.0)
+        self.results['power_saving'] = np.where(has_duty, round_half_even(power_before - power_after, 2), 0.0)
+
+    def _calculate_savings(self):
+        daily_energy_saving = self.results['power_saving'] * 24
+        annual_energy_saving = daily_energy_saving * 365
+        self.results['daily_energy_saving'] = round_half_even(daily_energy_saving, 2)
+        self.results['annual_energy_saving'] = round_half_even(annual_energy_saving, 2)
+
+        daily_cost_saving = self.results['daily_energy_saving'] * COST_PER_KWH
+        annual_cost_saving = daily_cost_saving * 365
+        self.results['daily_cost_saving'] = round_half_even(daily_cost_saving, 2)
+        self.results['annual_cost_saving'] = round_half_even(annual_cost_saving, 2)
+
+        daily_energy = self.results['daily_energy_saving']
+        annual_energy = self.results['annual_energy_saving']
+        self.results['daily_trees_saved'] = round_half_even(daily_energy * KWH_TO_TREES, 2)
+        self.results['annual_trees_saved'] = round_half_even(annual_energy * KWH_TO_TREES, 2)
+        self.results['daily_co2_reduction'] = round_half_even(daily_energy * KWH_TO_CO2_AVG, 2)
+        self.results['annual_co2_reduction'] = round_half_even(annual_energy * KWH_TO_CO2_AVG, 2)
+
+        annual_cost = self.results['annual_cost_saving']
+        has_saving = annual_cost > 0
+        self.results['payback_period_days'] = np.where(
+            has_saving, round_half_even((INVESTMENT_COST / annual_cost) * 365, 0), 0.0
+        )
+        self.results['payback_period_years'] = np.where(
+            has_saving, round_half_even(INVESTMENT_COST / annual_cost, 2), 0.0
+        )
+
+    def to_records(self) -> List[Dict]:
+        """
+        Per-pump result dictionaries with the same keys and values as the
+        headline results of calculate_energy_optimization()
+        """
+        if not self.results:
+            self.calculate_all()
+        columns = {name: self.results[name].tolist() for name in BATCH_RESULT_FIELDS}
+        records = []
+        for index in range(self.size):
+            record = {name: columns[name][index] for name in BATCH_RESULT_FIELDS}
+            record['cost_per_kwh'] = COST_PER_KWH
+            record['investment_cost'] = INVESTMENT_COST
+            records.append(record)
+        return records
+
+
+def calculate_energy_optimization_batch(submissions: List[Dict]) -> List[Dict]:
+    """
+    Calculate headline energy optimization results for many pumps at once
+    
+    Args:
+        submissions: List of dictionaries with the same fields as the form data
+        
+    Returns:
+        List of result dictionaries, one per submission
+    """
+    calculator = BatchEnergyOptimizationCalculator.from_records(submissions)
+    calculator.calculate_all()
+    return calculator.to_records()
@@ -0,0 +1,157 @@
+"""
+Generated Document Delivery
+Streams generated documents from spooled temp files with Content-Length and range support
+"""
+
+import os
+import re
+import shutil
+import tempfile
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+
+STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def create_spooled_file():
+    """
+    Temp file that stays in memory for small documents and rolls over to disk
+    once it grows past GENERATED_DOCUMENT_SPOOL_SIZE
+    """
+    max_size = getattr(settings, 'GENERATED_DOCUMENT_SPOOL_SIZE', 1024 * 1024)
+    return tempfile.SpooledTemporaryFile(max_size=max_size)
+
+
+class CleanupFile:
+    """
+    File wrapper that runs cleanup hooks (e.g. removing temp files or
+    directories) once the response has finished with it
+    """
+
+    def __init__(self, file, cleanup_hooks: Iterable[Callable] = ()):
+        self._file = file
+        self._cleanup_hooks = list(cleanup_hooks)
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._file.close()
+        finally:
+            for hook in self._cleanup_hooks:
+                try:
+                    hook()
+                except Exception as e:
+                    print(f"Document cleanup failed: {str(e)}")
+
+
+def open_temporary_file(path: str, cleanup_dir: Optional[str] = None) -> CleanupFile:
+    """
+    Open a generated file for streaming and delete it (and its temp directory)
+    when the response is closed
+    """
+    hooks = [lambda: os.path.exists(path) and os.unlink(path)]
+    if cleanup_dir:
+        hooks.append(lambda: shutil.rmtree(cleanup_dir, ignore_errors=True))
+    return CleanupFile(open(path, 'rb'), hooks)
+
+
+def _get_file_size(file) -> int:
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+def _parse_range(range_header: str, size: int):
+    """
+    Parse a single 'bytes=start-end' range. Returns (start, end) inclusive,
+    None for a missing or unsupported header, or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(range_header.strip()) if range_header else None
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _iter_file_range(file, start: int, length: int):
+    try:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def create_file_response(file, filename: str, content_type: str, request=None):
+    """
+    Stream a generated document back to the client
+
+    Args:
+        file: Readable, seekable file object; it is closed when the response is
+        filename: Download filename for Content-Disposition
+        content_type: MIME type of the document
+        request: Incoming request, used to honour a single byte Range
+
+    Returns:
+        FileResponse, or a 206/416 response for range requests
+    """
+    size = _get_file_size(file)
+    range_header = request.META.get('HTTP_RANGE', '') if request is not None else ''
+    byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        file.close()
+        response = StreamingHttpResponse(iter(()), status=416, content_type=content_type)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(file, start, length), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    else:
+        response = FileResponse(file, content_type=content_type, as_attachment=True, filename=filename)
+        response.block_size = STREAM_CHUNK_SIZE
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,249 @@
+"""
+Fleet Energy Analysis
+Runs the batch energy calculator over every pump of a plant and aggregates savings per site and configuration
+"""
+
+import csv
+import io
+import json
+import math
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from .energy_calculations import (
+    BATCH_PARAMETER_DEFAULTS, BATCH_RESULT_FIELDS, BatchEnergyOptimizationCalculator,
+    COST_PER_KWH, INVESTMENT_COST,
+)
+from .models import EnergyOptimizationSubmission
+from .water_properties import MAX_TEMPERATURE, MIN_TEMPERATURE
+
+
+# Form field names (camelCase) accepted as aliases for the submission fields
+FIELD_ALIASES = {
+    'projectType': 'project_type',
+    'pumpTag': 'pump_tag',
+    'daTankHeight': 'da_tank_height',
+    'boilerDrumHeight': 'boiler_drum_height',
+    'daTankPressure': 'da_tank_pressure',
+    'boilerDrumPressure': 'boiler_drum_pressure',
+    'feedWaterTemp': 'feed_water_temp',
+    'specificGravity': 'specific_gravity',
+    'actualFlowRequired': 'actual_flow_required',
+    'actualPowerConsumption': 'actual_power_consumption',
+}
+
+PROJECT_TYPES = [choice for choice, _ in EnergyOptimizationSubmission.PROJECT_TYPE_CHOICES]
+DUTY_CHOICES = ['running', 'standby']
+
+PUMP_OUTPUT_FIELDS = ['row', 'site', 'pump_tag', 'project_type', 'duty'] + BATCH_RESULT_FIELDS
+
+# Per-pump results summed for each site/configuration (standby pumps contribute nothing)
+SUMMED_FIELDS = [
+    'power_before', 'power_after', 'power_saving',
+    'daily_energy_saving', 'annual_energy_saving',
+    'daily_cost_saving', 'annual_cost_saving',
+    'annual_trees_saved', 'annual_co2_reduction',
+]
+
+SUMMARY_OUTPUT_FIELDS = [
+    'site', 'project_type', 'pump_count', 'running_count', 'standby_count',
+] + SUMMED_FIELDS + ['investment_cost', 'payback_period_days']
+
+STREAM_BATCH_SIZE = 500
+
+
+def _normalize_row(row: Dict) -> Dict:
+    normalized = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = key.strip()
+        normalized[FIELD_ALIASES.get(key, key)] = value.strip() if isinstance(value, str) else value
+    return normalized
+
+
+def read_fleet_csv(file) -> List[Dict]:
+    """
+    Read pump rows from an uploaded CSV file (header row required)
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        return list(csv.DictReader(text))
+    finally:
+        text.detach()
+
+
+def parse_fleet_rows(rows: Iterable[Dict], default_site: str = '') -> Tuple[List[Dict], List[Dict]]:
+    """
+    Validate pump rows for fleet analysis
+
+    Args:
+        rows: Pump dictionaries (CSV rows or JSON objects); snake_case and form
+            camelCase field names are both accepted
+        default_site: Site used for rows without a site column
+
+    Returns:
+        Tuple of (valid pumps, row errors)
+    """
+    pumps = []
+    errors = []
+
+    for row_number, raw_row in enumerate(rows, 1):
+        if not isinstance(raw_row, dict):
+            errors.append({'row': row_number, 'errors': ['Row must be an object']})
+            continue
+
+        row = _normalize_row(raw_row)
+        row_errors = []
+
+        pump = {
+            'row': row_number,
+            'site': str(row.get('site') or default_site or 'Unassigned'),
+            'pump_tag': str(row.get('pump_tag') or f'Pump {row_number}'),
+            'project_type': row.get('project_type') or '',
+            'duty': str(row.get('duty') or 'running').lower(),
+        }
+
+        if pump['project_type'] not in PROJECT_TYPES:
+            row_errors.append(f"project_type must be one of: {', '.join(PROJECT_TYPES)}")
+        if pump['duty'] not in DUTY_CHOICES:
+            row_errors.append(f"duty must be one of: {', '.join(DUTY_CHOICES)}")
+
+        for field, default in BATCH_PARAMETER_DEFAULTS.items():
+            value = row.get(field)
+            if value in (None, ''):
+                pump[field] = default
+                continue
+            try:
+                pump[field] = float(value)
+            except (TypeError, ValueError):
+                row_errors.append(f'{field} must be a number')
+                continue
+            if not math.isfinite(pump[field]):
+                row_errors.append(f'{field} must be a finite number')
+
+        # Rows without a specific gravity read it from the water table at this temperature
+        if (not row_errors and pump['specific_gravity'] <= 0 and not math.isnan(pump['feed_water_temp'])
+                and not MIN_TEMPERATURE <= pump['feed_water_temp'] <= MAX_TEMPERATURE):
+            row_errors.append(
+                f'feed_water_temp must be between {MIN_TEMPERATURE:g} and {MAX_TEMPERATURE:g} °C '
+                f'without a specific_gravity'
+            )
+
+        if row_errors:
+            errors.append({'row': row_number, 'pump_tag': pump['pump_tag'], 'errors': row_errors})
+        else:
+            pumps.append(pump)
+
+    return pumps, errors
+
+
+def _summarize(frame: pd.DataFrame) -> Dict:
+    running = frame['duty'] == 'running'
+    totals = {
+        'pump_count': int(len(frame)),
+        'running_count': int(running.sum()),
+        'standby_count': int((~running).sum()),
+    }
+    for field in SUMMED_FIELDS:
+        totals[field] = round(float(frame.loc[running, field].sum()), 2)
+
+    investment_cost = INVESTMENT_COST * totals['running_count']
+    annual_cost_saving = totals['annual_cost_saving']
+    totals['investment_cost'] = investment_cost
+    totals['payback_period_days'] = (
+        round((investment_cost / annual_cost_saving) * 365, 0) if annual_cost_saving > 0 else 0
+    )
+    return totals
+
+
+def analyze_fleet(pumps: List[Dict]) -> Tuple[List[Dict], Dict]:
+    """
+    Run the batch calculator over a fleet and aggregate the results
+
+    Args:
+        pumps: Validated pumps from parse_fleet_rows()
+
+    Returns:
+        Tuple of (per-pump results, summary with per-site/configuration totals)
+    """
+    calculator = BatchEnergyOptimizationCalculator.from_records(pumps)
+    results = calculator.calculate_all()
+
+    frame = pd.DataFrame({
+        'site': [pump['site'] for pump in pumps],
+        'project_type': [pump['project_type'] for pump in pumps],
+        'duty': [pump['duty'] for pump in pumps],
+        **{field: results[field] for field in BATCH_RESULT_FIELDS},
+    })
+
+    groups = []
+    for (site, project_type), group in frame.groupby(['site', 'project_type'], sort=True):
+        entry = {'site': site, 'project_type': project_type}
+        entry.update(_summarize(group))
+        if entry['running_count'] != entry['standby_count']:
+            # Every R + S configuration pairs each running pump with a standby
+            entry['warning'] = (
+                f"{entry['running_count']} running and {entry['standby_count']} standby pumps "
+                f"do not match the {project_type} configuration"
+            )
+        groups.append(entry)
+
+    sites = []
+    for site, group in frame.groupby('site', sort=True):
+        entry = {'site': site}
+        entry.update(_summarize(group))
+        sites.append(entry)
+
+    summary = {
+        'cost_per_kwh': COST_PER_KWH,
+        'investment_cost_per_pump': INVESTMENT_COST,
+        'fleet': _summarize(frame) if len(frame) else {},
+        'sites': sites,
+        'configurations': groups,
+    }
+
+    columns = {field: results[field].tolist() for field in BATCH_RESULT_FIELDS}
+    pump_results = []
+    for index, pump in enumerate(pumps):
+        record = {field: pump[field] for field in ('row', 'site', 'pump_tag', 'project_type', 'duty')}
+        for field in BATCH_RESULT_FIELDS:
+            record[field] = columns[field][index]
+        pump_results.append(record)
+
+    return pump_results, summary
+
+
+def iter_fleet_json(pump_results: List[Dict], summary: Dict, errors: List[Dict]):
+    """
+    Stream the fleet report as one JSON document; the summary comes first so
+    clients can show plant totals before the per-pump rows arrive
+    """
+    yield '{"success": true, '
+    yield f'"pump_count": {len(pump_results)}, '
+    yield f'"summary": {json.dumps(summary)}, '
+    yield f'"rejected_rows": {json.dumps(errors)}, '
+    yield '"pumps": ['
+    for start in range(0, len(pump_results), STREAM_BATCH_SIZE):
+        chunk = pump_results[start:start + STREAM_BATCH_SIZE]
+        prefix = ', ' if start else ''
+        yield prefix + ', '.join(json.dumps(record) for record in chunk)
+    yield ']}'
+
+
+class _CSVLineBuffer:
+    """Write target for csv.writer that hands back what was just written"""
+
+    def write(self, value):
+        return value
+
+
+def iter_fleet_csv(records: List[Dict], fieldnames: List[str]):
+    """
+    Stream result rows as CSV
+    """
+    writer = csv.DictWriter(_CSVLineBuffer(), fieldnames=fieldnames, extrasaction='ignore')
+    yield writer.writeheader()
+    for start in range(0, len(records), STREAM_BATCH_SIZE):
+        yield ''.join(writer.writerow(record) for record in records[start:start + STREAM_BATCH_SIZE])
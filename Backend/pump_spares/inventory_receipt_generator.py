@@ -10,25 +10,15 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
 import tempfile
 import subprocess
-import random
+from .file_responses import create_file_response, create_spooled_file, open_temporary_file
+from .reference_numbers import allocate_reference_number
 
 def generate_reference_number(customer_info=None):
     """
     Generate reference number with GST + last 2 digits sequential
     """
-    if customer_info and customer_info.get('gst_number'):
-        gst = customer_info.get('gst_number')
-        # Extract last 2 digits from GST number
-        last_two = gst[-2:] if len(gst) >= 2 else '00'
-        # Generate unique sequential number using timestamp + random
-        timestamp_part = str(int(datetime.now().timestamp()))[-6:]
-        random_part = str(random.randint(100, 999))
-        return f"{gst}{last_two}{timestamp_part}{random_part}"
-    else:
-        # Fallback: generate random reference with timestamp
-        timestamp_part = datetime.now().strftime('%y%m%d%H%M')
-        random_part = str(random.randint(1000, 9999))
-        return f"INV{timestamp_part}{random_part}"
+    gst = customer_info.get('gst_number') if customer_info else None
+    return allocate_reference_number(gst, fallback_prefix='INV', source='inventory_receipt')
 
 def create_comprehensive_template():
     """
@@ -178,7 +168,7 @@ def create_comprehensive_template():
     
     return doc
 
-def create_inventory_receipt_response(cart_items, customer_info=None):
+def create_inventory_receipt_response(cart_items, customer_info=None, request=None):
     """
     Generate a receipt document for inventory items and return as HTTP response
     """
@@ -274,39 +264,32 @@ def create_inventory_receipt_response(cart_items, customer_info=None):
                             if placeholder in paragraph.text:
                                 paragraph.text = paragraph.text.replace(placeholder, replacement)
         
-        # Save to buffer
-        buffer = io.BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        file_content = buffer.getvalue()
+        # Save to a spooled temp file
+        docx_file = create_spooled_file()
+        doc.save(docx_file)
+        docx_file.seek(0)
         
         # Try to convert to PDF using alternative method
         try:
-            pdf_content = convert_docx_to_pdf_alternative(file_content)
-            
-            response = HttpResponse(
-                pdf_content,
-                content_type='application/pdf'
-            )
+            pdf_path, output_dir = convert_docx_to_pdf_alternative(docx_file)
+            docx_file.close()
             
             filename = f"Pump_Spares_Quotation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            return create_file_response(
+                open_temporary_file(pdf_path, cleanup_dir=output_dir),
+                filename, 'application/pdf', request=request
+            )
             
         except Exception as pdf_error:
             # Fallback to DOCX if PDF conversion fails
             print(f"PDF conversion failed, falling back to DOCX: {pdf_error}")
             
-            response = HttpResponse(
-                file_content,
-                content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
-            
             filename = f"Pump_Spares_Quotation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            return create_file_response(
+                docx_file, filename,
+                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                request=request
+            )
         
     except Exception as e:
         error_response = HttpResponse(
@@ -316,7 +299,7 @@ def create_inventory_receipt_response(cart_items, customer_info=None):
         )
         return error_response
 
-def convert_docx_to_pdf_alternative(docx_content):
+def convert_docx_to_pdf_alternative(docx_file):
     """
     Convert DOCX to PDF using alternative method (currently returns DOCX)
     """
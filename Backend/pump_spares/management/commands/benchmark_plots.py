@@ -0,0 +1,118 @@
+import base64
+import multiprocessing
+import resource
+import statistics
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from pump_spares.energy_calculations import calculate_energy_optimization
+from pump_spares.plot_generator import PLOT_NUMBERS, EnergyOptimizationPlotGenerator
+
+
+# Representative 1R + 1S boiler feed pump
+SAMPLE_SUBMISSION = {
+    'project_type': '1R + 1S',
+    'da_tank_height': 5,
+    'boiler_drum_height': 25,
+    'da_tank_pressure': 5,
+    'boiler_drum_pressure': 100,
+    'specific_gravity': 0.92,
+    'actual_flow_required': 43,
+    'actual_power_consumption': 90000,
+    'efficiency': 70,
+    'flow_qnp': 60,
+    'head_hnp': 910,
+    'speed_n1': 2965,
+    'actual_speed_n2': 2900,
+}
+
+MODES = {
+    'figure-per-plot': False,
+    'shared-canvas': True,
+}
+
+
+def benchmark_plot_rendering(reuse_canvas, calculation_results, repeat, image_format, dpi):
+    """
+    Render every plot repeat times and report median milliseconds per plot,
+    image sizes and the process's peak RSS; run it in a fresh process so the
+    peak belongs to one rendering path
+    """
+    generator = EnergyOptimizationPlotGenerator(image_format=image_format, dpi=dpi, reuse_canvas=reuse_canvas)
+    baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = {number: [] for number in PLOT_NUMBERS}
+    sizes = {}
+    for _ in range(repeat):
+        for number in PLOT_NUMBERS:
+            started_at = time.perf_counter()
+            image = getattr(generator, f'_generate_plot{number}')(calculation_results.get(f'plot{number}_data', {}))
+            timings[number].append((time.perf_counter() - started_at) * 1000)
+            sizes[number] = len(base64.b64decode(image))
+    return {
+        'median_ms': {number: statistics.median(values) for number, values in timings.items()},
+        'sizes': sizes,
+        'baseline_rss_kb': baseline_rss_kb,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare per-plot render time and peak memory of the plot rendering paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Renders of each plot per mode; the median time is reported'
+        )
+        parser.add_argument(
+            '--output',
+            default='png',
+            choices=['png', 'webp', 'svg'],
+            help='Image format to render'
+        )
+        parser.add_argument(
+            '--dpi',
+            type=int,
+            default=300,
+            help='Render resolution'
+        )
+
+    def handle(self, *args, **options):
+        calculation_results = calculate_energy_optimization(SAMPLE_SUBMISSION)
+
+        # Each mode runs in its own process so peak RSS is not shared between them
+        context = multiprocessing.get_context('spawn')
+        results = {}
+        for mode, reuse_canvas in MODES.items():
+            self.stdout.write(f'Rendering {len(PLOT_NUMBERS)} plots x {options["repeat"]} ({mode})')
+            # Workers set Django up before importing this module to unpickle the benchmark
+            with context.Pool(1, initializer=django.setup) as pool:
+                results[mode] = pool.apply(benchmark_plot_rendering, (
+                    reuse_canvas, calculation_results, options['repeat'], options['output'], options['dpi']
+                ))
+
+        before, after = results['figure-per-plot'], results['shared-canvas']
+        self.stdout.write('')
+        self.stdout.write(f'{"plot":<6}{"before ms":>12}{"after ms":>12}{"speedup":>10}{"before KB":>12}{"after KB":>12}')
+        for number in PLOT_NUMBERS:
+            before_ms = before['median_ms'][number]
+            after_ms = after['median_ms'][number]
+            self.stdout.write(
+                f'{number:<6}{before_ms:>12.1f}{after_ms:>12.1f}{before_ms / after_ms:>9.2f}x'
+                f'{before["sizes"][number] / 1024:>12.1f}{after["sizes"][number] / 1024:>12.1f}'
+            )
+
+        total_before = sum(before['median_ms'].values())
+        total_after = sum(after['median_ms'].values())
+        self.stdout.write(f'{"total":<6}{total_before:>12.1f}{total_after:>12.1f}{total_before / total_after:>9.2f}x')
+        self.stdout.write('')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode}: peak RSS {result["peak_rss_kb"] / 1024:.0f} MB '
+                f'({(result["peak_rss_kb"] - result["baseline_rss_kb"]) / 1024:.0f} MB above start)'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
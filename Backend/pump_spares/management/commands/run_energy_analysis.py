@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from pump_spares.models import EnergyOptimizationSubmission
+from pump_spares.energy_analysis_pipeline import run_energy_analysis
+
+
+class Command(BaseCommand):
+    help = 'Run or resume energy optimization analysis for submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'submission_ids',
+            nargs='*',
+            type=int,
+            help='Submission IDs to analyse (defaults to all pending, running or failed submissions)'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Re-run every stage instead of resuming after the last completed one'
+        )
+
+    def handle(self, *args, **options):
+        submission_ids = options['submission_ids']
+        
+        if not submission_ids:
+            submission_ids = list(
+                EnergyOptimizationSubmission.objects.filter(
+                    analysis_status__in=['pending', 'running', 'failed']
+                ).order_by('created_at').values_list('id', flat=True)
+            )
+        
+        if not submission_ids:
+            self.stdout.write('No submissions need analysis')
+            return
+        
+        completed_count = 0
+        failed_count = 0
+        
+        for submission_id in submission_ids:
+            submission = run_energy_analysis(submission_id, restart=options['restart'])
+            if submission is None:
+                if not EnergyOptimizationSubmission.objects.filter(id=submission_id).exists():
+                    raise CommandError(f'Submission {submission_id} not found')
+                self.stdout.write(f'Submission {submission_id}: already running, skipped')
+                continue
+            
+            if submission.analysis_status == 'completed':
+                completed_count += 1
+                self.stdout.write(f'Submission {submission_id}: completed')
+            else:
+                failed_count += 1
+                self.stdout.write(
+                    self.style.ERROR(f'Submission {submission_id}: {submission.analysis_error}')
+                )
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nAnalysis Summary:\n'
+                f'Completed: {completed_count} submissions\n'
+                f'Failed: {failed_count} submissions'
+            )
+        )
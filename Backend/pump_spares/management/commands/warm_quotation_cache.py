@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from pump_spares.quotation_cache import warm_quotation_cache
+
+
+class Command(BaseCommand):
+    help = 'Pre-render quotation bodies for the most requested materials'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=50,
+            help='Number of most requested materials to pre-render'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render bodies even if they are up to date'
+        )
+
+    def handle(self, *args, **options):
+        top_n = options['top']
+        
+        self.stdout.write(f'Warming quotation cache for top {top_n} materials')
+        
+        rendered_ids = warm_quotation_cache(top_n=top_n, force=options['force'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Rendered {len(rendered_ids)} quotation bodies')
+        )
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0007_energyoptimizationsubmission_actual_discharge_pressure_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssuedReferenceNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference_number', models.CharField(max_length=80, unique=True)),
+                ('prefix', models.CharField(db_index=True, max_length=50)),
+                ('sequence_value', models.PositiveBigIntegerField()),
+                ('source', models.CharField(blank=True, help_text='Document type the number was issued for', max_length=50)),
+                ('worker_pid', models.PositiveIntegerField(blank=True, null=True)),
+                ('issued_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Issued Reference Number',
+                'verbose_name_plural': 'Issued Reference Numbers',
+                'ordering': ['-issued_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReferenceNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(help_text='Reference number prefix', max_length=50, unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=1, help_text='First value not yet reserved by any worker')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Reference Number Sequence',
+                'verbose_name_plural': 'Reference Number Sequences',
+                'ordering': ['prefix'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='energyoptimizationsubmission',
+            name='project_type',
+            field=models.CharField(choices=[('1R + 1S', '1R + 1S - 1 Running & 1 StandBy'), ('2R + 2S', '2R + 2S - 2 Running & 2 StandBy'), ('MR + MS', 'MR + MS - Multiple Running & Multiple StandBy')], max_length=20),
+        ),
+    ]
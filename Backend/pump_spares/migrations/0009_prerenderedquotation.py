@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0008_referencenumbersequence_issuedreferencenumber'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialofconstruction',
+            name='quotation_request_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, help_text='Number of quotations requested for this material'),
+        ),
+        migrations.CreateModel(
+            name='PrerenderedQuotation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body', models.BinaryField(help_text='Rendered DOCX body')),
+                ('material_updated_at', models.DateTimeField(help_text='Material version the body was rendered from')),
+                ('template_signature', models.CharField(help_text='Quotation template version the body was rendered from', max_length=100)),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+                ('material', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prerendered_quotation', to='pump_spares.materialofconstruction')),
+            ],
+            options={
+                'verbose_name': 'Pre-rendered Quotation',
+                'verbose_name_plural': 'Pre-rendered Quotations',
+                'ordering': ['-rendered_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:46
+
+from django.db import migrations, models
+
+
+def mark_completed_submissions(apps, schema_editor):
+    EnergyOptimizationSubmission = apps.get_model('pump_spares', 'EnergyOptimizationSubmission')
+    EnergyOptimizationSubmission.objects.filter(analysis_completed=True).update(analysis_status='completed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0009_prerenderedquotation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='analysis_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='analysis_finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='analysis_stage',
+            field=models.CharField(blank=True, help_text='Stage currently running or last attempted', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='analysis_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='analysis_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='calculation_results',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='plot_images',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='proposal_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='qh_curve_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='stage_status',
+            field=models.JSONField(blank=True, default=dict, help_text='Status and timings of each analysis stage'),
+        ),
+        migrations.RunPython(mark_completed_submissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0010_energyoptimizationsubmission_analysis_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnergyAnalysisResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_hash', models.CharField(help_text='SHA-256 of the normalized inputs', max_length=64, unique=True)),
+                ('calculator_version', models.CharField(max_length=20)),
+                ('qh_curve_data', models.JSONField(blank=True, null=True)),
+                ('calculation_results', models.JSONField(blank=True, null=True)),
+                ('plot_images', models.JSONField(blank=True, null=True)),
+                ('proposal_data', models.JSONField(blank=True, null=True)),
+                ('size_bytes', models.PositiveIntegerField(default=0, help_text='Approximate stored size of the outputs')),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Energy Analysis Result',
+                'verbose_name_plural': 'Energy Analysis Results',
+                'ordering': ['-last_used_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0011_energyanalysisresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='energyanalysisresult',
+            name='plot_specs',
+            field=models.JSONField(blank=True, help_text='Declarative chart specs rendered by the client', null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='plot_specs',
+            field=models.JSONField(blank=True, help_text='Declarative chart specs rendered by the client', null=True),
+        ),
+    ]
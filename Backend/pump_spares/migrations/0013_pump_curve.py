@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0012_plot_specs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='energyanalysisresult',
+            name='pump_curve',
+            field=models.JSONField(blank=True, help_text='Fitted head, efficiency and power curve coefficients', null=True),
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='pump_curve',
+            field=models.JSONField(blank=True, help_text='Fitted head, efficiency and power curve coefficients', null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0013_pump_curve'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryPumpCurve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('speed', models.FloatField(help_text='Speed the curve applies at (RPM)')),
+                ('impeller_diameter', models.FloatField(default=0, help_text='Impeller diameter (mm); 0 when not stated')),
+                ('curve', models.JSONField(help_text='Fitted head, efficiency and power curve coefficients')),
+                ('bep_flow', models.FloatField(help_text='Best efficiency flow (m³/hr)')),
+                ('bep_head', models.FloatField(help_text='Head at the best efficiency point (m)')),
+                ('bep_efficiency', models.FloatField(help_text='Best efficiency (%)')),
+                ('max_flow', models.FloatField(help_text='Largest flow the curve is valid for (m³/hr)')),
+                ('source_file', models.FileField(blank=True, help_text='Manufacturer curve file the coefficients were fitted from', null=True, upload_to='pump_curves/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('pump_make', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='library_curves', to='pump_spares.pumpmake')),
+                ('pump_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='library_curves', to='pump_spares.pumpmodel')),
+                ('pump_size', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='library_curves', to='pump_spares.pumpsize')),
+            ],
+            options={
+                'verbose_name': 'Library Pump Curve',
+                'verbose_name_plural': 'Library Pump Curves',
+                'ordering': ['pump_make__name', 'pump_model__name', 'pump_size__size', 'speed', 'impeller_diameter'],
+            },
+        ),
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='library_curve',
+            field=models.ForeignKey(blank=True, help_text='Stored manufacturer curve used instead of a QHnp upload', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='pump_spares.librarypumpcurve'),
+        ),
+        migrations.AddIndex(
+            model_name='librarypumpcurve',
+            index=models.Index(fields=['bep_flow', 'bep_head'], name='pump_spares_bep_flo_ae8a5b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='librarypumpcurve',
+            unique_together={('pump_make', 'pump_model', 'pump_size', 'speed', 'impeller_diameter')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0014_library_pump_curve'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prerenderedquotation',
+            name='related_signature',
+            field=models.CharField(blank=True, help_text='Pump make, model, size and part names the body was rendered with', max_length=64),
+        ),
+    ]
@@ -0,0 +1,36 @@
+import secrets
+
+from django.db import migrations, models
+
+import pump_spares.models
+
+
+def fill_access_tokens(apps, schema_editor):
+    EnergyOptimizationSubmission = apps.get_model('pump_spares', 'EnergyOptimizationSubmission')
+    for submission in EnergyOptimizationSubmission.objects.filter(access_token__isnull=True).only('id'):
+        submission.access_token = secrets.token_urlsafe(32)
+        submission.save(update_fields=['access_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pump_spares', '0015_prerendered_quotation_related_signature'),
+    ]
+
+    operations = [
+        # Added nullable first so existing submissions each get their own token
+        migrations.AddField(
+            model_name='energyoptimizationsubmission',
+            name='access_token',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_access_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='energyoptimizationsubmission',
+            name='access_token',
+            field=models.CharField(default=pump_spares.models.generate_access_token, editable=False,
+                                   help_text='Grants access to the submission without logging in as its owner',
+                                   max_length=64, unique=True),
+        ),
+    ]
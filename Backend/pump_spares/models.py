@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
@@ -71,6 +73,8 @@ class MaterialOfConstruction(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     drawing = models.CharField(max_length=255, blank=True, null=True)
     ref_part_list = models.CharField(max_length=255, blank=True, null=True)
+    quotation_request_count = models.PositiveIntegerField(default=0, db_index=True,
+                                                          help_text="Number of quotations requested for this material")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -127,6 +131,44 @@ class ReverseEngineeringDocument(models.Model):
         return f"{self.reverse_engineering_submission.customer_name} - {self.label}"
 
 
+class LibraryPumpCurve(models.Model):
+    """
+    Manufacturer pump curve stored as fitted coefficients (see PumpCurve.to_dict),
+    with its best efficiency point kept in columns for duty-point lookups
+    """
+    pump_make = models.ForeignKey(PumpMake, on_delete=models.CASCADE, related_name='library_curves')
+    pump_model = models.ForeignKey(PumpModel, on_delete=models.CASCADE, related_name='library_curves')
+    pump_size = models.ForeignKey(PumpSize, on_delete=models.CASCADE, related_name='library_curves')
+    speed = models.FloatField(help_text="Speed the curve applies at (RPM)")
+    impeller_diameter = models.FloatField(default=0, help_text="Impeller diameter (mm); 0 when not stated")
+    
+    curve = models.JSONField(help_text="Fitted head, efficiency and power curve coefficients")
+    bep_flow = models.FloatField(help_text="Best efficiency flow (m³/hr)")
+    bep_head = models.FloatField(help_text="Head at the best efficiency point (m)")
+    bep_efficiency = models.FloatField(help_text="Best efficiency (%)")
+    max_flow = models.FloatField(help_text="Largest flow the curve is valid for (m³/hr)")
+    source_file = models.FileField(upload_to='pump_curves/', null=True, blank=True,
+                                   help_text="Manufacturer curve file the coefficients were fitted from")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        verbose_name = "Library Pump Curve"
+        verbose_name_plural = "Library Pump Curves"
+        ordering = ['pump_make__name', 'pump_model__name', 'pump_size__size', 'speed', 'impeller_diameter']
+        unique_together = ['pump_make', 'pump_model', 'pump_size', 'speed', 'impeller_diameter']
+        indexes = [models.Index(fields=['bep_flow', 'bep_head'])]
+    
+    def __str__(self):
+        return f"{self.pump_make.name} {self.pump_model.name} {self.pump_size.size} @ {self.speed:g} RPM"
+
+
+def generate_access_token():
+    """Unguessable token that grants access to one submission"""
+    return secrets.token_urlsafe(32)
+
+
 class EnergyOptimizationSubmission(models.Model):
     PROJECT_TYPE_CHOICES = [
         ('1R + 1S', '1R + 1S - 1 Running & 1 StandBy'),
@@ -177,6 +219,9 @@ class EnergyOptimizationSubmission(models.Model):
     # File Uploads
     qhnp_file = models.FileField(upload_to='energy_optimization/qhnp/', null=True, blank=True,
                                help_text="Upload QHnp of one pump")
+    library_curve = models.ForeignKey(LibraryPumpCurve, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='submissions',
+                                      help_text="Stored manufacturer curve used instead of a QHnp upload")
     qhact_file = models.FileField(upload_to='energy_optimization/qhact/', null=True, blank=True,
                                 help_text="QHact Document")
     qhmod_file = models.FileField(upload_to='energy_optimization/qhmod/', null=True, blank=True,
@@ -207,7 +252,32 @@ class EnergyOptimizationSubmission(models.Model):
     plots_generated = models.BooleanField(default=False)
     proposal_generated = models.BooleanField(default=False)
     
+    ANALYSIS_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    ANALYSIS_STAGES = ['parse', 'calculate', 'plot', 'proposal']
+    
+    analysis_status = models.CharField(max_length=20, choices=ANALYSIS_STATUS_CHOICES, default='pending', db_index=True)
+    analysis_stage = models.CharField(max_length=20, blank=True, help_text="Stage currently running or last attempted")
+    stage_status = models.JSONField(default=dict, blank=True, help_text="Status and timings of each analysis stage")
+    analysis_error = models.TextField(blank=True)
+    analysis_started_at = models.DateTimeField(null=True, blank=True)
+    analysis_finished_at = models.DateTimeField(null=True, blank=True)
+    
+    # Stage outputs, kept so clients can fetch results and failed runs can resume
+    qh_curve_data = models.JSONField(null=True, blank=True)
+    pump_curve = models.JSONField(null=True, blank=True, help_text="Fitted head, efficiency and power curve coefficients")
+    calculation_results = models.JSONField(null=True, blank=True)
+    plot_images = models.JSONField(null=True, blank=True)
+    plot_specs = models.JSONField(null=True, blank=True, help_text="Declarative chart specs rendered by the client")
+    proposal_data = models.JSONField(null=True, blank=True)
+    
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    access_token = models.CharField(max_length=64, unique=True, default=generate_access_token, editable=False,
+                                    help_text="Grants access to the submission without logging in as its owner")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -244,3 +314,95 @@ class InventoryDatabase(models.Model):
     
     def __str__(self):
         return f"{self.part_no} - {self.part_name}"
+
+
+class ReferenceNumberSequence(models.Model):
+    """
+    Durable counter behind quotation reference numbers, one row per prefix
+    (GST based or date based). Worker processes reserve blocks of values
+    from it so most allocations never touch the database.
+    """
+    prefix = models.CharField(max_length=50, unique=True, help_text="Reference number prefix")
+    next_value = models.PositiveBigIntegerField(default=1, help_text="First value not yet reserved by any worker")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Reference Number Sequence"
+        verbose_name_plural = "Reference Number Sequences"
+        ordering = ['prefix']
+    
+    def __str__(self):
+        return f"{self.prefix} (next {self.next_value})"
+
+
+class IssuedReferenceNumber(models.Model):
+    """
+    Audit record of every quotation reference number handed out. Numbers
+    are recorded a block at a time when a worker reserves them, so
+    issued_at is the reservation time and a block's unused tail stays here.
+    """
+    reference_number = models.CharField(max_length=80, unique=True)
+    prefix = models.CharField(max_length=50, db_index=True)
+    sequence_value = models.PositiveBigIntegerField()
+    source = models.CharField(max_length=50, blank=True, help_text="Document type the number was issued for")
+    worker_pid = models.PositiveIntegerField(null=True, blank=True)
+    issued_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Issued Reference Number"
+        verbose_name_plural = "Issued Reference Numbers"
+        ordering = ['-issued_at']
+    
+    def __str__(self):
+        return self.reference_number
+
+
+class PrerenderedQuotation(models.Model):
+    """
+    Quotation body for a single material rendered ahead of time, with only
+    the customer block, date and reference number left to fill in.
+    """
+    material = models.OneToOneField(MaterialOfConstruction, on_delete=models.CASCADE, related_name='prerendered_quotation')
+    body = models.BinaryField(help_text="Rendered DOCX body")
+    material_updated_at = models.DateTimeField(help_text="Material version the body was rendered from")
+    template_signature = models.CharField(max_length=100, help_text="Quotation template version the body was rendered from")
+    related_signature = models.CharField(max_length=64, blank=True,
+                                         help_text="Pump make, model, size and part names the body was rendered with")
+    rendered_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Pre-rendered Quotation"
+        verbose_name_plural = "Pre-rendered Quotations"
+        ordering = ['-rendered_at']
+    
+    def __str__(self):
+        return f"Quotation body for {self.material}"
+
+
+class EnergyAnalysisResult(models.Model):
+    """
+    Cached outputs of an energy optimization analysis, keyed by a hash of the
+    normalized calculation inputs and the calculator version that produced them.
+    """
+    input_hash = models.CharField(max_length=64, unique=True, help_text="SHA-256 of the normalized inputs")
+    calculator_version = models.CharField(max_length=20)
+    qh_curve_data = models.JSONField(null=True, blank=True)
+    pump_curve = models.JSONField(null=True, blank=True, help_text="Fitted head, efficiency and power curve coefficients")
+    calculation_results = models.JSONField(null=True, blank=True)
+    plot_images = models.JSONField(null=True, blank=True)
+    plot_specs = models.JSONField(null=True, blank=True, help_text="Declarative chart specs rendered by the client")
+    proposal_data = models.JSONField(null=True, blank=True)
+    size_bytes = models.PositiveIntegerField(default=0, help_text="Approximate stored size of the outputs")
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name = "Energy Analysis Result"
+        verbose_name_plural = "Energy Analysis Results"
+        ordering = ['-last_used_at']
+    
+    def __str__(self):
+        return f"Analysis result {self.input_hash[:12]} (v{self.calculator_version})"
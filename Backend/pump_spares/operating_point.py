@@ -0,0 +1,234 @@
+"""
+Pump Operating Point Solver
+Solves H_pump(Q) = SH + k·Q² for a fitted pump curve, vectorized over system curves
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+# Fraction of the measured flow range a polynomial curve may be extrapolated
+EXTRAPOLATION = 0.2
+
+# Largest relative head error of a polynomial fit before 'auto' switches to the spline
+MAX_FIT_ERROR = 0.02
+
+# Grid used to bracket the first crossing before bisection
+BRACKET_SAMPLES = 64
+BISECTION_STEPS = 60
+
+SOLVER_METHODS = ['auto', 'polynomial', 'spline']
+
+
+class OperatingPointError(ValueError):
+    """Raised for pump curves that cannot be fitted"""
+
+
+def _pchip_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Fritsch-Carlson derivatives of a monotone piecewise cubic through (x, y)"""
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    if len(x) == 2:
+        return np.array([delta[0], delta[0]])
+
+    slopes = np.zeros_like(y)
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    same_sign = delta[:-1] * delta[1:] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+
+    def edge(h0, h1, d0, d1):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if np.sign(slope) != np.sign(d0):
+            return 0.0
+        if np.sign(d0) != np.sign(d1) and abs(slope) > abs(3 * d0):
+            return 3 * d0
+        return slope
+
+    slopes[0] = edge(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = edge(h[-1], h[-2], delta[-1], delta[-2])
+    return slopes
+
+
+class OperatingPointSolver:
+    """
+    Fitted pump Q-H curve and its intersection with system resistance curves
+
+    The curve is a least-squares polynomial (quadratic by default), solved in
+    closed form against SH + k·Q², or a monotone cubic spline (PCHIP) through
+    the measured points, solved by bracketing the first sign change on a grid
+    and bisecting. 'auto' uses the polynomial unless it misses a measured
+    point by more than MAX_FIT_ERROR of the shutoff head.
+    """
+
+    def __init__(self, q_points: Sequence[float], h_points: Sequence[float], degree: int = 2,
+                 method: str = 'auto'):
+        """
+        Args:
+            q_points: Measured flows (m³/hr)
+            h_points: Measured heads (m)
+            degree: Polynomial degree (1-4)
+            method: 'auto', 'polynomial' or 'spline'
+        """
+        if method not in SOLVER_METHODS:
+            raise OperatingPointError(f"method must be one of {', '.join(SOLVER_METHODS)}")
+        if not 1 <= degree <= 4:
+            raise OperatingPointError('degree must be between 1 and 4')
+
+        q = np.asarray(q_points, dtype=float)
+        h = np.asarray(h_points, dtype=float)
+        if q.shape != h.shape:
+            raise OperatingPointError('Q and H must have the same number of points')
+        finite = np.isfinite(q) & np.isfinite(h)
+        q, h = q[finite], h[finite]
+
+        # Repeated flows (e.g. test-bench re-reads) are averaged
+        q, inverse = np.unique(q, return_inverse=True)
+        h = np.bincount(inverse, weights=h) / np.bincount(inverse)
+        if len(q) < 2:
+            raise OperatingPointError('Pump curve needs at least 2 distinct flow points')
+
+        self.q_points = q
+        self.h_points = h
+        self.degree = min(degree, len(q) - 1)
+        self.coefficients = np.polynomial.polynomial.polyfit(q, h, self.degree)
+
+        scale = max(np.max(np.abs(h)), 1e-9)
+        self.fit_error = float(np.max(np.abs(np.polynomial.polynomial.polyval(q, self.coefficients) - h)) / scale)
+        if method == 'auto':
+            method = 'polynomial' if self.fit_error <= MAX_FIT_ERROR else 'spline'
+        self.method = method
+
+        if method == 'spline':
+            self.slopes = _pchip_slopes(q, h)
+            self.q_lower, self.q_upper = float(q[0]), float(q[-1])
+        else:
+            self.slopes = None
+            self.q_lower = 0.0
+            self.q_upper = float(q[-1] + (q[-1] - min(q[0], 0.0)) * EXTRAPOLATION)
+
+    @classmethod
+    def from_coefficients(cls, coefficients: Sequence[float], q_max: float) -> 'OperatingPointSolver':
+        """Solver for an already fitted head polynomial, valid up to q_max"""
+        solver = cls.__new__(cls)
+        solver.coefficients = np.asarray(coefficients, dtype=float)
+        solver.degree = len(solver.coefficients) - 1
+        solver.q_points = solver.h_points = solver.slopes = None
+        solver.fit_error = 0.0
+        solver.method = 'polynomial'
+        solver.q_lower, solver.q_upper = 0.0, float(q_max)
+        return solver
+
+    def head(self, q) -> np.ndarray:
+        """Pump head at the given flows"""
+        q = np.asarray(q, dtype=float)
+        if self.method != 'spline':
+            return np.polynomial.polynomial.polyval(q, self.coefficients)
+
+        x, y, slopes = self.q_points, self.h_points, self.slopes
+        index = np.clip(np.searchsorted(x, q, side='right') - 1, 0, len(x) - 2)
+        width = x[index + 1] - x[index]
+        t = (q - x[index]) / width
+        t2, t3 = t * t, t * t * t
+        return ((2 * t3 - 3 * t2 + 1) * y[index] + (t3 - 2 * t2 + t) * width * slopes[index]
+                + (-2 * t3 + 3 * t2) * y[index + 1] + (t3 - t2) * width * slopes[index + 1])
+
+    def _solve_quadratic(self, static_head: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """Smallest root of (a0 - SH) + a1·Q + (a2 - k)·Q² in the flow range"""
+        coefficients = np.zeros(3)
+        coefficients[:len(self.coefficients)] = self.coefficients
+        c0 = coefficients[0] - static_head
+        c1 = np.broadcast_to(coefficients[1], c0.shape)
+        c2 = coefficients[2] - k
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discriminant = c1 * c1 - 4 * c2 * c0
+            root = np.sqrt(np.where(discriminant >= 0, discriminant, np.nan))
+            # Citardauq form avoids cancellation when c2 is small
+            s = -0.5 * (c1 + np.copysign(root, c1))
+            roots = np.stack([
+                np.where(c2 != 0, s / c2, np.nan),
+                np.where(s != 0, c0 / s, np.nan),
+                np.where((c2 == 0) & (c1 != 0), -c0 / c1, np.nan),
+            ])
+        roots[(roots < self.q_lower) | (roots > self.q_upper)] = np.nan
+        return np.fmin.reduce(roots, axis=0)
+
+    def _solve_bracketed(self, static_head: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """First crossing in the flow range by grid bracketing and bisection"""
+        grid = np.linspace(self.q_lower, self.q_upper, BRACKET_SAMPLES + 1)
+        residual = self.head(grid)[None, :] - (static_head[:, None] + k[:, None] * grid[None, :] ** 2)
+
+        exact = residual == 0
+        crossing = (np.sign(residual[:, :-1]) * np.sign(residual[:, 1:]) < 0) | exact[:, :-1]
+        has_root = crossing.any(axis=1) | exact[:, -1]
+        first = np.where(crossing.any(axis=1), np.argmax(crossing, axis=1), BRACKET_SAMPLES)
+
+        low = grid[first]
+        high = grid[np.minimum(first + 1, BRACKET_SAMPLES)]
+        low_residual = residual[np.arange(len(first)), first]
+        for _ in range(BISECTION_STEPS):
+            middle = 0.5 * (low + high)
+            middle_residual = self.head(middle) - (static_head + k * middle ** 2)
+            move_low = np.sign(middle_residual) == np.sign(low_residual)
+            low = np.where(move_low, middle, low)
+            low_residual = np.where(move_low, middle_residual, low_residual)
+            high = np.where(move_low, high, middle)
+
+        solution = np.where(low_residual == 0, low, 0.5 * (low + high))
+        return np.where(has_root, solution, np.nan)
+
+    def solve(self, static_head, k) -> Dict[str, np.ndarray]:
+        """
+        Operating points for system curves H = SH + k·Q²
+
+        Args:
+            static_head: Static head(s) in m
+            k: Resistance coefficient(s) in m/(m³/hr)²; broadcast with static_head
+
+        Returns:
+            Dictionary of arrays shaped like the broadcast inputs: 'q' and 'h'
+            of the first crossing (NaN where the curves do not meet in the
+            flow range) and 'solved'
+        """
+        static_head, k = np.broadcast_arrays(np.asarray(static_head, dtype=float), np.asarray(k, dtype=float))
+        shape = static_head.shape
+        static_head, k = static_head.ravel(), k.ravel()
+
+        if self.method == 'polynomial' and self.degree <= 2:
+            q = self._solve_quadratic(static_head, k)
+        else:
+            q = self._solve_bracketed(static_head, k)
+
+        q = q.reshape(shape)
+        return {
+            'q': q,
+            'h': static_head.reshape(shape) + k.reshape(shape) * q ** 2,
+            'solved': np.isfinite(q),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'method': self.method,
+            'degree': self.degree,
+            'coefficients': self.coefficients.tolist(),
+            'fit_error': round(self.fit_error, 6),
+            'flow_range': [self.q_lower, self.q_upper],
+        }
+
+
+def find_operating_point(q_points: Sequence[float], h_points: Sequence[float], static_head: float,
+                         k: float) -> Optional[Dict]:
+    """
+    Main function to find the duty point of one pump and system curve
+
+    Returns:
+        {'Q': ..., 'H': ...} or None if the curves do not meet
+    """
+    result = OperatingPointSolver(q_points, h_points).solve(static_head, k)
+    if not result['solved']:
+        return None
+    return {'Q': float(result['q']), 'H': float(result['h'])}
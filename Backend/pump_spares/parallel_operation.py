@@ -0,0 +1,355 @@
+"""
+Parallel Pump Operation
+Stages identical or mixed pumps in parallel against the system curve over a demand profile
+"""
+
+import itertools
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .pump_curve import PumpCurve, PumpCurveError
+from .vfd_simulation import (
+    DEFAULT_MIN_SPEED_RATIO, HOURS_PER_YEAR, SPEED_BISECTION_STEPS, VFD_EFFICIENCY, SimulationError,
+    simulation_pump_curve,
+)
+
+
+# Running pumps of each project type; 'MR + MS' takes the count from the request
+RUNNING_PUMPS = {
+    '1R + 1S': 1,
+    '2R + 2S': 2,
+}
+DEFAULT_MULTIPLE_RUNNING = 3
+MAX_RUNNING_PUMPS = 12
+
+# Upper bound on running-pump combinations evaluated per step
+MAX_STAGING_OPTIONS = 64
+
+# Demand levels in the staging table
+STAGING_TABLE_LEVELS = 20
+
+
+class ParallelOperationError(ValueError):
+    """Raised for parallel operation requests that cannot be solved"""
+
+
+def running_pump_count(project_type: str, running_pumps: Optional[int] = None) -> int:
+    """Number of running (duty) pumps of an R + S configuration"""
+    if running_pumps is not None:
+        count = int(running_pumps)
+    else:
+        count = RUNNING_PUMPS.get(project_type, DEFAULT_MULTIPLE_RUNNING)
+    if not 1 <= count <= MAX_RUNNING_PUMPS:
+        raise ParallelOperationError(f'running_pumps must be between 1 and {MAX_RUNNING_PUMPS}')
+    return count
+
+
+class ParallelPumpSystem:
+    """
+    Pumps in parallel on a common header against H = SH + k·Q²
+
+    Running pumps share one speed ratio r (one drive setpoint) and one
+    header head H; pump i then delivers r·q_i(H/r²), where q_i is the
+    inverse of its full-speed head curve. A staging option is a count of
+    running pumps per pump type; every option is solved for every demand
+    step at once.
+    """
+
+    def __init__(self, pump_types: Sequence[Tuple[PumpCurve, int]], static_head: float, k: float,
+                 min_speed_ratio: float = DEFAULT_MIN_SPEED_RATIO):
+        """
+        Args:
+            pump_types: (full-speed curve, installed running count) per pump type
+            static_head: SRC static head (m)
+            k: SRC resistance coefficient for the total flow
+            min_speed_ratio: Lowest drive speed as a fraction of full speed
+        """
+        if not pump_types:
+            raise ParallelOperationError('At least one pump is required')
+        for curve, count in pump_types:
+            if curve.power_coefficients is None:
+                raise ParallelOperationError('Every pump curve needs a power curve; provide efficiencies')
+            if count < 1:
+                raise ParallelOperationError('Pump counts must be at least 1')
+        if not 0 < min_speed_ratio <= 1:
+            raise ParallelOperationError('min_speed_ratio must be between 0 and 1')
+
+        self.curves = [curve for curve, _ in pump_types]
+        self.counts = [int(count) for _, count in pump_types]
+        self.static_head = float(static_head)
+        self.k = float(k)
+        self.min_speed_ratio = float(min_speed_ratio)
+
+        options = [option for option in itertools.product(*(range(count + 1) for count in self.counts)) if any(option)]
+        if len(options) > MAX_STAGING_OPTIONS:
+            raise ParallelOperationError(f'Too many pump combinations ({len(options)}); at most {MAX_STAGING_OPTIONS}')
+        # Fewest running pumps first, so ties in power favour smaller stages
+        self.options = np.array(sorted(options, key=lambda option: (sum(option), option)), dtype=int)
+
+    def system_head(self, flows) -> np.ndarray:
+        return self.static_head + self.k * np.asarray(flows, dtype=float) ** 2
+
+    def _flows(self, option: np.ndarray, ratio: np.ndarray, head: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Total flow and full-speed equivalent flow of each running pump type"""
+        equivalent = [curve.flow_at_head(head / ratio ** 2) if count else None
+                      for curve, count in zip(self.curves, option)]
+        total = np.zeros(np.shape(head))
+        for count, flows in zip(option, equivalent):
+            if count:
+                total = total + count * ratio * flows
+        return total, equivalent
+
+    def _bisect(self, function, low, high, target, rising: bool) -> np.ndarray:
+        low = np.array(low, dtype=float)
+        high = np.array(high, dtype=float)
+        for _ in range(SPEED_BISECTION_STEPS):
+            middle = 0.5 * (low + high)
+            short = (function(middle) < target) if rising else (function(middle) > target)
+            low = np.where(short, middle, low)
+            high = np.where(short, high, middle)
+        return 0.5 * (low + high)
+
+    def solve_option(self, option: np.ndarray, demands: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Speed, header head and power of one staging option at each demand
+
+        Demands the option cannot reach at full speed, or only beyond a
+        pump's run-out flow, are marked infeasible. Demands below what the
+        option delivers at minimum speed are throttled at minimum speed.
+        """
+        head = self.system_head(demands)
+        shape = demands.shape
+
+        full_speed, _ = self._flows(option, np.ones(shape), head)
+        feasible = full_speed >= demands * (1 - 1e-9)
+
+        ratio = self._bisect(lambda r: self._flows(option, r, head)[0],
+                             np.full(shape, self.min_speed_ratio), np.ones(shape), demands, rising=True)
+
+        # Minimum speed delivers too much: throttle the header up at minimum speed
+        minimum = np.full(shape, self.min_speed_ratio)
+        throttled = self._flows(option, minimum, head)[0] > demands
+        if throttled.any():
+            shutoff = max(float(np.max(curve.head(np.linspace(0, max(curve.q_max, 1e-9), 64))))
+                          for curve, count in zip(self.curves, option) if count)
+            throttled_head = self._bisect(lambda h: self._flows(option, minimum, h)[0],
+                                          head, np.full(shape, shutoff * self.min_speed_ratio ** 2),
+                                          demands, rising=False)
+            head = np.where(throttled, throttled_head, head)
+            ratio = np.where(throttled, self.min_speed_ratio, ratio)
+
+        _, equivalent = self._flows(option, ratio, head)
+        power = np.zeros(shape)
+        for curve, count, flows in zip(self.curves, option, equivalent):
+            if count:
+                feasible &= flows <= curve.q_max * (1 + 1e-9)
+                power = power + count * ratio ** 3 * curve.power(flows)
+        power = power / VFD_EFFICIENCY
+
+        return {'speed_ratio': ratio, 'head': head, 'power': power, 'feasible': feasible}
+
+    def full_capacity(self) -> float:
+        """Total flow with every pump at full speed, where the combined curve meets the SRC"""
+        option = np.array(self.counts)
+        upper = sum(count * curve.q_max for curve, count in zip(self.curves, self.counts)) * 2
+        return float(self._bisect(
+            lambda q: self._flows(option, np.ones(np.shape(q)), self.system_head(q))[0] - q,
+            np.zeros(1), np.full(1, upper), np.zeros(1), rising=False
+        )[0])
+
+    def stage(self, demands: Sequence[float]) -> Dict[str, np.ndarray]:
+        """
+        Least-power staging option, speed and power for each demand
+
+        Returns:
+            Per-step arrays: option index (-1 when off), running pumps, speed
+            ratio, head, power (kW), delivered flow and unmet flag
+        """
+        demands = np.asarray(demands, dtype=float)
+        capacity = self.full_capacity()
+        running = demands > 0
+        unmet = demands > capacity * (1 + 1e-9)
+        delivered = np.minimum(demands, capacity)
+
+        solved = [self.solve_option(option, delivered) for option in self.options]
+        feasible = np.stack([result['feasible'] for result in solved])
+        power = np.where(feasible, np.stack([result['power'] for result in solved]), np.inf)
+
+        # Demands no option meets within run-out run every pump (the last option)
+        fallback = ~feasible.any(axis=0)
+        best = np.where(fallback, len(self.options) - 1, np.argmin(power, axis=0))
+        columns = np.arange(demands.size)
+
+        def pick(field):
+            return np.stack([result[field] for result in solved])[best, columns]
+
+        option_index = np.where(running, best, -1)
+        return {
+            'option': option_index,
+            'running_pumps': np.where(running, self.options.sum(axis=1)[best], 0),
+            'speed_ratio': np.where(running, pick('speed_ratio'), 0.0),
+            'head': np.where(running, pick('head'), 0.0),
+            'power': np.where(running, pick('power'), 0.0),
+            'delivered': np.where(running, delivered, 0.0),
+            'unmet': unmet | (running & fallback),
+        }
+
+
+def solve_parallel_operation(system: ParallelPumpSystem, demands: Sequence[float],
+                             hours: Optional[Sequence[float]] = None, step_hours: float = 1.0,
+                             include_steps: bool = False) -> Dict:
+    """
+    Optimal staging over a demand profile, compared with running every duty pump
+
+    Args:
+        system: Pumps and system curve
+        demands: Required total flow per step (m³/hr)
+        hours: Duration of each step (h); step_hours for every step if omitted
+        step_hours: Uniform step duration (h)
+        include_steps: Also return the per-step arrays
+
+    Returns:
+        Dictionary with totals, a staging table over demand levels, per-option
+        usage and optionally steps
+    """
+    demands = np.asarray(demands, dtype=float)
+    hours = np.full(demands.shape, float(step_hours)) if hours is None else np.asarray(hours, dtype=float)
+    if not demands.size:
+        raise ParallelOperationError('Demand profile has no steps')
+    if hours.shape != demands.shape:
+        raise ParallelOperationError('Each step needs one duration')
+    invalid = ~np.isfinite(demands) | (demands < 0) | ~np.isfinite(hours) | (hours < 0)
+    if invalid.any():
+        raise ParallelOperationError(f'Invalid flow or duration in row {int(np.argmax(invalid)) + 1}')
+
+    staged = system.stage(demands)
+
+    # Baseline: every duty pump runs, sharing the demand through speed control
+    all_pumps = system.solve_option(system.options[-1], staged['delivered'])
+    baseline_power = np.where(staged['delivered'] > 0, all_pumps['power'], 0.0)
+
+    energy = float(np.dot(staged['power'], hours))
+    baseline_energy = float(np.dot(baseline_power, hours))
+    total_hours = float(hours.sum())
+    running = staged['running_pumps'] > 0
+    running_hours = float(hours[running].sum())
+
+    hours_by_stage = {}
+    for count in range(int(system.options.sum(axis=1).max()) + 1):
+        selected = staged['running_pumps'] == count
+        if selected.any():
+            hours_by_stage[str(count)] = round(float(hours[selected].sum()), 2)
+
+    options = []
+    for index, option in enumerate(system.options):
+        selected = staged['option'] == index
+        options.append({
+            'counts': option.tolist(),
+            'running_pumps': int(option.sum()),
+            'hours': round(float(hours[selected].sum()), 2),
+            'energy_kwh': round(float(np.dot(staged['power'][selected], hours[selected])), 2),
+        })
+
+    capacity = system.full_capacity()
+    levels = np.linspace(0, capacity, STAGING_TABLE_LEVELS + 1)[1:]
+    table = system.stage(levels)
+    staging_table = {
+        'flow': levels.tolist(),
+        'running_pumps': table['running_pumps'].tolist(),
+        'counts': [system.options[index].tolist() for index in table['option']],
+        'speed_ratio': table['speed_ratio'].tolist(),
+        'head': table['head'].tolist(),
+        'power': table['power'].tolist(),
+    }
+
+    annual_factor = HOURS_PER_YEAR / total_hours if total_hours > 0 else 0.0
+    totals = {
+        'steps': int(demands.size),
+        'hours': round(total_hours, 2),
+        'running_hours': round(running_hours, 2),
+        'unmet_steps': int(staged['unmet'].sum()),
+        'capacity_flow': round(capacity, 3),
+        'energy_kwh': round(energy, 2),
+        'all_running_energy_kwh': round(baseline_energy, 2),
+        'staging_saving_kwh': round(baseline_energy - energy, 2),
+        'annual_staging_saving_kwh': round((baseline_energy - energy) * annual_factor, 2),
+        'hours_by_running_pumps': hours_by_stage,
+        'average_speed_ratio': (
+            round(float(np.dot(staged['speed_ratio'][running], hours[running]) / running_hours), 4)
+            if running_hours > 0 else 0
+        ),
+    }
+
+    result = {
+        'totals': totals,
+        'staging_table': staging_table,
+        'options': options,
+        'assumptions': {
+            'static_head': system.static_head,
+            'k': system.k,
+            'min_speed_ratio': system.min_speed_ratio,
+            'vfd_efficiency': VFD_EFFICIENCY,
+            'pumps': [{'count': count, 'curve': curve.to_dict()} for curve, count in zip(system.curves, system.counts)],
+        },
+    }
+    if include_steps:
+        result['steps'] = {
+            'flow': demands.tolist(),
+            'hours': hours.tolist(),
+            'running_pumps': staged['running_pumps'].tolist(),
+            'speed_ratio': staged['speed_ratio'].tolist(),
+            'power': staged['power'].tolist(),
+        }
+    return result
+
+
+def run_parallel_operation(calc_data: Dict, flows: Sequence[float], hours: Optional[Sequence[float]] = None,
+                           pump_curve_data: Optional[Dict] = None, pumps: Optional[List[Dict]] = None,
+                           running_pumps: Optional[int] = None, min_speed_ratio: float = DEFAULT_MIN_SPEED_RATIO,
+                           **options) -> Dict:
+    """
+    Main function to stage the pumps of a submission over a demand profile
+
+    Without explicit pumps, the submission's pump is installed as many
+    times as its project type has running pumps. The SRC is scaled so that
+    all duty pumps together deliver their rated flow at the rated head.
+
+    Args:
+        calc_data: Submission values (see build_calc_data)
+        flows: Required total flow per step (m³/hr)
+        hours: Duration of each step (h), if not uniform
+        pump_curve_data: Fitted pump curve stored on the submission
+        pumps: Mixed pumps as [{'curve': PumpCurve dict, 'count': n}]
+        running_pumps: Duty pump count for 'MR + MS' (or to override the type)
+        min_speed_ratio: Lowest drive speed as a fraction of full speed
+        **options: step_hours, include_steps
+
+    Raises:
+        ParallelOperationError: Missing pump data or an invalid profile
+    """
+    from .qh_curve_processor import generate_src_curves
+
+    src = generate_src_curves(calc_data)
+    if 'error' in src:
+        raise ParallelOperationError(src['error'])
+
+    try:
+        if pumps:
+            pump_types = []
+            for pump in pumps:
+                if not isinstance(pump, dict) or not isinstance(pump.get('curve'), dict):
+                    raise ParallelOperationError("Each pump needs a 'curve' with head, efficiency and power")
+                pump_types.append((PumpCurve.from_dict(pump['curve']), int(pump.get('count', 1))))
+        else:
+            count = running_pump_count(calc_data.get('project_type', ''), running_pumps)
+            pump_types = [(simulation_pump_curve(calc_data, pump_curve_data), count)]
+    except (PumpCurveError, SimulationError, KeyError, TypeError) as e:
+        raise ParallelOperationError(str(e))
+
+    # k1 puts one pump's rated flow at the rated head; the header carries all duty pumps
+    duty_pumps = sum(count for _, count in pump_types)
+    k = src['parameters']['k1'] / duty_pumps ** 2
+
+    system = ParallelPumpSystem(pump_types, src['parameters']['static_head'], k, min_speed_ratio)
+    return solve_parallel_operation(system, flows, hours, **options)
@@ -0,0 +1,273 @@
+"""
+Energy Optimization Parameter Sweep
+Evaluates what-if grids of tariff, investment, operating hours, speed ratio and efficiency target
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .energy_calculations import (
+    COST_PER_KWH, INVESTMENT_COST, KWH_TO_CO2_AVG, KWH_TO_TREES, EnergyOptimizationCalculator,
+)
+from .water_properties import WaterPropertyError
+
+
+# Sweep axes in cube order
+SWEEP_AXES = ['tariff', 'investment_cost', 'operating_hours', 'speed_ratio', 'efficiency_target']
+
+AXIS_LIMITS = {
+    'tariff': (0, None),
+    'investment_cost': (0, None),
+    'operating_hours': (0, 24),
+    'speed_ratio': (0, 1.5),
+    'efficiency_target': (0, 100),
+}
+
+# Metric name -> direction used for Pareto optimality
+SWEEP_OBJECTIVES = {
+    'annual_cost_saving': 'max',
+    'annual_energy_saving': 'max',
+    'annual_co2_reduction': 'max',
+    'payback_period_days': 'min',
+    'investment_cost': 'min',
+    'power_after': 'min',
+}
+
+DEFAULT_OBJECTIVES = ['annual_cost_saving', 'payback_period_days', 'investment_cost']
+
+SWEEP_METRICS = [
+    'efficiency_after', 'power_after', 'power_saving',
+    'daily_energy_saving', 'annual_energy_saving',
+    'annual_cost_saving', 'annual_co2_reduction', 'annual_trees_saved',
+    'payback_period_days',
+]
+
+MAX_AXIS_STEPS = 100
+
+
+class SweepError(ValueError):
+    """Raised for sweep requests that cannot be evaluated"""
+
+
+def _parse_axis(name: str, spec, default: float) -> np.ndarray:
+    """
+    Axis values from a number, a list of numbers or {'start', 'stop', 'steps'}
+    """
+    if spec is None:
+        values = [default]
+    elif isinstance(spec, dict):
+        try:
+            start = float(spec['start'])
+            stop = float(spec['stop'])
+            steps = int(spec.get('steps', 10))
+        except (KeyError, TypeError, ValueError):
+            raise SweepError(f"{name} range needs numeric 'start', 'stop' and 'steps'")
+        if not 1 <= steps <= MAX_AXIS_STEPS:
+            raise SweepError(f'{name} steps must be between 1 and {MAX_AXIS_STEPS}')
+        values = np.linspace(start, stop, steps)
+    else:
+        try:
+            values = [float(v) for v in (spec if isinstance(spec, (list, tuple)) else [spec])]
+        except (TypeError, ValueError):
+            raise SweepError(f'{name} values must be numbers')
+        if not 1 <= len(values) <= MAX_AXIS_STEPS:
+            raise SweepError(f'{name} needs between 1 and {MAX_AXIS_STEPS} values')
+
+    values = np.asarray(values, dtype=float)
+    low, high = AXIS_LIMITS[name]
+    if not np.all(np.isfinite(values)) or np.any(values < low) or (high is not None and np.any(values > high)):
+        bounds = f'{low} and {high}' if high is not None else f'at least {low}'
+        raise SweepError(f'{name} values must be {bounds}')
+    return values
+
+
+def pareto_mask(objectives: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of the non-dominated rows of an (n_points, n_objectives)
+    array where every objective is minimized. Of identical points only one
+    is kept.
+    """
+    n_points = objectives.shape[0]
+    # Visiting strong points first removes most dominated points early
+    candidates = np.lexsort(objectives.T[::-1])
+    remaining = objectives[candidates]
+    index = 0
+    while index < len(remaining):
+        # Keep points that beat the current one in at least one objective
+        keep = np.any(remaining < remaining[index], axis=1)
+        keep[index] = True
+        candidates = candidates[keep]
+        remaining = remaining[keep]
+        index = int(np.sum(keep[:index])) + 1
+    mask = np.zeros(n_points, dtype=bool)
+    mask[candidates] = True
+    return mask
+
+
+class EnergyOptimizationSweep:
+    """
+    What-if analysis over a grid of commercial and operating parameters
+
+    The existing pump's operating point comes from EnergyOptimizationCalculator
+    once; every grid point is then evaluated by NumPy broadcasting over the
+    sweep axes. The optimized pump runs at the target efficiency and its
+    brake power follows the affinity laws for the speed ratio (P ∝ (N2/N1)^3).
+    With every axis at its default the results agree with
+    calculate_energy_optimization() up to its intermediate rounding.
+    """
+
+    def __init__(self, submission_data: Dict, ranges: Optional[Dict] = None, max_points: int = 200000):
+        """
+        Args:
+            submission_data: Form data as used by EnergyOptimizationCalculator
+            ranges: Axis specs keyed by SWEEP_AXES names; omitted axes use the
+                calculator's defaults
+            max_points: Largest grid that may be evaluated
+        """
+        try:
+            self.baseline = EnergyOptimizationCalculator(submission_data).calculate_baseline()
+        except WaterPropertyError as e:
+            raise SweepError(str(e))
+        if self.baseline['hydraulic_power'] <= 0:
+            raise SweepError('Submission has no duty point: flow required and head developed must be positive')
+
+        ranges = ranges or {}
+        unknown = set(ranges) - set(SWEEP_AXES)
+        if unknown:
+            raise SweepError(f"Unknown sweep axes: {', '.join(sorted(unknown))}")
+
+        defaults = {
+            'tariff': COST_PER_KWH,
+            'investment_cost': INVESTMENT_COST,
+            'operating_hours': 24,
+            'speed_ratio': 1.0,
+            'efficiency_target': self.baseline['efficiency_after'],
+        }
+        self.axes = {name: _parse_axis(name, ranges.get(name), defaults[name]) for name in SWEEP_AXES}
+        self.shape = tuple(len(self.axes[name]) for name in SWEEP_AXES)
+
+        point_count = int(np.prod(self.shape))
+        if point_count > max_points:
+            raise SweepError(f'Sweep has {point_count} points, at most {max_points} are allowed')
+
+        self.cube = {}
+
+    def evaluate(self) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every grid point
+
+        Returns:
+            Dictionary of metric arrays shaped like the grid (axes in SWEEP_AXES order)
+        """
+        tariff, investment, hours, ratio, target = np.meshgrid(
+            *(self.axes[name] for name in SWEEP_AXES), indexing='ij', sparse=True
+        )
+        power_before = self.baseline['power_before']
+
+        efficiency_after = target
+        with np.errstate(divide='ignore', invalid='ignore'):
+            power_after = np.where(
+                efficiency_after > 0,
+                self.baseline['hydraulic_power'] / (efficiency_after / 100) * ratio ** 3,
+                power_before * ratio ** 3
+            )
+            power_saving = power_before - power_after
+            daily_energy_saving = power_saving * hours
+            annual_energy_saving = daily_energy_saving * 365
+            annual_cost_saving = annual_energy_saving * tariff
+            payback_period_days = np.where(
+                annual_cost_saving > 0, investment / annual_cost_saving * 365, np.inf
+            )
+
+        full = np.broadcast_shapes(*(a.shape for a in (tariff, investment, hours, ratio, target)))
+        self.cube = {
+            'efficiency_after': np.broadcast_to(efficiency_after, full),
+            'power_after': np.broadcast_to(power_after, full),
+            'power_saving': np.broadcast_to(power_saving, full),
+            'daily_energy_saving': np.broadcast_to(daily_energy_saving, full),
+            'annual_energy_saving': np.broadcast_to(annual_energy_saving, full),
+            'annual_cost_saving': np.broadcast_to(annual_cost_saving, full),
+            'annual_co2_reduction': np.broadcast_to(annual_energy_saving * KWH_TO_CO2_AVG, full),
+            'annual_trees_saved': np.broadcast_to(annual_energy_saving * KWH_TO_TREES, full),
+            'payback_period_days': np.broadcast_to(payback_period_days, full),
+            'investment_cost': np.broadcast_to(investment, full),
+        }
+        return self.cube
+
+    def pareto_front(self, objectives: Optional[Sequence[str]] = None, limit: int = 200) -> List[Dict]:
+        """
+        Grid settings that no other setting beats on every objective
+
+        Args:
+            objectives: Metric names from SWEEP_OBJECTIVES
+            limit: Maximum number of settings returned (best annual cost saving first)
+
+        Returns:
+            List of dictionaries with the axis settings and their metrics
+        """
+        objectives = list(objectives or DEFAULT_OBJECTIVES)
+        unknown = [name for name in objectives if name not in SWEEP_OBJECTIVES]
+        if unknown:
+            raise SweepError(f"Unknown objectives: {', '.join(unknown)}")
+        if not self.cube:
+            self.evaluate()
+
+        columns = []
+        for name in objectives:
+            values = self.cube[name].ravel()
+            columns.append(values if SWEEP_OBJECTIVES[name] == 'min' else -values)
+        mask = pareto_mask(np.column_stack(columns))
+
+        # Settings that save nothing are never worth recommending
+        mask &= self.cube['annual_cost_saving'].ravel() > 0
+
+        flat_indices = np.flatnonzero(mask)
+        flat_indices = flat_indices[np.argsort(-self.cube['annual_cost_saving'].ravel()[flat_indices], kind='stable')]
+
+        front = []
+        for flat_index in flat_indices[:limit]:
+            grid_index = np.unravel_index(flat_index, self.shape)
+            entry = {name: float(self.axes[name][i]) for name, i in zip(SWEEP_AXES, grid_index)}
+            for metric in SWEEP_METRICS:
+                entry[metric] = round(float(self.cube[metric][grid_index]), 2)
+            front.append(entry)
+        return front
+
+    def to_dict(self, objectives: Optional[Sequence[str]] = None) -> Dict:
+        """JSON-ready result cube, axes and Pareto front"""
+        if not self.cube:
+            self.evaluate()
+        cube = {}
+        for metric in SWEEP_METRICS:
+            values = np.round(self.cube[metric], 2)
+            # JSON has no infinity; settings without savings never pay back
+            cube[metric] = np.where(np.isfinite(values), values, -1).tolist() if metric == 'payback_period_days' \
+                else values.tolist()
+        return {
+            'baseline': {key: round(float(value), 2) for key, value in self.baseline.items()},
+            'axes': {name: self.axes[name].tolist() for name in SWEEP_AXES},
+            'shape': list(self.shape),
+            'cube': cube,
+            'objectives': list(objectives or DEFAULT_OBJECTIVES),
+            'pareto_front': self.pareto_front(objectives),
+        }
+
+
+def run_parameter_sweep(submission_data: Dict, ranges: Optional[Dict] = None,
+                        objectives: Optional[Sequence[str]] = None, max_points: int = 200000) -> Dict:
+    """
+    Main function to run a what-if sweep for one pump
+
+    Args:
+        submission_data: Form data as used by EnergyOptimizationCalculator
+        ranges: Axis specs keyed by SWEEP_AXES names
+        objectives: Metric names to optimize, see SWEEP_OBJECTIVES
+        max_points: Largest grid that may be evaluated
+
+    Returns:
+        Dictionary with baseline, axes, result cube and Pareto front
+    """
+    sweep = EnergyOptimizationSweep(submission_data, ranges, max_points=max_points)
+    sweep.evaluate()
+    return sweep.to_dict(objectives)
@@ -3,15 +3,72 @@ Plot Generation Service for Energy Optimization
 Generates all 10 required plots using matplotlib and returns base64 encoded images
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.patches import Rectangle
+from matplotlib.figure import Figure, SubplotParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
 import base64
 import io
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
-import json
+import math
+import threading
+from typing import Dict, List
+
+from PIL import Image
+
+from .plot_specs import QH_SRC_PLOT
+from .series_encoding import decode_series
+
+
+# Layout and fixed styling of each plot; the _generate_plotN methods only add data
+FIGURE_TEMPLATES = {
+    1: {'figsize': (10, 8), 'title': 'Plot 1: Qnp–Hnp Curve with SRC1 & SRC2 (when N1 = N2)',
+        'xlabel': 'Flow Rate (m³/hr)', 'ylabel': 'Head (m)'},
+    2: {'figsize': (10, 8), 'title': 'Plot 2: Qnp–Hnp Curve with SRC1 & SRC3 (when N1 ≠ N2)',
+        'xlabel': 'Flow Rate (m³/hr)', 'ylabel': 'Head (m)'},
+    3: {'figsize': (10, 8), 'title': 'Plot 3: Qreq–Hreq Curve with SRC (modified/replacement pump Curve)',
+        'xlabel': 'Flow Rate (m³/hr)', 'ylabel': 'Head (m)'},
+    4: {'figsize': (10, 6), 'title': 'Plot 4: Efficiency (Eff1 vs Eff2)',
+        'ylabel': 'Efficiency (%)', 'grid_axis': 'y'},
+    5: {'figsize': (12, 8), 'title': 'Plot 5: BKW1, BKW2, and Saving vs Time (days)',
+        'xlabel': 'Time (days)', 'ylabel': ('Power Consumption (kW)', 'black'),
+        'y2label': ('Power Saving (kW)', 'blue')},
+    6: {'figsize': (12, 8), 'title': 'Plot 6: Power Consumption (Before, After) and Saving vs Time (days)',
+        'xlabel': 'Time (days)', 'ylabel': ('Daily Power Consumption (kWh)', 'black'),
+        'y2label': ('Cumulative Energy Saving (kWh)', 'blue')},
+    7: {'figsize': (12, 8), 'title': 'Plot 7: Cost of Pump Running (Before, After) vs Time (days)',
+        'xlabel': 'Time (days)', 'ylabel': 'Daily Operating Cost ($)'},
+    8: {'figsize': (12, 8), 'title': 'Plot 8: Money Saved vs Time (days) with Investment Cost Curve',
+        'xlabel': 'Time (days)', 'ylabel': 'Cumulative Amount ($)'},
+    9: {'figsize': (12, 8), 'title': 'Plot 9: Number of Trees Saved vs Time (days)',
+        'xlabel': 'Time (days)', 'ylabel': ('Cumulative Trees Saved', 'green'),
+        'y2label': ('Daily Trees Saved', 'lightgreen')},
+    10: {'figsize': (12, 8), 'title': 'Plot 10: CO₂ Reduction (kg) vs Time (days)',
+         'xlabel': 'Time (days)', 'ylabel': ('Cumulative CO₂ Reduction (kg)', 'blue'),
+         'y2label': ('Daily CO₂ Reduction (kg)', 'lightblue')},
+    QH_SRC_PLOT: {'figsize': (10, 8), 'title': 'Pump Curve vs System Resistance Curve',
+                  'xlabel': 'Flow (Q) [m³/hr]', 'ylabel': 'Head (H) [m]'},
+}
+
+# Formats encoded by Pillow straight from the Agg pixel buffer; others go through savefig
+RASTER_FORMATS = {'png': 'PNG', 'webp': 'WEBP'}
+
+# Margin kept around the tight bounding box, as savefig(bbox_inches='tight') does
+TIGHT_PAD_INCHES = 0.1
+
+_canvases = threading.local()
+
+
+def _shared_canvas() -> FigureCanvasAgg:
+    """
+    The calling thread's reusable figure and Agg canvas
+
+    Agg keeps its pixel buffer while the canvas size and DPI stay the same,
+    so consecutive plots of one size render into the same memory.
+    """
+    canvas = getattr(_canvases, 'canvas', None)
+    if canvas is None:
+        canvas = _canvases.canvas = FigureCanvasAgg(Figure())
+        _canvases.buffer = io.BytesIO()
+    return canvas
 
 
 class EnergyOptimizationPlotGenerator:
@@ -19,9 +76,24 @@ class EnergyOptimizationPlotGenerator:
     Generates all plots for energy optimization analysis
     """
     
-    def __init__(self):
-        """Initialize plot generator with styling"""
-        plt.style.use('default')
+    def __init__(self, image_format: str = 'png', dpi: int = 300, width: int = None, reuse_canvas: bool = True):
+        """
+        Initialize plot generator with styling
+        
+        Args:
+            image_format: Output format understood by matplotlib (png, svg, webp)
+            dpi: Output resolution
+            width: Target image width in pixels; the figure keeps its aspect ratio
+            reuse_canvas: Draw on the thread's shared canvas and encode its
+                pixels directly; False builds a new figure per plot and uses
+                savefig (kept for comparison in benchmark_plots)
+        """
+        self.image_format = image_format
+        self.dpi = dpi
+        self.width = width
+        self.reuse_canvas = reuse_canvas
+        # Figures are built with the object-oriented API so no pyplot global
+        # state is shared; plots can be rendered from any thread or process
         self.colors = {
             'primary': '#1f77b4',
             'secondary': '#ff7f0e',
@@ -82,19 +154,91 @@ class EnergyOptimizationPlotGenerator:
         
         return plots
     
+    def _new_figure(self, plot_number: int):
+        """
+        Figure for a plot with its template applied
+        
+        Returns:
+            (figure, axes, secondary y axes or None)
+        """
+        template = FIGURE_TEMPLATES[plot_number]
+        if self.reuse_canvas:
+            fig = _shared_canvas().figure
+            fig.clear()
+            # clear() keeps the margins tight_layout set for the previous plot
+            fig.set_layout_engine(None)
+            fig.subplotpars.update(**vars(SubplotParams()))
+            fig.set_size_inches(template['figsize'])
+        else:
+            fig = Figure(figsize=template['figsize'])
+        
+        ax = fig.subplots()
+        ax.set_title(template['title'], fontsize=14, fontweight='bold')
+        if 'xlabel' in template:
+            ax.set_xlabel(template['xlabel'], fontsize=12)
+        ylabel = template['ylabel']
+        if isinstance(ylabel, tuple):
+            ax.set_ylabel(ylabel[0], fontsize=12, color=ylabel[1])
+        else:
+            ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3, axis=template.get('grid_axis', 'both'))
+        
+        ax2 = None
+        if 'y2label' in template:
+            ax2 = ax.twinx()
+            label, color = template['y2label']
+            ax2.set_ylabel(label, fontsize=12, color=color)
+        return fig, ax, ax2
+    
+    def _figure_bytes(self, fig) -> bytes:
+        """Render a figure in the configured format, size and resolution"""
+        # Text extents, and so the layout, depend on the DPI; never inherit the previous plot's
+        fig.set_dpi(self.dpi)
+        if self.width:
+            # An exact pixel width needs a fixed canvas, so lay out inside it instead of trimming
+            fig_width, fig_height = fig.get_size_inches()
+            fig.set_size_inches(self.width / self.dpi, self.width / self.dpi * fig_height / fig_width)
+            fig.tight_layout()
+        
+        if not self.reuse_canvas or self.image_format not in RASTER_FORMATS:
+            buffer = io.BytesIO()
+            if self.width:
+                fig.savefig(buffer, format=self.image_format, dpi=self.dpi)
+            else:
+                fig.savefig(buffer, format=self.image_format, dpi=self.dpi, bbox_inches='tight')
+            return buffer.getvalue()
+        
+        # One draw, then crop the pixel buffer to the tight bounding box;
+        # savefig(bbox_inches='tight') would draw the figure twice
+        canvas = fig.canvas
+        canvas.draw()
+        width, height = canvas.get_width_height(physical=True)
+        image = Image.frombuffer('RGBA', (width, height), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        if not self.width:
+            bbox = fig.get_tightbbox(canvas.get_renderer()).padded(TIGHT_PAD_INCHES)
+            image = image.crop((
+                max(int(math.floor(bbox.x0 * self.dpi)), 0),
+                max(height - int(math.ceil(bbox.y1 * self.dpi)), 0),
+                min(int(math.ceil(bbox.x1 * self.dpi)), width),
+                min(height - int(math.floor(bbox.y0 * self.dpi)), height),
+            ))
+        
+        # Figures are opaque, so the alpha channel only costs encoding time
+        buffer = _canvases.buffer
+        buffer.seek(0)
+        buffer.truncate()
+        image.convert('RGB').save(buffer, format=RASTER_FORMATS[self.image_format], dpi=(self.dpi, self.dpi))
+        return buffer.getvalue()
+    
     def _plot_to_base64(self, fig) -> str:
         """Convert matplotlib figure to base64 string"""
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close(fig)
+        image_base64 = base64.b64encode(self._figure_bytes(fig)).decode()
         return image_base64
     
     def _generate_plot1(self, data: Dict) -> str:
         """Generate Plot 1: Qnp–Hnp Curve with SRC1 & SRC2 (when N1 = N2)"""
         try:
-            fig, ax = plt.subplots(figsize=(10, 8))
+            fig, ax, ax2 = self._new_figure(1)
             
             q_points = data.get('q_points', [])
             h_points = data.get('h_points', [])
@@ -121,10 +265,6 @@ class EnergyOptimizationPlotGenerator:
                 h_src2 = k2 * q_src**2
                 ax.plot(q_src, h_src2, 'r--', linewidth=2, label='SRC2')
             
-            ax.set_xlabel('Flow Rate (m³/hr)', fontsize=12)
-            ax.set_ylabel('Head (m)', fontsize=12)
-            ax.set_title('Plot 1: Qnp–Hnp Curve with SRC1 & SRC2 (when N1 = N2)', fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
             ax.legend()
             
             return self._plot_to_base64(fig)
@@ -136,7 +276,7 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot2(self, data: Dict) -> str:
         """Generate Plot 2: Qnp–Hnp Curve with SRC1 & SRC3 (when N1 ≠ N2)"""
         try:
-            fig, ax = plt.subplots(figsize=(10, 8))
+            fig, ax, ax2 = self._new_figure(2)
             
             q_points_n1 = data.get('q_points_n1', [])
             h_points_n1 = data.get('h_points_n1', [])
@@ -161,10 +301,6 @@ class EnergyOptimizationPlotGenerator:
                 h_src3 = k3 * q_src**2
                 ax.plot(q_src, h_src3, 'm--', linewidth=2, label='SRC3')
             
-            ax.set_xlabel('Flow Rate (m³/hr)', fontsize=12)
-            ax.set_ylabel('Head (m)', fontsize=12)
-            ax.set_title('Plot 2: Qnp–Hnp Curve with SRC1 & SRC3 (when N1 ≠ N2)', fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
             ax.legend()
             
             return self._plot_to_base64(fig)
@@ -176,7 +312,7 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot3(self, data: Dict) -> str:
         """Generate Plot 3: Qreq–Hreq Curve with SRC (modified/replacement pump Curve)"""
         try:
-            fig, ax = plt.subplots(figsize=(10, 8))
+            fig, ax, ax2 = self._new_figure(3)
             
             q_points_req = data.get('q_points_req', [])
             h_points_req = data.get('h_points_req', [])
@@ -202,10 +338,6 @@ class EnergyOptimizationPlotGenerator:
                 h_src = k * q_src**2
                 ax.plot(q_src, h_src, 'r--', linewidth=2, label='SRC')
             
-            ax.set_xlabel('Flow Rate (m³/hr)', fontsize=12)
-            ax.set_ylabel('Head (m)', fontsize=12)
-            ax.set_title('Plot 3: Qreq–Hreq Curve with SRC (modified/replacement pump Curve)', fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
             ax.legend()
             
             return self._plot_to_base64(fig)
@@ -217,7 +349,7 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot4(self, data: Dict) -> str:
         """Generate Plot 4: Efficiency (Eff1 vs Eff2)"""
         try:
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig, ax, ax2 = self._new_figure(4)
             
             efficiency_before = data.get('efficiency_before', 0)
             efficiency_after = data.get('efficiency_after', 0)
@@ -243,10 +375,7 @@ class EnergyOptimizationPlotGenerator:
                            arrowprops=dict(arrowstyle='->', color='green', lw=2),
                            fontsize=12, ha='center', color='green', fontweight='bold')
             
-            ax.set_ylabel('Efficiency (%)', fontsize=12)
-            ax.set_title('Plot 4: Efficiency (Eff1 vs Eff2)', fontsize=14, fontweight='bold')
             ax.set_ylim(0, max(values) + 10)
-            ax.grid(True, alpha=0.3, axis='y')
             
             return self._plot_to_base64(fig)
             
@@ -257,33 +386,25 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot5(self, data: Dict) -> str:
         """Generate Plot 5: BKW1, BKW2, and Saving vs Time (days)"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 8))
+            fig, ax, ax2 = self._new_figure(5)
             
-            days = data.get('days', [])
-            bkw1 = data.get('bkw1', [])
-            bkw2 = data.get('bkw2', [])
-            saving = data.get('saving', [])
+            days = decode_series(data.get('days', []))
+            bkw1 = decode_series(data.get('bkw1', []))
+            bkw2 = decode_series(data.get('bkw2', []))
+            saving = decode_series(data.get('saving', []))
             
             # Plot power consumption
             ax.plot(days, bkw1, 'r-', linewidth=2, label='BKW1 (Before)', alpha=0.8)
             ax.plot(days, bkw2, 'g-', linewidth=2, label='BKW2 (After)', alpha=0.8)
             
-            # Create second y-axis for savings
-            ax2 = ax.twinx()
+            # Savings on the second y-axis
             ax2.plot(days, saving, 'b-', linewidth=2, label='Power Saving', alpha=0.8)
             
-            ax.set_xlabel('Time (days)', fontsize=12)
-            ax.set_ylabel('Power Consumption (kW)', fontsize=12, color='black')
-            ax2.set_ylabel('Power Saving (kW)', fontsize=12, color='blue')
-            ax.set_title('Plot 5: BKW1, BKW2, and Saving vs Time (days)', fontsize=14, fontweight='bold')
-            
             # Combine legends
             lines1, labels1 = ax.get_legend_handles_labels()
             lines2, labels2 = ax2.get_legend_handles_labels()
             ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
             
-            ax.grid(True, alpha=0.3)
-            
             return self._plot_to_base64(fig)
             
         except Exception as e:
@@ -293,33 +414,25 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot6(self, data: Dict) -> str:
         """Generate Plot 6: Power Consumption (Before, After) and Saving vs Time (days)"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 8))
+            fig, ax, ax2 = self._new_figure(6)
             
-            days = data.get('days', [])
-            consumption_before = data.get('consumption_before', [])
-            consumption_after = data.get('consumption_after', [])
-            saving_cumulative = data.get('saving_cumulative', [])
+            days = decode_series(data.get('days', []))
+            consumption_before = decode_series(data.get('consumption_before', []))
+            consumption_after = decode_series(data.get('consumption_after', []))
+            saving_cumulative = decode_series(data.get('saving_cumulative', []))
             
             # Plot consumption
             ax.plot(days, consumption_before, 'r-', linewidth=2, label='Power Consumption (Before)', alpha=0.8)
             ax.plot(days, consumption_after, 'g-', linewidth=2, label='Power Consumption (After)', alpha=0.8)
             
-            # Create second y-axis for cumulative savings
-            ax2 = ax.twinx()
+            # Cumulative savings on the second y-axis
             ax2.plot(days, saving_cumulative, 'b-', linewidth=2, label='Cumulative Energy Saving', alpha=0.8)
             
-            ax.set_xlabel('Time (days)', fontsize=12)
-            ax.set_ylabel('Daily Power Consumption (kWh)', fontsize=12, color='black')
-            ax2.set_ylabel('Cumulative Energy Saving (kWh)', fontsize=12, color='blue')
-            ax.set_title('Plot 6: Power Consumption (Before, After) and Saving vs Time (days)', fontsize=14, fontweight='bold')
-            
             # Combine legends
             lines1, labels1 = ax.get_legend_handles_labels()
             lines2, labels2 = ax2.get_legend_handles_labels()
             ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
             
-            ax.grid(True, alpha=0.3)
-            
             return self._plot_to_base64(fig)
             
         except Exception as e:
@@ -329,11 +442,11 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot7(self, data: Dict) -> str:
         """Generate Plot 7: Cost of Pump Running (Before, After) vs Time (days)"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 8))
+            fig, ax, ax2 = self._new_figure(7)
             
-            days = data.get('days', [])
-            cost_before = data.get('cost_before', [])
-            cost_after = data.get('cost_after', [])
+            days = decode_series(data.get('days', []))
+            cost_before = decode_series(data.get('cost_before', []))
+            cost_after = decode_series(data.get('cost_after', []))
             
             # Plot costs
             ax.plot(days, cost_before, 'r-', linewidth=2, label='Cost Before Optimization', alpha=0.8)
@@ -342,11 +455,7 @@ class EnergyOptimizationPlotGenerator:
             # Fill area between curves to show savings
             ax.fill_between(days, cost_after, cost_before, alpha=0.3, color='green', label='Cost Savings')
             
-            ax.set_xlabel('Time (days)', fontsize=12)
-            ax.set_ylabel('Daily Operating Cost ($)', fontsize=12)
-            ax.set_title('Plot 7: Cost of Pump Running (Before, After) vs Time (days)', fontsize=14, fontweight='bold')
             ax.legend()
-            ax.grid(True, alpha=0.3)
             
             return self._plot_to_base64(fig)
             
@@ -357,11 +466,11 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot8(self, data: Dict) -> str:
         """Generate Plot 8: Money Saved vs Time (days) with Investment Cost Curve"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 8))
+            fig, ax, ax2 = self._new_figure(8)
             
-            days = data.get('days', [])
-            cumulative_savings = data.get('cumulative_savings', [])
-            investment_line = data.get('investment_line', [])
+            days = decode_series(data.get('days', []))
+            cumulative_savings = decode_series(data.get('cumulative_savings', []))
+            investment_line = decode_series(data.get('investment_line', []))
             break_even_point = data.get('break_even_point', {})
             
             # Plot cumulative savings
@@ -386,11 +495,7 @@ class EnergyOptimizationPlotGenerator:
                            arrowprops=dict(arrowstyle='->', color='orange', lw=2),
                            fontsize=12, ha='center', color='orange', fontweight='bold')
             
-            ax.set_xlabel('Time (days)', fontsize=12)
-            ax.set_ylabel('Cumulative Amount ($)', fontsize=12)
-            ax.set_title('Plot 8: Money Saved vs Time (days) with Investment Cost Curve', fontsize=14, fontweight='bold')
             ax.legend()
-            ax.grid(True, alpha=0.3)
             
             return self._plot_to_base64(fig)
             
@@ -401,31 +506,23 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot9(self, data: Dict) -> str:
         """Generate Plot 9: Number of Trees Saved vs Time (days)"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 8))
+            fig, ax, ax2 = self._new_figure(9)
             
-            days = data.get('days', [])
-            cumulative_trees = data.get('cumulative_trees', [])
-            daily_trees = data.get('daily_trees', [])
+            days = decode_series(data.get('days', []))
+            cumulative_trees = decode_series(data.get('cumulative_trees', []))
+            daily_trees = decode_series(data.get('daily_trees', []))
             
             # Plot cumulative trees saved
             ax.plot(days, cumulative_trees, 'g-', linewidth=3, label='Cumulative Trees Saved', alpha=0.8)
             
             # Add daily trees as bar chart (secondary)
-            ax2 = ax.twinx()
             ax2.bar(days[::30], daily_trees[::30], alpha=0.3, color='lightgreen', width=20, label='Daily Trees Saved')
             
-            ax.set_xlabel('Time (days)', fontsize=12)
-            ax.set_ylabel('Cumulative Trees Saved', fontsize=12, color='green')
-            ax2.set_ylabel('Daily Trees Saved', fontsize=12, color='lightgreen')
-            ax.set_title('Plot 9: Number of Trees Saved vs Time (days)', fontsize=14, fontweight='bold')
-            
             # Combine legends
             lines1, labels1 = ax.get_legend_handles_labels()
             lines2, labels2 = ax2.get_legend_handles_labels()
             ax.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
             
-            ax.grid(True, alpha=0.3)
-            
             return self._plot_to_base64(fig)
             
         except Exception as e:
@@ -435,31 +532,23 @@ class EnergyOptimizationPlotGenerator:
     def _generate_plot10(self, data: Dict) -> str:
         """Generate Plot 10: CO₂ Reduction (kg) vs Time (days)"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 8))
+            fig, ax, ax2 = self._new_figure(10)
             
-            days = data.get('days', [])
-            cumulative_co2 = data.get('cumulative_co2', [])
-            daily_co2 = data.get('daily_co2', [])
+            days = decode_series(data.get('days', []))
+            cumulative_co2 = decode_series(data.get('cumulative_co2', []))
+            daily_co2 = decode_series(data.get('daily_co2', []))
             
             # Plot cumulative CO2 reduction
             ax.plot(days, cumulative_co2, 'b-', linewidth=3, label='Cumulative CO₂ Reduction', alpha=0.8)
             
             # Add daily CO2 as bar chart (secondary)
-            ax2 = ax.twinx()
             ax2.bar(days[::30], daily_co2[::30], alpha=0.3, color='lightblue', width=20, label='Daily CO₂ Reduction')
             
-            ax.set_xlabel('Time (days)', fontsize=12)
-            ax.set_ylabel('Cumulative CO₂ Reduction (kg)', fontsize=12, color='blue')
-            ax2.set_ylabel('Daily CO₂ Reduction (kg)', fontsize=12, color='lightblue')
-            ax.set_title('Plot 10: CO₂ Reduction (kg) vs Time (days)', fontsize=14, fontweight='bold')
-            
             # Combine legends
             lines1, labels1 = ax.get_legend_handles_labels()
             lines2, labels2 = ax2.get_legend_handles_labels()
             ax.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
             
-            ax.grid(True, alpha=0.3)
-            
             return self._plot_to_base64(fig)
             
         except Exception as e:
@@ -467,6 +556,78 @@ class EnergyOptimizationPlotGenerator:
             return ""
 
 
+    def _generate_plot11(self, data: Dict) -> str:
+        """Generate the Q-H/SRC plot: uploaded or library pump curve against the SRC"""
+        try:
+            fig, ax, ax2 = self._new_figure(QH_SRC_PLOT)
+            
+            pump_curve = data.get('pump_curve', {})
+            src_curve = data.get('src_curve', {})
+            operating_point = data.get('operating_point')
+            
+            ax.plot(pump_curve.get('Q', []), pump_curve.get('H', []), marker='o', linestyle='-', color='blue',
+                    linewidth=2, markersize=6, label='Pump Q-H Curve')
+            ax.plot(src_curve.get('Q', []), src_curve.get('H', []), marker='s', linestyle='--', color='red',
+                    linewidth=2, markersize=6, label='System Resistance Curve (SRC)')
+            
+            if operating_point:
+                ax.plot(operating_point['Q'], operating_point['H'], 'go', markersize=10,
+                        label=f"Operating Point (Q={operating_point['Q']:.1f}, H={operating_point['H']:.1f})")
+            
+            ax.legend(fontsize=11)
+            
+            return self._plot_to_base64(fig)
+            
+        except Exception as e:
+            print(f"Error generating plot 11: {str(e)}")
+            return ""
+
+
+# The ten analysis plots every completed analysis has
+PLOT_NUMBERS = list(range(1, 11))
+
+
+def available_plot_numbers(calculation_results: Dict) -> List[int]:
+    """Plots of a calculation result: the ten analysis plots, plus the Q-H/SRC plot with a Q-H curve"""
+    if calculation_results.get(f'plot{QH_SRC_PLOT}_data'):
+        return PLOT_NUMBERS + [QH_SRC_PLOT]
+    return PLOT_NUMBERS
+
+
+def render_plot(plot_number: int, plot_data: Dict) -> str:
+    """
+    Render a single plot from its plotN_data
+    
+    Args:
+        plot_number: Plot number (1-11)
+        plot_data: The matching plotN_data entry of the calculation results
+        
+    Returns:
+        Base64 encoded PNG, or an empty string if rendering failed
+    """
+    generator = EnergyOptimizationPlotGenerator()
+    return getattr(generator, f'_generate_plot{plot_number}')(plot_data or {})
+
+
+def render_plot_image(plot_number: int, plot_data: Dict, image_format: str = 'png', dpi: int = 300,
+                      width: int = None) -> bytes:
+    """
+    Render a single plot as image bytes
+    
+    Args:
+        plot_number: Plot number (1-11)
+        plot_data: The matching plotN_data entry of the calculation results
+        image_format: png, svg or webp
+        dpi: Output resolution
+        width: Target width in pixels; the height follows the figure's aspect ratio
+        
+    Returns:
+        Image bytes, or empty bytes if rendering failed
+    """
+    generator = EnergyOptimizationPlotGenerator(image_format=image_format, dpi=dpi, width=width)
+    return base64.b64decode(getattr(generator, f'_generate_plot{plot_number}')(plot_data or {}))
+
+
 def generate_energy_optimization_plots(calculation_results: Dict) -> Dict:
     """
     Main function to generate all energy optimization plots
@@ -0,0 +1,182 @@
+"""
+Plot Image Cache
+Renders single energy optimization plots on first request and keeps the files on disk
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.urls import reverse
+
+from .energy_calculations import CALCULATOR_VERSION
+from .models import EnergyOptimizationSubmission
+from .plot_generator import available_plot_numbers
+
+# Format -> content type
+PLOT_IMAGE_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp',
+}
+
+# Requested sizes are rounded up to these, so each plot has a handful of cached variants
+DEFAULT_DPI = 100
+DPI_BUCKETS = (72, 100, 150, 200, 300)
+WIDTH_BUCKETS = (400, 800, 1200, 1600, 2400)
+
+_eviction_lock = threading.Lock()
+
+
+class PlotImageError(ValueError):
+    """Raised for plot image requests that cannot be served"""
+
+
+def _bucketed_int(name: str, value, buckets: Sequence[int]) -> Optional[int]:
+    """Smallest bucket at least as large as the value, or the largest bucket"""
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise PlotImageError(f'{name} must be a whole number')
+    return buckets[min(bisect.bisect_left(buckets, number), len(buckets) - 1)]
+
+
+def parse_plot_image_options(params) -> Tuple[str, int, Optional[int]]:
+    """
+    Image format, DPI and width from query parameters
+
+    width and dpi are rounded up to WIDTH_BUCKETS and DPI_BUCKETS; without a
+    width the figure keeps its natural size at the requested DPI.
+    """
+    image_format = (params.get('output') or 'png').lower()
+    if image_format not in PLOT_IMAGE_FORMATS:
+        raise PlotImageError(f"output must be one of {', '.join(PLOT_IMAGE_FORMATS)}")
+    dpi = _bucketed_int('dpi', params.get('dpi'), DPI_BUCKETS) or DEFAULT_DPI
+    width = _bucketed_int('width', params.get('width'), WIDTH_BUCKETS)
+    return image_format, dpi, width
+
+
+def plot_image_digest(plot_data: Dict, image_format: str, dpi: int, width: Optional[int]) -> str:
+    """Hash of everything the rendered image depends on; doubles as its ETag"""
+    payload = {
+        'version': CALCULATOR_VERSION,
+        'data': plot_data,
+        'format': image_format,
+        'dpi': dpi,
+        'width': width,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def get_cache_dir() -> Path:
+    return Path(getattr(settings, 'ENERGY_PLOT_CACHE_DIR', settings.BASE_DIR / 'energy_optimization' / 'plot_cache'))
+
+
+def get_plot_image(submission: EnergyOptimizationSubmission, plot_number: int, image_format: str = 'png',
+                   dpi: int = DEFAULT_DPI, width: Optional[int] = None) -> Tuple[Path, str]:
+    """
+    Path of a rendered plot image, rendering it on first request
+
+    Args:
+        submission: Submission with a completed analysis
+        plot_number: Plot number (1-11)
+        image_format: One of PLOT_IMAGE_FORMATS
+        dpi: Output resolution
+        width: Target width in pixels
+
+    Returns:
+        (path, digest) of the cached image file
+
+    Raises:
+        PlotImageError: Unknown plot or the plot could not be rendered
+    """
+    from .plot_rendering import render_single_plot
+
+    calculation_results = submission.calculation_results or {}
+    if plot_number not in available_plot_numbers(calculation_results):
+        raise PlotImageError(f'Plot {plot_number} does not exist')
+
+    plot_data = calculation_results.get(f'plot{plot_number}_data') or {}
+    digest = plot_image_digest(plot_data, image_format, dpi, width)
+    path = get_cache_dir() / str(submission.id) / f'plot{plot_number}-{digest[:32]}.{image_format}'
+    try:
+        # The modification time doubles as the last use for eviction
+        os.utime(path)
+        return path, digest
+    except FileNotFoundError:
+        pass
+
+    image = render_single_plot(plot_number, plot_data, image_format, dpi, width)
+    if not image:
+        raise PlotImageError(f'Plot {plot_number} could not be rendered')
+
+    # Concurrent first requests may both render; the rename keeps the file whole
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(image)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    evict_plot_images(keep=path)
+    return path, digest
+
+
+def evict_plot_images(keep: Optional[Path] = None):
+    """
+    Delete the least recently used images until the cache fits
+    ENERGY_PLOT_CACHE_MAX_FILES and _MAX_BYTES, then empty submission folders
+    """
+    max_files = getattr(settings, 'ENERGY_PLOT_CACHE_MAX_FILES', 2000)
+    max_bytes = getattr(settings, 'ENERGY_PLOT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    cache_dir = get_cache_dir()
+
+    with _eviction_lock:
+        entries = []
+        for folder in cache_dir.iterdir() if cache_dir.is_dir() else []:
+            for path in folder.glob('plot*.*') if folder.is_dir() else []:
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((path != keep, -stat.st_mtime, stat.st_size, path))
+        total_bytes = sum(entry[2] for entry in entries)
+        if len(entries) <= max_files and total_bytes <= max_bytes:
+            return
+
+        # Newest first; the image just written is always kept
+        entries.sort(key=lambda entry: entry[:2])
+        kept_bytes = 0
+        for index, (_, _, size_bytes, path) in enumerate(entries):
+            kept_bytes += size_bytes
+            if index and (index >= max_files or kept_bytes > max_bytes):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+        for folder in cache_dir.iterdir():
+            try:
+                folder.rmdir()
+            except OSError:
+                pass
+
+
+def plot_image_urls(submission) -> Dict[str, str]:
+    """Per-plot image URLs keyed plot1..plot10 (plus plot11), carrying the submission's access token"""
+    return {
+        f'plot{number}': f"{reverse('energy-optimization-plot', args=[submission.id, number])}?token={submission.access_token}"
+        for number in available_plot_numbers(submission.calculation_results or {})
+    }
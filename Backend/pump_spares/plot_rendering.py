@@ -0,0 +1,163 @@
+"""
+Plot Rendering Service
+Renders the ten energy optimization plots in parallel on a warm process pool
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .plot_generator import PLOT_NUMBERS, render_plot, render_plot_image
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _warm_worker():
+    """Import matplotlib and the plot code once per worker process"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.backends import backend_agg  # noqa: F401
+    from . import plot_generator  # noqa: F401
+
+
+def _noop():
+    return None
+
+
+def get_plot_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Return the shared rendering pool, starting its workers on first use
+
+    Returns None when ENERGY_PLOT_WORKERS is 0, in which case plots are
+    rendered inline.
+    """
+    global _pool
+    workers = settings.ENERGY_PLOT_WORKERS
+    if workers <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Spawned workers do not inherit the server's threads or DB connections
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker
+                )
+                for _ in range(workers):
+                    pool.submit(_noop)
+                _pool = pool
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Stop a pool whose workers are stuck or dead; the next call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        try:
+            process.terminate()
+        except Exception:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_plots_inline(calculation_results: Dict) -> Dict:
+    """Render every plot in the current process, one after another"""
+    return {
+        f'plot{number}': render_plot(number, calculation_results.get(f'plot{number}_data', {}))
+        for number in PLOT_NUMBERS
+    }
+
+
+def render_energy_optimization_plots(calculation_results: Dict, timeout: Optional[float] = None) -> Dict:
+    """
+    Render all ten plots, one task per plot on the process pool
+
+    Args:
+        calculation_results: Results from energy optimization calculations
+        timeout: Seconds each plot may take (ENERGY_PLOT_TIMEOUT by default);
+            a plot that runs over is returned as an empty string
+
+    Returns:
+        Dictionary of base64 encoded plot images keyed plot1..plot10, plus
+        'errors' listing plots that failed or timed out
+    """
+    pool = get_plot_pool()
+    if pool is None:
+        return render_plots_inline(calculation_results)
+
+    timeout = timeout if timeout is not None else settings.ENERGY_PLOT_TIMEOUT
+    try:
+        futures = {
+            number: pool.submit(render_plot, number, calculation_results.get(f'plot{number}_data', {}))
+            for number in PLOT_NUMBERS
+        }
+    except BrokenProcessPool:
+        print("Plot pool is broken, rendering inline")
+        _discard_pool(pool)
+        return render_plots_inline(calculation_results)
+
+    plots = {}
+    errors = {}
+    started_at = time.monotonic()
+    stuck = False
+    for number, future in futures.items():
+        # Plots render concurrently, so each one's deadline counts from submission
+        remaining = max(timeout - (time.monotonic() - started_at), 0)
+        try:
+            plots[f'plot{number}'] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            print(f"Plot {number} timed out after {timeout}s")
+            future.cancel()
+            plots[f'plot{number}'] = ""
+            errors[f'plot{number}'] = f'Timed out after {timeout}s'
+            stuck = True
+        except BrokenProcessPool:
+            print(f"Plot {number} failed: worker process died, rendering inline")
+            plots[f'plot{number}'] = render_plot(number, calculation_results.get(f'plot{number}_data', {}))
+            stuck = True
+        except Exception as e:
+            print(f"Error rendering plot {number}: {str(e)}")
+            plots[f'plot{number}'] = ""
+            errors[f'plot{number}'] = str(e)
+
+    if stuck:
+        _discard_pool(pool)
+    if errors:
+        plots['errors'] = errors
+    return plots
+
+
+def render_single_plot(plot_number: int, plot_data: Dict, image_format: str = 'png', dpi: int = 100,
+                       width: Optional[int] = None, timeout: Optional[float] = None) -> bytes:
+    """
+    Render one plot as image bytes on the process pool (inline if disabled)
+
+    Raises:
+        TimeoutError: The plot took longer than the timeout
+    """
+    pool = get_plot_pool()
+    if pool is None:
+        return render_plot_image(plot_number, plot_data, image_format, dpi, width)
+
+    timeout = timeout if timeout is not None else settings.ENERGY_PLOT_TIMEOUT
+    try:
+        future = pool.submit(render_plot_image, plot_number, plot_data, image_format, dpi, width)
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        _discard_pool(pool)
+        raise TimeoutError(f'Plot {plot_number} timed out after {timeout}s')
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return render_plot_image(plot_number, plot_data, image_format, dpi, width)
+
@@ -0,0 +1,253 @@
+"""
+Plot Specification Builder
+Describes the energy optimization plots as declarative chart specs for client-side rendering
+"""
+
+import math
+from typing import Dict, List, Optional
+
+from .curve_sampling import sample_src
+from .series_encoding import decode_series
+
+COLORS = {
+    'blue': '#1f77b4',
+    'green': '#2ca02c',
+    'red': '#d62728',
+    'magenta': '#e377c2',
+    'orange': '#ff7f0e',
+    'light_green': '#90ee90',
+    'light_blue': '#add8e6',
+}
+
+FLOW_AXIS = {'label': 'Flow Rate (m³/hr)'}
+HEAD_AXIS = {'label': 'Head (m)'}
+DAYS_AXIS = {'label': 'Time (days)'}
+
+# Pump Q-H curve against the SRC; only analyses with an uploaded or library Q-H curve have it
+QH_SRC_PLOT = 11
+
+
+def _values(series) -> List[Optional[float]]:
+    """Plain list with non-finite values as None (JSON has no NaN)"""
+    return [value if math.isfinite(value) else None for value in decode_series(series).tolist()]
+
+
+def _series(name: str, x, y, color: str, kind: str = 'line', dashed: bool = False, axis: str = 'y', **extra) -> Dict:
+    """
+    One chart series; x and y are either plain lists or compact series
+    descriptors (constant / linear / sampled) that the client expands
+    """
+    spec = {'name': name, 'type': kind, 'x': x, 'y': y, 'color': color, 'dashed': dashed, 'axis': axis}
+    spec.update(extra)
+    return spec
+
+
+def _src_curve(max_q: float, k: float) -> Dict:
+    """System resistance curve H = k * Q^2, adaptively sampled"""
+    q_src, h_src = sample_src(0.0, k, max_q)
+    return {'x': _values(q_src), 'y': _values(h_src)}
+
+
+def _chart(title: str, x_axis: Dict, y_axis: Dict, series: List[Dict], y2_axis: Optional[Dict] = None,
+           annotations: Optional[List[Dict]] = None) -> Dict:
+    spec = {'title': title, 'x_axis': x_axis, 'y_axis': y_axis, 'series': series, 'annotations': annotations or []}
+    if y2_axis:
+        spec['y2_axis'] = y2_axis
+    return spec
+
+
+def _spec_plot1(data: Dict) -> Dict:
+    q_points = _values(data.get('q_points', []))
+    rated_point = data.get('rated_point', {})
+    series = [_series('Pump Curve (N1=N2)', q_points, _values(data.get('h_points', [])), COLORS['blue'])]
+    if rated_point:
+        series.append(_series('Rated Point', [rated_point['q']], [rated_point['h']], COLORS['red'], kind='scatter'))
+    if q_points:
+        max_q = max((q for q in q_points if q is not None), default=0)
+        k1 = rated_point['h'] / (rated_point['q'] ** 2) if rated_point.get('q', 0) > 0 else 0.1
+        series.append(_series('SRC1', color=COLORS['green'], dashed=True, **_src_curve(max_q, k1)))
+        series.append(_series('SRC2', color=COLORS['red'], dashed=True, **_src_curve(max_q, k1 * 1.2)))
+    return _chart('Plot 1: Qnp–Hnp Curve with SRC1 & SRC2 (when N1 = N2)', FLOW_AXIS, HEAD_AXIS, series)
+
+
+def _spec_plot2(data: Dict) -> Dict:
+    q_points_n1 = _values(data.get('q_points_n1', []))
+    h_points_n1 = _values(data.get('h_points_n1', []))
+    series = [
+        _series('Pump Curve (N1)', q_points_n1, h_points_n1, COLORS['blue']),
+        _series('Pump Curve (N2)', _values(data.get('q_points_n2', [])), _values(data.get('h_points_n2', [])),
+                COLORS['red']),
+    ]
+    if q_points_n1:
+        max_q = max((q for q in q_points_n1 if q is not None), default=0)
+        first_q = q_points_n1[0] or 0
+        k1 = h_points_n1[0] / (first_q ** 2) if first_q > 0 and h_points_n1[0] is not None else 0.1
+        series.append(_series('SRC1', color=COLORS['green'], dashed=True, **_src_curve(max_q, k1)))
+        series.append(_series('SRC3', color=COLORS['magenta'], dashed=True, **_src_curve(max_q, k1 * 0.8)))
+    return _chart('Plot 2: Qnp–Hnp Curve with SRC1 & SRC3 (when N1 ≠ N2)', FLOW_AXIS, HEAD_AXIS, series)
+
+
+def _spec_plot3(data: Dict) -> Dict:
+    q_points_req = _values(data.get('q_points_req', []))
+    duty_point = data.get('duty_point', {})
+    series = [
+        _series('Required Duty Curve', q_points_req, _values(data.get('h_points_req', [])), COLORS['green']),
+        _series('Modified Pump Curve', _values(data.get('q_points_mod', [])), _values(data.get('h_points_mod', [])),
+                COLORS['blue']),
+    ]
+    if duty_point:
+        series.append(_series('Duty Point', [duty_point['q']], [duty_point['h']], COLORS['red'], kind='scatter'))
+    if q_points_req:
+        max_q = max((q for q in q_points_req if q is not None), default=0)
+        k = duty_point['h'] / (duty_point['q'] ** 2) if duty_point.get('q', 0) > 0 else 0.1
+        series.append(_series('SRC', color=COLORS['red'], dashed=True, **_src_curve(max_q, k)))
+    return _chart('Plot 3: Qreq–Hreq Curve with SRC (modified/replacement pump Curve)', FLOW_AXIS, HEAD_AXIS, series)
+
+
+def _spec_plot4(data: Dict) -> Dict:
+    efficiency_before = data.get('efficiency_before', 0)
+    efficiency_after = data.get('efficiency_after', 0)
+    improvement = data.get('improvement', 0)
+    categories = ['Before Optimization', 'After Optimization']
+    series = [
+        _series('Before Optimization', [categories[0]], [efficiency_before], COLORS['red'], kind='bar',
+                label=f'{efficiency_before:.1f}%'),
+        _series('After Optimization', [categories[1]], [efficiency_after], COLORS['green'], kind='bar',
+                label=f'{efficiency_after:.1f}%'),
+    ]
+    annotations = []
+    if improvement > 0:
+        annotations.append({'type': 'text', 'x': categories[1], 'y': efficiency_after,
+                            'text': f'Improvement: +{improvement:.1f}%', 'color': COLORS['green']})
+    return _chart('Plot 4: Efficiency (Eff1 vs Eff2)', {'label': '', 'categories': categories},
+                  {'label': 'Efficiency (%)', 'min': 0}, series, annotations=annotations)
+
+
+def _spec_plot5(data: Dict) -> Dict:
+    days = data.get('days', [])
+    series = [
+        _series('BKW1 (Before)', days, data.get('bkw1', []), COLORS['red']),
+        _series('BKW2 (After)', days, data.get('bkw2', []), COLORS['green']),
+        _series('Power Saving', days, data.get('saving', []), COLORS['blue'], axis='y2'),
+    ]
+    return _chart('Plot 5: BKW1, BKW2, and Saving vs Time (days)', DAYS_AXIS,
+                  {'label': 'Power Consumption (kW)'}, series, y2_axis={'label': 'Power Saving (kW)'})
+
+
+def _spec_plot6(data: Dict) -> Dict:
+    days = data.get('days', [])
+    series = [
+        _series('Power Consumption (Before)', days, data.get('consumption_before', []), COLORS['red']),
+        _series('Power Consumption (After)', days, data.get('consumption_after', []), COLORS['green']),
+        _series('Cumulative Energy Saving', days, data.get('saving_cumulative', []), COLORS['blue'], axis='y2'),
+    ]
+    return _chart('Plot 6: Power Consumption (Before, After) and Saving vs Time (days)', DAYS_AXIS,
+                  {'label': 'Daily Power Consumption (kWh)'}, series,
+                  y2_axis={'label': 'Cumulative Energy Saving (kWh)'})
+
+
+def _spec_plot7(data: Dict) -> Dict:
+    days = data.get('days', [])
+    cost_before = data.get('cost_before', [])
+    cost_after = data.get('cost_after', [])
+    series = [
+        _series('Cost Savings', days, cost_before, COLORS['green'], kind='area', y_base=cost_after),
+        _series('Cost Before Optimization', days, cost_before, COLORS['red']),
+        _series('Cost After Optimization', days, cost_after, COLORS['green']),
+    ]
+    return _chart('Plot 7: Cost of Pump Running (Before, After) vs Time (days)', DAYS_AXIS,
+                  {'label': 'Daily Operating Cost ($)'}, series)
+
+
+def _spec_plot8(data: Dict) -> Dict:
+    days = data.get('days', [])
+    break_even_point = data.get('break_even_point', {})
+    series = [
+        _series('Cumulative Savings', days, data.get('cumulative_savings', []), COLORS['green'], width=3),
+        _series('Investment Cost', days, data.get('investment_line', []), COLORS['red'], dashed=True),
+    ]
+    annotations = []
+    if break_even_point:
+        payback_day = break_even_point['day']
+        series.append(_series('Break-Even Point', [payback_day], [break_even_point['amount']], COLORS['red'],
+                              kind='scatter'))
+        annotations.append({'type': 'vline', 'x': payback_day, 'color': COLORS['orange'],
+                            'text': f'Payback: {payback_day:.0f} days'})
+    return _chart('Plot 8: Money Saved vs Time (days) with Investment Cost Curve', DAYS_AXIS,
+                  {'label': 'Cumulative Amount ($)'}, series, annotations=annotations)
+
+
+def _monthly_bars(days, daily) -> Dict:
+    """Every 30th day, as the server-rendered plots draw the daily bars"""
+    return {'x': _values(days)[::30], 'y': _values(daily)[::30]}
+
+
+def _spec_plot9(data: Dict) -> Dict:
+    days = data.get('days', [])
+    series = [
+        _series('Cumulative Trees Saved', days, data.get('cumulative_trees', []), COLORS['green'], width=3),
+        _series('Daily Trees Saved', color=COLORS['light_green'], kind='bar', axis='y2',
+                **_monthly_bars(days, data.get('daily_trees', []))),
+    ]
+    return _chart('Plot 9: Number of Trees Saved vs Time (days)', DAYS_AXIS,
+                  {'label': 'Cumulative Trees Saved'}, series, y2_axis={'label': 'Daily Trees Saved'})
+
+
+def _spec_plot10(data: Dict) -> Dict:
+    days = data.get('days', [])
+    series = [
+        _series('Cumulative CO₂ Reduction', days, data.get('cumulative_co2', []), COLORS['blue'], width=3),
+        _series('Daily CO₂ Reduction', color=COLORS['light_blue'], kind='bar', axis='y2',
+                **_monthly_bars(days, data.get('daily_co2', []))),
+    ]
+    return _chart('Plot 10: CO₂ Reduction (kg) vs Time (days)', DAYS_AXIS,
+                  {'label': 'Cumulative CO₂ Reduction (kg)'}, series, y2_axis={'label': 'Daily CO₂ Reduction (kg)'})
+
+
+def _spec_plot11(data: Dict) -> Dict:
+    pump_curve = data.get('pump_curve', {})
+    src_curve = data.get('src_curve', {})
+    operating_point = data.get('operating_point')
+    series = [
+        _series('Pump Q-H Curve', _values(pump_curve.get('Q', [])), _values(pump_curve.get('H', [])), COLORS['blue']),
+        _series('System Resistance Curve (SRC)', _values(src_curve.get('Q', [])), _values(src_curve.get('H', [])),
+                COLORS['red'], dashed=True),
+    ]
+    if operating_point:
+        series.append(_series(
+            f"Operating Point (Q={operating_point['Q']:.1f}, H={operating_point['H']:.1f})",
+            [operating_point['Q']], [operating_point['H']], COLORS['green'], kind='scatter'
+        ))
+    return _chart('Pump Curve vs System Resistance Curve', {'label': 'Flow (Q) [m³/hr]'}, {'label': 'Head (H) [m]'},
+                  series)
+
+
+SPEC_BUILDERS = {
+    1: _spec_plot1, 2: _spec_plot2, 3: _spec_plot3, 4: _spec_plot4, 5: _spec_plot5,
+    6: _spec_plot6, 7: _spec_plot7, 8: _spec_plot8, 9: _spec_plot9, 10: _spec_plot10,
+    QH_SRC_PLOT: _spec_plot11,
+}
+
+
+def build_plot_specs(calculation_results: Dict) -> Dict:
+    """
+    Build chart specs for the ten analysis plots and, with a Q-H curve, the Q-H/SRC plot
+
+    Args:
+        calculation_results: Results from energy optimization calculations
+
+    Returns:
+        Dictionary of chart specs keyed plot1..plot10 (plus plot11); a plot
+        whose data is missing or broken maps to None
+    """
+    specs = {}
+    for number, builder in SPEC_BUILDERS.items():
+        data = calculation_results.get(f'plot{number}_data') or {}
+        if number == QH_SRC_PLOT and not data:
+            continue
+        try:
+            specs[f'plot{number}'] = builder(data)
+        except Exception as e:
+            print(f"Error building spec for plot {number}: {str(e)}")
+            specs[f'plot{number}'] = None
+    return specs
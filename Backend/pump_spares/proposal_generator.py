@@ -84,6 +84,7 @@ class EnergyOptimizationProposalGenerator:
     def _generate_project_overview(self):
         """Generate project overview section"""
         project_type = self.submission_data.get('project_type', 'Unknown')
+        feed_water_temp = self.submission_data.get('feed_water_temp')
         
         self.proposal['project_overview'] = {
             'title': 'Project Overview',
@@ -95,8 +96,8 @@ class EnergyOptimizationProposalGenerator:
             - Boiler Drum Height: {self.submission_data.get('boiler_drum_height', 'N/A')} m
             - DA Tank Pressure: {self.submission_data.get('da_tank_pressure', 'N/A')} kg/cm²
             - Boiler Drum Pressure: {self.submission_data.get('boiler_drum_pressure', 'N/A')} kg/cm²
-            - Feed Water Temperature: {self.submission_data.get('feed_water_temp', 'N/A')} °C
-            - Specific Gravity: {self.submission_data.get('specific_gravity', 'N/A')}
+            - Feed Water Temperature: {feed_water_temp if feed_water_temp is not None else 'N/A'} °C
+            - Specific Gravity: {self.results.get('specific_gravity') or self.submission_data.get('specific_gravity', 'N/A')}
             
             **Current Operating Conditions:**
             - Actual Flow: {self.submission_data.get('actual_flow_required', 'N/A')} m³/hr
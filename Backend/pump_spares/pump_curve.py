@@ -0,0 +1,330 @@
+"""
+Fitted Pump Curve Model
+Head, efficiency and power curves stored as polynomial coefficients, with affinity-law scaling
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from numpy.polynomial import polynomial as P
+
+from .operating_point import OperatingPointSolver
+from .water_properties import liquid_specific_gravity
+
+
+GRAVITY = 9.81  # m/s²
+WATER_DENSITY = 1000  # kg/m³
+
+# Power curves derived from head and efficiency are refitted at this degree
+POWER_DEGREE = 3
+POWER_FIT_SAMPLES = 32
+
+# Flow range of nameplate curves, as a multiple of the nameplate flow
+NAMEPLATE_FLOW_RANGE = 1.2
+
+# Shutoff head of a replacement curve through a duty point, as a multiple of the duty head
+DUTY_SHUTOFF_RATIO = 1.1
+
+FLOW_BISECTION_STEPS = 50
+
+CURVE_SOURCES = ['file', 'library', 'nameplate', 'duty_point']
+
+# Flow grid used to locate the best efficiency point
+BEP_SEARCH_POINTS = 201
+
+
+class PumpCurveError(ValueError):
+    """Raised for pump curves that cannot be built"""
+
+
+def _coefficients(values) -> Optional[np.ndarray]:
+    if values is None:
+        return None
+    values = np.asarray(values, dtype=float)
+    return values if values.size else None
+
+
+def parabolic_efficiency(q_bep: float, efficiency_bep: float) -> np.ndarray:
+    """Coefficients of η(Q) = η_bep·(Q/Q_bep)·(2 − Q/Q_bep), peaking at the best efficiency point"""
+    if q_bep <= 0:
+        raise PumpCurveError('Best efficiency flow must be positive')
+    return np.array([0.0, 2 * efficiency_bep / q_bep, -efficiency_bep / q_bep ** 2])
+
+
+class PumpCurve:
+    """
+    Pump performance curves at one speed and impeller diameter
+
+    head (m), efficiency (%) and power (kW) are polynomials in Q (m³/hr),
+    coefficients in increasing order. Curves are fitted once and kept as
+    coefficients, so evaluating them is a polyval over the flow array.
+    """
+
+    def __init__(self, head: Sequence[float], efficiency: Optional[Sequence[float]] = None,
+                 power: Optional[Sequence[float]] = None, q_max: float = 0.0,
+                 speed: Optional[float] = None, diameter: Optional[float] = None, source: str = 'file'):
+        """
+        Args:
+            head: Head polynomial coefficients
+            efficiency: Efficiency polynomial coefficients, if known
+            power: Brake power polynomial coefficients, if known
+            q_max: Largest flow the curves are valid for (m³/hr)
+            speed: Speed the curves apply at (rpm)
+            diameter: Impeller diameter the curves apply at (mm)
+            source: Where the curves came from (one of CURVE_SOURCES)
+        """
+        self.head_coefficients = _coefficients(head)
+        if self.head_coefficients is None:
+            raise PumpCurveError('Head curve needs at least one coefficient')
+        self.efficiency_coefficients = _coefficients(efficiency)
+        self.power_coefficients = _coefficients(power)
+        self.q_max = float(q_max)
+        self.speed = float(speed) if speed else None
+        self.diameter = float(diameter) if diameter else None
+        self.source = source
+
+    @classmethod
+    def fit(cls, q_points: Sequence[float], h_points: Sequence[float],
+            efficiency_points: Optional[Sequence[float]] = None, power_points: Optional[Sequence[float]] = None,
+            degree: int = 2, **kwargs) -> 'PumpCurve':
+        """
+        Least-squares fit of measured curve points
+
+        Args:
+            q_points: Flows (m³/hr)
+            h_points: Heads (m)
+            efficiency_points: Efficiencies (%) at the same flows, if measured
+            power_points: Brake powers (kW) at the same flows, if measured
+            degree: Head polynomial degree
+            **kwargs: speed, diameter and source for the curve
+        """
+        q = np.asarray(q_points, dtype=float)
+        h = np.asarray(h_points, dtype=float)
+        if q.shape != h.shape:
+            raise PumpCurveError('Q and H must have the same number of points')
+        finite = np.isfinite(q) & np.isfinite(h)
+        if np.unique(q[finite]).size < 2:
+            raise PumpCurveError('Pump curve needs at least 2 distinct flow points')
+
+        def fit_points(values, fit_degree):
+            if values is None:
+                return None
+            values = np.asarray(values, dtype=float)
+            valid = finite & np.isfinite(values)
+            distinct = np.unique(q[valid]).size
+            if distinct < 2:
+                return None
+            return P.polyfit(q[valid], values[valid], min(fit_degree, distinct - 1))
+
+        head = fit_points(h, degree)
+        efficiency = fit_points(efficiency_points, 2)
+        power = fit_points(power_points, POWER_DEGREE)
+        return cls(head, efficiency, power, q_max=float(np.max(q[finite])), **kwargs)
+
+    @classmethod
+    def quadratic(cls, shutoff_head: float, q_ref: float, h_ref: float, **kwargs) -> 'PumpCurve':
+        """H = H0 − (H0 − H_ref)·(Q/Q_ref)² through the shutoff head and one reference point"""
+        if q_ref <= 0:
+            raise PumpCurveError('Reference flow must be positive')
+        return cls([shutoff_head, 0.0, -(shutoff_head - h_ref) / q_ref ** 2], **kwargs)
+
+    @classmethod
+    def from_nameplate(cls, q_np: float, h_np: float, efficiency: float = 0.0,
+                       speed: Optional[float] = None, specific_gravity: float = 1.0) -> 'PumpCurve':
+        """
+        Simplified nameplate curve H = H_np·(1 − (Q/Q_np)²)
+
+        With a nameplate efficiency, efficiency peaks at Q_np and the power
+        curve is derived from head and efficiency.
+        """
+        curve = cls.quadratic(h_np, q_np, 0.0, q_max=q_np * NAMEPLATE_FLOW_RANGE, speed=speed, source='nameplate')
+        if efficiency > 0:
+            curve.set_efficiency(q_np, efficiency, specific_gravity)
+        return curve
+
+    @classmethod
+    def from_duty_point(cls, q_duty: float, h_duty: float, shutoff_ratio: float = DUTY_SHUTOFF_RATIO,
+                        flow_range: float = NAMEPLATE_FLOW_RANGE) -> 'PumpCurve':
+        """Replacement pump curve through the duty point with a shutoff head of shutoff_ratio·H"""
+        return cls.quadratic(h_duty * shutoff_ratio, q_duty, h_duty, q_max=q_duty * flow_range, source='duty_point')
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PumpCurve':
+        return cls(
+            data['head'], data.get('efficiency'), data.get('power'),
+            q_max=data.get('q_max', 0.0), speed=data.get('speed'), diameter=data.get('diameter'),
+            source=data.get('source', 'file')
+        )
+
+    def to_dict(self) -> Dict:
+        """Compact JSON form stored on the submission"""
+        def listed(values):
+            return values.tolist() if values is not None else None
+
+        return {
+            'head': listed(self.head_coefficients),
+            'efficiency': listed(self.efficiency_coefficients),
+            'power': listed(self.power_coefficients),
+            'q_max': self.q_max,
+            'speed': self.speed,
+            'diameter': self.diameter,
+            'source': self.source,
+        }
+
+    def head(self, q) -> np.ndarray:
+        """Head (m) at the given flows; negative heads past run-out are clipped to zero"""
+        return np.maximum(P.polyval(np.asarray(q, dtype=float), self.head_coefficients), 0)
+
+    def efficiency(self, q) -> Optional[np.ndarray]:
+        """Efficiency (%) at the given flows, or None without an efficiency curve"""
+        if self.efficiency_coefficients is None:
+            return None
+        return np.clip(P.polyval(np.asarray(q, dtype=float), self.efficiency_coefficients), 0, 100)
+
+    def power(self, q) -> Optional[np.ndarray]:
+        """Brake power (kW) at the given flows, or None without a power curve"""
+        if self.power_coefficients is None:
+            return None
+        return np.maximum(P.polyval(np.asarray(q, dtype=float), self.power_coefficients), 0)
+
+    def flow_at_head(self, h) -> np.ndarray:
+        """
+        Flow (m³/hr) at which the pump develops each head, on the falling part of the curve
+
+        Heads above the curve's maximum give zero flow (the check valve stays shut).
+        """
+        h = np.asarray(h, dtype=float)
+        a0, a1, a2 = np.pad(self.head_coefficients, (0, max(3 - len(self.head_coefficients), 0)))[:3]
+        if len(self.head_coefficients) <= 3 and (a2 < 0 or (a2 == 0 and a1 < 0)):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if a2 < 0:
+                    # Larger root of a2·Q² + a1·Q + (a0 − H) = 0
+                    q = (-a1 - np.sqrt(a1 * a1 - 4 * a2 * (a0 - h))) / (2 * a2)
+                else:
+                    q = (h - a0) / a1
+            return np.maximum(np.nan_to_num(q, nan=0.0), 0)
+
+        # Other shapes: bisect the falling curve between shutoff and run-out
+        low = np.zeros(h.shape)
+        high = np.full(h.shape, max(self.q_max, 1e-9) * 2)
+        for _ in range(FLOW_BISECTION_STEPS):
+            middle = 0.5 * (low + high)
+            above = P.polyval(middle, self.head_coefficients) > h
+            low = np.where(above, middle, low)
+            high = np.where(above, high, middle)
+        return low
+
+    def evaluate(self, q) -> Dict[str, Optional[np.ndarray]]:
+        """All curves at the given flows"""
+        q = np.asarray(q, dtype=float)
+        return {'q': q, 'h': self.head(q), 'efficiency': self.efficiency(q), 'power': self.power(q)}
+
+    def flow_points(self, count: int = 20) -> np.ndarray:
+        return np.linspace(0, self.q_max, count)
+
+    def best_efficiency_point(self) -> Optional[Dict[str, float]]:
+        """Flow, head and efficiency where the efficiency curve peaks, or None without one"""
+        if self.efficiency_coefficients is None or self.q_max <= 0:
+            return None
+        q = np.linspace(0, self.q_max, BEP_SEARCH_POINTS)
+        efficiency = self.efficiency(q)
+        index = int(np.argmax(efficiency))
+        if efficiency[index] <= 0:
+            return None
+        return {'q': float(q[index]), 'h': float(self.head(q[index])), 'efficiency': float(efficiency[index])}
+
+    def derive_power(self, specific_gravity: float = 1.0) -> Optional[np.ndarray]:
+        """Power coefficients fitted to ρ·g·Q·H / η over the flow range"""
+        if self.efficiency_coefficients is None or self.q_max <= 0:
+            return None
+        # Q = 0 is skipped: Q/η(Q) is finite there but evaluates as 0/0
+        q = np.linspace(self.q_max / POWER_FIT_SAMPLES, self.q_max, POWER_FIT_SAMPLES)
+        efficiency = P.polyval(q, self.efficiency_coefficients) / 100
+        valid = efficiency > 0
+        if np.count_nonzero(valid) <= POWER_DEGREE:
+            return None
+        hydraulic = WATER_DENSITY * specific_gravity * GRAVITY * q * self.head(q) / 3.6e6
+        return P.polyfit(q[valid], hydraulic[valid] / efficiency[valid], POWER_DEGREE)
+
+    def set_efficiency(self, q_bep: float, efficiency_bep: float, specific_gravity: float = 1.0):
+        """Use a parabolic efficiency curve peaking at the best efficiency point and derive power from it"""
+        self.efficiency_coefficients = parabolic_efficiency(q_bep, efficiency_bep)
+        self.power_coefficients = self.derive_power(specific_gravity)
+
+    def _scaled(self, ratio: float, speed: Optional[float], diameter: Optional[float]) -> 'PumpCurve':
+        """Curves under Q ∝ r, H ∝ r², P ∝ r³ with efficiency unchanged at corresponding flows"""
+        if ratio <= 0:
+            raise PumpCurveError('Scaling ratio must be positive')
+
+        def scale(coefficients, exponent):
+            if coefficients is None:
+                return None
+            # c(Q) = r^exponent · f(Q / r)  =>  c_i = f_i · r^(exponent - i)
+            return coefficients * ratio ** (exponent - np.arange(len(coefficients)))
+
+        return PumpCurve(
+            scale(self.head_coefficients, 2),
+            scale(self.efficiency_coefficients, 0),
+            scale(self.power_coefficients, 3),
+            q_max=self.q_max * ratio, speed=speed, diameter=diameter, source=self.source
+        )
+
+    def at_speed(self, speed: float) -> 'PumpCurve':
+        """Curves at another speed by the affinity laws"""
+        if not self.speed:
+            raise PumpCurveError('Curve speed is unknown')
+        return self._scaled(speed / self.speed, speed, self.diameter)
+
+    def trimmed(self, diameter: float) -> 'PumpCurve':
+        """Curves for a trimmed impeller by the constant-speed affinity laws (small trims)"""
+        if not self.diameter:
+            raise PumpCurveError('Impeller diameter is unknown')
+        return self._scaled(diameter / self.diameter, self.speed, diameter)
+
+    def trimmed_to(self, ratio: float) -> 'PumpCurve':
+        """Curves for an impeller trimmed to a fraction of its diameter (the diameter may be unknown)"""
+        return self._scaled(ratio, self.speed, self.diameter * ratio if self.diameter else None)
+
+    def operating_point(self, static_head, k) -> Dict[str, np.ndarray]:
+        """Intersection with system curves H = SH + k·Q² (see OperatingPointSolver.solve)"""
+        return OperatingPointSolver.from_coefficients(self.head_coefficients, self.q_max).solve(static_head, k)
+
+
+def build_pump_curve(calc_data: Dict, qh_curve_data: Optional[Dict] = None,
+                     library_curve: Optional[PumpCurve] = None) -> PumpCurve:
+    """
+    Main function to fit the pump curve of a submission
+
+    A referenced library curve is used as stored, scaled to the nameplate
+    speed. Otherwise the uploaded Q-H points are fitted when they were
+    processed successfully, and the nameplate values are used when not;
+    the nameplate efficiency shapes the efficiency and power curves in
+    both of these cases.
+
+    Args:
+        calc_data: Submission values (see build_calc_data)
+        qh_curve_data: Output of the Q-H curve processor, if a file was uploaded
+        library_curve: Stored manufacturer curve referenced by the submission
+
+    Returns:
+        Fitted PumpCurve at the nameplate speed
+    """
+    q_np = float(calc_data.get('flow_qnp', 60))
+    h_np = float(calc_data.get('head_hnp', 910))
+    efficiency = float(calc_data.get('efficiency', 0))
+    speed = float(calc_data.get('speed_n1', 0)) or None
+    specific_gravity = liquid_specific_gravity(calc_data)
+
+    if library_curve is not None:
+        if speed and library_curve.speed and speed != library_curve.speed:
+            return library_curve.at_speed(speed)
+        return library_curve
+
+    if qh_curve_data and qh_curve_data.get('success'):
+        points = qh_curve_data['pump_curve']
+        curve = PumpCurve.fit(points['Q'], points['H'], speed=speed, source='file')
+        if efficiency > 0 and q_np > 0:
+            curve.set_efficiency(q_np, efficiency, specific_gravity)
+        return curve
+
+    return PumpCurve.from_nameplate(q_np, h_np, efficiency, speed, specific_gravity)
@@ -0,0 +1,299 @@
+"""
+Replacement Pump Recommendation
+Scores library pumps, at standard speeds and with trimmed impellers, by life-cycle energy cost at a duty point and load profile
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .curve_library import (
+    DEFAULT_BEP_TOLERANCE, MAX_BEP_TOLERANCE, LibraryError, evaluate_rows, get_curve_set,
+    library_pump_curve, serialize_library_curve,
+)
+from .energy_calculations import COST_PER_KWH, KWH_TO_CO2_AVG
+from .models import LibraryPumpCurve
+from .pump_curve import PumpCurve, PumpCurveError
+from .vfd_simulation import HOURS_PER_YEAR, SPEED_BISECTION_STEPS
+from .water_properties import liquid_specific_gravity
+
+
+# Smallest impeller diameter, as a fraction of the full diameter, considered without a new pump
+DEFAULT_MIN_TRIM = 0.8
+
+# Life-cycle energy cost: years of operation discounted at this rate
+DEFAULT_LIFE_YEARS = 10
+DEFAULT_DISCOUNT_RATE = 0.08
+
+DEFAULT_RECOMMENDATIONS = 5
+MAX_RECOMMENDATIONS = 50
+
+# Largest power-curve degree whose flow moments are accumulated
+MAX_POWER_TERMS = 8
+
+
+class RecommendationError(ValueError):
+    """Raised for recommendation requests that cannot be answered"""
+
+
+def present_value_factor(years: float, discount_rate: float) -> float:
+    """Present value of 1 per year over the given years"""
+    if discount_rate <= 0:
+        return float(years)
+    return float((1 - (1 + discount_rate) ** -years) / discount_rate)
+
+
+def flow_moments(flows: np.ndarray, hours: np.ndarray, terms: int) -> np.ndarray:
+    """
+    Σ hours·Q^i for i < terms over the running steps
+
+    Throttled energy is Σ hours·P(Q) and P is a polynomial, so it equals
+    Σ p_i·M_i: every candidate is scored from these few numbers instead
+    of from the whole profile.
+    """
+    running = flows > 0
+    return np.array([np.dot(hours[running], flows[running] ** power) for power in range(terms)])
+
+
+def _trim_ratios(curve_set, rows: np.ndarray, speed_ratio: np.ndarray, flow: float, head: float,
+                 min_trim: float) -> np.ndarray:
+    """
+    Trim t at which s²·H(Q/s) = head with s = speed ratio·t, bisected for all rows at once
+
+    s²·H(Q/s) rises with s for a falling head curve. Rows that miss the head
+    at full diameter or still exceed it at min_trim get NaN.
+    """
+    coefficients = curve_set.head[rows]
+
+    def developed(ratio):
+        return ratio ** 2 * evaluate_rows(coefficients, flow / ratio)
+
+    low, high = speed_ratio * min_trim, speed_ratio.copy()
+    reachable = (developed(high) >= head) & (developed(low) <= head)
+    for _ in range(SPEED_BISECTION_STEPS):
+        middle = 0.5 * (low + high)
+        short = developed(middle) < head
+        low = np.where(short, middle, low)
+        high = np.where(short, high, middle)
+    return np.where(reachable, high / speed_ratio, np.nan)
+
+
+def recommend_pumps(duty_flow: float, duty_head: float, flows: Optional[Sequence[float]] = None,
+                    hours: Optional[Sequence[float]] = None, step_hours: float = 1.0,
+                    speeds: Optional[Sequence[float]] = None, min_trim: float = DEFAULT_MIN_TRIM,
+                    head_margin: float = 0.0, tolerance: float = DEFAULT_BEP_TOLERANCE,
+                    specific_gravity: float = 1.0, cost_per_kwh: float = COST_PER_KWH,
+                    years: float = DEFAULT_LIFE_YEARS, discount_rate: float = DEFAULT_DISCOUNT_RATE,
+                    limit: int = DEFAULT_RECOMMENDATIONS, current_curve: Optional[PumpCurve] = None) -> Dict:
+    """
+    Rank library pumps for a duty point by life-cycle energy cost
+
+    Every library curve whose BEP can reach the duty point is taken at each
+    requested speed (its own speed if none are given). Its impeller is then
+    trimmed so that the curve passes through the duty head plus the margin.
+    The pump runs at fixed speed on that curve and a valve throttles lower
+    demands, so its power at each step is P(Q) whatever the system curve.
+    Flows above the duty flow are capped at it.
+
+    Args:
+        duty_flow: Required flow (m³/hr)
+        duty_head: Required head at that flow (m)
+        flows: Demand per step (m³/hr); the duty flow all year if omitted
+        hours: Duration of each step (h); step_hours for every step if omitted
+        step_hours: Uniform step duration (h)
+        speeds: Motor speeds to consider (rpm)
+        min_trim: Smallest impeller diameter ratio
+        head_margin: Extra head at the duty flow, as a fraction of the duty head
+        tolerance: BEP window used to prune the library (see BepIndex.affinity_candidates)
+        specific_gravity: Liquid SG; library power curves are for water
+        cost_per_kwh: Energy tariff
+        years: Life-cycle length
+        discount_rate: Annual discount rate
+        limit: Number of pumps returned
+        current_curve: Installed pump curve, to report savings against
+
+    Returns:
+        Dictionary with the ranked options (best variant per pump), the
+        installed pump's energy and the assumptions
+    """
+    if duty_flow <= 0 or duty_head <= 0:
+        raise RecommendationError('Duty flow and head must be positive')
+    if not 0 < min_trim <= 1:
+        raise RecommendationError('min_trim must be between 0 and 1')
+    if not 0 < tolerance <= MAX_BEP_TOLERANCE:
+        raise RecommendationError(f'tolerance must be between 0 and {MAX_BEP_TOLERANCE}')
+    if not 1 <= limit <= MAX_RECOMMENDATIONS:
+        raise RecommendationError(f'limit must be between 1 and {MAX_RECOMMENDATIONS}')
+
+    if flows is None:
+        flows = np.array([duty_flow])
+        hours = np.array([float(HOURS_PER_YEAR)])
+    flows = np.asarray(flows, dtype=float)
+    hours = np.full(flows.shape, float(step_hours)) if hours is None else np.asarray(hours, dtype=float)
+    if not flows.size or hours.shape != flows.shape:
+        raise RecommendationError('Each profile step needs one flow and one duration')
+    invalid = ~np.isfinite(flows) | (flows < 0) | ~np.isfinite(hours) | (hours < 0)
+    if invalid.any():
+        raise RecommendationError(f'Invalid flow or duration in row {int(np.argmax(invalid)) + 1}')
+
+    total_hours = float(hours.sum())
+    annual_factor = HOURS_PER_YEAR / total_hours if total_hours > 0 else 0.0
+    unmet_hours = float(hours[flows > duty_flow].sum())
+    flows = np.minimum(flows, duty_flow)
+
+    curve_set = get_curve_set()
+    target_head = duty_head * (1 + head_margin)
+
+    # Prune with the BEP index, then pair every candidate with every speed
+    known_speeds = curve_set.speed[np.isfinite(curve_set.speed)]
+    if speeds and known_speeds.size:
+        ratio_low = min_trim * min(speeds) / known_speeds.max()
+        ratio_high = max(speeds) / known_speeds.min()
+    else:
+        ratio_low, ratio_high = min_trim, 1.0
+    candidates = curve_set.index.affinity_candidates(duty_flow, target_head, ratio_low, ratio_high, tolerance)
+    candidates = candidates[np.isfinite(curve_set.power[candidates, 0])]
+
+    variant_speeds = np.asarray(speeds, dtype=float) if speeds else None
+    if variant_speeds is not None:
+        rows = np.repeat(candidates, len(variant_speeds))
+        speed = np.tile(variant_speeds, len(candidates))
+        speed_ratio = speed / curve_set.speed[rows]
+        keep = np.isfinite(speed_ratio)
+        rows, speed, speed_ratio = rows[keep], speed[keep], speed_ratio[keep]
+    else:
+        rows = candidates
+        speed = curve_set.speed[rows]
+        speed_ratio = np.ones(len(rows))
+
+    trim = _trim_ratios(curve_set, rows, speed_ratio, duty_flow, target_head, min_trim)
+    ratio = speed_ratio * trim
+    feasible = np.isfinite(trim) & (duty_flow / np.where(np.isfinite(ratio), ratio, 1) <= curve_set.q_max[rows])
+    rows, speed, speed_ratio, trim, ratio = (values[feasible] for values in (rows, speed, speed_ratio, trim, ratio))
+
+    # Scaled power polynomial P(Q) = s³·P_lib(Q/s): coefficient i scales by s^(3 - i)
+    power = curve_set.power[rows]
+    terms = min(power.shape[1], MAX_POWER_TERMS)
+    scaled_power = power[:, :terms] * ratio[:, None] ** (3 - np.arange(terms)) * specific_gravity
+    moments = flow_moments(flows, hours, terms)
+    annual_kwh = scaled_power @ moments * annual_factor
+
+    duty_power = evaluate_rows(scaled_power, np.full(len(rows), duty_flow))
+    duty_efficiency = np.clip(evaluate_rows(curve_set.efficiency[rows], duty_flow / ratio), 0, 100)
+
+    life_factor = present_value_factor(years, discount_rate)
+    life_cycle_cost = annual_kwh * cost_per_kwh * life_factor
+
+    # Best variant per pump, cheapest first
+    order = np.argsort(life_cycle_cost, kind='stable')
+    _, first = np.unique(curve_set.ids[rows[order]], return_index=True)
+    chosen = order[np.sort(first)][:limit]
+
+    baseline_kwh = None
+    if current_curve is not None and current_curve.power_coefficients is not None:
+        running = flows > 0
+        baseline_kwh = float(np.dot(current_curve.power(flows[running]), hours[running])) * annual_factor
+
+    entries = LibraryPumpCurve.objects.select_related('pump_make', 'pump_model', 'pump_size').in_bulk(
+        curve_set.ids[rows[chosen]].tolist()
+    )
+    options = []
+    for index in chosen:
+        entry = entries.get(int(curve_set.ids[rows[index]]))
+        if entry is None:
+            continue
+        curve = library_pump_curve(entry)
+        if speed_ratio[index] != 1:
+            curve = curve.at_speed(float(speed[index]))
+        curve = curve.trimmed_to(float(trim[index]))
+
+        option = serialize_library_curve(entry, include_curve=False)
+        option.update({
+            'operating_speed': float(speed[index]),
+            'trim_ratio': round(float(trim[index]), 4),
+            'trimmed_diameter': round(curve.diameter, 1) if curve.diameter else None,
+            'duty_power_kw': round(float(duty_power[index]), 3),
+            'duty_efficiency': round(float(duty_efficiency[index]), 2),
+            'annual_kwh': round(float(annual_kwh[index]), 2),
+            'annual_cost': round(float(annual_kwh[index]) * cost_per_kwh, 2),
+            'life_cycle_energy_cost': round(float(life_cycle_cost[index]), 2),
+            'curve': curve.to_dict(),
+        })
+        if baseline_kwh is not None:
+            saving = baseline_kwh - float(annual_kwh[index])
+            option['annual_saving_kwh'] = round(saving, 2)
+            option['annual_cost_saving'] = round(saving * cost_per_kwh, 2)
+            option['annual_co2_reduction_kg'] = round(saving * KWH_TO_CO2_AVG, 2)
+        options.append(option)
+
+    return {
+        'options': options,
+        'candidates_evaluated': int(len(rows)),
+        'library_size': len(curve_set),
+        'current_pump': {
+            'annual_kwh': round(baseline_kwh, 2),
+            'annual_cost': round(baseline_kwh * cost_per_kwh, 2),
+            'life_cycle_energy_cost': round(baseline_kwh * cost_per_kwh * life_factor, 2),
+        } if baseline_kwh is not None else None,
+        'assumptions': {
+            'duty_flow': duty_flow,
+            'duty_head': duty_head,
+            'head_margin': head_margin,
+            'min_trim': min_trim,
+            'speeds': list(speeds) if speeds else None,
+            'specific_gravity': specific_gravity,
+            'cost_per_kwh': cost_per_kwh,
+            'years': years,
+            'discount_rate': discount_rate,
+            'profile_hours': round(total_hours, 2),
+            'unmet_hours': round(unmet_hours, 2),
+        },
+    }
+
+
+def run_pump_recommendation(calc_data: Dict, flows: Optional[Sequence[float]] = None,
+                            hours: Optional[Sequence[float]] = None, pump_curve_data: Optional[Dict] = None,
+                            duty_flow: Optional[float] = None, duty_head: Optional[float] = None,
+                            **options) -> Dict:
+    """
+    Main function to recommend replacement pumps for a submission
+
+    The duty flow defaults to the actual required flow (the nameplate flow
+    if not given) and the duty head to SRC1 at that flow. The installed
+    pump is the simulation curve of the submission.
+
+    Args:
+        calc_data: Submission values (see build_calc_data)
+        flows: Demand per step (m³/hr), if a load profile is given
+        hours: Duration of each step (h), if not uniform
+        pump_curve_data: Fitted pump curve stored on the submission
+        duty_flow: Required flow override (m³/hr)
+        duty_head: Required head override (m)
+        **options: Passed to recommend_pumps
+
+    Raises:
+        RecommendationError: Missing duty data or invalid options
+    """
+    from .qh_curve_processor import generate_src_curves
+    from .vfd_simulation import SimulationError, simulation_pump_curve
+
+    src = generate_src_curves(calc_data)
+    if 'error' in src:
+        raise RecommendationError(src['error'])
+    duty_flow = float(duty_flow or calc_data.get('actual_flow_required') or calc_data.get('flow_qnp') or 0)
+    if duty_head is None:
+        duty_head = src['parameters']['static_head'] + src['parameters']['k1'] * duty_flow ** 2
+
+    try:
+        current_curve = simulation_pump_curve(calc_data, pump_curve_data)
+    except (PumpCurveError, SimulationError):
+        current_curve = None
+
+    try:
+        return recommend_pumps(
+            duty_flow, float(duty_head), flows, hours,
+            specific_gravity=liquid_specific_gravity(calc_data),
+            current_curve=current_curve, **options
+        )
+    except LibraryError as e:
+        raise RecommendationError(str(e))
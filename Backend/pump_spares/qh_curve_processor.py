@@ -4,14 +4,16 @@ Handles Excel file uploads and generates System Resistance Curves (SRC)
 Based on the provided Tkinter code logic
 """
 
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import Dict, List, Tuple, Optional
-import io
-import base64
 from django.core.files.uploadedfile import UploadedFile
 
+from .curve_ingestion import CurveFileError, read_curve_file
+from .curve_sampling import sample_src
+from .operating_point import OperatingPointError, OperatingPointSolver
+from .plot_specs import QH_SRC_PLOT
+from .water_properties import liquid_specific_gravity, pressure_head
+
 
 class QHCurveProcessor:
     """
@@ -23,58 +25,84 @@ class QHCurveProcessor:
         self.gravity = 9.81  # m/s²
         self.water_density = 1000  # kg/m³
     
-    def process_qh_curve(self, excel_file: UploadedFile, process_params: Dict) -> Dict:
+    def process_qh_curve(self, excel_file: UploadedFile, process_params: Dict, with_plot: bool = True) -> Dict:
         """
-        Process Q-H curve from Excel file and generate SRC
+        Process Q-H curve from a curve file and generate SRC
         
         Args:
-            excel_file: Uploaded Excel file containing Q-H data
+            excel_file: Uploaded CSV, XLSX or XLS file containing Q-H data
             process_params: Dictionary containing process parameters
+            with_plot: Render the Q-H/SRC plot as a base64 PNG
             
         Returns:
             Dictionary containing processed data and plot
         """
         try:
-            # Read Excel file
-            df = pd.read_excel(excel_file)
+            # Read Q and H columns (converted to m³/hr and m)
+            try:
+                curve = read_curve_file(excel_file)
+            except CurveFileError as e:
+                return {"error": str(e)}
             
-            if df.shape[1] < 2:
-                return {"error": "Excel must have at least 2 columns (Q and H)"}
+            return self.process_qh_points(curve.q, curve.h, process_params, curve.columns, curve.units, with_plot)
             
-            # Extract Q and H data
-            Q = df.iloc[:, 0].dropna().tolist()
-            H = df.iloc[:, 1].dropna().tolist()
+        except Exception as e:
+            return {"error": f"Processing failed: {str(e)}"}
+    
+    def process_qh_points(self, q: np.ndarray, h: np.ndarray, process_params: Dict,
+                          columns: Optional[Dict] = None, units: Optional[Dict] = None,
+                          with_plot: bool = True) -> Dict:
+        """
+        Generate the SRC and duty point for Q-H points already read or sampled
+        
+        Args:
+            q: Flows (m³/hr)
+            h: Heads (m)
+            process_params: Dictionary containing process parameters
+            columns: Column names the points were read from, if any
+            units: Units the points were converted from, if any
+            with_plot: Render the Q-H/SRC plot as a base64 PNG; without it
+                the result has no 'plot' and qh_src_plot_data feeds a spec
+                or the on-demand plot endpoint instead
             
-            if len(Q) != len(H):
-                return {"error": "Mismatch between Q and H data length"}
+        Returns:
+            Dictionary containing processed data and plot
+        """
+        try:
+            q = np.asarray(q, dtype=float)
+            h = np.asarray(h, dtype=float)
+            Q = q.tolist()
+            H = h.tolist()
             
             # Calculate process parameters
             h1 = float(process_params.get('da_tank_height', 0))  # DA tank height (m)
             h2 = float(process_params.get('boiler_drum_height', 0))  # Boiler drum height (m)
             P1 = float(process_params.get('da_tank_pressure', 0))  # DA tank pressure (Kg/cm²)
             P2 = float(process_params.get('boiler_drum_pressure', 0))  # Boiler drum pressure (Kg/cm²)
-            SG = float(process_params.get('specific_gravity', 1.0))  # Specific gravity
+            SG = liquid_specific_gravity(process_params)  # Specific gravity, entered or at the feed water temperature
             Qnp = float(process_params.get('flow_qnp', 0))  # Nameplate flow (m³/hr)
             Hnp = float(process_params.get('head_hnp', 0))  # Nameplate head (m)
             
             # Calculate Static Head
-            static_head = (h2 - h1) + ((P2 - P1) * 10 / SG)
+            static_head = (h2 - h1) + pressure_head(P2 - P1, SG)
             
             # Calculate k1 factor for SRC
             k1 = (Hnp - static_head) / (Qnp ** 2) if Qnp > 0 else 0
             
-            # Generate SRC curve points
-            Qi = np.arange(0, Qnp + 1, 5)
-            SRC = static_head + k1 * (Qi ** 2)
+            # Duty point where the pump curve meets the SRC
+            operating_point = self._find_intersection(q, h, static_head, k1)
             
-            # Generate plot
-            plot_data = self._generate_qh_src_plot(Q, H, Qi.tolist(), SRC.tolist())
+            # Generate SRC curve points, sampled exactly at the duty point
+            Qi, SRC = sample_src(static_head, k1, Qnp,
+                                 include=[operating_point['Q']] if operating_point else None)
             
-            return {
+            result = {
                 'success': True,
                 'pump_curve': {
                     'Q': Q,
-                    'H': H
+                    'H': H,
+                    'columns': columns or {'q': None, 'h': None},
+                    'units': units or {'q': 'm3/h', 'h': 'm'}
                 },
                 'src_curve': {
                     'Q': Qi.tolist(),
@@ -91,99 +119,42 @@ class QHCurveProcessor:
                     'Qnp': Qnp,
                     'Hnp': Hnp
                 },
-                'plot': plot_data
+                'operating_point': operating_point
             }
+            if with_plot:
+                from .plot_generator import render_plot
+                result['plot'] = render_plot(QH_SRC_PLOT, qh_src_plot_data(result))
+            return result
             
         except Exception as e:
             return {"error": f"Processing failed: {str(e)}"}
     
-    def _generate_qh_src_plot(self, Q: List[float], H: List[float], 
-                             Qi: List[float], SRC: List[float]) -> str:
-        """
-        Generate Q-H vs SRC plot and return as base64 string
-        
-        Args:
-            Q: Pump curve flow points
-            H: Pump curve head points
-            Qi: SRC flow points
-            SRC: SRC head points
-            
-        Returns:
-            Base64 encoded plot image
-        """
-        try:
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            # Plot pump curve
-            ax.plot(Q, H, marker="o", linestyle="-", color="blue", 
-                   linewidth=2, markersize=6, label="Pump Q-H Curve")
-            
-            # Plot SRC curve
-            ax.plot(Qi, SRC, marker="s", linestyle="--", color="red", 
-                   linewidth=2, markersize=6, label="System Resistance Curve (SRC)")
-            
-            # Find intersection point
-            intersection = self._find_intersection(Q, H, Qi, SRC)
-            if intersection:
-                ax.plot(intersection['Q'], intersection['H'], 'go', 
-                       markersize=10, label=f"Operating Point (Q={intersection['Q']:.1f}, H={intersection['H']:.1f})")
-            
-            ax.set_title("Pump Curve vs System Resistance Curve", fontsize=14, fontweight='bold')
-            ax.set_xlabel("Flow (Q) [m³/hr]", fontsize=12)
-            ax.set_ylabel("Head (H) [m]", fontsize=12)
-            ax.grid(True, alpha=0.3)
-            ax.legend(fontsize=11)
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode()
-            plt.close(fig)
-            
-            return image_base64
-            
-        except Exception as e:
-            print(f"Error generating plot: {str(e)}")
-            return ""
-    
-    def _find_intersection(self, Q: List[float], H: List[float], 
-                          Qi: List[float], SRC: List[float]) -> Optional[Dict]:
+    def _find_intersection(self, Q, H, static_head: float, k: float) -> Optional[Dict]:
         """
         Find intersection point between pump curve and SRC
         
         Args:
             Q: Pump curve flow points
             H: Pump curve head points
-            Qi: SRC flow points
-            SRC: SRC head points
+            static_head: SRC static head (m)
+            k: SRC resistance coefficient
             
         Returns:
-            Dictionary with intersection point or None
+            Dictionary with intersection point and curve fit, or None
         """
         try:
-            # Interpolate both curves to find intersection
-            Q_interp = np.linspace(min(min(Q), min(Qi)), max(max(Q), max(Qi)), 1000)
+            solver = OperatingPointSolver(Q, H)
+            result = solver.solve(static_head, k)
+            if not result['solved']:
+                return None
             
-            # Interpolate pump curve
-            H_pump_interp = np.interp(Q_interp, Q, H)
-            
-            # Interpolate SRC curve
-            H_src_interp = np.interp(Q_interp, Qi, SRC)
-            
-            # Find intersection
-            diff = np.abs(H_pump_interp - H_src_interp)
-            min_diff_idx = np.argmin(diff)
-            
-            if diff[min_diff_idx] < 1.0:  # Within 1m tolerance
-                return {
-                    'Q': float(Q_interp[min_diff_idx]),
-                    'H': float(H_pump_interp[min_diff_idx])
-                }
-            
-            return None
+            return {
+                'Q': float(result['q']),
+                'H': float(result['h']),
+                'fit': solver.to_dict()
+            }
             
-        except Exception as e:
+        except OperatingPointError as e:
             print(f"Error finding intersection: {str(e)}")
             return None
     
@@ -202,27 +173,24 @@ class QHCurveProcessor:
             h2 = float(process_params.get('boiler_drum_height', 0))
             P1 = float(process_params.get('da_tank_pressure', 0))
             P2 = float(process_params.get('boiler_drum_pressure', 0))
-            SG = float(process_params.get('specific_gravity', 1.0))
+            SG = liquid_specific_gravity(process_params)
             Qnp = float(process_params.get('flow_qnp', 0))
             Hnp = float(process_params.get('head_hnp', 0))
             
             # Base static head
-            static_head = (h2 - h1) + ((P2 - P1) * 10 / SG)
-            
-            # Generate flow points
-            Qi = np.arange(0, Qnp * 1.2, 5)
+            static_head = (h2 - h1) + pressure_head(P2 - P1, SG)
             
             # SRC1: Base system resistance
             k1 = (Hnp - static_head) / (Qnp ** 2) if Qnp > 0 else 0
-            SRC1 = static_head + k1 * (Qi ** 2)
             
             # SRC2: Higher system resistance (valve throttling)
             k2 = k1 * 1.2
-            SRC2 = static_head + k2 * (Qi ** 2)
             
             # SRC3: Lower system resistance (optimized system)
             k3 = k1 * 0.8
-            SRC3 = static_head + k3 * (Qi ** 2)
+            
+            # All three curves share one flow grid that passes through the rated flow
+            Qi, (SRC1, SRC2, SRC3) = sample_src(static_head, [k1, k2, k3], Qnp * 1.2, include=[Qnp])
             
             return {
                 'success': True,
@@ -242,19 +210,55 @@ class QHCurveProcessor:
             return {"error": f"Failed to generate SRC curves: {str(e)}"}
 
 
-def process_qh_curve_file(excel_file: UploadedFile, process_params: Dict) -> Dict:
+def qh_src_plot_data(qh_curve_data: Dict) -> Dict:
+    """
+    Data of the Q-H/SRC plot from processed Q-H curve data
+    
+    Args:
+        qh_curve_data: Successful result of the Q-H curve processor
+        
+    Returns:
+        Pump curve, SRC and operating point, as stored in plot11_data
+    """
+    operating_point = qh_curve_data.get('operating_point')
+    return {
+        'pump_curve': {key: qh_curve_data['pump_curve'][key] for key in ('Q', 'H')},
+        'src_curve': qh_curve_data['src_curve'],
+        'operating_point': {key: operating_point[key] for key in ('Q', 'H')} if operating_point else None,
+    }
+
+
+def process_qh_curve_file(excel_file: UploadedFile, process_params: Dict, with_plot: bool = True) -> Dict:
     """
     Main function to process Q-H curve file
     
     Args:
         excel_file: Uploaded Excel file
         process_params: Process parameters
+        with_plot: Render the Q-H/SRC plot as a base64 PNG
+        
+    Returns:
+        Processed data and plots
+    """
+    processor = QHCurveProcessor()
+    return processor.process_qh_curve(excel_file, process_params, with_plot)
+
+
+def process_library_curve(pump_curve, process_params: Dict, with_plot: bool = True) -> Dict:
+    """
+    Process a stored library curve like an uploaded Q-H file
+    
+    Args:
+        pump_curve: PumpCurve of the library entry
+        process_params: Process parameters
+        with_plot: Render the Q-H/SRC plot as a base64 PNG
         
     Returns:
         Processed data and plots
     """
+    q = pump_curve.flow_points()
     processor = QHCurveProcessor()
-    return processor.process_qh_curve(excel_file, process_params)
+    return processor.process_qh_points(q, pump_curve.head(q), process_params, with_plot=with_plot)
 
 
 def generate_src_curves(process_params: Dict) -> Dict:
@@ -0,0 +1,194 @@
+"""
+Pre-rendered Quotation Cache
+Keeps ready-made quotation bodies for the most requested materials, and
+converted PDFs of recently issued quotations
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import MaterialOfConstruction, PrerenderedQuotation
+from .receipt_generator import format_spare_description, get_template_signature, render_quotation_body
+from .serializers import MaterialOfConstructionSerializer
+
+# Customer details printed on (or numbering) a personalized quotation
+QUOTATION_CUSTOMER_FIELDS = (
+    'gst_number', 'full_name', 'company_name', 'company_address', 'official_email', 'email', 'location',
+)
+
+_pdf_eviction_lock = threading.Lock()
+
+
+def record_quotation_requests(material_ids: Iterable[int]):
+    """Bump the request counter of every quoted material in one query"""
+    material_ids = set(material_ids)
+    if material_ids:
+        MaterialOfConstruction.objects.filter(id__in=material_ids).update(
+            quotation_request_count=F('quotation_request_count') + 1
+        )
+
+
+def get_related_signature(material: MaterialOfConstruction) -> str:
+    """
+    Digest of the related names printed in the spare description
+
+    Renaming a pump make, model, size, part number or part name does not
+    touch the material's updated_at, so bodies are also keyed on these.
+    """
+    names = [
+        material.pump_make.name, material.pump_model.name, material.pump_size.size,
+        material.part_number.part_no, material.part_name.name,
+    ]
+    return hashlib.sha256('\x1f'.join(names).encode()).hexdigest()
+
+
+def get_cached_quotation_body(material: MaterialOfConstruction) -> Optional[bytes]:
+    """
+    Return the pre-rendered body for a single-unit quotation of a material,
+    or None when there is none or it is stale
+    """
+    cached = PrerenderedQuotation.objects.filter(
+        material_id=material.id,
+        material_updated_at=material.updated_at,
+        template_signature=get_template_signature(),
+        related_signature=get_related_signature(material)
+    ).values_list('body', flat=True).first()
+    return bytes(cached) if cached is not None else None
+
+
+def prerender_quotation(material: MaterialOfConstruction) -> PrerenderedQuotation:
+    """Render and store the single-unit quotation body for a material"""
+    material_data = MaterialOfConstructionSerializer(material).data
+    body = render_quotation_body([(material_data, 1)])
+    prerendered, _ = PrerenderedQuotation.objects.update_or_create(
+        material=material,
+        defaults={
+            'body': body,
+            'material_updated_at': material.updated_at,
+            'template_signature': get_template_signature(),
+            'related_signature': get_related_signature(material),
+        }
+    )
+    return prerendered
+
+
+def warm_quotation_cache(top_n: int = 50, force: bool = False) -> List[int]:
+    """
+    Pre-render quotation bodies for the top-N most requested materials
+    
+    Args:
+        top_n: Number of materials to warm, by quotation_request_count
+        force: Re-render even if an up-to-date body already exists
+        
+    Returns:
+        IDs of the materials that were (re)rendered
+    """
+    materials = MaterialOfConstruction.objects.select_related(
+        'pump_make', 'pump_model', 'pump_size', 'part_number', 'part_name', 'prerendered_quotation'
+    ).filter(quotation_request_count__gt=0).order_by('-quotation_request_count', 'id')[:top_n]
+    
+    template_signature = get_template_signature()
+    rendered_ids = []
+    for material in materials:
+        existing = getattr(material, 'prerendered_quotation', None)
+        if (not force and existing is not None
+                and existing.material_updated_at == material.updated_at
+                and existing.template_signature == template_signature
+                and existing.related_signature == get_related_signature(material)):
+            continue
+        prerender_quotation(material)
+        rendered_ids.append(material.id)
+    
+    # Drop bodies for materials that fell out of the top-N
+    PrerenderedQuotation.objects.exclude(material__in=[m.id for m in materials]).delete()
+    
+    return rendered_ids
+
+
+def quotation_pdf_key(line_items, user_info: Optional[Dict] = None) -> str:
+    """
+    Hash of everything printed on a personalized quotation
+
+    Covers the template, each line's description, unit price and quantity,
+    the customer block and today's date. The same request from the same
+    customer on the same day gets the same document, reference number
+    included, rather than another LibreOffice conversion and number.
+    """
+    user_info = user_info or {}
+    payload = {
+        'template': get_template_signature(),
+        'date': datetime.now().strftime('%d/%m/%Y'),
+        'customer': {field: str(user_info.get(field) or '') for field in QUOTATION_CUSTOMER_FIELDS},
+        'lines': [
+            [format_spare_description(material_data), str(material_data.get('unit_price') or 0), quantity]
+            for material_data, quantity in line_items
+        ],
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def get_pdf_cache_dir() -> Path:
+    return Path(getattr(settings, 'QUOTATION_PDF_CACHE_DIR', settings.BASE_DIR / 'quotation_pdf_cache'))
+
+
+def get_cached_quotation_pdf(key: str) -> Optional[Path]:
+    """Path of the converted PDF for a quotation key, or None"""
+    path = get_pdf_cache_dir() / f'{key}.pdf'
+    try:
+        # The modification time doubles as the last use for eviction
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        return None
+
+
+def store_quotation_pdf(key: str, pdf_path: str) -> Path:
+    """Copy a converted PDF into the cache and return its cached path"""
+    path = get_pdf_cache_dir() / f'{key}.pdf'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file, open(pdf_path, 'rb') as pdf_file:
+            shutil.copyfileobj(pdf_file, temp_file)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    evict_quotation_pdfs(keep=path)
+    return path
+
+
+def evict_quotation_pdfs(keep: Optional[Path] = None):
+    """Delete the least recently used PDFs beyond QUOTATION_PDF_CACHE_MAX_FILES"""
+    max_files = getattr(settings, 'QUOTATION_PDF_CACHE_MAX_FILES', 500)
+    cache_dir = get_pdf_cache_dir()
+
+    with _pdf_eviction_lock:
+        entries = []
+        for path in cache_dir.glob('*.pdf') if cache_dir.is_dir() else []:
+            try:
+                entries.append((path != keep, -path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        if len(entries) <= max_files:
+            return
+
+        # Newest first; the PDF just stored is always kept
+        entries.sort(key=lambda entry: entry[:2])
+        for _, _, path in entries[max(max_files, 1):]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -2,30 +2,26 @@ from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.conf import settings
 import os
 from datetime import datetime
+from decimal import Decimal
 import io
 import hashlib
-import random
+import shutil
 import subprocess
 import tempfile
+import zipfile
+from .file_responses import create_file_response, create_spooled_file, open_temporary_file
+from .reference_numbers import allocate_reference_number
 
 def generate_reference_number(user_info=None):
     """
     Generate reference number with GST + last 2 digits sequential
     """
-    if user_info and user_info.get('gst_number'):
-        gst = user_info.get('gst_number')
-        # Extract last 2 digits from GST number
-        last_two = gst[-2:] if len(gst) >= 2 else '00'
-        # Generate sequential number (using timestamp for uniqueness)
-        sequential = str(int(datetime.now().timestamp()))[-4:]
-        return f"{gst}{last_two}{sequential}"
-    else:
-        # Fallback: generate random reference
-        return f"SS{datetime.now().strftime('%y%m%d')}{random.randint(1000, 9999)}"
+    gst = user_info.get('gst_number') if user_info else None
+    return allocate_reference_number(gst, fallback_prefix='SS', source='receipt')
 
 def create_basic_template():
     """
@@ -185,11 +181,102 @@ def create_basic_template():
     
     return doc
 
-def generate_receipt(material_data, user_info=None):
+def format_spare_description(material_data):
     """
-    Generate a receipt document with filled pump spares details
+    Build the multi-line spare description shown in the quotation table
+    """
+    spare_description = f"{material_data.get('part_name_value', '')} - {material_data.get('moc', '')}"
+    if material_data.get('pump_make_name') and material_data.get('pump_model_name') and material_data.get('pump_size_value'):
+        spare_description += f"\nPump: {material_data.get('pump_make_name')} {material_data.get('pump_model_name')} {material_data.get('pump_size_value')}"
+    if material_data.get('part_number_value'):
+        spare_description += f"\nPart No: {material_data.get('part_number_value')}"
+    return spare_description
+
+def find_items_table(doc):
+    """
+    Return the spares table (the one whose header starts with 'Sr. No.')
+    """
+    for table in doc.tables:
+        if len(table.rows) > 0 and 'Sr. No.' in table.rows[0].cells[0].text:
+            return table
+    return None
+
+def fill_items_table(table, line_items):
+    """
+    Replace the placeholder rows of the spares table with one row per line item
+
+    Args:
+        table: The spares table from the quotation template
+        line_items: List of (material_data, quantity) pairs
+
+    Returns:
+        Total basic price of all lines as Decimal
+    """
+    # Clear placeholder rows, keeping only the header
+    while len(table.rows) > 1:
+        table._element.remove(table.rows[1]._element)
+
+    total_basic_price = Decimal('0')
+    for idx, (material_data, quantity) in enumerate(line_items, 1):
+        unit_price = Decimal(str(material_data.get('unit_price') or 0))
+        line_total = unit_price * quantity
+
+        row = table.add_row()
+        row.cells[0].text = str(idx)
+        row.cells[1].text = format_spare_description(material_data)
+        row.cells[2].text = str(quantity)
+        row.cells[3].text = f"{unit_price:,.2f}"
+        row.cells[4].text = f"{line_total:,.2f}"
+
+        total_basic_price += line_total
+
+    return total_basic_price
+
+def get_template_path():
+    return os.path.join(settings.BASE_DIR, 'Receipt.docx')
+
+def get_template_signature():
+    """
+    Identify the current quotation template so cached bodies can be invalidated
+    """
+    template_path = get_template_path()
+    if not os.path.exists(template_path):
+        return 'basic'
+    stat = os.stat(template_path)
+    return f"{int(stat.st_mtime)}:{stat.st_size}"
+
+def replace_placeholders(doc, replacements, skip_table=None):
+    """
+    Replace placeholders in all paragraphs and table cells of a document
+    """
+    for paragraph in doc.paragraphs:
+        for placeholder, replacement in replacements.items():
+            if placeholder in paragraph.text:
+                paragraph.text = paragraph.text.replace(placeholder, replacement)
+    
+    for table in doc.tables:
+        if skip_table is not None and table._element is skip_table._element:
+            continue
+        for row in table.rows:
+            for cell in row.cells:
+                for placeholder, replacement in replacements.items():
+                    if placeholder in cell.text:
+                        cell.text = cell.text.replace(placeholder, replacement)
+
+def render_quotation_body(line_items):
     """
-    template_path = os.path.join(settings.BASE_DIR, 'Receipt.docx')
+    Render everything in the quotation that does not depend on the customer
+
+    The spares table, totals and fixed terms are filled in; the reference
+    number, date and customer placeholders are left for personalize_quotation.
+
+    Args:
+        line_items: List of (material_data, quantity) pairs
+
+    Returns:
+        DOCX document as bytes
+    """
+    template_path = get_template_path()
     
     if not os.path.exists(template_path):
         # Create a basic template if it doesn't exist
@@ -197,10 +284,46 @@ def generate_receipt(material_data, user_info=None):
     else:
         doc = Document(template_path)
     
+    # Render one table row per line item
+    total_basic_price = Decimal('0')
+    items_table = find_items_table(doc)
+    if items_table is not None:
+        total_basic_price = fill_items_table(items_table, line_items)
+    
+    replacements = {
+        '[XXXX]': f"{total_basic_price:,.2f}",
+        '[X weeks]': '2-3 weeks',
+        '[50%]': '50%',
+        '[Authorized Signatory Name]': 'Authorized Signatory',
+        '[Designation]': 'Sales Manager',
+        '[Contact Details]': 'Email: info@shaftseal.com | Phone: +91-XXXXXXXXXX'
+    }
+    replace_placeholders(doc, replacements, skip_table=items_table)
+    
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def personalize_quotation(body, user_info=None, ref_no=None):
+    """
+    Fill the reference number, date and customer block into a rendered body
+
+    Args:
+        body: DOCX bytes from render_quotation_body
+        user_info: Customer details of the logged-in user
+        ref_no: Reference number already allocated for this document;
+            a new one is allocated if omitted
+
+    Returns:
+        Spooled temp file containing the DOCX document
+    """
+    doc = Document(io.BytesIO(body))
+    
     current_date = datetime.now().strftime("%d/%m/%Y")
     
     # Generate reference number with GST + last 2 digits sequential
-    ref_no = generate_reference_number(user_info)
+    if ref_no is None:
+        ref_no = generate_reference_number(user_info)
     
     # Auto-populate customer details from login
     if user_info:
@@ -216,144 +339,219 @@ def generate_receipt(material_data, user_info=None):
         if customer_email:
             customer_full_address += f"\nEmail: {customer_email}"
     else:
-        customer_name = ''
-        customer_address = ''
         customer_full_address = ''
         customer_location = ''
     
-    unit_price = float(material_data.get('unit_price', 0))
-    quantity = 1 
-    total_price = unit_price * quantity
-    
-    # Format prices correctly
-    formatted_unit_price = f"{unit_price:,.2f}"
-    formatted_total_price = f"{total_price:,.2f}"
-    
-    # Create detailed spare description
-    spare_description = f"{material_data.get('part_name_value', '')} - {material_data.get('moc', '')}"
-    if material_data.get('pump_make_name') and material_data.get('pump_model_name') and material_data.get('pump_size_value'):
-        spare_description += f"\nPump: {material_data.get('pump_make_name')} {material_data.get('pump_model_name')} {material_data.get('pump_size_value')}"
-    if material_data.get('part_number_value'):
-        spare_description += f"\nPart No: {material_data.get('part_number_value')}"
-    
     replacements = {
         '[Ref. No.]': ref_no,
         '[DD/MM/YYYY]': current_date,
         '[Customer Name & Address]': customer_full_address,
-        '[Spare Name & Details]': spare_description,
-        'X': str(quantity),
-        'XXXX': formatted_unit_price,
-        '[XXXX]': formatted_total_price,
         '[Location]': customer_location,
-        '[X weeks]': '2-3 weeks',
-        '[50%]': '50%',
         '[Your City/State]': customer_location,
         '[Your City]': customer_location,
-        '[Authorized Signatory Name]': 'Authorized Signatory',
-        '[Designation]': 'Sales Manager',
-        '[Contact Details]': 'Email: info@shaftseal.com | Phone: +91-XXXXXXXXXX'
     }
+    replace_placeholders(doc, replacements, skip_table=find_items_table(doc))
     
-    for paragraph in doc.paragraphs:
-        for placeholder, replacement in replacements.items():
-            if placeholder in paragraph.text:
-                paragraph.text = paragraph.text.replace(placeholder, replacement)
+    docx_file = create_spooled_file()
+    doc.save(docx_file)
+    docx_file.seek(0)
     
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for placeholder, replacement in replacements.items():
-                    if placeholder in cell.text:
-                        cell.text = cell.text.replace(placeholder, replacement)
+    return docx_file
+
+def generate_receipt(line_items, user_info=None, body=None, ref_no=None):
+    """
+    Generate a receipt document with filled pump spares details
+
+    Args:
+        line_items: List of (material_data, quantity) pairs. A single
+            material_data dict is accepted and quoted with quantity 1.
+        user_info: Customer details of the logged-in user
+        body: Optional pre-rendered body from render_quotation_body
+        ref_no: Optional reference number allocated in advance
+
+    Returns:
+        Spooled temp file containing the DOCX document
+    """
+    if isinstance(line_items, dict):
+        line_items = [(line_items, 1)]
     
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
+    if body is None:
+        body = render_quotation_body(line_items)
     
-    return buffer
+    return personalize_quotation(body, user_info, ref_no=ref_no)
 
-def convert_docx_to_pdf(docx_buffer):
+def convert_docx_to_pdf(docx_file):
     """
-    Convert DOCX buffer to PDF using LibreOffice
+    Convert a DOCX file object to PDF using LibreOffice
+
+    Returns:
+        (pdf_path, output_dir) - the caller removes output_dir once the PDF
+        has been delivered
     """
+    output_dir = tempfile.mkdtemp()
     try:
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_docx:
-            temp_docx.write(docx_buffer.getvalue())
-            temp_docx_path = temp_docx.name
-        
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            temp_pdf_path = temp_pdf.name
+        # Spool the DOCX to disk for LibreOffice without loading it into memory
+        temp_docx_path = os.path.join(output_dir, 'quotation.docx')
+        docx_file.seek(0)
+        with open(temp_docx_path, 'wb') as temp_docx:
+            shutil.copyfileobj(docx_file, temp_docx)
         
         # Convert using LibreOffice
         cmd = [
             'libreoffice',
             '--headless',
             '--convert-to', 'pdf',
-            '--outdir', os.path.dirname(temp_pdf_path),
+            '--outdir', output_dir,
             temp_docx_path
         ]
         
         result = subprocess.run(cmd, capture_output=True, text=True)
         
-        if result.returncode == 0:
-            # Read the generated PDF
-            with open(temp_pdf_path, 'rb') as pdf_file:
-                pdf_content = pdf_file.read()
-            
-            # Clean up temporary files
-            os.unlink(temp_docx_path)
-            os.unlink(temp_pdf_path)
-            
-            return pdf_content
-        else:
+        if result.returncode != 0:
             raise Exception(f"LibreOffice conversion failed: {result.stderr}")
+        
+        pdf_path = os.path.join(output_dir, 'quotation.pdf')
+        if not os.path.exists(pdf_path):
+            raise Exception(f"PDF file not found: {pdf_path}")
+        
+        os.unlink(temp_docx_path)
+        return pdf_path, output_dir
             
     except Exception as e:
-        # Clean up temporary files if they exist
-        try:
-            if 'temp_docx_path' in locals():
-                os.unlink(temp_docx_path)
-            if 'temp_pdf_path' in locals():
-                os.unlink(temp_pdf_path)
-        except:
-            pass
+        shutil.rmtree(output_dir, ignore_errors=True)
         raise Exception(f"PDF conversion error: {str(e)}")
 
-def create_receipt_response(material_data, user_info=None):
+def create_receipt_response(line_items, user_info=None, body=None, request=None):
     """
     Create HTTP response with the generated receipt document as PDF
+
+    Converted PDFs are cached per quotation_pdf_key, so repeating a request
+    (or resuming its download with a Range header) serves the same document
+    without another conversion.
     """
+    from .quotation_cache import get_cached_quotation_pdf, quotation_pdf_key, store_quotation_pdf
+    
+    if isinstance(line_items, dict):
+        line_items = [(line_items, 1)]
+    
     try:
-        docx_buffer = generate_receipt(material_data, user_info)
+        pdf_key = quotation_pdf_key(line_items, user_info)
+        filename = f"Pump_Spares_Quotation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        cached_pdf = get_cached_quotation_pdf(pdf_key)
+        if cached_pdf is not None:
+            return create_file_response(open(cached_pdf, 'rb'), filename, 'application/pdf', request=request)
+        
+        docx_file = generate_receipt(line_items, user_info, body=body)
         
         # Try to convert to PDF
         try:
-            pdf_content = convert_docx_to_pdf(docx_buffer)
-            
-            response = HttpResponse(
-                pdf_content,
-                content_type='application/pdf'
-            )
-            
-            filename = f"Pump_Spares_Quotation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            pdf_path, output_dir = convert_docx_to_pdf(docx_file)
+            docx_file.close()
             
-            return response
+            try:
+                cached_pdf = store_quotation_pdf(pdf_key, pdf_path)
+            except OSError as cache_error:
+                print(f"Could not cache quotation PDF: {cache_error}")
+                return create_file_response(
+                    open_temporary_file(pdf_path, cleanup_dir=output_dir),
+                    filename, 'application/pdf', request=request
+                )
+            shutil.rmtree(output_dir, ignore_errors=True)
+            return create_file_response(open(cached_pdf, 'rb'), filename, 'application/pdf', request=request)
             
         except Exception as pdf_error:
             # Fallback to DOCX if PDF conversion fails
             print(f"PDF conversion failed, falling back to DOCX: {pdf_error}")
             
-            response = HttpResponse(
-                docx_buffer.getvalue(),
-                content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
-            
             filename = f"Pump_Spares_Quotation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            return create_file_response(
+                docx_file, filename,
+                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                request=request
+            )
         
     except Exception as e:
         raise Exception(f"Error generating receipt: {str(e)}")
+
+
+class _ZipStreamBuffer:
+    """
+    Write-only file object that hands written bytes back to a streaming
+    generator. ZipFile falls back to data descriptors when the target is
+    not seekable, so the archive never has to be held in memory.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_receipt_zip(documents):
+    """
+    Yield a ZIP archive containing one DOCX quotation per customer
+
+    Args:
+        documents: List of (entry name, line_items, user_info, reference
+            number) tuples from prepare_batch_receipts
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry_name, line_items, user_info, ref_no in documents:
+            docx_file = generate_receipt(line_items, user_info, ref_no=ref_no)
+            with docx_file, archive.open(entry_name, mode='w') as entry:
+                shutil.copyfileobj(docx_file, entry)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    yield buffer.drain()
+
+
+def prepare_batch_receipts(quotations):
+    """
+    Allocate the reference number and ZIP entry name of every quotation in a batch
+
+    Runs before the response starts streaming, so database errors are
+    reported as a normal error response and every number is on record
+    whether or not the client reads the whole archive.
+
+    Args:
+        quotations: Iterable of (line_items, user_info) pairs
+
+    Returns:
+        List of (entry name, line_items, user_info, reference number)
+    """
+    documents = []
+    for idx, (line_items, user_info) in enumerate(quotations, 1):
+        customer = (user_info or {}).get('company_name') or (user_info or {}).get('full_name') or 'Customer'
+        safe_customer = ''.join(c if c.isalnum() else '_' for c in customer).strip('_') or 'Customer'
+        documents.append((
+            f"{idx:03d}_{safe_customer}_Quotation.docx", line_items, user_info,
+            generate_reference_number(user_info)
+        ))
+    return documents
+
+
+def create_batch_receipt_response(quotations):
+    """
+    Create a streaming HTTP response with many customers' quotations packaged as a ZIP
+
+    Quotations are shipped as DOCX so a batch does not pay one LibreOffice
+    conversion per customer. Reference numbers are allocated up front; only
+    the documents themselves are generated while the archive streams.
+    """
+    documents = prepare_batch_receipts(quotations)
+    response = StreamingHttpResponse(iter_receipt_zip(documents), content_type='application/zip')
+    filename = f"Pump_Spares_Quotations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,143 @@
+"""
+Quotation Reference Number Allocation
+Hands out collision-free reference numbers from durable per-prefix sequences
+"""
+
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+class ReferenceNumberAllocator:
+    """
+    Allocates reference numbers from ReferenceNumberSequence rows.
+
+    Each worker process reserves a block of values per prefix and document
+    type inside a row-locked transaction, which also writes the whole block
+    to IssuedReferenceNumber in one bulk insert. Numbers are then served
+    from memory until the block runs out, so a number printed on a document
+    is always on record without a database write per number. Blocks never
+    overlap, so numbers are unique across processes; values left in a
+    block when a worker exits stay on record unused.
+    """
+    
+    def __init__(self, block_size: int = 20):
+        self.block_size = max(int(block_size), 1)
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        """Drop per-process state (also used after a fork)"""
+        self._pid = os.getpid()
+        self._blocks: Dict[Tuple[str, str], Deque[int]] = {}
+    
+    def allocate(self, prefix: str, source: str = '') -> str:
+        """
+        Allocate the next reference number for a prefix
+        
+        Args:
+            prefix: Sequence prefix, e.g. GST based or date based
+            source: Document type recorded in the audit trail
+            
+        Returns:
+            Reference number made of the prefix and a zero-padded sequence value
+            
+        Raises:
+            DatabaseError: A new block could not be reserved and recorded
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Blocks reserved by the parent must not be reused in a forked worker
+                self._reset()
+            
+            block = self._blocks.get((prefix, source))
+            while not block:
+                block = self._reserve_block(prefix, source)
+                self._blocks[(prefix, source)] = block
+            
+            return format_reference_number(prefix, block.popleft())
+    
+    def _reserve_block(self, prefix: str, source: str) -> Deque[int]:
+        """Reserve the next block of values for this process and record them as issued"""
+        from .models import IssuedReferenceNumber, ReferenceNumberSequence
+        
+        with transaction.atomic():
+            ReferenceNumberSequence.objects.get_or_create(prefix=prefix)
+            sequence = ReferenceNumberSequence.objects.select_for_update().get(prefix=prefix)
+            start = sequence.next_value
+            sequence.next_value = start + self.block_size
+            sequence.save(update_fields=['next_value', 'updated_at'])
+            
+            numbers = {format_reference_number(prefix, value): value
+                       for value in range(start, start + self.block_size)}
+            # Numbers already on record (e.g. entered by hand) are skipped, never issued twice
+            taken = set(IssuedReferenceNumber.objects.filter(
+                reference_number__in=list(numbers)
+            ).values_list('reference_number', flat=True))
+            issued_at = timezone.now()
+            IssuedReferenceNumber.objects.bulk_create([
+                IssuedReferenceNumber(
+                    reference_number=reference_number,
+                    prefix=prefix,
+                    sequence_value=value,
+                    source=source,
+                    worker_pid=self._pid,
+                    issued_at=issued_at,
+                )
+                for reference_number, value in numbers.items() if reference_number not in taken
+            ])
+        
+        return deque(value for reference_number, value in numbers.items() if reference_number not in taken)
+
+
+def format_reference_number(prefix: str, value: int) -> str:
+    return f"{prefix}{value:04d}"
+
+
+_allocator: Optional[ReferenceNumberAllocator] = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator() -> ReferenceNumberAllocator:
+    """Return the process-wide allocator, creating it on first use"""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = ReferenceNumberAllocator(
+                    block_size=getattr(settings, 'REFERENCE_NUMBER_BLOCK_SIZE', 20),
+                )
+    return _allocator
+
+
+def get_reference_prefix(gst_number: Optional[str] = None, fallback_prefix: str = 'SS') -> str:
+    """
+    Build the sequence prefix: GST + its last 2 digits, or a dated fallback
+    """
+    if gst_number:
+        last_two = gst_number[-2:] if len(gst_number) >= 2 else '00'
+        return f"{gst_number}{last_two}"
+    return f"{fallback_prefix}{datetime.now().strftime('%y%m%d')}"
+
+
+def allocate_reference_number(gst_number: Optional[str] = None, fallback_prefix: str = 'SS',
+                              source: str = '') -> str:
+    """
+    Main function to allocate a unique quotation reference number
+    
+    Args:
+        gst_number: Customer GST number, used as the per-customer prefix
+        fallback_prefix: Prefix used (with today's date) when no GST is known
+        source: Document type recorded in the audit trail
+        
+    Returns:
+        Unique reference number
+    """
+    prefix = get_reference_prefix(gst_number, fallback_prefix)
+    return get_allocator().allocate(prefix, source=source)
@@ -102,8 +102,6 @@ class InventoryFilterSerializer(serializers.Serializer):
 
 
 class EnergyOptimizationSubmissionSerializer(serializers.ModelSerializer):
-    user_email = serializers.CharField(source='user.official_email', read_only=True)
-    
     class Meta:
         model = EnergyOptimizationSubmission
         fields = [
@@ -111,7 +109,18 @@ class EnergyOptimizationSubmissionSerializer(serializers.ModelSerializer):
             'da_tank_pressure', 'boiler_drum_pressure', 'feed_water_temp',
             'specific_gravity', 'actual_flow_24hrs', 'actual_flow_required',
             'flow_qnp', 'head_hnp', 'bkw_bkwnp', 'efficiency',
-            'qhnp_file', 'qhact_file', 'qhmod_file',
-            'user', 'user_email', 'created_at', 'updated_at'
+            'qhnp_file', 'qhact_file', 'qhmod_file', 'library_curve',
+            'user', 'created_at', 'updated_at'
         ]
         read_only_fields = ['user', 'created_at', 'updated_at']
+
+
+class EnergyOptimizationStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EnergyOptimizationSubmission
+        fields = [
+            'id', 'analysis_status', 'analysis_stage', 'stage_status', 'analysis_error',
+            'analysis_started_at', 'analysis_finished_at',
+            'analysis_completed', 'plots_generated', 'proposal_generated'
+        ]
+        read_only_fields = fields
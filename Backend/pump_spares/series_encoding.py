@@ -0,0 +1,90 @@
+"""
+Compact Series Encoding
+Describes plot series as constant, linear or sampled descriptors instead of long JSON lists
+"""
+
+import base64
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+
+SeriesData = Union[Dict, Sequence[float], np.ndarray]
+
+
+def constant_series(value: float, length: int) -> Dict:
+    """Series where every point has the same value"""
+    return {'encoding': 'constant', 'value': value, 'length': length}
+
+
+def linear_series(slope: float, length: int, start: int = 1, intercept: float = 0.0) -> Dict:
+    """Series intercept + slope * x for x = start, start + 1, ..., start + length - 1"""
+    return {'encoding': 'linear', 'slope': slope, 'intercept': intercept, 'start': start, 'length': length}
+
+
+def sampled_series(values: Sequence[float]) -> Dict:
+    """Arbitrary series stored as a base64 float32 buffer"""
+    buffer = np.asarray(values, dtype='<f4').tobytes()
+    return {
+        'encoding': 'sampled',
+        'dtype': 'float32',
+        'length': len(values),
+        'data': base64.b64encode(buffer).decode(),
+    }
+
+
+def encode_series(values: Sequence[float], rel_tol: float = 1e-9, start: int = 1) -> Dict:
+    """
+    Pick the most compact descriptor for a series of values
+
+    The series is stored as constant or linear (over x = start, start + 1, ...)
+    when every point lies within rel_tol of that form, relative to the largest
+    magnitude in the series; anything else is sampled.
+    """
+    array = np.asarray(values, dtype=float)
+    length = len(array)
+    if length == 0 or not np.all(np.isfinite(array)):
+        return sampled_series(array)
+
+    tolerance = rel_tol * max(float(np.max(np.abs(array))), 1.0)
+    if np.max(np.abs(array - array[0])) <= tolerance:
+        return constant_series(float(array[0]), length)
+
+    if length > 2:
+        x = np.arange(start, start + length, dtype=float)
+        slope, intercept = np.polyfit(x, array, 1)
+        if np.max(np.abs(slope * x + intercept - array)) <= tolerance:
+            return linear_series(float(slope), length, start=start, intercept=float(intercept))
+
+    return sampled_series(array)
+
+
+def decode_series(series: SeriesData) -> np.ndarray:
+    """
+    Expand a series descriptor into a NumPy array
+
+    Plain lists (results stored before descriptors were introduced) are
+    returned as arrays unchanged.
+    """
+    if series is None:
+        return np.array([])
+    if not isinstance(series, dict):
+        return np.asarray(series, dtype=float)
+
+    encoding = series.get('encoding')
+    length = int(series.get('length', 0))
+
+    if encoding == 'constant':
+        return np.full(length, series['value'], dtype=float)
+
+    if encoding == 'linear':
+        x = np.arange(series.get('start', 1), series.get('start', 1) + length, dtype=float)
+        values = series['slope'] * x
+        intercept = series.get('intercept', 0.0)
+        return values + intercept if intercept else values
+
+    if encoding == 'sampled':
+        buffer = base64.b64decode(series['data'])
+        return np.frombuffer(buffer, dtype='<f4').astype(float)
+
+    raise ValueError(f"Unknown series encoding: {encoding}")
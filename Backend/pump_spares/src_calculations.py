@@ -8,10 +8,13 @@ import math
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-import pandas as pd
 import numpy as np
 from decimal import Decimal
 
+from .curve_ingestion import read_curve_file
+from .curve_sampling import sample_src
+from .pump_curve import PumpCurve
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -54,34 +57,22 @@ def calculate_src_curves(request):
         k2 = (hact - sh_value) / (qact * qact)
         
         # Generate SRC curve data points
-        # Create flow range from 0 to max(Qnp, Qact) * 1.2
-        max_flow = max(qnp, qact) * 1.2
-        flow_points = np.linspace(0, max_flow, 20)
-        
-        # Calculate Theoretical SRC curve: SRC = SH + k1 * Qi²
-        theoretical_src = []
-        for qi in flow_points:
-            src_value = sh_value + k1 * (qi * qi)
-            theoretical_src.append({
-                'q': float(qi),
-                'src': float(src_value)
-            })
+        flow_points, theoretical_values, actual_values = sample_src_set(sh_value, k1, k2, qnp, qact)
         
-        # Calculate Actual SRC curve: SRC = SH + k2 * Qi²
-        actual_src = []
-        for qi in flow_points:
-            src_value = sh_value + k2 * (qi * qi)
-            actual_src.append({
-                'q': float(qi),
-                'src': float(src_value)
-            })
+        # Theoretical SRC curve: SRC = SH + k1 * Qi²; actual SRC curve: SRC = SH + k2 * Qi²
+        theoretical_src = [{'q': q, 'src': src} for q, src in zip(flow_points.tolist(), theoretical_values.tolist())]
+        actual_src = [{'q': q, 'src': src} for q, src in zip(flow_points.tolist(), actual_values.tolist())]
         
         # Process Q-H curve file if provided
         qh_curve_data = None
+        pump_curve = None
         if 'qhFile' in request.FILES:
             try:
                 qh_file = request.FILES['qhFile']
-                qh_curve_data = process_qh_file(qh_file)
+                curve = read_curve_file(qh_file)
+                qh_curve_data = curve.to_points()
+                # Fitted coefficients let the client evaluate the curve at any flow
+                pump_curve = PumpCurve.fit(curve.q, curve.h).to_dict()
             except Exception as e:
                 print(f"Error processing Q-H file: {e}")
                 # Continue without file data
@@ -97,6 +88,7 @@ def calculate_src_curves(request):
             'actualSRC': actual_src,
             'flowPoints': [float(q) for q in flow_points],
             'qhCurveData': qh_curve_data,
+            'pumpCurve': pump_curve,
             'operatingPoint': {
                 'qact': qact,
                 'hact': hact
@@ -116,36 +108,27 @@ def calculate_src_curves(request):
         }, status=500)
 
 
+def sample_src_set(sh_value, k1, k2, qnp, qact):
+    """
+    Theoretical and actual SRC of one parameter set on an adaptive flow grid
+    from 0 to max(Qnp, Qact) * 1.2 that passes through both duty points
+
+    Returns:
+        Tuple of (flows, theoretical SRC, actual SRC) arrays
+    """
+    max_flow = max(qnp, qact) * 1.2
+    flow_points, (theoretical_values, actual_values) = sample_src(
+        sh_value, [k1, k2], max_flow, include=[qnp, qact]
+    )
+    return flow_points, theoretical_values, actual_values
+
+
 def process_qh_file(file):
     """
     Process uploaded Q-H curve file to extract curve data
     """
     try:
-        # Read Excel file
-        if file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file)
-        elif file.name.endswith('.csv'):
-            df = pd.read_csv(file)
-        else:
-            raise ValueError("Unsupported file format")
-        
-        # Assume first two columns are Q and H
-        if len(df.columns) < 2:
-            raise ValueError("File must have at least 2 columns (Q and H)")
-        
-        q_values = df.iloc[:, 0].values  # First column
-        h_values = df.iloc[:, 1].values  # Second column
-        
-        # Convert to list of dictionaries
-        curve_data = []
-        for q, h in zip(q_values, h_values):
-            if not pd.isna(q) and not pd.isna(h):
-                curve_data.append({
-                    'q': float(q),
-                    'h': float(h)
-                })
-        
-        return curve_data
+        return read_curve_file(file).to_points()
         
     except Exception as e:
         print(f"Error processing Q-H file: {e}")
@@ -178,3 +161,144 @@ def generate_src_curve_points(sh_value, k_value, flow_range):
 
 
 
+# Batch parameter names; snake_case aliases are accepted as well
+SRC_BATCH_FIELDS = ['shValue', 'qnp', 'hnp', 'qact', 'hact']
+SRC_FIELD_ALIASES = {
+    'sh_value': 'shValue',
+    'sh': 'shValue',
+    'q_np': 'qnp',
+    'h_np': 'hnp',
+    'q_act': 'qact',
+    'h_act': 'hact',
+}
+
+SRC_FLOW_POINTS = 20
+SRC_MAX_FLOW_POINTS = 200
+
+# 'uniform': shared-length grids stacked into columns (vectorized);
+# 'adaptive': the single-set endpoint's grids, one length per set
+SRC_SAMPLING_METHODS = ['uniform', 'adaptive']
+
+
+def _to_number(value) -> float:
+    """Float of a JSON/CSV cell; NaN for blanks and text"""
+    if value is None or isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_src_parameter_sets(rows):
+    """
+    Validate parameter sets for the batch SRC calculation
+
+    Args:
+        rows: Dictionaries with shValue, qnp, hnp, qact and hact (JSON objects
+            or CSV rows)
+
+    Returns:
+        Tuple of (row numbers of the valid sets, dict of float arrays per
+        field for the valid sets, row errors)
+    """
+    columns = {field: [] for field in SRC_BATCH_FIELDS}
+    is_object = []
+    for row in rows:
+        is_object.append(isinstance(row, dict))
+        normalized = {}
+        if is_object[-1]:
+            normalized = {SRC_FIELD_ALIASES.get(str(key).strip(), str(key).strip()): value
+                          for key, value in row.items()}
+        for field in SRC_BATCH_FIELDS:
+            columns[field].append(_to_number(normalized.get(field)))
+
+    arrays = {field: np.array(values, dtype=float) for field, values in columns.items()}
+
+    # Same rules as the single-set endpoint: every value present and non-zero
+    bad_fields = {field: ~np.isfinite(values) | (values == 0) for field, values in arrays.items()}
+    is_object = np.array(is_object, dtype=bool)
+    valid = is_object & ~np.logical_or.reduce(list(bad_fields.values()))
+
+    errors = []
+    for index in np.flatnonzero(~valid):
+        if not is_object[index]:
+            messages = ['Row must be an object']
+        else:
+            missing = [field for field in SRC_BATCH_FIELDS if bad_fields[field][index]]
+            messages = [f"Missing or zero: {', '.join(missing)}"]
+        errors.append({'row': int(index) + 1, 'errors': messages})
+
+    row_numbers = np.flatnonzero(valid) + 1
+    return row_numbers, {field: values[valid] for field, values in arrays.items()}, errors
+
+
+def calculate_src_batch(sh_value, qnp, hnp, qact, hact, flow_points: int = SRC_FLOW_POINTS):
+    """
+    k1, k2 and both SRC curves for many parameter sets at once
+
+    Each set gets its own evenly spaced flow grid from 0 to max(Qnp, Qact) * 1.2,
+    so all curves have the same length and stack into columns. Unlike the
+    single-set endpoint's adaptive grids, these do not pass through the duty
+    points; sample_src_batch() reproduces those.
+
+    Args:
+        sh_value, qnp, hnp, qact, hact: Equal-length arrays of set parameters
+        flow_points: Points per curve
+
+    Returns:
+        Dictionary of arrays: k1 and k2 of shape (n,), flowPoints,
+        theoreticalSRC and actualSRC of shape (n, flow_points)
+    """
+    sh_value = np.asarray(sh_value, dtype=float)[:, None]
+    qnp = np.asarray(qnp, dtype=float)
+    qact = np.asarray(qact, dtype=float)
+
+    k1 = (np.asarray(hnp, dtype=float) - sh_value[:, 0]) / (qnp * qnp)
+    k2 = (np.asarray(hact, dtype=float) - sh_value[:, 0]) / (qact * qact)
+
+    # Matches np.linspace(0, max_flow, flow_points) row by row
+    max_flow = np.maximum(qnp, qact) * 1.2
+    step = max_flow / (flow_points - 1)
+    flow = np.arange(flow_points, dtype=float)[None, :] * step[:, None]
+    flow[:, -1] = max_flow
+    flow_squared = flow * flow
+
+    return {
+        'k1': k1,
+        'k2': k2,
+        'flowPoints': flow,
+        'theoreticalSRC': sh_value + k1[:, None] * flow_squared,
+        'actualSRC': sh_value + k2[:, None] * flow_squared,
+    }
+
+
+def sample_src_batch(sh_value, qnp, hnp, qact, hact):
+    """
+    k1, k2 and both SRC curves for many parameter sets, each sampled exactly
+    as the single-set endpoint samples it (see sample_src_set)
+
+    Grids are refined per set, so curves differ in length and are returned
+    as nested lists rather than stacked arrays.
+
+    Args:
+        sh_value, qnp, hnp, qact, hact: Equal-length arrays of set parameters
+
+    Returns:
+        Dictionary of lists: k1 and k2 with one value per set, flowPoints,
+        theoreticalSRC and actualSRC with one list of points per set
+    """
+    sh_value = np.asarray(sh_value, dtype=float)
+    qnp = np.asarray(qnp, dtype=float)
+    qact = np.asarray(qact, dtype=float)
+
+    k1 = (np.asarray(hnp, dtype=float) - sh_value) / (qnp * qnp)
+    k2 = (np.asarray(hact, dtype=float) - sh_value) / (qact * qact)
+
+    curves = {'k1': k1.tolist(), 'k2': k2.tolist(), 'flowPoints': [], 'theoreticalSRC': [], 'actualSRC': []}
+    for values in zip(sh_value.tolist(), k1.tolist(), k2.tolist(), qnp.tolist(), qact.tolist()):
+        flow_points, theoretical_values, actual_values = sample_src_set(*values)
+        curves['flowPoints'].append(flow_points.tolist())
+        curves['theoreticalSRC'].append(theoretical_values.tolist())
+        curves['actualSRC'].append(actual_values.tolist())
+    return curves
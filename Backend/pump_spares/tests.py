@@ -1,3 +1,1452 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from docx import Document
+from rest_framework.test import APIClient
+
+from . import plot_rendering
+from .analysis_cache import compute_input_hash, get_cached_result, store_result
+from .curve_ingestion import CurveFileError, parse_number, read_curve_file
+from .curve_library import store_library_curve
+from .curve_sampling import DEFAULT_TOLERANCE, MAX_POINTS, sample_curve, sample_src
+from .energy_analysis_pipeline import claim_submission, run_energy_analysis
+from .energy_calculations import (
+    BATCH_RESULT_FIELDS, calculate_energy_optimization, calculate_energy_optimization_batch, round_half_even,
+)
+from .file_responses import create_file_response, open_temporary_file
+from .fleet_analysis import (
+    PUMP_OUTPUT_FIELDS, SUMMARY_OUTPUT_FIELDS, analyze_fleet, parse_fleet_rows, read_fleet_csv,
+)
+from .models import (
+    EnergyAnalysisResult, EnergyOptimizationSubmission, InventoryDatabase, IssuedReferenceNumber, LibraryPumpCurve, MaterialOfConstruction, PartName, PartNumber, PumpMake, PumpModel, PumpSize,
+    ReferenceNumberSequence,
+)
+from .operating_point import OperatingPointError, OperatingPointSolver, find_operating_point
+from .parallel_operation import (
+    ParallelOperationError, ParallelPumpSystem, run_parallel_operation, running_pump_count, solve_parallel_operation,
+)
+from .parameter_sweep import EnergyOptimizationSweep, SweepError, pareto_mask, run_parameter_sweep
+from .plot_generator import PLOT_NUMBERS, render_plot_image
+from .plot_image_cache import evict_plot_images, parse_plot_image_options
+from .plot_rendering import get_plot_pool, render_energy_optimization_plots, render_plots_inline, render_single_plot
+from .plot_specs import QH_SRC_PLOT, build_plot_specs
+from .qh_curve_processor import QHCurveProcessor, qh_src_plot_data
+from .pump_curve import DUTY_SHUTOFF_RATIO, PumpCurve, PumpCurveError
+from .pump_recommendation import RecommendationError, present_value_factor, recommend_pumps
+from .receipt_generator import create_receipt_response
+from .quotation_cache import get_cached_quotation_body, prerender_quotation
+from .reference_numbers import ReferenceNumberAllocator, get_reference_prefix
+from .series_encoding import constant_series, decode_series, encode_series, linear_series, sampled_series
+from .src_calculations import SRC_FIELD_ALIASES, SRC_FLOW_POINTS, calculate_src_batch, parse_src_parameter_sets
+from .vfd_simulation import VFD_EFFICIENCY, SimulationError, run_vfd_simulation, simulate_vfd_savings
+from .water_properties import (
+    WaterPropertyError, _liquid_density, _saturation_pressure, get_water_table, liquid_specific_gravity,
+    resolve_specific_gravity,
+)
+
+
+class ReferenceNumberAllocatorTests(TestCase):
+    def test_numbers_are_sequential_and_recorded_when_reserved(self):
+        allocator = ReferenceNumberAllocator(block_size=3)
+        for expected in ['AB0001', 'AB0002', 'AB0003', 'AB0004']:
+            self.assertEqual(allocator.allocate('AB', source='receipt'), expected)
+            self.assertTrue(IssuedReferenceNumber.objects.filter(reference_number=expected).exists())
+        self.assertEqual(ReferenceNumberSequence.objects.get(prefix='AB').next_value, 7)
+        self.assertEqual(IssuedReferenceNumber.objects.filter(prefix='AB', source='receipt').count(), 6)
+
+    def test_numbers_within_a_block_need_no_queries(self):
+        allocator = ReferenceNumberAllocator(block_size=4)
+        allocator.allocate('GH')
+        with self.assertNumQueries(0):
+            numbers = [allocator.allocate('GH') for _ in range(3)]
+        self.assertEqual(numbers, ['GH0002', 'GH0003', 'GH0004'])
+
+    def test_workers_get_disjoint_blocks(self):
+        first = ReferenceNumberAllocator(block_size=5)
+        second = ReferenceNumberAllocator(block_size=5)
+        numbers = [first.allocate('CD'), second.allocate('CD'), first.allocate('CD'), second.allocate('CD')]
+        self.assertEqual(numbers, ['CD0001', 'CD0006', 'CD0002', 'CD0007'])
+        self.assertEqual(IssuedReferenceNumber.objects.filter(prefix='CD').count(), 10)
+
+    def test_document_types_get_their_own_blocks(self):
+        allocator = ReferenceNumberAllocator(block_size=5)
+        self.assertEqual(allocator.allocate('IJ', source='receipt'), 'IJ0001')
+        self.assertEqual(allocator.allocate('IJ', source='inventory_receipt'), 'IJ0006')
+        self.assertEqual(IssuedReferenceNumber.objects.get(reference_number='IJ0006').source, 'inventory_receipt')
+
+    def test_numbers_already_on_record_are_skipped(self):
+        IssuedReferenceNumber.objects.create(
+            reference_number='EF0001', prefix='EF', sequence_value=1, issued_at='2024-01-01T00:00Z'
+        )
+        IssuedReferenceNumber.objects.create(
+            reference_number='EF0002', prefix='EF', sequence_value=2, issued_at='2024-01-01T00:00Z'
+        )
+        allocator = ReferenceNumberAllocator(block_size=2)
+        self.assertEqual(allocator.allocate('EF'), 'EF0003')
+
+    def test_prefix_from_gst_number(self):
+        self.assertEqual(get_reference_prefix('27ABCDE1234F1Z5'), '27ABCDE1234F1Z5Z5')
+        self.assertTrue(get_reference_prefix(None, 'QT').startswith('QT'))
+
+
+class QuotationCacheTests(TestCase):
+    def setUp(self):
+        self.material = MaterialOfConstruction.objects.create(
+            pump_make=PumpMake.objects.create(name='KSB'),
+            pump_model=PumpModel.objects.create(name='HGM'),
+            pump_size=PumpSize.objects.create(size='65/7'),
+            part_number=PartNumber.objects.create(part_no='P-100'),
+            part_name=PartName.objects.create(name='Impeller'),
+            moc='SS 410', unit_price='1250.00',
+        )
+
+    def cached_body(self):
+        material = MaterialOfConstruction.objects.select_related(
+            'pump_make', 'pump_model', 'pump_size', 'part_number', 'part_name'
+        ).get(id=self.material.id)
+        return get_cached_quotation_body(material)
+
+    def test_cached_body_is_served_until_a_related_name_changes(self):
+        prerender_quotation(self.material)
+        self.assertIsNotNone(self.cached_body())
+
+        PumpModel.objects.filter(id=self.material.pump_model_id).update(name='HGM-R')
+        self.assertIsNone(self.cached_body())
+
+
+
+class BatchReceiptTests(TestCase):
+    def setUp(self):
+        self.material = MaterialOfConstruction.objects.create(
+            pump_make=PumpMake.objects.create(name='KSB'),
+            pump_model=PumpModel.objects.create(name='HGM'),
+            pump_size=PumpSize.objects.create(size='65/7'),
+            part_number=PartNumber.objects.create(part_no='P-100'),
+            part_name=PartName.objects.create(name='Impeller'),
+            moc='SS 410', unit_price='1250.00',
+        )
+        self.user = get_user_model().objects.create_user(
+            'buyer@example.com', password='secret', company_name='Buyer Works', gst_number='29BBBBB2222B1Z7'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('generate-receipt')
+
+    def post(self, quotations):
+        return self.client.post(self.url, {'quotations': quotations}, format='json')
+
+    def test_numbers_are_allocated_before_the_archive_streams(self):
+        response = self.post([
+            {'customer_info': {'company_name': 'Acme Power', 'gst_number': '27AAAAA1111A1Z5'},
+             'items': [{'material_id': self.material.id, 'quantity': 3}]},
+            {'items': [[self.material.id, 1]]},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        prefixes = set(ReferenceNumberSequence.objects.values_list('prefix', flat=True))
+        self.assertEqual(prefixes, {'27AAAAA1111A1Z5Z5', '29BBBBB2222B1Z7Z7'})
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), ['001_Acme_Power_Quotation.docx', '002_Buyer_Works_Quotation.docx'])
+        texts = [
+            '\n'.join(paragraph.text for paragraph in Document(io.BytesIO(archive.read(name))).paragraphs)
+            for name in archive.namelist()
+        ]
+        self.assertIn('27AAAAA1111A1Z5Z50001', texts[0])
+        self.assertIn('Acme Power', texts[0])
+        self.assertIn('29BBBBB2222B1Z7Z70001', texts[1])
+
+    def test_invalid_batches_are_rejected_before_any_number_is_issued(self):
+        item = {'material_id': self.material.id}
+        cases = [
+            ([{'items': [item]}, {'items': []}], 400),
+            ([{'items': [item, {'material_id': 999}]}, {'items': [{'material_id': 998}]}], 404),
+            ([{'customer_info': 'Acme', 'items': [item]}], 400),
+            ([{'items': [{'material_id': self.material.id, 'quantity': 0}]}], 400),
+        ]
+        for quotations, expected_status in cases:
+            response = self.post(quotations)
+            self.assertEqual(response.status_code, expected_status, quotations)
+        self.assertEqual(response.json()['error'], 'Invalid quotation lines: Quantity for material '
+                                                   f'{self.material.id} must be at least 1')
+        self.assertEqual(self.post([{'items': [{'material_id': 999}, {'material_id': 998}]}]).json()[
+            'missing_material_ids'], [998, 999])
+        self.assertFalse(ReferenceNumberSequence.objects.exists())
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.post([{'items': [item]}]).status_code, 401)
+
+
+
+@mock.patch('pump_spares.inventory_receipt_generator.convert_docx_to_pdf_alternative',
+            side_effect=RuntimeError('no LibreOffice'))
+class InventoryReceiptTests(TestCase):
+    def setUp(self):
+        self.gasket = InventoryDatabase.objects.create(
+            part_name='Gasket', part_no='G-10', moc='PTFE', availability=5, unit_price='40.00'
+        )
+        self.sleeve = InventoryDatabase.objects.create(
+            part_name='Shaft Sleeve', part_no='S-20', moc='SS 316', availability=1, unit_price='900.00'
+        )
+        self.client = APIClient()
+        self.url = reverse('generate-inventory-receipt')
+
+    def post(self, cart_items):
+        return self.client.post(self.url, {'cart_items': cart_items}, format='json')
+
+    def test_valid_cart_is_quoted_at_catalogue_prices(self, conversion):
+        response = self.post([
+            {'id': self.gasket.id, 'quantity': 5, 'unitPrice': 1},
+            {'partName': 'Impeller nut', 'partNo': 'N-1', 'moc': 'CS', 'unitPrice': 15, 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        document = Document(io.BytesIO(b''.join(response.streaming_content)))
+        table = next(table for table in document.tables if table.rows[0].cells[0].text == 'Sr. No.')
+        self.assertEqual([row.cells[4].text for row in table.rows[1:]], ['200.00', '30.00'])
+        self.assertTrue(IssuedReferenceNumber.objects.filter(source='inventory_receipt').exists())
+
+    def test_partially_missing_cart_lists_only_the_missing_lines(self, conversion):
+        response = self.post([{'id': self.gasket.id}, {'id': 999, 'quantity': 2}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['errors'], [
+            {'index': 1, 'id': 999, 'error': 'Inventory item with ID 999 not found'},
+        ])
+
+    def test_all_missing_cart_is_not_found(self, conversion):
+        response = self.post([{'id': 998}, {'id': 999}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0, 1])
+        self.assertFalse(IssuedReferenceNumber.objects.exists())
+
+    def test_mixed_errors_are_all_reported(self, conversion):
+        response = self.post([
+            {'id': self.gasket.id, 'quantity': 2},
+            {'id': 999},
+            {'id': self.sleeve.id, 'quantity': 3},
+            {'id': self.gasket.id, 'quantity': 0},
+            {'partName': 'Seal', 'unitPrice': 'call us'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual([error['index'] for error in errors], [1, 2, 3, 4])
+        self.assertEqual(errors[1]['error'], 'Requested quantity 3 exceeds available 1')
+        self.assertIn('quantity must be at least 1', errors[2]['error'])
+        self.assertFalse(IssuedReferenceNumber.objects.exists())
+        self.assertEqual(self.post([]).status_code, 400)
+        conversion.assert_not_called()
+
+
+@override_settings(QUOTATION_PDF_CACHE_DIR=tempfile.mkdtemp(), QUOTATION_PDF_CACHE_MAX_FILES=2)
+class QuotationPdfCacheTests(TestCase):
+    material = {'part_name_value': 'Impeller', 'moc': 'SS 410', 'unit_price': '1250.00'}
+    customer = {'company_name': 'Acme Power', 'location': 'Pune'}
+
+    def fake_conversion(self, docx_file):
+        # Stands in for LibreOffice: the "PDF" records which conversion produced it
+        self.conversions += 1
+        output_dir = tempfile.mkdtemp()
+        pdf_path = os.path.join(output_dir, 'quotation.pdf')
+        Path(pdf_path).write_bytes(f'%PDF conversion {self.conversions}'.encode())
+        return pdf_path, output_dir
+
+    def download(self, quantity=1, customer=None):
+        response = create_receipt_response([(self.material, quantity)], customer or self.customer)
+        return b''.join(response.streaming_content)
+
+    def setUp(self):
+        self.conversions = 0
+        patcher = mock.patch('pump_spares.receipt_generator.convert_docx_to_pdf', self.fake_conversion)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for path in Path(settings.QUOTATION_PDF_CACHE_DIR).glob('*.pdf'):
+            path.unlink()
+
+    def test_identical_requests_reuse_the_converted_pdf(self):
+        first = self.download()
+        self.assertEqual(self.download(), first)
+        self.assertTrue(first.startswith(b'%PDF'))
+        self.assertEqual(self.conversions, 1)
+
+    def test_printed_changes_convert_again(self):
+        first = self.download()
+        self.assertNotEqual(self.download(quantity=2), first)
+        self.assertNotEqual(self.download(customer={'company_name': 'Other Ltd'}), first)
+        self.assertEqual(self.conversions, 3)
+        self.assertEqual(len(list(Path(settings.QUOTATION_PDF_CACHE_DIR).glob('*.pdf'))), 2)
+
+class FileResponseTests(TestCase):
+    DOCUMENT = bytes(range(256)) * 4
+
+    def respond(self, range_header=None):
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, 'quotation.pdf')
+        with open(path, 'wb') as handle:
+            handle.write(self.DOCUMENT)
+        extra = {'HTTP_RANGE': range_header} if range_header else {}
+        request = RequestFactory().get('/', **extra)
+        response = create_file_response(
+            open_temporary_file(path, cleanup_dir=tmp_dir), 'quotation.pdf', 'application/pdf', request=request
+        )
+        return response, tmp_dir
+
+    def test_full_download_removes_temp_files_after_close(self):
+        response, tmp_dir = self.respond()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(self.DOCUMENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.DOCUMENT)
+        self.assertTrue(os.path.exists(tmp_dir))
+        response.close()
+        self.assertFalse(os.path.exists(tmp_dir))
+
+    def test_single_range(self):
+        response, tmp_dir = self.respond('bytes=100-299')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-299/1024')
+        self.assertEqual(response['Content-Length'], '200')
+        self.assertEqual(b''.join(response.streaming_content), self.DOCUMENT[100:300])
+        response.close()
+        self.assertFalse(os.path.exists(tmp_dir))
+
+    def test_open_ended_and_suffix_ranges(self):
+        response, _ = self.respond('bytes=1000-')
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.DOCUMENT[1000:])
+        response.close()
+
+        response, _ = self.respond('bytes=-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.DOCUMENT[-24:])
+        response.close()
+
+        response, _ = self.respond('bytes=-5000')
+        self.assertEqual(response['Content-Range'], 'bytes 0-1023/1024')
+        response.close()
+
+    def test_unsatisfiable_range(self):
+        for range_header in ('bytes=1024-', 'bytes=500-100', 'bytes=-0'):
+            response, tmp_dir = self.respond(range_header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response['Content-Range'], 'bytes */1024')
+            self.assertEqual(b''.join(response.streaming_content), b'')
+            self.assertFalse(os.path.exists(tmp_dir))
+
+    def test_unsupported_range_serves_whole_document(self):
+        response, _ = self.respond('bytes=0-10,20-30')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.DOCUMENT)
+        response.close()
+
+
+SUBMISSION_FORM = {
+    'projectType': '1R + 1S', 'daTankHeight': 5, 'boilerDrumHeight': 25, 'daTankPressure': 1,
+    'boilerDrumPressure': 5, 'specificGravity': 0.92, 'actualFlowRequired': 10, 'efficiency': 70,
+    'flowQnp': 12, 'headHnp': 90, 'speedN1': 2965, 'actualSpeedN2': 2900,
+}
+
+
+class SubmissionAccessTests(TestCase):
+    def setUp(self):
+        users = get_user_model().objects
+        self.owner = users.create_user('owner@example.com', password='secret')
+        self.other = users.create_user('other@example.com', password='secret')
+        self.submission = EnergyOptimizationSubmission.objects.create(project_type='1R + 1S', user=self.owner)
+        self.client = APIClient()
+        self.url = reverse('energy-optimization-status', args=[self.submission.id])
+
+    def test_owner_reads_own_submission(self):
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_other_users_and_anonymous_requests_get_not_found(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'token': 'guess'}).status_code, 404)
+
+    def test_access_token_grants_access(self):
+        response = self.client.get(self.url, {'token': self.submission.access_token})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_X_SUBMISSION_TOKEN=self.submission.access_token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_submissions_get_distinct_tokens(self):
+        other = EnergyOptimizationSubmission.objects.create(project_type='1R + 1S')
+        self.assertNotEqual(other.access_token, self.submission.access_token)
+
+    @override_settings(ENERGY_ANALYSIS_EAGER=True, ENERGY_PLOT_WORKERS=0, ENERGY_PLOT_CACHE_DIR=tempfile.mkdtemp())
+    def test_anonymous_submit_then_poll_with_returned_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('submit-energy-optimization'), SUBMISSION_FORM)
+        self.assertEqual(response.status_code, 202)
+        data = response.json()['data']
+        submission_id = data['submission']['id']
+        results_url = reverse('energy-optimization-results', args=[submission_id])
+        
+        self.assertEqual(self.client.get(results_url).status_code, 404)
+        response = self.client.get(results_url, HTTP_X_SUBMISSION_TOKEN=data['access_token'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(self.client.get(data['results_url']).status_code, 200)
+
+
+
+class AnalysisClaimTests(TestCase):
+    def setUp(self):
+        self.submission = EnergyOptimizationSubmission.objects.create(project_type='1R + 1S')
+
+    def test_only_one_worker_claims_a_submission(self):
+        self.assertTrue(claim_submission(self.submission.id))
+        self.assertFalse(claim_submission(self.submission.id))
+        self.assertFalse(claim_submission(self.submission.id, restart=True))
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.analysis_status, 'running')
+
+    def test_running_submission_is_not_analysed_again(self):
+        claim_submission(self.submission.id)
+        self.assertIsNone(run_energy_analysis(self.submission.id))
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.stage_status, {})
+
+    @override_settings(ENERGY_ANALYSIS_CLAIM_TIMEOUT=60)
+    def test_abandoned_claim_can_be_taken_over(self):
+        claim_submission(self.submission.id)
+        EnergyOptimizationSubmission.objects.filter(id=self.submission.id).update(
+            analysis_started_at=timezone.now() - timedelta(seconds=120))
+        self.assertTrue(claim_submission(self.submission.id))
+
+    def test_finished_submission_can_be_claimed_again(self):
+        for analysis_status in ('completed', 'failed'):
+            EnergyOptimizationSubmission.objects.filter(id=self.submission.id).update(
+                analysis_status=analysis_status)
+            self.assertTrue(claim_submission(self.submission.id))
+
+class AnalysisCacheTests(TestCase):
+    calc_data = {'flow_qnp': 60.0, 'head_hnp': 910.0, 'efficiency': 70.0}
+
+    def cached_submission(self, **outputs):
+        return EnergyOptimizationSubmission(
+            project_type='1R + 1S', calculation_results={'power_saving': 12.5}, proposal_data={'total': 1},
+            **outputs
+        )
+
+    def test_input_hash_is_canonical(self):
+        input_hash = compute_input_hash(self.calc_data)
+        self.assertEqual(compute_input_hash(dict(reversed(list(self.calc_data.items())))), input_hash)
+        self.assertNotEqual(compute_input_hash(dict(self.calc_data, efficiency=71.0)), input_hash)
+        with mock.patch('pump_spares.analysis_cache.CALCULATOR_VERSION', 'next'):
+            self.assertNotEqual(compute_input_hash(self.calc_data), input_hash)
+
+    def test_stored_results_are_reused_until_they_expire(self):
+        input_hash = compute_input_hash(self.calc_data)
+        self.assertIsNone(get_cached_result(input_hash))
+        store_result(input_hash, self.cached_submission())
+
+        cached = get_cached_result(input_hash)
+        self.assertEqual(cached.calculation_results, {'power_saving': 12.5})
+        get_cached_result(input_hash)
+        cached.refresh_from_db()
+        self.assertEqual(cached.hit_count, 2)
+
+        EnergyAnalysisResult.objects.update(created_at=timezone.now() - timedelta(days=30))
+        with override_settings(ENERGY_ANALYSIS_CACHE_TTL=3600):
+            self.assertIsNone(get_cached_result(input_hash))
+        EnergyAnalysisResult.objects.update(created_at=timezone.now(), calculator_version='old')
+        self.assertIsNone(get_cached_result(input_hash))
+
+    @override_settings(ENERGY_ANALYSIS_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        for efficiency in (60.0, 65.0):
+            store_result(compute_input_hash(dict(self.calc_data, efficiency=efficiency)), self.cached_submission())
+        get_cached_result(compute_input_hash(dict(self.calc_data, efficiency=60.0)))
+        store_result(compute_input_hash(dict(self.calc_data, efficiency=70.0)), self.cached_submission())
+        kept = set(EnergyAnalysisResult.objects.values_list('input_hash', flat=True))
+        self.assertEqual(kept, {compute_input_hash(dict(self.calc_data, efficiency=efficiency))
+                                for efficiency in (60.0, 70.0)})
+
+    @override_settings(ENERGY_ANALYSIS_EAGER=True, ENERGY_PLOT_WORKERS=0, ENERGY_PLOT_CACHE_DIR=tempfile.mkdtemp())
+    def test_repeated_submission_is_answered_from_the_cache(self):
+        client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = client.post(reverse('submit-energy-optimization'), SUBMISSION_FORM)
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(EnergyAnalysisResult.objects.count(), 1)
+        analysed = EnergyOptimizationSubmission.objects.get(id=first.json()['data']['submission']['id'])
+
+        with mock.patch('pump_spares.energy_analysis_pipeline.enqueue_energy_analysis') as enqueue:
+            second = client.post(reverse('submit-energy-optimization'), dict(SUBMISSION_FORM, efficiency='70.0'))
+        enqueue.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        data = second.json()['data']
+        self.assertEqual(data['calculations'], analysed.calculation_results)
+        self.assertEqual(data['status']['analysis_status'], 'completed')
+        self.assertNotEqual(data['submission']['id'], analysed.id)
+
+
+BASE_SUBMISSION = {
+    'project_type': '1R + 1S',
+    'da_tank_height': 5,
+    'boiler_drum_height': 25,
+    'da_tank_pressure': 5,
+    'boiler_drum_pressure': 60,
+    'specific_gravity': 0.92,
+    'actual_flow_required': 43,
+    'actual_power_consumption': 90000,
+    'efficiency': 70,
+    'flow_qnp': 60,
+    'head_hnp': 910,
+    'speed_n1': 2965,
+    'actual_speed_n2': 2900,
+}
+
+
+class BatchCalculatorTests(TestCase):
+    submissions = [
+        BASE_SUBMISSION,
+        dict(BASE_SUBMISSION, actual_flow_required=0),
+        dict(BASE_SUBMISSION, actual_power_consumption=0, efficiency=0),
+        dict(BASE_SUBMISSION, specific_gravity=None, feed_water_temp=150),
+        dict(BASE_SUBMISSION, specific_gravity=None, feed_water_temp=None),
+        dict(BASE_SUBMISSION, specific_gravity=None, feed_water_temp=0),
+        # Head of exactly 2738.505: round() gives 2738.51 where np.round gives 2738.50
+        dict(BASE_SUBMISSION, da_tank_height=0, boiler_drum_height=2738.505, da_tank_pressure=0,
+             boiler_drum_pressure=0),
+    ]
+
+    def test_batch_matches_scalar_calculator(self):
+        for submission, batch in zip(self.submissions, calculate_energy_optimization_batch(self.submissions)):
+            scalar = calculate_energy_optimization(submission)
+            for field in BATCH_RESULT_FIELDS:
+                # Without a duty point the scalar calculator leaves power results unset
+                self.assertEqual(batch[field], scalar.get(field, 0), f'{field} of {submission}')
+
+    def test_rounding_follows_python_round(self):
+        self.assertEqual(calculate_energy_optimization_batch(self.submissions[-1:])[0]['head_developed'], 2738.51)
+        values = np.array([2738.505, 105495.285, 967926.195, 0.125, -2.675])
+        self.assertEqual(round_half_even(values, 2).tolist(), [round(value, 2) for value in values.tolist()])
+
+
+FLEET_PUMP = {
+    field: BASE_SUBMISSION[field]
+    for field in ('da_tank_height', 'boiler_drum_height', 'da_tank_pressure', 'boiler_drum_pressure',
+                  'specific_gravity', 'actual_flow_required', 'actual_power_consumption', 'efficiency')
+}
+
+
+class FleetAnalysisTests(TestCase):
+    pumps = [
+        dict(FLEET_PUMP, site='Boiler House A', pump_tag='BFP-1A', project_type='1R + 1S'),
+        dict(FLEET_PUMP, site='Boiler House A', pump_tag='BFP-1B', project_type='1R + 1S', duty='Standby'),
+        dict(FLEET_PUMP, site='Boiler House B', pump_tag='BFP-2A', project_type='2R + 2S',
+             actual_power_consumption=120000),
+        dict(FLEET_PUMP, site='Boiler House B', pump_tag='BFP-2B', project_type='2R + 2S',
+             actual_power_consumption=120000),
+        dict(FLEET_PUMP, site='Boiler House B', pump_tag='BFP-3S', project_type='1R + 1S', duty='standby'),
+    ]
+
+    def test_fleet_totals_per_site_and_configuration(self):
+        pumps, errors = parse_fleet_rows(self.pumps)
+        self.assertEqual(errors, [])
+        pump_results, summary = analyze_fleet(pumps)
+        single = calculate_energy_optimization_batch([FLEET_PUMP])[0]
+        self.assertEqual(pump_results[0]['power_saving'], single['power_saving'])
+
+        self.assertEqual(summary['fleet']['pump_count'], 5)
+        self.assertEqual(summary['fleet']['running_count'], 3)
+        self.assertEqual(summary['fleet']['investment_cost'], 3 * summary['investment_cost_per_pump'])
+        site_a, site_b = summary['sites']
+        self.assertEqual(site_a['site'], 'Boiler House A')
+        self.assertAlmostEqual(site_a['annual_cost_saving'], single['annual_cost_saving'], places=2)
+        self.assertEqual((site_b['running_count'], site_b['standby_count']), (2, 1))
+        self.assertAlmostEqual(
+            summary['fleet']['power_saving'], site_a['power_saving'] + site_b['power_saving'], places=2
+        )
+
+        groups = {(group['site'], group['project_type']): group for group in summary['configurations']}
+        self.assertNotIn('warning', groups['Boiler House A', '1R + 1S'])
+        standby_only = groups['Boiler House B', '1R + 1S']
+        self.assertEqual(standby_only['power_saving'], 0)
+        self.assertEqual(standby_only['payback_period_days'], 0)
+        self.assertEqual(
+            standby_only['warning'],
+            '0 running and 1 standby pumps do not match the 1R + 1S configuration'
+        )
+        self.assertIn('warning', groups['Boiler House B', '2R + 2S'])
+
+    def test_invalid_rows_are_rejected(self):
+        pumps, errors = parse_fleet_rows([
+            dict(FLEET_PUMP, project_type='3R + 1S'),
+            dict(FLEET_PUMP, project_type='1R + 1S', duty='spare', efficiency='n/a'),
+            dict(FLEET_PUMP, project_type='1R + 1S', specific_gravity='', feed_water_temp=400),
+            dict(FLEET_PUMP, project_type='1R + 1S'),
+        ], default_site='Plant')
+        self.assertEqual([pump['row'] for pump in pumps], [4])
+        self.assertEqual(pumps[0]['site'], 'Plant')
+        self.assertEqual([error['row'] for error in errors], [1, 2, 3])
+        self.assertEqual(len(errors[1]['errors']), 2)
+
+    def test_csv_upload_with_bom_and_form_field_names(self):
+        csv_text = (
+            '\ufeffsite,pumpTag,projectType,duty,daTankHeight,boilerDrumHeight,daTankPressure,'
+            'boilerDrumPressure,feedWaterTemp,actualFlowRequired,actualPowerConsumption,efficiency\n'
+            'Unit 1,FW-1,1R + 1S,running,5,25,5,60,150,43,90000,70\n'
+            'Unit 1,FW-2,1R + 1S,standby,5,25,5,60,150,43,90000,70\n'
+        )
+        rows = read_fleet_csv(io.BytesIO(csv_text.encode('utf-8')))
+        self.assertEqual(rows[0]['site'], 'Unit 1')
+        pumps, errors = parse_fleet_rows(rows)
+        self.assertEqual(errors, [])
+        self.assertEqual(pumps[0]['pump_tag'], 'FW-1')
+        self.assertEqual(pumps[0]['feed_water_temp'], 150)
+
+        upload = SimpleUploadedFile('fleet.csv', csv_text.encode('utf-8'), content_type='text/csv')
+        response = APIClient().post(reverse('energy-optimization-fleet-analysis'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['pump_count'], 2)
+        self.assertEqual(data['summary']['configurations'][0]['running_count'], 1)
+        self.assertEqual([pump['pump_tag'] for pump in data['pumps']], ['FW-1', 'FW-2'])
+
+    @mock.patch('pump_spares.fleet_analysis.STREAM_BATCH_SIZE', 2)
+    def test_streamed_json_and_csv(self):
+        client = APIClient()
+        url = reverse('energy-optimization-fleet-analysis')
+        payload = {'site': 'Plant', 'pumps': self.pumps + [dict(FLEET_PUMP, project_type='4R')]}
+
+        response = client.post(url, payload, format='json')
+        self.assertEqual(response['X-Fleet-Pump-Count'], '5')
+        self.assertEqual(response['X-Fleet-Rejected-Rows'], '1')
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertTrue(data['success'])
+        self.assertEqual([pump['row'] for pump in data['pumps']], [1, 2, 3, 4, 5])
+        self.assertEqual(data['rejected_rows'][0]['row'], 6)
+
+        response = client.post(url + '?output=csv', payload, format='json')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(list(rows[0]), PUMP_OUTPUT_FIELDS)
+        self.assertEqual([row['pump_tag'] for row in rows], [pump['pump_tag'] for pump in self.pumps])
+
+        response = client.post(url + '?output=csv&section=summary', payload, format='json')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), SUMMARY_OUTPUT_FIELDS)
+
+        self.assertEqual(client.post(url, {'pumps': []}, format='json').status_code, 400)
+        response = client.post(url, {'pumps': [{'project_type': 'none'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['rejected_rows'][0]['row'], 1)
+
+SWEEP_SUBMISSION = dict(BASE_SUBMISSION, actual_power_consumption=400000, efficiency=60)
+
+
+class ParameterSweepTests(TestCase):
+    def test_default_axes_reproduce_the_scalar_calculator(self):
+        scalar = calculate_energy_optimization(SWEEP_SUBMISSION)
+        result = run_parameter_sweep(SWEEP_SUBMISSION)
+        self.assertEqual(result['shape'], [1, 1, 1, 1, 1])
+        point = result['pareto_front'][0]
+        for metric in ('efficiency_after', 'power_after', 'power_saving', 'annual_cost_saving', 'annual_co2_reduction'):
+            self.assertAlmostEqual(point[metric], scalar[metric], delta=abs(scalar[metric]) * 1e-6, msg=metric)
+
+    def test_grid_follows_operating_hours_and_affinity_laws(self):
+        sweep = EnergyOptimizationSweep(SWEEP_SUBMISSION, {
+            'operating_hours': {'start': 8, 'stop': 24, 'steps': 3},
+            'speed_ratio': [0.8, 1.0],
+        })
+        cube = sweep.evaluate()
+        self.assertEqual(cube['power_after'].shape, (1, 1, 3, 2, 1))
+        np.testing.assert_allclose(cube['power_after'][..., 0, :], cube['power_after'][..., 1, :] * 0.8 ** 3)
+        daily = cube['daily_energy_saving'][0, 0, :, 1, 0]
+        np.testing.assert_allclose(daily / daily[-1], [8 / 24, 16 / 24, 1])
+
+    def test_pareto_front_is_not_dominated(self):
+        sweep = EnergyOptimizationSweep(SWEEP_SUBMISSION, {
+            'tariff': [0.08, 0.12],
+            'investment_cost': [30000, 50000, 80000],
+            'efficiency_target': [60, 70, 80],
+        })
+        front = sweep.pareto_front()
+        savings = [entry['annual_cost_saving'] for entry in front]
+        self.assertEqual(savings, sorted(savings, reverse=True))
+        self.assertTrue(all(saving > 0 for saving in savings))
+        cube = sweep.cube
+        points = np.column_stack([
+            -cube['annual_cost_saving'].ravel(), cube['payback_period_days'].ravel(), cube['investment_cost'].ravel()
+        ])
+        for entry in front:
+            setting = np.array([-entry['annual_cost_saving'], entry['payback_period_days'], entry['investment_cost']])
+            dominated = np.all(points <= setting + 0.01, axis=1) & np.any(points < setting - 0.01, axis=1)
+            self.assertFalse(dominated.any(), entry)
+        self.assertEqual({entry['efficiency_target'] for entry in front}, {80.0})
+        self.assertEqual(pareto_mask(np.array([[1, 2], [2, 1], [2, 2], [1, 2]])).tolist(), [True, True, False, False])
+
+    def test_invalid_sweeps_are_rejected(self):
+        for ranges in ({'discount': [1]}, {'tariff': {'start': 0.1, 'stop': 0.2, 'steps': 0}},
+                       {'speed_ratio': [2.0]}, {'tariff': ['cheap']}):
+            with self.assertRaises(SweepError):
+                EnergyOptimizationSweep(SWEEP_SUBMISSION, ranges)
+        with self.assertRaises(SweepError):
+            EnergyOptimizationSweep(SWEEP_SUBMISSION, {'tariff': {'start': 0, 'stop': 1, 'steps': 50}}, max_points=10)
+        with self.assertRaises(SweepError):
+            EnergyOptimizationSweep(dict(SWEEP_SUBMISSION, actual_flow_required=0))
+
+    @override_settings(ENERGY_SWEEP_MAX_POINTS=100)
+    def test_what_if_endpoint(self):
+        client = APIClient()
+        url = reverse('energy-optimization-what-if')
+        response = client.post(url, {
+            'parameters': SWEEP_SUBMISSION, 'ranges': {'tariff': [0.1, 0.15]}, 'objectives': ['annual_energy_saving'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['shape'], [2, 1, 1, 1, 1])
+        self.assertEqual(len(data['cube']['annual_cost_saving']), 2)
+
+        ranges = {'tariff': {'start': 0.05, 'stop': 0.2, 'steps': 50}, 'investment_cost': [30000, 50000, 80000]}
+        response = client.post(url, {'parameters': SWEEP_SUBMISSION, 'ranges': ranges}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 100', response.json()['error'])
+        self.assertEqual(client.post(url, {}, format='json').status_code, 400)
+        owned = EnergyOptimizationSubmission.objects.create(
+            project_type='1R + 1S', user=get_user_model().objects.create_user('owner@example.com', password='secret')
+        )
+        self.assertEqual(client.post(url, {'submission_id': owned.id}, format='json').status_code, 404)
+
+
+class FailingPlotPool:
+    """Stands in for a process pool whose workers died or hang"""
+
+    def __init__(self, error):
+        self.error = error
+        self.shut_down = False
+
+    def submit(self, *args):
+        if isinstance(self.error, BrokenProcessPool):
+            raise self.error
+        future = Future()
+        future.set_exception(self.error)
+        return future
+
+    def shutdown(self, **kwargs):
+        self.shut_down = True
+
+
+class PlotRenderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.results = calculate_energy_optimization(BASE_SUBMISSION)
+
+    @override_settings(ENERGY_PLOT_WORKERS=0)
+    def test_no_workers_renders_inline(self):
+        self.assertIsNone(get_plot_pool())
+        plots = render_energy_optimization_plots(self.results)
+        self.assertEqual(sorted(plots), sorted(f'plot{number}' for number in PLOT_NUMBERS))
+        self.assertTrue(all(plots.values()))
+
+    @override_settings(ENERGY_PLOT_WORKERS=1)
+    def test_pool_renders_the_same_image_as_inline(self):
+        pool = get_plot_pool()
+        self.addCleanup(plot_rendering._discard_pool, pool)
+        self.assertIs(get_plot_pool(), pool)
+        plot_data = self.results['plot4_data']
+        self.assertEqual(render_single_plot(4, plot_data, dpi=72), render_plot_image(4, plot_data, dpi=72))
+
+    @override_settings(ENERGY_PLOT_WORKERS=1)
+    def test_broken_pool_falls_back_to_inline_rendering(self):
+        pool = FailingPlotPool(BrokenProcessPool('worker died'))
+        with mock.patch.object(plot_rendering, '_pool', pool):
+            plots = render_energy_optimization_plots(self.results)
+            self.assertIsNone(plot_rendering._pool)
+        self.assertTrue(pool.shut_down)
+        self.assertEqual(plots, render_plots_inline(self.results))
+
+    @override_settings(ENERGY_PLOT_WORKERS=1)
+    def test_timed_out_plots_are_reported_and_the_pool_replaced(self):
+        pool = FailingPlotPool(FutureTimeoutError())
+        with mock.patch.object(plot_rendering, '_pool', pool):
+            plots = render_energy_optimization_plots(self.results, timeout=1)
+            self.assertIsNone(plot_rendering._pool)
+        self.assertTrue(pool.shut_down)
+        self.assertEqual(plots['plot1'], '')
+        self.assertEqual(sorted(plots['errors']), sorted(f'plot{number}' for number in PLOT_NUMBERS))
+        with mock.patch.object(plot_rendering, '_pool', pool), self.assertRaises(TimeoutError):
+            render_single_plot(4, self.results['plot4_data'])
+
+
+@override_settings(ENERGY_PLOT_WORKERS=0, ENERGY_PLOT_CACHE_DIR=tempfile.mkdtemp())
+class QHSrcPlotTests(TestCase):
+    def setUp(self):
+        self.qh_curve_data = QHCurveProcessor().process_qh_points(
+            [0, 20, 40, 60, 80], [1000, 980, 940, 880, 800], BASE_SUBMISSION, with_plot=False
+        )
+
+    def test_specs_mode_keeps_no_image(self):
+        self.assertTrue(self.qh_curve_data['success'])
+        self.assertNotIn('plot', self.qh_curve_data)
+        spec = build_plot_specs({'plot11_data': qh_src_plot_data(self.qh_curve_data)})['plot11']
+        self.assertEqual(len(spec['series']), 3)
+        self.assertNotIn('plot11', build_plot_specs({}))
+
+    def test_plot_is_rendered_on_demand(self):
+        submission = EnergyOptimizationSubmission.objects.create(
+            project_type='1R + 1S', analysis_status='completed',
+            calculation_results={'plot11_data': qh_src_plot_data(self.qh_curve_data)},
+        )
+        client = APIClient()
+        url = reverse('energy-optimization-plot', args=[submission.id, 11])
+        response = client.get(url, {'token': submission.access_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+        submission.calculation_results = {}
+        submission.save()
+        self.assertEqual(client.get(url, {'token': submission.access_token}).status_code, 404)
+
+    def test_shared_canvas_output_does_not_depend_on_render_order(self):
+        plot_data = qh_src_plot_data(self.qh_curve_data)
+
+        def render_in_new_thread(widths):
+            # Each thread starts with its own fresh shared canvas
+            digests = []
+            thread = threading.Thread(target=lambda: digests.extend(
+                hashlib.sha256(render_plot_image(QH_SRC_PLOT, plot_data, dpi=72, width=width)).hexdigest()
+                for width in widths))
+            thread.start()
+            thread.join()
+            return digests
+
+        natural_then_fixed = render_in_new_thread([None, 400])
+        fixed_then_natural = render_in_new_thread([400, None])
+        self.assertEqual(len(natural_then_fixed), 2)
+        self.assertEqual(natural_then_fixed, fixed_then_natural[::-1])
+
+
+class PlotImageCacheTests(TestCase):
+    def test_sizes_are_rounded_up_to_buckets(self):
+        self.assertEqual(parse_plot_image_options({'width': '801', 'dpi': '96'}), ('png', 100, 1200))
+        self.assertEqual(parse_plot_image_options({'width': '9000', 'dpi': '1'}), ('png', 72, 2400))
+        self.assertEqual(parse_plot_image_options({}), ('png', 100, None))
+
+    def test_least_recently_used_images_are_evicted(self):
+        cache_dir = Path(tempfile.mkdtemp())
+        paths = []
+        for index in range(4):
+            path = cache_dir / str(index % 2 + 1) / f'plot{index + 1}-digest.png'
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(b'x' * 100)
+            os.utime(path, (1000 + index, 1000 + index))
+            paths.append(path)
+        # Oldest image, but just written
+        os.utime(paths[3], (0, 0))
+
+        with self.settings(ENERGY_PLOT_CACHE_DIR=cache_dir, ENERGY_PLOT_CACHE_MAX_FILES=3,
+                           ENERGY_PLOT_CACHE_MAX_BYTES=250):
+            evict_plot_images(keep=paths[3])
+        self.assertEqual([path.exists() for path in paths], [False, False, True, True])
+
+
+class SeriesEncodingTests(TestCase):
+    def test_descriptors_round_trip(self):
+        self.assertEqual(decode_series(constant_series(42.5, 365)).tolist(), [42.5] * 365)
+        days = decode_series(linear_series(1, 365))
+        self.assertEqual(days.tolist(), list(range(1, 366)))
+        saving = decode_series(linear_series(123.45, 365))
+        self.assertEqual(saving.tolist(), [123.45 * day for day in range(1, 366)])
+        offset = decode_series(linear_series(2.0, 3, start=0, intercept=-1.0))
+        self.assertEqual(offset.tolist(), [-1.0, 1.0, 3.0])
+        self.assertEqual(decode_series([1, 2.5]).tolist(), [1.0, 2.5])
+        self.assertEqual(decode_series(None).size, 0)
+        with self.assertRaises(ValueError):
+            decode_series({'encoding': 'delta', 'length': 3})
+
+    def test_sampled_series_round_trips_within_float32_precision(self):
+        values = np.random.default_rng(7).uniform(-5e4, 5e4, 1000)
+        decoded = decode_series(sampled_series(values))
+        self.assertEqual(decoded.dtype, np.float64)
+        np.testing.assert_allclose(decoded, values, rtol=np.finfo(np.float32).eps)
+        self.assertTrue(np.array_equal(decode_series(sampled_series([])), []))
+
+    def test_encoding_detects_constant_and_linear_series(self):
+        self.assertEqual(encode_series([7.25] * 365), constant_series(7.25, 365))
+        self.assertEqual(encode_series([1000.0, 1000.0 + 1e-7, 1000.0])['encoding'], 'constant')
+        self.assertEqual(encode_series([1000.0, 1000.01, 1000.0])['encoding'], 'sampled')
+
+        cumulative = np.cumsum(np.full(365, 123.45))
+        descriptor = encode_series(cumulative)
+        self.assertEqual(descriptor['encoding'], 'linear')
+        np.testing.assert_allclose(decode_series(descriptor), cumulative, rtol=1e-9)
+        noisy = cumulative + np.where(np.arange(365) == 200, 1e-3, 0)
+        self.assertEqual(encode_series(noisy)['encoding'], 'sampled')
+        self.assertEqual(encode_series(noisy, rel_tol=1e-6)['encoding'], 'linear')
+
+        curve = np.linspace(0, 10, 50) ** 2
+        self.assertEqual(encode_series(curve)['encoding'], 'sampled')
+        self.assertEqual(encode_series([1.0, np.nan, 1.0])['encoding'], 'sampled')
+
+
+SEMICOLON_CSV = (
+    'Pump test report;;\n'
+    'Serial 4471;;\n'
+    'Flow (l/s);Head [ft];Remark\n'
+    '0;100,5;shutoff\n'
+    '2,5;98;\n'
+    'n/a;95;sensor fault\n'
+    '5;90,25;\n'
+    ';\n'
+).encode()
+
+GROUPED_CSV = (
+    '\ufeffCapacity (gpm),TDH\n'
+    '"0",120\n'
+    '"1,250",110.5\n'
+    '"2,500.5",95\n'
+).encode('utf-8')
+
+
+def curve_workbook(rows):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class CurveIngestionTests(TestCase):
+    def test_number_separators(self):
+        cases = {
+            '1,250': 1250, '12,500,000': 12500000, '1,25,000': 125000, '1.250.000': 1250000,
+            '1,250.5': 1250.5, '1.250,5': 1250.5, '12,5': 12.5, '1250,75': 1250.75, '1,2345': 1.2345,
+            ' 3 000 ': 3000, 7: 7, '': None, 'n/a': None, 'inf': None, True: None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_number(text), expected, text)
+
+    def test_semicolon_csv_with_preamble_units_and_bad_rows(self):
+        curve = read_curve_file(SimpleUploadedFile('curve.csv', SEMICOLON_CSV))
+        self.assertEqual(curve.file_format, 'csv')
+        self.assertEqual(curve.columns, {'q': 'Flow (l/s)', 'h': 'Head [ft]'})
+        self.assertEqual(curve.units, {'q': 'l/s', 'h': 'ft'})
+        np.testing.assert_allclose(curve.q, [0, 9, 18])
+        np.testing.assert_allclose(curve.h, np.array([100.5, 98, 90.25]) * 0.3048)
+
+    def test_comma_csv_with_bom_and_thousands_separators(self):
+        curve = read_curve_file(io.BytesIO(GROUPED_CSV))
+        self.assertEqual(curve.units, {'q': 'gpm', 'h': 'm'})
+        np.testing.assert_allclose(curve.q, np.array([0, 1250, 2500.5]) * 0.2271247)
+        np.testing.assert_allclose(curve.h, [120, 110.5, 95])
+
+    def test_headerless_files_use_the_first_two_columns(self):
+        curve = read_curve_file(io.StringIO('0\t50\n10\t45\n20\t36\n'))
+        self.assertEqual(curve.columns, {'q': None, 'h': None})
+        np.testing.assert_allclose(curve.h, [50, 45, 36])
+
+    def test_xlsx_with_title_rows_and_bad_rows(self):
+        workbook = curve_workbook([
+            ['Acme BF-100 test bench'],
+            [],
+            ['Point', 'Flow Q [m3/min]', 'Head Total (m)'],
+            [1, 0, 52],
+            [2, 0.5, 'n/a'],
+            [3, 1, 48.5],
+            [4, '1,5', '44,25'],
+        ])
+        curve = read_curve_file(SimpleUploadedFile('curve.xlsx', workbook.getvalue()))
+        self.assertEqual(curve.file_format, 'xlsx')
+        self.assertEqual(curve.units, {'q': 'm3/min', 'h': 'm'})
+        np.testing.assert_allclose(curve.q, [0, 60, 90])
+        np.testing.assert_allclose(curve.h, [52, 48.5, 44.25])
+
+    def test_sample_workbook(self):
+        curve = read_curve_file(Path(settings.BASE_DIR) / 'energy_optimization' / 'qhnp' / 'QH.xlsx')
+        self.assertEqual(curve.columns, {'q': 'Flow', 'h': 'Head'})
+        self.assertEqual(curve.to_points()[:2], [{'q': 0.0, 'h': 980.0}, {'q': 5.0, 'h': 960.0}])
+
+    def test_unreadable_files(self):
+        for data, message in [
+            (b'', 'empty'),
+            (b'Speed,Power\nlow,high\n', 'No Q and H columns'),
+            (b'Flow (m3/h),Head (m)\n1,2\n', 'at least 2'),
+            (b'Flow (bbl/d),Head (m)\n1,2\n3,4\n', "Unknown unit 'bbl/d'"),
+            (b'\x00\x01binary', 'Unsupported'),
+        ]:
+            with self.assertRaisesMessage(CurveFileError, message):
+                read_curve_file(io.BytesIO(data))
+
+
+class OperatingPointTests(TestCase):
+    # H = 1000 - 0.05·Q² meets H = 500 + 0.05·Q² at Q = √5000, H = 750
+    q_points = np.arange(0, 101, 10)
+    h_points = 1000 - 0.05 * q_points ** 2
+
+    def test_polynomial_solution_is_exact(self):
+        solver = OperatingPointSolver(self.q_points, self.h_points)
+        self.assertEqual(solver.method, 'polynomial')
+        result = solver.solve(500, 0.05)
+        self.assertAlmostEqual(float(result['q']), 5000 ** 0.5, places=9)
+        self.assertAlmostEqual(float(result['h']), 750, places=9)
+
+    def test_spline_solution_matches_polynomial(self):
+        result = OperatingPointSolver(self.q_points, self.h_points, method='spline').solve(500, 0.05)
+        self.assertAlmostEqual(float(result['q']), 5000 ** 0.5, delta=0.05)
+        self.assertAlmostEqual(float(result['h']), 750, delta=0.5)
+
+    def test_vectorized_solve_matches_single_solves(self):
+        for method in ['polynomial', 'spline']:
+            solver = OperatingPointSolver(self.q_points, self.h_points, method=method)
+            static_heads = np.array([0.0, 250.0, 500.0, 900.0])
+            batch = solver.solve(static_heads, 0.05)
+            for index, static_head in enumerate(static_heads):
+                single = solver.solve(static_head, 0.05)
+                self.assertAlmostEqual(float(batch['q'][index]), float(single['q']), places=9)
+
+    def test_curves_that_do_not_meet(self):
+        solver = OperatingPointSolver(self.q_points, self.h_points)
+        result = solver.solve([500, 1200], 0.05)
+        self.assertEqual(result['solved'].tolist(), [True, False])
+        self.assertTrue(np.isnan(result['q'][1]))
+        self.assertIsNone(find_operating_point(self.q_points, self.h_points, 1200, 0.05))
+
+    def test_badly_fitting_polynomial_switches_to_spline(self):
+        h_points = np.where(self.q_points < 50, 1000.0, 1000 - 8 * (self.q_points - 50))
+        self.assertEqual(OperatingPointSolver(self.q_points, h_points).method, 'spline')
+
+    def test_repeated_flows_are_averaged(self):
+        solver = OperatingPointSolver([0, 50, 50, 100], [1000, 880, 870, 500], method='spline')
+        self.assertEqual(solver.h_points.tolist(), [1000, 875, 500])
+        with self.assertRaises(OperatingPointError):
+            OperatingPointSolver([50, 50], [880, 870])
+
+
+class PumpCurveTests(TestCase):
+    # H = 110 - 0.002·Q², η peaking at 80 % at 100 m³/hr
+    q_points = np.arange(0, 151, 15)
+    h_points = 110 - 0.002 * q_points ** 2
+    efficiency_points = 80 * (q_points / 100) * (2 - q_points / 100)
+
+    def test_fit_recovers_measured_curves(self):
+        curve = PumpCurve.fit(
+            self.q_points, self.h_points, self.efficiency_points, speed=2950, diameter=250
+        )
+        np.testing.assert_allclose(curve.head_coefficients, [110, 0, -0.002], atol=1e-9)
+        self.assertEqual(curve.q_max, 150)
+        bep = curve.best_efficiency_point()
+        self.assertAlmostEqual(bep['q'], 100, delta=1)
+        self.assertAlmostEqual(bep['efficiency'], 80, delta=0.01)
+        self.assertEqual(PumpCurve.from_dict(curve.to_dict()).to_dict(), curve.to_dict())
+        with self.assertRaises(PumpCurveError):
+            PumpCurve.fit([50, 50, np.nan], [100, 90, 80])
+
+    def test_affinity_laws(self):
+        curve = PumpCurve.fit(self.q_points, self.h_points, self.efficiency_points, speed=2950, diameter=250)
+        curve.power_coefficients = curve.derive_power()
+        ratio = 2360 / 2950
+        for scaled in (curve.at_speed(2360), curve.trimmed(250 * ratio)):
+            q = np.array([20.0, 60.0, 100.0])
+            np.testing.assert_allclose(scaled.head(q * ratio), curve.head(q) * ratio ** 2, rtol=1e-12)
+            np.testing.assert_allclose(scaled.efficiency(q * ratio), curve.efficiency(q), rtol=1e-12)
+            np.testing.assert_allclose(scaled.power(q * ratio), curve.power(q) * ratio ** 3, rtol=1e-12)
+            self.assertAlmostEqual(scaled.q_max, 150 * ratio)
+        self.assertEqual(curve.at_speed(2360).speed, 2360)
+        self.assertEqual(curve.trimmed(200).diameter, 200)
+        with self.assertRaises(PumpCurveError):
+            PumpCurve([110, 0, -0.002]).at_speed(1450)
+
+    def test_flow_at_head_inverts_the_head_curve(self):
+        heads = np.array([120.0, 110.0, 90.0, 30.0])
+        quadratic = PumpCurve([110, 0, -0.002], q_max=150)
+        np.testing.assert_allclose(quadratic.flow_at_head(heads), [0, 0, 100, 200], atol=1e-9)
+        cubic = PumpCurve([110, 0, -0.001, -5e-6], q_max=150)
+        flows = cubic.flow_at_head(heads[2:])
+        np.testing.assert_allclose(cubic.head(flows), heads[2:], atol=1e-6)
+
+    def test_duty_point_curve(self):
+        curve = PumpCurve.from_duty_point(43, 900)
+        self.assertAlmostEqual(float(curve.head(0)), 900 * DUTY_SHUTOFF_RATIO)
+        self.assertAlmostEqual(float(curve.head(43)), 900)
+        self.assertAlmostEqual(curve.q_max, 43 * 1.2)
+        self.assertEqual(curve.source, 'duty_point')
+        with self.assertRaises(PumpCurveError):
+            PumpCurve.from_duty_point(0, 900)
+
+    def test_zero_required_flow_keeps_the_modified_curve_plot(self):
+        results = calculate_energy_optimization(dict(BASE_SUBMISSION, actual_flow_required=0))
+        plot = results['plot3_data']
+        self.assertNotIn('error', plot)
+        self.assertEqual(plot['h_points_mod'], [results['head_developed'] * DUTY_SHUTOFF_RATIO] * 20)
+
+
+class CurveSamplingTests(TestCase):
+    def assert_within_tolerance(self, q, h, curve):
+        middles = 0.5 * (q[:-1] + q[1:])
+        chord_error = np.abs(curve(middles) - 0.5 * (h[:-1] + h[1:]))
+        self.assertLessEqual(chord_error.max(), DEFAULT_TOLERANCE * (h.max() - h.min()) * (1 + 1e-9))
+
+    def test_src_samples_are_within_tolerance(self):
+        q, h = sample_src(300.0, 0.1, 60.0)
+        self.assertEqual((q[0], q[-1]), (0.0, 60.0))
+        self.assertTrue(np.all(np.diff(q) > 0))
+        np.testing.assert_allclose(h, 300.0 + 0.1 * q ** 2)
+        self.assertLess(len(q), MAX_POINTS)
+        self.assert_within_tolerance(q, h, lambda flows: 300.0 + 0.1 * flows ** 2)
+
+    def test_point_count_does_not_depend_on_scale(self):
+        small, _ = sample_src(0.0, 40.0, 5.0)
+        large, _ = sample_src(0.0, 40.0 / 1000 ** 2, 5000.0)
+        self.assertEqual(len(small), len(large))
+        np.testing.assert_allclose(small * 1000, large)
+
+    def test_included_flows_are_sampled_exactly(self):
+        q, h = sample_src(300.0, 0.1, 60.0, include=[43.21, 75.0, float('nan')])
+        self.assertIn(43.21, q.tolist())
+        self.assertLessEqual(q.max(), 60.0)
+
+    def test_several_curves_share_one_grid(self):
+        q, h = sample_src(300.0, [0.1, 0.12, 0.08], 60.0)
+        self.assertEqual(h.shape, (3, len(q)))
+        np.testing.assert_allclose(h[1], 300.0 + 0.12 * q ** 2)
+
+    def test_bounds(self):
+        q, h = sample_curve(np.sqrt, 0.0, 100.0, max_points=9)
+        self.assertEqual(len(q), 9)
+        q, h = sample_src(300.0, 0.1, 0.0)
+        self.assertEqual((q.tolist(), h.tolist()), ([0.0], [300.0]))
+
+
+class SrcBatchTests(TestCase):
+    sets = [
+        {'shValue': 300, 'qnp': 60, 'hnp': 910, 'qact': 43, 'hact': 640},
+        {'sh_value': '120', 'q_np': '250', 'h_np': '95', 'q_act': '180', 'h_act': '130'},
+    ]
+
+    def single_set(self, values):
+        form = {field: values[field] for field in ('shValue', 'qnp', 'hnp', 'qact', 'hact')}
+        response = APIClient().post(reverse('calculate-src-curves'), form)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_parameter_sets_are_validated(self):
+        row_numbers, parameters, errors = parse_src_parameter_sets(self.sets + [
+            {'shValue': 300, 'qnp': 0, 'hnp': 910, 'qact': 'n/a', 'hact': 640},
+            [300, 60, 910, 43, 640],
+        ])
+        self.assertEqual(row_numbers.tolist(), [1, 2])
+        self.assertEqual(parameters['qact'].tolist(), [43.0, 180.0])
+        self.assertEqual(errors, [
+            {'row': 3, 'errors': ['Missing or zero: qnp, qact']},
+            {'row': 4, 'errors': ['Row must be an object']},
+        ])
+
+    def test_uniform_batch_matches_linspace_grids(self):
+        _, parameters, _ = parse_src_parameter_sets(self.sets)
+        curves = calculate_src_batch(*(parameters[field] for field in ('shValue', 'qnp', 'hnp', 'qact', 'hact')))
+        self.assertEqual(curves['flowPoints'].shape, (2, SRC_FLOW_POINTS))
+        np.testing.assert_allclose(curves['k1'], [(910 - 300) / 60 ** 2, (95 - 120) / 250 ** 2])
+        for index, (sh_value, max_flow) in enumerate([(300, 60 * 1.2), (120, 250 * 1.2)]):
+            flows = np.linspace(0, max_flow, SRC_FLOW_POINTS)
+            np.testing.assert_allclose(curves['flowPoints'][index], flows, rtol=1e-12)
+            np.testing.assert_allclose(
+                curves['actualSRC'][index], sh_value + curves['k2'][index] * flows ** 2, rtol=1e-12
+            )
+
+    def test_adaptive_batch_matches_single_set_endpoint(self):
+        response = APIClient().post(
+            reverse('calculate-src-curves-batch'), {'sets': self.sets, 'sampling': 'adaptive'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        batch = response.json()
+        self.assertEqual(batch['sampling'], 'adaptive')
+        for index, values in enumerate(self.sets):
+            values = {SRC_FIELD_ALIASES.get(key, key): float(value) for key, value in values.items()}
+            single = self.single_set(values)
+            self.assertEqual(batch['flowPoints'][index], single['flowPoints'])
+            self.assertEqual(batch['actualSRC'][index], [point['src'] for point in single['actualSRC']])
+            self.assertEqual(batch['theoreticalSRC'][index], [point['src'] for point in single['theoreticalSRC']])
+            self.assertIn(values['qact'], batch['flowPoints'][index])
+
+    def test_uniform_sampling_is_reported(self):
+        url = reverse('calculate-src-curves-batch')
+        response = APIClient().post(url + '?flow_points=5', {'sets': self.sets}, format='json')
+        data = response.json()
+        self.assertEqual(data['sampling'], 'uniform')
+        self.assertEqual([len(flows) for flows in data['flowPoints']], [5, 5])
+        self.assertNotIn(43.0, data['flowPoints'][0])
+        response = APIClient().post(url, {'sets': self.sets, 'sampling': 'spline'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = APIClient().post(url + '?flow_points=1', {'sets': self.sets}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class VfdSimulationTests(TestCase):
+    def setUp(self):
+        self.pump_curve = PumpCurve.from_duty_point(60, 900, shutoff_ratio=1.25)
+        self.pump_curve.set_efficiency(60, 70)
+
+    def test_friction_only_system_follows_the_affinity_laws(self):
+        # Without static head the SRC is an affinity parabola: speed ratio Q/60, power r³·P(60)
+        flows = [0, 6, 30, 45, 60, 80]
+        hours = [1, 1, 2, 3, 4, 5]
+        result = simulate_vfd_savings(self.pump_curve, 0.0, 900 / 60 ** 2, flows, hours, include_steps=True)
+        steps = result['steps']
+        ratio = np.array([0, 0.3, 0.5, 0.75, 1, 1])
+        np.testing.assert_allclose(steps['speed_ratio'], ratio, atol=1e-9)
+
+        full_power = float(self.pump_curve.power(60))
+        np.testing.assert_allclose(steps['power_vfd'][2:], ratio[2:] ** 3 * full_power / VFD_EFFICIENCY, rtol=1e-6)
+        np.testing.assert_allclose(steps['power_throttle'][1:], self.pump_curve.power(np.minimum(flows[1:], 60)))
+        self.assertEqual(steps['power_throttle'][0], 0)
+        self.assertEqual(steps['power_vfd'][0], 0)
+
+        totals = result['totals']
+        self.assertEqual(totals['unmet_steps'], 1)
+        self.assertEqual(totals['capacity_flow'], 60)
+        self.assertEqual(totals['running_hours'], 15)
+        self.assertEqual(totals['energy_throttle_kwh'], round(float(np.dot(steps['power_throttle'], hours)), 2))
+        self.assertEqual(totals['energy_vfd_kwh'], round(float(np.dot(steps['power_vfd'], hours)), 2))
+
+    def test_speed_meets_the_system_head(self):
+        static_head, k = 400.0, 500 / 60 ** 2
+        flows = np.array([20.0, 35.0, 50.0])
+        steps = simulate_vfd_savings(self.pump_curve, static_head, k, flows, include_steps=True)['steps']
+        ratio = np.array(steps['speed_ratio'])
+        np.testing.assert_allclose(ratio ** 2 * self.pump_curve.head(flows / ratio), static_head + k * flows ** 2,
+                                   rtol=1e-9)
+
+    def test_invalid_profiles(self):
+        with self.assertRaises(SimulationError):
+            simulate_vfd_savings(self.pump_curve, 0.0, 0.25, [30, -1])
+        with self.assertRaises(SimulationError):
+            simulate_vfd_savings(self.pump_curve, 0.0, 0.25, [30, 40], [1])
+        with self.assertRaises(SimulationError):
+            simulate_vfd_savings(PumpCurve.from_duty_point(60, 900), 0.0, 0.25, [30])
+
+    def test_nameplate_submission_saves_energy_at_part_load(self):
+        totals = run_vfd_simulation(BASE_SUBMISSION, [30, 40, 50], [8, 8, 8])['totals']
+        self.assertGreater(totals['energy_saving_kwh'], 0)
+        self.assertEqual(totals['hours'], 24)
+        self.assertAlmostEqual(totals['annual_energy_saving_kwh'] / totals['energy_saving_kwh'], 365, places=2)
+
+
+class ParallelOperationTests(TestCase):
+    def setUp(self):
+        self.pump_curve = PumpCurve.from_duty_point(60, 900, shutoff_ratio=1.25)
+        self.pump_curve.set_efficiency(60, 70)
+        # Friction-only header: two pumps together deliver 120 m³/hr at 900 m
+        self.system = ParallelPumpSystem([(self.pump_curve, 2)], 0.0, 900 / 120 ** 2)
+
+    def test_identical_pumps_follow_the_affinity_laws(self):
+        self.assertAlmostEqual(self.system.full_capacity(), 120, places=6)
+        demands = np.array([45.0, 60.0, 90.0, 120.0])
+        result = self.system.solve_option(np.array([2]), demands)
+        ratio = demands / 120
+        np.testing.assert_allclose(result['speed_ratio'], ratio, rtol=1e-9)
+        np.testing.assert_allclose(result['power'], 2 * ratio ** 3 * float(self.pump_curve.power(60)) / VFD_EFFICIENCY,
+                                   rtol=1e-6)
+        self.assertTrue(result['feasible'].all())
+
+    def test_staging_picks_the_least_power_feasible_option(self):
+        demands = np.array([0.0, 20.0, 50.0, 80.0, 110.0, 150.0])
+        staged = self.system.stage(demands)
+        options = [self.system.solve_option(option, staged['delivered']) for option in self.system.options]
+        for step, demand in enumerate(demands):
+            if not demand:
+                self.assertEqual((staged['option'][step], staged['power'][step]), (-1, 0))
+                continue
+            feasible = [result['power'][step] for result in options if result['feasible'][step]]
+            self.assertAlmostEqual(staged['power'][step], min(feasible))
+        # One pump alone meets this header at about 95 m³/hr
+        self.assertEqual(staged['running_pumps'][4:].tolist(), [2, 2])
+        self.assertEqual(staged['unmet'].tolist(), [False] * 5 + [True])
+
+    def test_staging_never_uses_more_energy_than_running_every_pump(self):
+        result = solve_parallel_operation(self.system, [20, 50, 80, 110], [6, 6, 6, 6])
+        totals = result['totals']
+        self.assertGreaterEqual(totals['staging_saving_kwh'], 0)
+        self.assertEqual(sum(totals['hours_by_running_pumps'].values()), 24)
+        self.assertEqual(sum(option['hours'] for option in result['options']), 24)
+
+    def test_running_pump_counts(self):
+        self.assertEqual(running_pump_count('1R + 1S'), 1)
+        self.assertEqual(running_pump_count('2R + 2S'), 2)
+        self.assertEqual(running_pump_count('MR + MS', 4), 4)
+        with self.assertRaises(ParallelOperationError):
+            running_pump_count('MR + MS', 0)
+
+    def test_mixed_pumps_stage_fewest_pumps_first(self):
+        small = PumpCurve.from_duty_point(30, 900, shutoff_ratio=1.25)
+        small.set_efficiency(30, 65)
+        system = ParallelPumpSystem([(self.pump_curve, 2), (small, 1)], 0.0, 900 / 150 ** 2)
+        self.assertEqual(system.options.sum(axis=1).tolist(), [1, 1, 2, 2, 3])
+        self.assertAlmostEqual(system.full_capacity(), 150, places=6)
+
+    def test_submission_with_two_duty_pumps(self):
+        submission = dict(BASE_SUBMISSION, project_type='2R + 2S')
+        totals = run_parallel_operation(submission, [40, 80, 120], [8, 8, 8])['totals']
+        self.assertAlmostEqual(totals['capacity_flow'], 120, delta=0.01)
+        self.assertEqual(totals['unmet_steps'], 0)
+
+
+
+def library_curve(efficiency, bep_flow=100, speed=2950):
+    """Curve through 90 m at 100 m³/hr, peaking at the given efficiency and BEP flow"""
+    curve = PumpCurve.quadratic(110, 100, 90, q_max=150, speed=speed)
+    curve.set_efficiency(bep_flow, efficiency)
+    return curve
+
+
+class PumpCurveLibraryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('pump-curve-library')
+        self.payload = {'pump_make': 'Acme', 'pump_model': 'BF-100', 'pump_size': '100x80',
+                        'curve': library_curve(78).to_dict()}
+
+    def test_only_staff_can_add_curves(self):
+        self.assertEqual(self.client.post(self.url, self.payload, format='json').status_code, 401)
+        users = get_user_model().objects
+        self.client.force_authenticate(users.create_user('engineer@example.com', password='secret'))
+        self.assertEqual(self.client.post(self.url, self.payload, format='json').status_code, 403)
+        self.assertFalse(LibraryPumpCurve.objects.exists())
+
+    def test_staff_add_a_fitted_curve(self):
+        users = get_user_model().objects
+        self.client.force_authenticate(users.create_user('admin@example.com', password='secret', is_staff=True))
+        response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        bep = response.json()['data']['bep']
+        # The BEP is located on a flow grid, not solved exactly
+        self.assertAlmostEqual(bep['flow'], 100, delta=1)
+        self.assertAlmostEqual(bep['head'], 90, delta=0.5)
+        self.assertAlmostEqual(bep['efficiency'], 78, places=2)
+
+        listed = self.client.get(self.url).json()['data']
+        self.assertEqual([entry['pump_model'] for entry in listed], ['BF-100'])
+        response = self.client.post(self.url, dict(self.payload, curve={'head': [1]}), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_recommendations_are_ranked_by_life_cycle_cost(self):
+        store_library_curve('Acme', 'Efficient', '100x80', library_curve(82))
+        store_library_curve('Acme', 'Average', '100x80', library_curve(70))
+        store_library_curve('Acme', 'Oversized', '150x125', library_curve(85, bep_flow=400))
+
+        result = recommend_pumps(100, 90, flows=[100, 80, 60], hours=[2000, 3000, 3760])
+        options = result['options']
+        self.assertEqual([option['pump_model'] for option in options], ['Efficient', 'Average'])
+        costs = [option['life_cycle_energy_cost'] for option in options]
+        self.assertEqual(costs, sorted(costs))
+        self.assertAlmostEqual(options[0]['trim_ratio'], 1, places=3)
+        # Same head and flow, so duty power scales with 1 / efficiency
+        self.assertAlmostEqual(options[1]['duty_power_kw'] / options[0]['duty_power_kw'], 82 / 70, places=2)
+
+        limited = recommend_pumps(100, 90, limit=1)['options']
+        self.assertEqual([option['pump_model'] for option in limited], ['Efficient'])
+
+class PumpRecommendationTests(TestCase):
+    def setUp(self):
+        store_library_curve('Acme', 'BF-100', '100x80', library_curve(80))
+
+    def test_impeller_is_trimmed_to_the_duty_head(self):
+        option = recommend_pumps(100, 80)['options'][0]
+        self.assertLess(option['trim_ratio'], 1)
+        curve = PumpCurve.from_dict(option['curve'])
+        self.assertAlmostEqual(float(curve.head(100)), 80, places=3)
+        self.assertAlmostEqual(option['duty_power_kw'], float(curve.power(100)), places=2)
+        # Trimming shifts the efficiency peak but not its value (affinity laws)
+        self.assertAlmostEqual(option['duty_efficiency'], float(curve.efficiency(100)), places=2)
+        self.assertEqual(recommend_pumps(100, 80, min_trim=0.99)['options'], [])
+
+    def test_slower_motor_is_chosen_when_trimming_cannot_reach_the_duty(self):
+        self.assertEqual(recommend_pumps(50, 22)['options'], [])
+        option = recommend_pumps(50, 22, speeds=[1475, 2950])['options'][0]
+        self.assertEqual(option['operating_speed'], 1475)
+        self.assertGreater(option['trim_ratio'], 0.95)
+        self.assertAlmostEqual(float(PumpCurve.from_dict(option['curve']).head(50)), 22, places=3)
+
+    def test_profile_energy_matches_step_by_step_integration(self):
+        flows, hours = [120, 100, 60, 0], [500, 1500, 1000, 380]
+        result = recommend_pumps(100, 90, flows=flows, hours=hours, years=1, discount_rate=0)
+        option = result['options'][0]
+        self.assertEqual(result['assumptions']['unmet_hours'], 500)
+
+        power = PumpCurve.from_dict(option['curve']).power(np.array([100, 100, 60]))
+        annual_kwh = float(np.dot(power, hours[:3])) * 8760 / sum(hours)
+        self.assertAlmostEqual(option['annual_kwh'], annual_kwh, delta=annual_kwh * 1e-6)
+        self.assertAlmostEqual(option['life_cycle_energy_cost'], option['annual_cost'], places=1)
+        self.assertAlmostEqual(present_value_factor(10, 0.08), 6.7101, places=4)
+
+    def test_invalid_requests(self):
+        for options in ({'duty_flow': 0}, {'min_trim': 0}, {'limit': 0}, {'flows': [100, -1], 'hours': [1, 1]},
+                        {'flows': [100], 'hours': [1, 2]}):
+            arguments = dict({'duty_flow': 100, 'duty_head': 90}, **options)
+            with self.assertRaises(RecommendationError):
+                recommend_pumps(**arguments)
+
+    def test_recommend_pumps_endpoint(self):
+        client = APIClient()
+        url = reverse('energy-optimization-recommend-pumps')
+        response = client.post(url, {
+            'parameters': BASE_SUBMISSION, 'duty_flow': 100, 'duty_head': 85, 'flows': [100, 80], 'hours': [4000, 4760],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([option['pump_model'] for option in data['options']], ['BF-100'])
+        self.assertEqual(data['assumptions']['duty_head'], 85)
+        self.assertIn('annual_saving_kwh', data['options'][0])
+
+        response = client.post(url, {'parameters': BASE_SUBMISSION, 'duty_flow': 100, 'duty_head': 85, 'limit': 99},
+                               format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class WaterPropertyTests(TestCase):
+    def test_if97_verification_values(self):
+        # IAPWS-IF97 tables 5 and 35
+        temperatures = np.array([300.0, 300.0, 500.0])
+        pressures = np.array([3.0, 80.0, 3.0])
+        np.testing.assert_allclose(1 / _liquid_density(temperatures, pressures),
+                                   [0.100215168e-2, 0.971180894e-3, 0.120241800e-2], rtol=1e-8)
+        np.testing.assert_allclose(_saturation_pressure(np.array([300.0, 500.0, 600.0])),
+                                   [0.353658941e-2, 0.263889776e1, 0.123443146e2], rtol=1e-8)
+
+    def test_table_interpolation(self):
+        table = get_water_table()
+        np.testing.assert_allclose(table.density(20.0), 998.2, atol=0.1)
+        np.testing.assert_allclose(table.density(150.5, 5.0), _liquid_density(np.array(423.65), np.array(5.0)),
+                                   rtol=1e-4)
+        with self.assertRaises(WaterPropertyError):
+            table.density(301.0)
+
+    def test_zero_degrees_is_a_temperature(self):
+        self.assertEqual(liquid_specific_gravity({'feed_water_temp': None}), 1.0)
+        self.assertEqual(liquid_specific_gravity({'feed_water_temp': ''}), 1.0)
+        self.assertAlmostEqual(liquid_specific_gravity({'feed_water_temp': 0}), 0.99984, places=4)
+        self.assertNotEqual(liquid_specific_gravity({'feed_water_temp': 0}), 1.0)
+        self.assertEqual(liquid_specific_gravity({'feed_water_temp': 0, 'specific_gravity': 0.92}), 0.92)
+        np.testing.assert_allclose(resolve_specific_gravity([0, 0.9, 0], [np.nan, 350, 0]),
+                                   [1.0, 0.9, liquid_specific_gravity({'feed_water_temp': 0})])
+
+    def test_temperature_outside_the_table_is_reported_as_an_error(self):
+        results = calculate_energy_optimization(dict(BASE_SUBMISSION, specific_gravity=0, feed_water_temp=350))
+        self.assertIn('Water temperature', results['error'])
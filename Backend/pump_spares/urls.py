@@ -18,9 +18,22 @@ urlpatterns = [
     
     path('submit-energy-optimization/', views.submit_energy_optimization, name='submit-energy-optimization'),
     path('energy-optimization-submissions/', views.get_energy_optimization_submissions, name='energy-optimization-submissions'),
+    path('energy-optimization/<int:submission_id>/status/', views.get_energy_optimization_status, name='energy-optimization-status'),
+    path('energy-optimization/<int:submission_id>/results/', views.get_energy_optimization_results, name='energy-optimization-results'),
+    path('energy-optimization/<int:submission_id>/plots/<int:plot_number>/', views.get_energy_optimization_plot, name='energy-optimization-plot'),
+    path('energy-optimization/fleet-analysis/', views.analyze_energy_fleet, name='energy-optimization-fleet-analysis'),
+    path('energy-optimization/what-if/', views.energy_optimization_what_if, name='energy-optimization-what-if'),
+    path('energy-optimization/vfd-simulation/', views.energy_optimization_vfd_simulation, name='energy-optimization-vfd-simulation'),
+    path('energy-optimization/parallel-operation/', views.energy_optimization_parallel_operation, name='energy-optimization-parallel-operation'),
+    path('energy-optimization/recommend-pumps/', views.energy_optimization_recommend_pumps, name='energy-optimization-recommend-pumps'),
     path('test-energy-optimization/', views.test_energy_optimization, name='test-energy-optimization'),
     path('process-qh-curve/', views.process_qh_curve, name='process-qh-curve'),
     path('calculate-src-curves/', views.calculate_src_curves, name='calculate-src-curves'),
+    path('calculate-src-curves/batch/', views.calculate_src_curves_batch, name='calculate-src-curves-batch'),
+    path('pump-curves/', views.pump_curve_library, name='pump-curve-library'),
+    path('pump-curves/near/', views.find_library_pumps, name='pump-curve-library-near'),
+    path('pump-curves/<int:curve_id>/', views.get_library_pump_curve, name='pump-curve-library-detail'),
+    path('water-properties/', views.get_water_properties, name='water-properties'),
     
     path('inventory/', views.InventoryDatabaseListCreateView.as_view(), name='inventory-list-create'),
     path('inventory/<int:pk>/', views.InventoryDatabaseDetailView.as_view(), name='inventory-detail'),
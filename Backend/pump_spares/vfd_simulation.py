@@ -0,0 +1,289 @@
+"""
+Variable Speed Drive Savings Simulation
+Compares throttle-valve and speed control energy over a flow profile using the fitted pump curve and SRC
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .curve_ingestion import FLOW_UNITS, csv_rows, parse_column_header, parse_number
+from .energy_calculations import COST_PER_KWH, KWH_TO_CO2_AVG
+from .pump_curve import PumpCurve, PumpCurveError
+from .water_properties import liquid_specific_gravity
+
+
+HOURS_PER_YEAR = 8760
+
+# One leap year of 15-minute steps
+MAX_PROFILE_STEPS = 366 * 24 * 4
+
+# Lowest speed the drive runs at; lower flows are throttled at this speed
+DEFAULT_MIN_SPEED_RATIO = 0.3
+
+# Drive and extra motor losses under speed control
+VFD_EFFICIENCY = 0.97
+
+# Nameplate pumps are modelled through the rated point with this shutoff head ratio
+NAMEPLATE_SHUTOFF_RATIO = 1.25
+
+DURATION_CURVE_POINTS = 101
+SPEED_BISECTION_STEPS = 50
+
+# Header names of an optional per-row duration column
+HOURS_HEADERS = ['hours', 'hour', 'duration', 'duration h', 'step hours']
+
+
+class SimulationError(ValueError):
+    """Raised for simulations that cannot be run"""
+
+
+def read_load_profile(file) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Required flows (m³/hr) and optional step durations (h) from a CSV profile
+
+    The flow column is found by its header ("Flow (m3/hr)", "Q [l/s]", ...)
+    and converted from its unit; without a header the first numeric column
+    is used. A "hours"/"duration" column gives each row its own duration.
+    """
+    data = file.read()
+    if isinstance(data, str):
+        data = data.encode()
+    rows = list(csv_rows(data))
+    rows = [row for row in rows if any(str(cell).strip() for cell in row)]
+    if not rows:
+        raise SimulationError('Load profile is empty')
+
+    header = rows[0]
+    flow_index, hours_index, factor = None, None, 1.0
+    for index, cell in enumerate(header):
+        quantity, unit = parse_column_header(cell)
+        if quantity == 'q' and flow_index is None:
+            flow_index = index
+            if unit:
+                if unit not in FLOW_UNITS:
+                    raise SimulationError(f"Unknown flow unit '{unit}' in column '{cell.strip()}'")
+                factor = FLOW_UNITS[unit]
+        elif str(cell).strip().lower().replace('_', ' ') in HOURS_HEADERS:
+            hours_index = index
+
+    if flow_index is not None:
+        rows = rows[1:]
+    else:
+        # No recognised header: skip a text header row, then take the first numeric column
+        if not any(parse_number(cell) is not None for cell in header):
+            rows = rows[1:]
+        sample = rows[0] if rows else []
+        flow_index = next((index for index, cell in enumerate(sample) if parse_number(cell) is not None), None)
+        if flow_index is None:
+            raise SimulationError('No flow column found: add a header such as "Flow (m3/hr)"')
+
+    if len(rows) > MAX_PROFILE_STEPS:
+        raise SimulationError(f'Load profiles may contain at most {MAX_PROFILE_STEPS} rows')
+
+    def column(index):
+        return np.array([parse_number(row[index]) if index < len(row) else None for row in rows], dtype=float)
+
+    flows = column(flow_index) * factor
+    hours = column(hours_index) if hours_index is not None else None
+    return flows, hours
+
+
+def _speed_ratios(pump_curve: PumpCurve, flows: np.ndarray, heads: np.ndarray, min_ratio: float) -> np.ndarray:
+    """
+    Speed ratio r at which the pump delivers each (Q, H), from r²·H(Q/r) = H
+
+    r²·H(Q/r) rises with r for a falling head curve, so every step is
+    bisected on [min_ratio, 1] at once.
+    """
+    low = np.full(flows.shape, min_ratio)
+    high = np.ones(flows.shape)
+    for _ in range(SPEED_BISECTION_STEPS):
+        middle = 0.5 * (low + high)
+        too_slow = middle ** 2 * pump_curve.head(flows / middle) < heads
+        low = np.where(too_slow, middle, low)
+        high = np.where(too_slow, high, middle)
+    return high
+
+
+def simulate_vfd_savings(pump_curve: PumpCurve, static_head: float, k: float, flows: Sequence[float],
+                         hours: Optional[Sequence[float]] = None, step_hours: float = 1.0,
+                         min_speed_ratio: float = DEFAULT_MIN_SPEED_RATIO,
+                         cost_per_kwh: float = COST_PER_KWH, include_steps: bool = False) -> Dict:
+    """
+    Energy of throttle control versus speed control for every profile step
+
+    With a throttle valve the pump runs at full speed on its own curve and
+    the valve burns the head above the SRC. With a drive the speed follows
+    the SRC, and power scales by the affinity laws as r³·P(Q/r). Flows
+    above the full-speed operating point are capped at it and counted as
+    unmet.
+
+    Args:
+        pump_curve: Full-speed pump curve with a power curve
+        static_head: SRC static head (m)
+        k: SRC resistance coefficient
+        flows: Required flow per step (m³/hr); zero means the pump is off
+        hours: Duration of each step (h); step_hours for every step if omitted
+        step_hours: Uniform step duration (h)
+        min_speed_ratio: Lowest drive speed as a fraction of full speed
+        cost_per_kwh: Energy tariff
+        include_steps: Also return the per-step arrays
+
+    Returns:
+        Dictionary with totals, a load duration curve and optionally steps
+    """
+    if pump_curve.power_coefficients is None:
+        raise SimulationError('The pump curve has no power curve; provide the nameplate efficiency')
+    if not 0 < min_speed_ratio <= 1:
+        raise SimulationError('min_speed_ratio must be between 0 and 1')
+
+    flows = np.asarray(flows, dtype=float)
+    hours = np.full(flows.shape, float(step_hours)) if hours is None else np.asarray(hours, dtype=float)
+    if not flows.size:
+        raise SimulationError('Load profile has no steps')
+    if hours.shape != flows.shape:
+        raise SimulationError('Each step needs one duration')
+    invalid = ~np.isfinite(flows) | (flows < 0) | ~np.isfinite(hours) | (hours < 0)
+    if invalid.any():
+        raise SimulationError(f'Invalid flow or duration in row {int(np.argmax(invalid)) + 1}')
+
+    capacity = pump_curve.operating_point(static_head, k)
+    if not capacity['solved']:
+        raise SimulationError('The pump curve does not meet the system resistance curve')
+    q_capacity = float(capacity['q'])
+
+    running = flows > 0
+    delivered = np.minimum(flows, q_capacity)
+    unmet = flows > q_capacity
+
+    # Throttle control: full speed, any flow up to the operating point
+    power_throttle = np.where(running, pump_curve.power(delivered), 0.0)
+
+    # Speed control: the pump produces just the SRC head
+    system_head = static_head + k * delivered ** 2
+    speed_ratio = np.where(running, _speed_ratios(pump_curve, delivered, system_head, min_speed_ratio), 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power_vfd = speed_ratio ** 3 * pump_curve.power(np.where(running, delivered / speed_ratio, 0.0))
+    power_vfd = np.where(running, power_vfd / VFD_EFFICIENCY, 0.0)
+
+    energy_throttle = float(np.dot(power_throttle, hours))
+    energy_vfd = float(np.dot(power_vfd, hours))
+    energy_saving = energy_throttle - energy_vfd
+    total_hours = float(hours.sum())
+    running_hours = float(hours[running].sum())
+    annual_factor = HOURS_PER_YEAR / total_hours if total_hours > 0 else 0.0
+
+    totals = {
+        'steps': int(flows.size),
+        'hours': round(total_hours, 2),
+        'running_hours': round(running_hours, 2),
+        'unmet_steps': int(unmet.sum()),
+        'capacity_flow': round(q_capacity, 3),
+        'delivered_volume': round(float(np.dot(delivered, hours)), 2),
+        'energy_throttle_kwh': round(energy_throttle, 2),
+        'energy_vfd_kwh': round(energy_vfd, 2),
+        'energy_saving_kwh': round(energy_saving, 2),
+        'saving_percent': round(energy_saving / energy_throttle * 100, 2) if energy_throttle > 0 else 0,
+        'cost_saving': round(energy_saving * cost_per_kwh, 2),
+        'co2_reduction_kg': round(energy_saving * KWH_TO_CO2_AVG, 2),
+        'annual_energy_saving_kwh': round(energy_saving * annual_factor, 2),
+        'annual_cost_saving': round(energy_saving * annual_factor * cost_per_kwh, 2),
+        'average_speed_ratio': (
+            round(float(np.dot(speed_ratio[running], hours[running]) / running_hours), 4) if running_hours > 0 else 0
+        ),
+    }
+
+    # Load duration curve: steps by descending flow against cumulative hours
+    order = np.argsort(-flows, kind='stable')
+    cumulative_hours = np.cumsum(hours[order])
+    duration_hours = np.linspace(0, total_hours, DURATION_CURVE_POINTS)
+    index = np.minimum(np.searchsorted(cumulative_hours, duration_hours, side='right'), flows.size - 1)
+    duration_curve = {
+        'hours': duration_hours.tolist(),
+        'flow': flows[order][index].tolist(),
+        'power_throttle': power_throttle[order][index].tolist(),
+        'power_vfd': power_vfd[order][index].tolist(),
+        'speed_ratio': speed_ratio[order][index].tolist(),
+    }
+
+    result = {
+        'totals': totals,
+        'duration_curve': duration_curve,
+        'assumptions': {
+            'static_head': static_head,
+            'k': k,
+            'min_speed_ratio': min_speed_ratio,
+            'vfd_efficiency': VFD_EFFICIENCY,
+            'cost_per_kwh': cost_per_kwh,
+            'pump_curve': pump_curve.to_dict(),
+        },
+    }
+    if include_steps:
+        result['steps'] = {
+            'flow': flows.tolist(),
+            'hours': hours.tolist(),
+            'speed_ratio': speed_ratio.tolist(),
+            'power_throttle': power_throttle.tolist(),
+            'power_vfd': power_vfd.tolist(),
+        }
+    return result
+
+
+def simulation_pump_curve(calc_data: Dict, pump_curve_data: Optional[Dict] = None) -> PumpCurve:
+    """
+    Full-speed pump curve for the simulation
+
+    A curve fitted from an uploaded file or taken from the library is used
+    as stored. The simplified nameplate curve of the plots reaches zero
+    head at Qnp, so nameplate pumps are modelled through (Qnp, Hnp) instead.
+    """
+    if pump_curve_data and pump_curve_data.get('source') in ('file', 'library'):
+        return PumpCurve.from_dict(pump_curve_data)
+
+    q_np = float(calc_data.get('flow_qnp', 0))
+    h_np = float(calc_data.get('head_hnp', 0))
+    efficiency = float(calc_data.get('efficiency', 0))
+    if q_np <= 0 or h_np <= 0:
+        raise SimulationError('Nameplate flow and head are required')
+    if efficiency <= 0:
+        raise SimulationError('Nameplate efficiency is required')
+
+    curve = PumpCurve.from_duty_point(q_np, h_np, shutoff_ratio=NAMEPLATE_SHUTOFF_RATIO)
+    curve.speed = float(calc_data.get('speed_n1', 0)) or None
+    curve.set_efficiency(q_np, efficiency, liquid_specific_gravity(calc_data))
+    return curve
+
+
+def run_vfd_simulation(calc_data: Dict, flows: Sequence[float], hours: Optional[Sequence[float]] = None,
+                       pump_curve_data: Optional[Dict] = None, **options) -> Dict:
+    """
+    Main function to simulate drive savings for a submission
+
+    Args:
+        calc_data: Submission values (see build_calc_data)
+        flows: Required flow per step (m³/hr)
+        hours: Duration of each step (h), if not uniform
+        pump_curve_data: Fitted pump curve stored on the submission
+        **options: step_hours, min_speed_ratio, cost_per_kwh, include_steps
+
+    Returns:
+        Simulation result (see simulate_vfd_savings)
+
+    Raises:
+        SimulationError: Missing pump data or an invalid profile
+    """
+    from .qh_curve_processor import generate_src_curves
+
+    src = generate_src_curves(calc_data)
+    if 'error' in src:
+        raise SimulationError(src['error'])
+
+    try:
+        pump_curve = simulation_pump_curve(calc_data, pump_curve_data)
+    except PumpCurveError as e:
+        raise SimulationError(str(e))
+
+    return simulate_vfd_savings(
+        pump_curve, src['parameters']['static_head'], src['parameters']['k1'], flows, hours, **options
+    )
@@ -1,3 +1,6 @@
+import json
+import secrets
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -8,17 +11,20 @@ from django.utils.decorators import method_decorator
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.urls import reverse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from datetime import datetime
 from .models import (
     PumpMake, PumpModel, PumpSize, PartNumber, PartName, MaterialOfConstruction, 
     ReverseEngineeringSubmission, ReverseEngineeringDocument, EnergyOptimizationSubmission,
-    InventoryDatabase
+    InventoryDatabase, LibraryPumpCurve
 )
 from .serializers import (
     PumpMakeSerializer, PumpModelSerializer, PumpSizeSerializer,
     PartNumberSerializer, PartNameSerializer, MaterialOfConstructionSerializer,
     PumpSparesFilterSerializer, ReverseEngineeringSubmissionSerializer, ReverseEngineeringDocumentSerializer,
-    EnergyOptimizationSubmissionSerializer, InventoryDatabaseSerializer, InventoryFilterSerializer
+    EnergyOptimizationSubmissionSerializer, EnergyOptimizationStatusSerializer,
+    InventoryDatabaseSerializer, InventoryFilterSerializer
 )
 
 
@@ -261,6 +267,31 @@ def submit_pump_details(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def get_accessible_submission(request, submission_id):
+    """
+    Energy optimization submission the request may read, or None
+
+    Owners read their submissions when logged in; anyone else needs the
+    submission's access token, returned at submit time, as the 'token'
+    query or body parameter or the X-Submission-Token header. Callers
+    report None as not found, so IDs cannot be probed.
+    """
+    try:
+        submission = EnergyOptimizationSubmission.objects.get(id=submission_id)
+    except (EnergyOptimizationSubmission.DoesNotExist, ValueError, TypeError):
+        return None
+    
+    if submission.user_id and request.user.is_authenticated and submission.user_id == request.user.id:
+        return submission
+    
+    token = request.headers.get('X-Submission-Token') or request.query_params.get('token')
+    if not token and hasattr(request.data, 'get'):
+        token = request.data.get('token')
+    if token and secrets.compare_digest(str(token), submission.access_token):
+        return submission
+    return None
+
+
 @csrf_exempt
 @api_view(['POST'])
 def submit_energy_optimization(request):
@@ -286,6 +317,7 @@ def submit_energy_optimization(request):
             'efficiency': request.data.get('efficiency'),
             'speed_n1': request.data.get('speedN1'),
             'qhnp_file': request.FILES.get('qhnpFile'),
+            'library_curve': request.data.get('libraryCurveId') or None,
             'qhact_file': request.FILES.get('qhactFile'),
             'qhmod_file': request.FILES.get('qhmodFile'),
             'desp_input_file': request.FILES.get('despInputFile'),
@@ -309,111 +341,43 @@ def submit_energy_optimization(request):
         if serializer.is_valid():
             submission = serializer.save()
             
-            # Perform energy optimization calculations
-            try:
-                from .energy_calculations import calculate_energy_optimization
-                from .plot_generator import generate_energy_optimization_plots
-                from .proposal_generator import generate_energy_optimization_proposal
-                from .qh_curve_processor import process_qh_curve_file
-                
-                # Convert submission data to calculation format
-                calc_data = {
-                    'project_type': submission.project_type,
-                    'da_tank_height': float(submission.da_tank_height or 0),
-                    'boiler_drum_height': float(submission.boiler_drum_height or 0),
-                    'da_tank_pressure': float(submission.da_tank_pressure or 0),
-                    'boiler_drum_pressure': float(submission.boiler_drum_pressure or 0),
-                    'feed_water_temp': float(submission.feed_water_temp or 0),
-                    'specific_gravity': float(submission.specific_gravity or 1.0),
-                    'actual_flow_24hrs': float(submission.actual_flow_24hrs or 0),
-                    'actual_flow_required': float(submission.actual_flow_required or 0),
-                    'actual_speed_n2': float(submission.actual_speed_n2 or 0),
-                    'actual_discharge_pressure': float(submission.actual_discharge_pressure or 0),
-                    'actual_suction_pressure': float(submission.actual_suction_pressure or 0),
-                    'actual_power_consumption': float(submission.actual_power_consumption or 0),
-                    'flow_qnp': float(submission.flow_qnp or 0),
-                    'head_hnp': float(submission.head_hnp or 0),
-                    'bkw_bkwnp': float(submission.bkw_bkwnp or 0),
-                    'efficiency': float(submission.efficiency or 0),
-                    'speed_n1': float(submission.speed_n1 or 0),
-                }
-                
-                # Process Q-H curve file if uploaded
-                qh_curve_data = None
-                if submission.qhnp_file:
-                    try:
-                        qh_curve_data = process_qh_curve_file(submission.qhnp_file, calc_data)
-                        print(f"Q-H curve processed successfully: {qh_curve_data.get('success', False)}")
-                    except Exception as qh_error:
-                        print(f"Q-H curve processing failed: {str(qh_error)}")
-                        qh_curve_data = {"error": f"Q-H curve processing failed: {str(qh_error)}"}
-                else:
-                    print("No Q-H curve file uploaded, using calculated curves only")
-                
-                # Perform calculations
-                print(f"Starting energy optimization calculations...")
-                calculation_results = calculate_energy_optimization(calc_data)
-                print(f"Calculations completed: {bool(calculation_results)}")
-                
-                # Add Q-H curve data to results if available
-                if qh_curve_data and qh_curve_data.get('success'):
-                    calculation_results['qh_curve_data'] = qh_curve_data
-                
-                # Generate plots
-                print(f"Generating plots...")
-                plots = generate_energy_optimization_plots(calculation_results)
-                print(f"Plots generated: {bool(plots)}")
-                
-                # Generate proposal
-                print(f"Generating proposal...")
-                proposal = generate_energy_optimization_proposal(calc_data, calculation_results)
-                print(f"Proposal generated: {bool(proposal)}")
-                
-                # Update submission with calculated results
-                submission.calculated_efficiency_before = calculation_results.get('efficiency_before', 0)
-                submission.calculated_efficiency_after = calculation_results.get('efficiency_after', 0)
-                submission.power_saving_kwh = calculation_results.get('power_saving', 0)
-                submission.cost_saving_per_day = calculation_results.get('daily_cost_saving', 0)
-                submission.co2_reduction_kg = calculation_results.get('annual_co2_reduction', 0)
-                submission.trees_saved = calculation_results.get('annual_trees_saved', 0)
-                submission.payback_period_days = calculation_results.get('payback_period_days', 0)
-                submission.analysis_completed = True
-                submission.plots_generated = True
-                submission.proposal_generated = True
-                submission.save()
-                
-                # Prepare response data
-                response_data = {
-                    'submission': EnergyOptimizationSubmissionSerializer(submission).data,
-                    'calculations': calculation_results,
-                    'plots': plots,
-                    'proposal': proposal,
-                    'message': 'Energy optimization analysis completed successfully'
-                }
-                
-                print(f"Response data prepared:")
-                print(f"  - Submission: {bool(response_data['submission'])}")
-                print(f"  - Calculations: {bool(response_data['calculations'])}")
-                print(f"  - Plots: {bool(response_data['plots'])}")
-                print(f"  - Proposal: {bool(response_data['proposal'])}")
-                
-            except Exception as calc_error:
-                import traceback
-                calc_error_details = traceback.format_exc()
-                print(f"Error in calculations: {str(calc_error)}")
-                print(f"Calculation error details: {calc_error_details}")
-                response_data = {
-                    'submission': EnergyOptimizationSubmissionSerializer(submission).data,
-                    'error': f'Analysis completed but calculations failed: {str(calc_error)}',
-                    'message': 'Form submitted successfully, but analysis needs manual review',
-                    'error_details': calc_error_details
-                }
+            # Identical inputs reuse a cached analysis and return right away
+            from .analysis_cache import apply_cached_result, compute_input_hash, get_cached_result
+            from .energy_analysis_pipeline import build_calc_data, enqueue_energy_analysis
+            from .plot_image_cache import plot_image_urls
+            cached = get_cached_result(compute_input_hash(build_calc_data(submission), submission))
+            if cached is not None:
+                apply_cached_result(submission, cached)
+                return Response({
+                    'success': True,
+                    'message': 'Energy optimization project submitted successfully with analysis!',
+                    'data': {
+                        'submission': EnergyOptimizationSubmissionSerializer(submission).data,
+                        'status': EnergyOptimizationStatusSerializer(submission).data,
+                        'calculations': submission.calculation_results,
+                        'pump_curve': submission.pump_curve,
+                        'plots': submission.plot_images,
+                        'plot_specs': submission.plot_specs,
+                        'plot_urls': plot_image_urls(submission),
+                        'proposal': submission.proposal_data,
+                        'access_token': submission.access_token,
+                    }
+                }, status=status.HTTP_201_CREATED)
+            
+            # Analysis runs as staged background tasks (parse → calculate → plot → proposal)
+            enqueue_energy_analysis(submission.id)
             
             return Response({
                 'success': True,
-                'message': response_data.get('message', 'Energy optimization project submitted successfully!'),
-                'data': response_data
-            }, status=status.HTTP_201_CREATED)
+                'message': 'Energy optimization project submitted successfully! Analysis is running.',
+                'data': {
+                    'submission': EnergyOptimizationSubmissionSerializer(submission).data,
+                    'status': EnergyOptimizationStatusSerializer(submission).data,
+                    'status_url': f"{reverse('energy-optimization-status', args=[submission.id])}?token={submission.access_token}",
+                    'results_url': f"{reverse('energy-optimization-results', args=[submission.id])}?token={submission.access_token}",
+                    'access_token': submission.access_token,
+                }
+            }, status=status.HTTP_202_ACCEPTED)
         else:
             return Response({
                 'success': False,
@@ -449,6 +413,640 @@ def get_energy_optimization_submissions(request):
     })
 
 
+@api_view(['GET'])
+def get_energy_optimization_status(request, submission_id):
+    """Get the analysis status of an energy optimization submission"""
+    submission = get_accessible_submission(request, submission_id)
+    if submission is None:
+        return Response({
+            'error': 'Submission not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'success': True,
+        'status': EnergyOptimizationStatusSerializer(submission).data
+    })
+
+
+@api_view(['GET'])
+def get_energy_optimization_results(request, submission_id):
+    """
+    Get calculations, plot specs and proposal once the analysis has completed;
+    ?plots=images also returns the server-rendered PNG plots
+    """
+    submission = get_accessible_submission(request, submission_id)
+    if submission is None:
+        return Response({
+            'error': 'Submission not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    status_data = EnergyOptimizationStatusSerializer(submission).data
+    
+    if submission.analysis_status == 'failed':
+        return Response({
+            'success': False,
+            'error': submission.analysis_error,
+            'message': 'Form submitted successfully, but analysis needs manual review',
+            'status': status_data
+        }, status=status.HTTP_409_CONFLICT)
+    
+    if submission.analysis_status != 'completed':
+        return Response({
+            'success': False,
+            'message': 'Analysis is still running',
+            'status': status_data
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    from .plot_image_cache import plot_image_urls
+    
+    plot_images = submission.plot_images
+    if request.query_params.get('plots') == 'images':
+        from .energy_analysis_pipeline import ensure_plot_images
+        try:
+            plot_images = ensure_plot_images(submission)
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': f'Error rendering plots: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        'success': True,
+        'message': 'Energy optimization analysis completed successfully',
+        'data': {
+            'submission': EnergyOptimizationSubmissionSerializer(submission).data,
+            'status': status_data,
+            'calculations': submission.calculation_results,
+            'pump_curve': submission.pump_curve,
+            'plots': plot_images,
+            'plot_specs': submission.plot_specs,
+            'plot_urls': plot_image_urls(submission),
+            'proposal': submission.proposal_data,
+        }
+    })
+
+
+@api_view(['GET'])
+def get_energy_optimization_plot(request, submission_id, plot_number):
+    """
+    Get one plot as an image, rendered on first request and cached on disk
+
+    Query parameters: output (png, svg or webp), width (pixels) and dpi.
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
+    from .plot_image_cache import (
+        PLOT_IMAGE_FORMATS, PlotImageError, get_plot_image, parse_plot_image_options, plot_image_digest,
+    )
+    from .plot_generator import PLOT_NUMBERS, available_plot_numbers
+    from .plot_specs import QH_SRC_PLOT
+    
+    submission = get_accessible_submission(request, submission_id)
+    if submission is None:
+        return Response({
+            'error': 'Submission not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    if plot_number not in PLOT_NUMBERS + [QH_SRC_PLOT]:
+        return Response({
+            'error': f'Plot {plot_number} does not exist'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    if submission.analysis_status == 'failed':
+        return Response({
+            'success': False,
+            'error': submission.analysis_error,
+            'status': EnergyOptimizationStatusSerializer(submission).data
+        }, status=status.HTTP_409_CONFLICT)
+    
+    if submission.analysis_status != 'completed':
+        return Response({
+            'success': False,
+            'message': 'Analysis is still running',
+            'status': EnergyOptimizationStatusSerializer(submission).data
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    # Only analyses with a Q-H curve have the Q-H/SRC plot
+    if plot_number not in available_plot_numbers(submission.calculation_results or {}):
+        return Response({
+            'error': f'Plot {plot_number} does not exist for this submission'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        image_format, dpi, width = parse_plot_image_options(request.query_params)
+    except PlotImageError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    plot_data = (submission.calculation_results or {}).get(f'plot{plot_number}_data') or {}
+    etag = f'"{plot_image_digest(plot_data, image_format, dpi, width)}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        try:
+            path, _ = get_plot_image(submission, plot_number, image_format, dpi, width)
+        except (PlotImageError, TimeoutError) as e:
+            print(f"Error rendering plot {plot_number} for submission {submission_id}: {str(e)}")
+            return Response({
+                'success': False,
+                'error': f'Error rendering plot: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        response = FileResponse(open(path, 'rb'), content_type=PLOT_IMAGE_FORMATS[image_format])
+        response['Content-Disposition'] = f'inline; filename="plot{plot_number}.{image_format}"'
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
+@api_view(['POST'])
+def analyze_energy_fleet(request):
+    """
+    Energy analysis for every pump of a plant in one request
+
+    Accepts a CSV upload ('file', optional 'site') or JSON {'site': .., 'pumps': [..]}.
+    Streams per-pump results with totals per site and configuration as JSON,
+    or as CSV with ?output=csv (&section=summary for the totals only).
+    """
+    try:
+        default_site = request.data.get('site', '')
+        if 'file' in request.FILES:
+            from .fleet_analysis import read_fleet_csv
+            rows = read_fleet_csv(request.FILES['file'])
+        else:
+            rows = request.data.get('pumps', [])
+        
+        if not isinstance(rows, list) or not rows:
+            return Response({
+                'success': False,
+                'error': 'No pumps provided'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_pumps = getattr(settings, 'FLEET_ANALYSIS_MAX_PUMPS', 20000)
+        if len(rows) > max_pumps:
+            return Response({
+                'success': False,
+                'error': f'Too many pumps: {len(rows)} provided, at most {max_pumps} per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        from .fleet_analysis import (
+            parse_fleet_rows, analyze_fleet, iter_fleet_json, iter_fleet_csv,
+            PUMP_OUTPUT_FIELDS, SUMMARY_OUTPUT_FIELDS,
+        )
+        pumps, row_errors = parse_fleet_rows(rows, default_site=default_site)
+        if not pumps:
+            return Response({
+                'success': False,
+                'error': 'No valid pumps to analyze',
+                'rejected_rows': row_errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        pump_results, summary = analyze_fleet(pumps)
+        
+        if request.query_params.get('output') == 'csv':
+            if request.query_params.get('section') == 'summary':
+                content = iter_fleet_csv(summary['configurations'], SUMMARY_OUTPUT_FIELDS)
+                filename = 'fleet_energy_summary.csv'
+            else:
+                content = iter_fleet_csv(pump_results, PUMP_OUTPUT_FIELDS)
+                filename = 'fleet_energy_analysis.csv'
+            response = StreamingHttpResponse(content, content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        else:
+            response = StreamingHttpResponse(
+                iter_fleet_json(pump_results, summary, row_errors), content_type='application/json'
+            )
+        
+        response['X-Fleet-Pump-Count'] = str(len(pump_results))
+        response['X-Fleet-Rejected-Rows'] = str(len(row_errors))
+        return response
+        
+    except Exception as e:
+        import traceback
+        print(f"Error in fleet analysis: {traceback.format_exc()}")
+        return Response({
+            'success': False,
+            'error': f'Error analyzing pump fleet: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def energy_optimization_what_if(request):
+    """
+    What-if sweep over tariff, investment, operating hours, speed ratio and
+    efficiency target for a saved submission ('submission_id') or raw
+    calculator 'parameters'; returns the result cube and Pareto-optimal settings
+    """
+    try:
+        from .parameter_sweep import run_parameter_sweep, SweepError
+        
+        submission_id = request.data.get('submission_id')
+        if submission_id:
+            submission = get_accessible_submission(request, submission_id)
+            if submission is None:
+                return Response({
+                    'error': 'Submission not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            from .energy_analysis_pipeline import build_calc_data
+            calc_data = build_calc_data(submission)
+        else:
+            calc_data = request.data.get('parameters')
+            if not isinstance(calc_data, dict) or not calc_data:
+                return Response({
+                    'success': False,
+                    'error': 'Provide submission_id or parameters'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = run_parameter_sweep(
+                calc_data,
+                ranges=request.data.get('ranges') or {},
+                objectives=request.data.get('objectives'),
+                max_points=getattr(settings, 'ENERGY_SWEEP_MAX_POINTS', 20000)
+            )
+        except SweepError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': result
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error running what-if analysis: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def simulation_inputs(request, profile_required=True):
+    """
+    Calculator values, stored pump curve and load profile of a simulation
+    request, as (calc_data, pump_curve_data, flows, hours, error_response).
+    Without a required profile, flows and hours are None when none is given.
+    """
+    from .vfd_simulation import read_load_profile, SimulationError
+    
+    pump_curve_data = None
+    submission_id = request.data.get('submission_id')
+    if submission_id:
+        submission = get_accessible_submission(request, submission_id)
+        if submission is None:
+            return None, None, None, None, Response({
+                'error': 'Submission not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        from .energy_analysis_pipeline import build_calc_data
+        calc_data = build_calc_data(submission)
+        pump_curve_data = submission.pump_curve
+    else:
+        calc_data = request.data.get('parameters')
+        if isinstance(calc_data, str):
+            try:
+                calc_data = json.loads(calc_data)
+            except ValueError:
+                calc_data = None
+        if not isinstance(calc_data, dict) or not calc_data:
+            return None, None, None, None, Response({
+                'success': False,
+                'error': 'Provide submission_id or parameters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if 'file' in request.FILES:
+            flows, hours = read_load_profile(request.FILES['file'])
+        else:
+            flows, hours = request.data.get('flows'), request.data.get('hours')
+            if flows is None and not profile_required:
+                hours = None
+            elif not isinstance(flows, list) or not flows:
+                raise SimulationError('Upload a load profile CSV or provide a list of flows')
+    except SimulationError as e:
+        return None, None, None, None, Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return calc_data, pump_curve_data, flows, hours, None
+
+
+@api_view(['POST'])
+def energy_optimization_vfd_simulation(request):
+    """
+    Throttle versus variable-speed drive energy over a flow profile for a
+    saved submission ('submission_id') or raw calculator 'parameters'.
+    The profile is a CSV upload ('file') or a JSON list of 'flows' (m³/hr).
+    Returns annual totals and a load duration curve.
+    """
+    try:
+        from .vfd_simulation import run_vfd_simulation, SimulationError, DEFAULT_MIN_SPEED_RATIO
+        from .energy_calculations import COST_PER_KWH
+        
+        calc_data, pump_curve_data, flows, hours, error_response = simulation_inputs(request)
+        if error_response:
+            return error_response
+        
+        try:
+            result = run_vfd_simulation(
+                calc_data, flows, hours,
+                pump_curve_data=pump_curve_data,
+                step_hours=float(request.data.get('step_hours') or 1),
+                min_speed_ratio=float(request.data.get('min_speed_ratio') or DEFAULT_MIN_SPEED_RATIO),
+                cost_per_kwh=float(request.data.get('cost_per_kwh') or COST_PER_KWH),
+                include_steps=str(request.data.get('include_steps', '')).lower() in ('1', 'true', 'yes')
+            )
+        except (SimulationError, TypeError, ValueError) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': result
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error running drive simulation: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def energy_optimization_parallel_operation(request):
+    """
+    Least-energy staging of parallel duty pumps over a flow profile for a
+    saved submission ('submission_id') or raw calculator 'parameters'.
+    The running-pump count follows the project type ('running_pumps' for
+    MR + MS); 'pumps' lists mixed pump curves with counts instead. The
+    profile is given as for the drive simulation.
+    """
+    try:
+        from .parallel_operation import run_parallel_operation, ParallelOperationError
+        from .vfd_simulation import DEFAULT_MIN_SPEED_RATIO
+        
+        calc_data, pump_curve_data, flows, hours, error_response = simulation_inputs(request)
+        if error_response:
+            return error_response
+        
+        try:
+            pumps = request.data.get('pumps')
+            if isinstance(pumps, str):
+                pumps = json.loads(pumps)
+            running_pumps = request.data.get('running_pumps')
+            result = run_parallel_operation(
+                calc_data, flows, hours,
+                pump_curve_data=pump_curve_data,
+                pumps=pumps,
+                running_pumps=int(running_pumps) if running_pumps not in (None, '') else None,
+                min_speed_ratio=float(request.data.get('min_speed_ratio') or DEFAULT_MIN_SPEED_RATIO),
+                step_hours=float(request.data.get('step_hours') or 1),
+                include_steps=str(request.data.get('include_steps', '')).lower() in ('1', 'true', 'yes')
+            )
+        except (ParallelOperationError, TypeError, ValueError) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': result
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error running parallel operation analysis: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def energy_optimization_recommend_pumps(request):
+    """
+    Replacement pumps from the curve library ranked by life-cycle energy
+    cost, for a saved submission ('submission_id') or raw calculator
+    'parameters'. The duty point defaults to the required flow on SRC1
+    ('duty_flow'/'duty_head' override it); an optional load profile is given
+    as for the drive simulation. Candidates include motor 'speeds' (rpm)
+    and impeller trims down to 'min_trim'.
+    """
+    try:
+        from .pump_recommendation import (
+            run_pump_recommendation, RecommendationError, DEFAULT_MIN_TRIM, DEFAULT_LIFE_YEARS,
+            DEFAULT_DISCOUNT_RATE, DEFAULT_RECOMMENDATIONS
+        )
+        from .curve_library import DEFAULT_BEP_TOLERANCE
+        from .energy_calculations import COST_PER_KWH
+        
+        calc_data, pump_curve_data, flows, hours, error_response = simulation_inputs(request, profile_required=False)
+        if error_response:
+            return error_response
+        
+        try:
+            speeds = request.data.get('speeds')
+            if isinstance(speeds, str):
+                speeds = json.loads(speeds)
+            duty_flow = request.data.get('duty_flow')
+            duty_head = request.data.get('duty_head')
+            result = run_pump_recommendation(
+                calc_data, flows, hours,
+                pump_curve_data=pump_curve_data,
+                duty_flow=float(duty_flow) if duty_flow not in (None, '') else None,
+                duty_head=float(duty_head) if duty_head not in (None, '') else None,
+                step_hours=float(request.data.get('step_hours') or 1),
+                speeds=[float(speed) for speed in speeds] if speeds else None,
+                min_trim=float(request.data.get('min_trim') or DEFAULT_MIN_TRIM),
+                head_margin=float(request.data.get('head_margin') or 0),
+                tolerance=float(request.data.get('tolerance') or DEFAULT_BEP_TOLERANCE),
+                cost_per_kwh=float(request.data.get('cost_per_kwh') or COST_PER_KWH),
+                years=float(request.data.get('years') or DEFAULT_LIFE_YEARS),
+                discount_rate=float(request.data.get('discount_rate') or DEFAULT_DISCOUNT_RATE),
+                limit=int(request.data.get('limit') or DEFAULT_RECOMMENDATIONS)
+            )
+        except (RecommendationError, TypeError, ValueError) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': result
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error recommending replacement pumps: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'POST'])
+def pump_curve_library(request):
+    """
+    GET lists library curves, optionally filtered by pump_make, pump_model and
+    pump_size ids. POST stores a manufacturer curve for a make, model and
+    size: a Q-H 'file' with its 'speed', 'bep_flow' and 'bep_efficiency', or
+    a fitted 'curve' (PumpCurve JSON with speed and efficiency). The library
+    is shared by every user's analyses, so only staff may add curves.
+    """
+    from .curve_library import LibraryError, fit_library_curve, serialize_library_curve, store_library_curve
+    from .pump_curve import PumpCurve, PumpCurveError
+    
+    try:
+        if request.method == 'GET':
+            curves = LibraryPumpCurve.objects.select_related('pump_make', 'pump_model', 'pump_size')
+            for field in ('pump_make', 'pump_model', 'pump_size'):
+                value = request.GET.get(field)
+                if value:
+                    curves = curves.filter(**{f'{field}_id': value})
+            return Response({
+                'success': True,
+                'data': [serialize_library_curve(entry, include_curve=False) for entry in curves]
+            })
+        
+        if not request.user.is_authenticated:
+            return Response({
+                'error': 'Authentication required'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        if not request.user.is_staff:
+            return Response({
+                'success': False,
+                'error': 'Only staff can add library curves'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                curve = fit_library_curve(
+                    upload,
+                    speed=float(request.data.get('speed') or 0),
+                    bep_flow=float(request.data.get('bep_flow') or 0),
+                    bep_efficiency=float(request.data.get('bep_efficiency') or 0),
+                    impeller_diameter=float(request.data.get('impeller_diameter') or 0) or None
+                )
+            else:
+                curve_data = request.data.get('curve')
+                if isinstance(curve_data, str):
+                    curve_data = json.loads(curve_data)
+                if not isinstance(curve_data, dict):
+                    raise LibraryError("Upload a curve 'file' or provide a fitted 'curve'")
+                curve = PumpCurve.from_dict(curve_data)
+            
+            entry = store_library_curve(
+                request.data.get('pump_make'), request.data.get('pump_model'), request.data.get('pump_size'),
+                curve, source_file=upload
+            )
+        except (LibraryError, PumpCurveError, KeyError, TypeError, ValueError) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': serialize_library_curve(entry)
+        }, status=status.HTTP_201_CREATED)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error accessing pump curve library: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def get_library_pump_curve(request, curve_id):
+    """Get one library curve with its coefficients"""
+    from .curve_library import serialize_library_curve
+    
+    try:
+        entry = LibraryPumpCurve.objects.select_related('pump_make', 'pump_model', 'pump_size').get(id=curve_id)
+    except LibraryPumpCurve.DoesNotExist:
+        return Response({
+            'error': 'Library curve not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'success': True,
+        'data': serialize_library_curve(entry)
+    })
+
+
+@api_view(['GET'])
+def find_library_pumps(request):
+    """
+    Library pumps whose best efficiency point is near a duty point ('flow'
+    in m³/hr, 'head' in m), within 'tolerance' (fraction of flow and head)
+    and nearest first, at most 'limit' of them.
+    """
+    from .curve_library import DEFAULT_BEP_TOLERANCE, DEFAULT_MATCH_LIMIT, LibraryError, find_pumps_near_duty
+    
+    try:
+        try:
+            matches = find_pumps_near_duty(
+                float(request.GET.get('flow', 0)),
+                float(request.GET.get('head', 0)),
+                tolerance=float(request.GET.get('tolerance') or DEFAULT_BEP_TOLERANCE),
+                limit=int(request.GET.get('limit') or DEFAULT_MATCH_LIMIT)
+            )
+        except (LibraryError, ValueError) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': matches
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error searching pump curve library: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def get_water_properties(request):
+    """
+    Water density, specific gravity, vapor pressure and viscosity at one or
+    more comma-separated 'temperature' values (°C), as saturated liquid or
+    compressed to a gauge 'pressure' (kg/cm²).
+    """
+    from .water_properties import WaterPropertyError, water_properties
+    
+    try:
+        try:
+            temperatures = [float(value) for value in request.GET.get('temperature', '').split(',') if value.strip()]
+            if not temperatures:
+                raise WaterPropertyError('temperature is required')
+            pressure = request.GET.get('pressure')
+            data = water_properties(temperatures, float(pressure) if pressure else None)
+        except (WaterPropertyError, ValueError) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': data
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Error looking up water properties: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 def test_energy_optimization(request):
     """Test endpoint for energy optimization"""
@@ -475,7 +1073,9 @@ def process_qh_curve(request):
             'boiler_drum_height': float(request.data.get('boiler_drum_height', 0)),
             'da_tank_pressure': float(request.data.get('da_tank_pressure', 0)),
             'boiler_drum_pressure': float(request.data.get('boiler_drum_pressure', 0)),
-            'specific_gravity': float(request.data.get('specific_gravity', 1.0)),
+            # Left as sent: a missing temperature differs from 0 °C
+            'feed_water_temp': request.data.get('feed_water_temp'),
+            'specific_gravity': float(request.data.get('specific_gravity', 0)),
             'flow_qnp': float(request.data.get('flow_qnp', 0)),
             'head_hnp': float(request.data.get('head_hnp', 0)),
         }
@@ -495,10 +1095,51 @@ def process_qh_curve(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def parse_quotation_lines(raw_lines):
+    """
+    Normalize quotation lines into a list of (material_id, quantity) pairs.
+    Each line may be a {"material_id": .., "quantity": ..} dict or a
+    [material_id, quantity] pair; quantity defaults to 1.
+    """
+    lines = []
+    for raw_line in raw_lines:
+        if isinstance(raw_line, dict):
+            material_id = raw_line.get('material_id')
+            quantity = raw_line.get('quantity', 1)
+        else:
+            material_id, quantity = raw_line
+        material_id = int(material_id)
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError(f'Quantity for material {material_id} must be at least 1')
+        lines.append((material_id, quantity))
+    return lines
+
+
+def get_user_quotation_info(user):
+    """Customer details used to fill a quotation for a logged-in user"""
+    return {
+        'user_unique_code': user.user_unique_code,
+        'full_name': user.full_name or '',
+        'company_name': user.company_name or '',
+        'company_address': user.company_address or '',
+        'official_email': user.official_email,
+        'gst_number': user.gst_number or '',
+        'location': user.location or ''
+    }
+
+
 @api_view(['POST'])
 def generate_receipt(request):
-    """Generate and download receipt for selected material - Requires authentication"""
-    from .receipt_generator import create_receipt_response
+    """
+    Generate and download receipt for selected materials - Requires authentication
+
+    Accepts a single `material_id`, a list of `items` ({material_id, quantity})
+    for one multi-line quotation, or a list of `quotations` (each with its own
+    `customer_info` and `items`) which is returned as a ZIP of documents.
+    """
+    from .receipt_generator import create_receipt_response, create_batch_receipt_response
+    from .quotation_cache import get_cached_quotation_body, record_quotation_requests
     
     if not request.user.is_authenticated:
         email = request.data.get('email')
@@ -518,38 +1159,77 @@ def generate_receipt(request):
             }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
+        quotations = request.data.get('quotations')
+        items = request.data.get('items')
         material_id = request.data.get('material_id')
         
-        if not material_id:
+        try:
+            if quotations:
+                batch_lines = [parse_quotation_lines(quotation.get('items', [])) for quotation in quotations]
+                if any(not isinstance(quotation.get('customer_info') or {}, dict) for quotation in quotations):
+                    raise TypeError('customer_info must be an object')
+            elif items:
+                batch_lines = [parse_quotation_lines(items)]
+            elif material_id:
+                batch_lines = [parse_quotation_lines([(material_id, request.data.get('quantity', 1))])]
+            else:
+                return Response({
+                    'error': 'Material ID is required'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        except (ValueError, TypeError, AttributeError) as e:
             return Response({
-                'error': 'Material ID is required'
+                'error': f'Invalid quotation lines: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        material = MaterialOfConstruction.objects.select_related(
+        if not all(batch_lines):
+            return Response({
+                'error': 'Every quotation needs at least one item'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Resolve every material across all quotations in a single query
+        material_ids = {material_id for lines in batch_lines for material_id, _ in lines}
+        materials = MaterialOfConstruction.objects.select_related(
             'pump_make', 'pump_model', 'pump_size', 'part_number', 'part_name'
-        ).get(id=material_id)
+        ).in_bulk(material_ids)
         
-        serializer = MaterialOfConstructionSerializer(material)
-        material_data = serializer.data
+        missing_ids = sorted(material_ids - set(materials))
+        if missing_ids:
+            return Response({
+                'error': 'Material not found',
+                'missing_material_ids': missing_ids
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        record_quotation_requests(material_ids)
+        
+        material_data = {
+            item['id']: item
+            for item in MaterialOfConstructionSerializer(materials.values(), many=True).data
+        }
         
         user_info = {}
         if request.user.is_authenticated:
-            user_info = {
-                'user_unique_code': request.user.user_unique_code,
-                'full_name': request.user.full_name or '',
-                'company_name': request.user.company_name or '',
-                'company_address': request.user.company_address or '',
-                'official_email': request.user.official_email,
-                'gst_number': request.user.gst_number or '',
-                'location': request.user.location or ''
-            }
+            user_info = get_user_quotation_info(request.user)
         
-        return create_receipt_response(material_data, user_info)
+        if quotations:
+            # Each quotation is addressed to its own customer; the logged-in
+            # user's details are only used for entries without customer_info
+            return create_batch_receipt_response([
+                (
+                    [(material_data[material_id], quantity) for material_id, quantity in lines],
+                    quotation['customer_info'] if quotation.get('customer_info') is not None else user_info
+                )
+                for quotation, lines in zip(quotations, batch_lines)
+            ])
+        
+        line_items = [(material_data[material_id], quantity) for material_id, quantity in batch_lines[0]]
+        
+        # Single-unit quotes of bestsellers reuse a pre-rendered body
+        body = None
+        if len(batch_lines[0]) == 1 and batch_lines[0][0][1] == 1:
+            body = get_cached_quotation_body(materials[batch_lines[0][0][0]])
+        
+        return create_receipt_response(line_items, user_info, body=body, request=request)
         
-    except MaterialOfConstruction.DoesNotExist:
-        return Response({
-            'error': 'Material not found'
-        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({
             'error': f'Error generating receipt: {str(e)}'
@@ -784,17 +1464,48 @@ def generate_inventory_receipt(request):
                 'location': getattr(user, 'location', '')
             })
         
-        validated_cart_items = []
+        # Resolve every catalogue line with a single query
+        cart_ids = set()
         for item in cart_items:
+            if 'id' in item:
+                try:
+                    cart_ids.add(int(item['id']))
+                except (ValueError, TypeError):
+                    pass
+        inventory_items = InventoryDatabase.objects.in_bulk(cart_ids)
+        
+        validated_cart_items = []
+        line_errors = []
+        missing_ids = []
+        for index, item in enumerate(cart_items):
             try:
+                quantity = int(item.get('quantity', 1))
+                if quantity < 1:
+                    raise ValueError('quantity must be at least 1')
+                
                 if 'id' in item:
-                    inventory_item = InventoryDatabase.objects.get(id=item['id'])
+                    inventory_item = inventory_items.get(int(item['id']))
+                    if inventory_item is None:
+                        missing_ids.append(item['id'])
+                        line_errors.append({
+                            'index': index,
+                            'id': item['id'],
+                            'error': f'Inventory item with ID {item["id"]} not found'
+                        })
+                        continue
+                    if quantity > inventory_item.availability:
+                        line_errors.append({
+                            'index': index,
+                            'id': item['id'],
+                            'error': f'Requested quantity {quantity} exceeds available {inventory_item.availability}'
+                        })
+                        continue
                     validated_item = {
                         'partName': inventory_item.part_name,
                         'partNo': inventory_item.part_no,
                         'moc': inventory_item.moc,
                         'unitPrice': float(inventory_item.unit_price),
-                        'quantity': int(item.get('quantity', 1)),
+                        'quantity': quantity,
                         'uom': inventory_item.uom,
                         'drawing': inventory_item.drawing or 'N/A',
                         'availability': inventory_item.availability
@@ -805,7 +1516,7 @@ def generate_inventory_receipt(request):
                         'partNo': item.get('partNo', ''),
                         'moc': item.get('moc', ''),
                         'unitPrice': float(item.get('unitPrice', 0)),
-                        'quantity': int(item.get('quantity', 1)),
+                        'quantity': quantity,
                         'uom': item.get('uom', 'nos'),
                         'drawing': item.get('drawing', 'N/A'),
                         'availability': item.get('availability', 0)
@@ -813,16 +1524,21 @@ def generate_inventory_receipt(request):
                 
                 validated_cart_items.append(validated_item)
                 
-            except InventoryDatabase.DoesNotExist:
-                return Response({
-                    'error': f'Inventory item with ID {item.get("id")} not found'
-                }, status=status.HTTP_404_NOT_FOUND)
             except (ValueError, TypeError) as e:
-                return Response({
+                line_errors.append({
+                    'index': index,
+                    'id': item.get('id'),
                     'error': f'Invalid data for item: {str(e)}'
-                }, status=status.HTTP_400_BAD_REQUEST)
+                })
+        
+        if line_errors:
+            only_missing = len(missing_ids) == len(line_errors)
+            return Response({
+                'error': 'Some cart items are invalid',
+                'errors': line_errors
+            }, status=status.HTTP_404_NOT_FOUND if only_missing else status.HTTP_400_BAD_REQUEST)
         
-        return create_inventory_receipt_response(validated_cart_items, customer_info)
+        return create_inventory_receipt_response(validated_cart_items, customer_info, request=request)
         
     except Exception as e:
         return Response({
@@ -1093,4 +1809,100 @@ def calculate_src_curves(request):
     """
     API endpoint to calculate SRC curves
     """
-    return calculate_src_curves_api(request)
\ No newline at end of file
+    return calculate_src_curves_api(request)
+
+@api_view(['POST'])
+def calculate_src_curves_batch(request):
+    """
+    SRC curves for many parameter sets in one request
+
+    Accepts a CSV upload ('file') or JSON {'sets': [{shValue, qnp, hnp, qact, hact}, ..]}
+    and returns columnar arrays: one entry per accepted set. With the default
+    'sampling': 'uniform', curves are rows of 'flow_points' evenly spaced points
+    (default 20); 'sampling': 'adaptive' samples every set like the single-set
+    endpoint, through both duty points, with a point count per set.
+    """
+    try:
+        from .src_calculations import (
+            parse_src_parameter_sets, calculate_src_batch, sample_src_batch,
+            SRC_FLOW_POINTS, SRC_MAX_FLOW_POINTS, SRC_SAMPLING_METHODS,
+        )
+        
+        if 'file' in request.FILES:
+            from .fleet_analysis import read_fleet_csv
+            rows = read_fleet_csv(request.FILES['file'])
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('sets', [])
+        
+        if not isinstance(rows, list) or not rows:
+            return Response({
+                'success': False,
+                'error': 'No parameter sets provided'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_sets = getattr(settings, 'SRC_BATCH_MAX_SETS', 50000)
+        if len(rows) > max_sets:
+            return Response({
+                'success': False,
+                'error': f'Too many parameter sets: {len(rows)} provided, at most {max_sets} per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        def option(name):
+            value = request.query_params.get(name)
+            if value is None and not isinstance(request.data, list):
+                value = request.data.get(name)
+            return value
+        
+        sampling = option('sampling') or 'uniform'
+        if sampling not in SRC_SAMPLING_METHODS:
+            return Response({
+                'success': False,
+                'error': f"sampling must be one of: {', '.join(SRC_SAMPLING_METHODS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            flow_points = int(option('flow_points') or SRC_FLOW_POINTS)
+        except (TypeError, ValueError):
+            flow_points = 0
+        if sampling == 'uniform' and not 2 <= flow_points <= SRC_MAX_FLOW_POINTS:
+            return Response({
+                'success': False,
+                'error': f'flow_points must be a whole number from 2 to {SRC_MAX_FLOW_POINTS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        row_numbers, parameters, row_errors = parse_src_parameter_sets(rows)
+        if not len(row_numbers):
+            return Response({
+                'success': False,
+                'error': 'No valid parameter sets',
+                'rejected_rows': row_errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        set_parameters = [parameters[field] for field in ('shValue', 'qnp', 'hnp', 'qact', 'hact')]
+        if sampling == 'adaptive':
+            curves = sample_src_batch(*set_parameters)
+        else:
+            curves = {
+                field: values.tolist()
+                for field, values in calculate_src_batch(*set_parameters, flow_points=flow_points).items()
+            }
+        
+        return Response({
+            'success': True,
+            'count': len(row_numbers),
+            'sampling': sampling,
+            'rows': row_numbers.tolist(),
+            **{field: values.tolist() for field, values in parameters.items()},
+            **curves,
+            'rejected_rows': row_errors
+        })
+        
+    except Exception as e:
+        import traceback
+        print(f"Error in batch SRC calculation: {traceback.format_exc()}")
+        return Response({
+            'success': False,
+            'error': f'Error calculating SRC curves: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,243 @@
+"""
+Water Property Tables
+Density, specific gravity, vapor pressure and viscosity of liquid water from 0 to 300 °C, interpolated from precomputed tables
+"""
+
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+
+MIN_TEMPERATURE = 0.0  # °C
+MAX_TEMPERATURE = 300.0  # °C
+TEMPERATURE_STEP = 1.0  # °C
+
+# Compressed liquid table up to 40 MPa absolute, above any boiler feed discharge pressure
+MAX_PRESSURE = 40.0  # MPa
+PRESSURE_STEP = 0.5  # MPa
+
+# Specific gravity is relative to 1000 kg/m³, the density the power calculations use
+REFERENCE_DENSITY = 1000.0  # kg/m³
+
+# 1 kg/cm² is 10 m of water at the reference density
+KG_CM2_HEAD = 10.0  # m per kg/cm²
+KG_CM2_TO_MPA = 0.0980665
+ATMOSPHERIC_PRESSURE = 1.0332  # kg/cm²
+
+# IAPWS-IF97 region 1 (compressed liquid): reference pressure, temperature and gas constant
+_IF97_P_STAR = 16.53  # MPa
+_IF97_T_STAR = 1386.0  # K
+_IF97_R = 0.461526  # kJ/(kg·K)
+
+_IF97_I = np.array([0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3, 4, 4, 4, 5, 8, 8,
+                    21, 23, 29, 30, 31, 32], dtype=float)
+_IF97_J = np.array([-2, -1, 0, 1, 2, 3, 4, 5, -9, -7, -1, 0, 1, 3, -3, 0, 1, 3, 17, -4, 0, 6, -5, -2, 10, -8,
+                    -11, -6, -29, -31, -38, -39, -40, -41], dtype=float)
+_IF97_N = np.array([
+    0.14632971213167, -0.84548187169114, -0.37563603672040e1, 0.33855169168385e1,
+    -0.95791963387872, 0.15772038513228, -0.16616417199501e-1, 0.81214629983568e-3,
+    0.28319080123804e-3, -0.60706301565874e-3, -0.18990068218419e-1, -0.32529748770505e-1,
+    -0.21841717175414e-1, -0.52838357969930e-4, -0.47184321073267e-3, -0.30001780793026e-3,
+    0.47661393906987e-4, -0.44141845330846e-5, -0.72694996297594e-15, -0.31679644845054e-4,
+    -0.28270797985312e-5, -0.85205128120103e-9, -0.22425281908000e-5, -0.65171222895601e-6,
+    -0.14341729937924e-12, -0.40516996860117e-6, -0.12734301741641e-8, -0.17424871230634e-9,
+    -0.68762131295531e-18, 0.14478307828521e-19, 0.26335781662795e-22, -0.11947622640071e-22,
+    0.18228094581404e-23, -0.93537087292458e-25,
+])
+
+# IAPWS-IF97 region 4 (saturation line)
+_IF97_SATURATION_N = [
+    0.11670521452767e4, -0.72421316703206e6, -0.17073846940092e2, 0.12020824702470e5,
+    -0.32325550322333e7, 0.14915108613530e2, -0.48232657361591e4, 0.40511340542057e6,
+    -0.23855557567849, 0.65017534844798e3,
+]
+
+# Vogel equation for liquid viscosity, within about 2.5% up to 300 °C
+_VISCOSITY_A = 2.414e-5  # Pa·s
+_VISCOSITY_B = 247.8  # K
+_VISCOSITY_C = 140.0  # K
+
+
+class WaterPropertyError(ValueError):
+    """Raised for states outside the water property tables"""
+
+
+def _saturation_pressure(temperature_k: np.ndarray) -> np.ndarray:
+    """Saturation pressure (MPa) from the IF97 region 4 equation"""
+    n = _IF97_SATURATION_N
+    theta = temperature_k + n[8] / (temperature_k - n[9])
+    a = theta ** 2 + n[0] * theta + n[1]
+    b = n[2] * theta ** 2 + n[3] * theta + n[4]
+    c = n[5] * theta ** 2 + n[6] * theta + n[7]
+    return (2 * c / (-b + np.sqrt(b ** 2 - 4 * a * c))) ** 4
+
+
+def _liquid_density(temperature_k: np.ndarray, pressure: np.ndarray) -> np.ndarray:
+    """Compressed liquid density (kg/m³) from the IF97 region 1 Gibbs free energy"""
+    pi = (pressure / _IF97_P_STAR)[..., None]
+    tau = (_IF97_T_STAR / temperature_k)[..., None]
+    gamma_pi = np.sum(-_IF97_N * _IF97_I * (7.1 - pi) ** (_IF97_I - 1) * (tau - 1.222) ** _IF97_J, axis=-1)
+    specific_volume = _IF97_R * temperature_k * gamma_pi / (_IF97_P_STAR * 1000)
+    return 1 / specific_volume
+
+
+class WaterPropertyTable:
+    """
+    Liquid water properties tabulated on a temperature and pressure grid
+
+    Saturated properties are tabulated every TEMPERATURE_STEP; density is
+    also tabulated against absolute pressure for compressed liquid, with
+    pressures below saturation read on the saturation line. Lookups
+    interpolate whole arrays at once: vapor pressure and viscosity in log
+    space, density bilinearly.
+    """
+
+    def __init__(self):
+        self.temperatures = np.arange(MIN_TEMPERATURE, MAX_TEMPERATURE + TEMPERATURE_STEP / 2, TEMPERATURE_STEP)
+        self.pressures = np.arange(0.0, MAX_PRESSURE + PRESSURE_STEP / 2, PRESSURE_STEP)
+        temperature_k = self.temperatures + 273.15
+
+        self.vapor_pressures = _saturation_pressure(temperature_k)
+        self.saturated_densities = _liquid_density(temperature_k, self.vapor_pressures)
+        grid_pressure = np.maximum(self.pressures[None, :], self.vapor_pressures[:, None])
+        self.densities = _liquid_density(np.broadcast_to(temperature_k[:, None], grid_pressure.shape), grid_pressure)
+        self.log_vapor_pressures = np.log(self.vapor_pressures)
+        self.log_viscosities = np.log(_VISCOSITY_A) + np.log(10) * _VISCOSITY_B / (temperature_k - _VISCOSITY_C)
+
+    def _temperatures(self, temperature) -> np.ndarray:
+        temperature = np.asarray(temperature, dtype=float)
+        outside = ~((temperature >= MIN_TEMPERATURE) & (temperature <= MAX_TEMPERATURE))
+        if outside.any():
+            raise WaterPropertyError(
+                f'Water temperature must be between {MIN_TEMPERATURE:g} and {MAX_TEMPERATURE:g} °C'
+            )
+        return temperature
+
+    def vapor_pressure(self, temperature) -> np.ndarray:
+        """Saturation pressure (MPa absolute)"""
+        temperature = self._temperatures(temperature)
+        return np.exp(np.interp(temperature, self.temperatures, self.log_vapor_pressures))
+
+    def viscosity(self, temperature) -> np.ndarray:
+        """Dynamic viscosity (Pa·s); the pressure effect is neglected"""
+        temperature = self._temperatures(temperature)
+        return np.exp(np.interp(temperature, self.temperatures, self.log_viscosities))
+
+    def density(self, temperature, pressure=None) -> np.ndarray:
+        """
+        Liquid density (kg/m³) at a temperature and absolute pressure (MPa)
+
+        Saturated liquid density without a pressure.
+        """
+        temperature = self._temperatures(temperature)
+        if pressure is None:
+            return np.interp(temperature, self.temperatures, self.saturated_densities)
+
+        pressure = np.asarray(pressure, dtype=float)
+        if (~(pressure <= MAX_PRESSURE)).any():
+            raise WaterPropertyError(f'Water pressure must be at most {MAX_PRESSURE:g} MPa')
+        temperature, pressure = np.broadcast_arrays(temperature, np.maximum(pressure, 0.0))
+
+        row = np.clip(((temperature - MIN_TEMPERATURE) / TEMPERATURE_STEP).astype(int), 0, len(self.temperatures) - 2)
+        column = np.clip((pressure / PRESSURE_STEP).astype(int), 0, len(self.pressures) - 2)
+        t = (temperature - self.temperatures[row]) / TEMPERATURE_STEP
+        p = (pressure - self.pressures[column]) / PRESSURE_STEP
+        low = self.densities[row, column] * (1 - p) + self.densities[row, column + 1] * p
+        high = self.densities[row + 1, column] * (1 - p) + self.densities[row + 1, column + 1] * p
+        return low * (1 - t) + high * t
+
+    def specific_gravity(self, temperature, pressure=None) -> np.ndarray:
+        """Density relative to REFERENCE_DENSITY"""
+        return self.density(temperature, pressure) / REFERENCE_DENSITY
+
+
+_table: Optional[WaterPropertyTable] = None
+_table_lock = threading.Lock()
+
+
+def get_water_table() -> WaterPropertyTable:
+    """Water property table, built on first use"""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = WaterPropertyTable()
+        return _table
+
+
+def gauge_to_absolute(pressure) -> np.ndarray:
+    """Absolute pressure (MPa) of a gauge pressure (kg/cm²)"""
+    return (np.asarray(pressure, dtype=float) + ATMOSPHERIC_PRESSURE) * KG_CM2_TO_MPA
+
+
+def pressure_head(pressure_difference, specific_gravity):
+    """Head (m of liquid) of a pressure difference in kg/cm²"""
+    return pressure_difference * KG_CM2_HEAD / specific_gravity
+
+
+def resolve_specific_gravity(specific_gravity, feed_water_temp, suction_pressure=0.0) -> np.ndarray:
+    """
+    Entered specific gravities, with missing ones taken from the water table
+
+    A specific gravity that is not positive counts as not entered and is
+    read at the feed water temperature and suction (gauge, kg/cm²) pressure;
+    a temperature of NaN counts as not entered, and without one water at the
+    reference density (SG 1) is assumed. 0 °C is a real temperature. Only
+    the rows that need the table are looked up.
+    """
+    specific_gravity, feed_water_temp, suction_pressure = np.broadcast_arrays(
+        np.asarray(specific_gravity, dtype=float),
+        np.asarray(feed_water_temp, dtype=float),
+        np.asarray(suction_pressure, dtype=float),
+    )
+    resolved = np.where(specific_gravity > 0, specific_gravity, 1.0)
+    derived = ~(specific_gravity > 0) & ~np.isnan(feed_water_temp)
+    if derived.any():
+        resolved[derived] = get_water_table().specific_gravity(
+            feed_water_temp[derived], gauge_to_absolute(suction_pressure[derived])
+        )
+    return resolved
+
+
+def liquid_specific_gravity(data: Dict) -> float:
+    """Specific gravity of a submission (see resolve_specific_gravity); a missing temperature is None"""
+    feed_water_temp = data.get('feed_water_temp')
+    return float(resolve_specific_gravity(
+        float(data.get('specific_gravity') or 0),
+        np.nan if feed_water_temp in (None, '') else float(feed_water_temp),
+        float(data.get('da_tank_pressure') or 0),
+    ))
+
+
+def water_properties(temperature, pressure=None) -> Dict:
+    """
+    Main function to look up water properties
+
+    Args:
+        temperature: Temperatures (°C)
+        pressure: Gauge pressures (kg/cm²); saturated liquid if omitted
+
+    Returns:
+        Dictionary of property lists in the order of the temperatures
+    """
+    table = get_water_table()
+    temperature = np.atleast_1d(np.asarray(temperature, dtype=float))
+    absolute = None if pressure is None else gauge_to_absolute(pressure)
+    density = table.density(temperature, absolute)
+    viscosity = table.viscosity(temperature)
+    temperature = np.broadcast_to(temperature, density.shape)
+    return {
+        'temperature': temperature.tolist(),
+        'density': np.round(density, 3).tolist(),
+        'specific_gravity': np.round(density / REFERENCE_DENSITY, 5).tolist(),
+        'vapor_pressure': np.round(table.vapor_pressure(temperature) / KG_CM2_TO_MPA, 5).tolist(),
+        'viscosity': np.broadcast_to(viscosity, density.shape).tolist(),
+        'kinematic_viscosity': (viscosity / density).tolist(),
+        'units': {
+            'temperature': '°C',
+            'density': 'kg/m3',
+            'vapor_pressure': 'kg/cm2 (a)',
+            'viscosity': 'Pa·s',
+            'kinematic_viscosity': 'm2/s',
+        },
+    }
@@ -198,12 +198,14 @@ const EnergyOptimizationForm = () => {
         const submissionData = response.data?.submission || response.submission;
         const calculations = response.data?.calculations;
         const plots = response.data?.plots;
+        const plotSpecs = response.data?.plot_specs;
         const proposal = response.data?.proposal;
         
         console.log('Response data structure:', {
           submissionData: !!submissionData,
           calculations: !!calculations,
           plots: !!plots,
+          plotSpecs: !!plotSpecs,
           proposal: !!proposal
         });
         
@@ -218,6 +220,7 @@ const EnergyOptimizationForm = () => {
             analysisResults: {
               calculations: calculations || { message: 'Calculations in progress...' },
               plots: plots || { message: 'Plots being generated...' },
+              plotSpecs: plotSpecs || null,
               proposal: proposal || { message: 'Proposal being prepared...' },
               submissionId: submissionData.id
             }
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import './EnergyOptimizationResultsPage.css';
 import Navbar from './Navbar';
+import PlotSpecChart from './PlotSpecChart';
 import { FaDownload, FaChartLine, FaFileAlt, FaArrowLeft, FaCheckCircle } from 'react-icons/fa';
 
 const EnergyOptimizationResultsPage = () => {
@@ -123,9 +124,10 @@ const EnergyOptimizationResultsPage = () => {
   };
 
   const renderPlots = () => {
-    const plots = resultsData?.analysisResults?.plots;
+    const plots = resultsData?.analysisResults?.plots || {};
+    const plotSpecs = resultsData?.analysisResults?.plotSpecs || {};
     
-    if (!plots) {
+    if (!Object.keys(plots).length && !Object.keys(plotSpecs).length) {
       return (
         <div className="no-data">
           <p>No plot data available.</p>
@@ -152,13 +154,15 @@ const EnergyOptimizationResultsPage = () => {
         
         <div className="plots-grid">
           {plotTitles.map((title, index) => {
-            const plotKey = `plot_${index + 1}`;
-            const plotData = plots[plotKey];
+            const plotKey = `plot${index + 1}`;
+            const plotSpec = plotSpecs[plotKey];
+            const plotData = plotSpec ? null : plots[plotKey] || plots[`plot_${index + 1}`];
             
             return (
               <div key={index} className="plot-card">
                 <h4>{title}</h4>
                 <div className="plot-container">
+                  {plotSpec ? <PlotSpecChart spec={plotSpec} /> : null}
                   {plotData ? (
                     <img 
                       src={`data:image/png;base64,${plotData}`} 
@@ -170,7 +174,7 @@ const EnergyOptimizationResultsPage = () => {
                       }}
                     />
                   ) : null}
-                  <div className="plot-placeholder" style={{ display: plotData ? 'none' : 'block' }}>
+                  <div className="plot-placeholder" style={{ display: plotSpec || plotData ? 'none' : 'block' }}>
                     <FaChartLine className="plot-icon" />
                     <p>Plot {index + 1} - {title}</p>
                     <small>Plot data not available</small>
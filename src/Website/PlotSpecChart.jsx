@@ -0,0 +1,227 @@
+import React, { useMemo } from 'react';
+
+// Chart area inside the SVG viewBox
+const WIDTH = 720;
+const HEIGHT = 440;
+const MARGIN = { top: 40, right: 70, bottom: 60, left: 80 };
+const TICK_COUNT = 5;
+
+// Expand a plain list or a compact series descriptor (constant / linear / sampled)
+export const decodeSeries = (series) => {
+  if (!series) return [];
+  if (Array.isArray(series)) return series;
+
+  const length = series.length || 0;
+  switch (series.encoding) {
+    case 'constant':
+      return Array.from({ length }, () => series.value);
+    case 'linear': {
+      const start = series.start ?? 1;
+      const intercept = series.intercept || 0;
+      return Array.from({ length }, (_, i) => series.slope * (start + i) + intercept);
+    }
+    case 'sampled': {
+      const binary = atob(series.data);
+      const bytes = new Uint8Array(binary.length);
+      for (let i = 0; i < binary.length; i += 1) bytes[i] = binary.charCodeAt(i);
+      return Array.from(new Float32Array(bytes.buffer));
+    }
+    default:
+      return [];
+  }
+};
+
+const isNumber = (value) => typeof value === 'number' && Number.isFinite(value);
+
+const extent = (values, includeZero = false) => {
+  const numbers = values.filter(isNumber);
+  if (includeZero) numbers.push(0);
+  if (!numbers.length) return [0, 1];
+  let min = Math.min(...numbers);
+  let max = Math.max(...numbers);
+  if (min === max) {
+    const pad = Math.abs(min) * 0.1 || 1;
+    min -= pad;
+    max += pad;
+  }
+  return [min, max];
+};
+
+const formatTick = (value) => {
+  const abs = Math.abs(value);
+  if (abs >= 1e6) return `${(value / 1e6).toFixed(1)}M`;
+  if (abs >= 1e3) return `${(value / 1e3).toFixed(1)}k`;
+  if (abs >= 10 || value === 0) return value.toFixed(0);
+  return value.toFixed(2);
+};
+
+const ticks = ([min, max]) =>
+  Array.from({ length: TICK_COUNT + 1 }, (_, i) => min + ((max - min) * i) / TICK_COUNT);
+
+const PlotSpecChart = ({ spec }) => {
+  const chart = useMemo(() => {
+    if (!spec) return null;
+
+    const categories = spec.x_axis?.categories;
+    const series = spec.series.map((s) => ({
+      ...s,
+      x: categories ? s.x : decodeSeries(s.x),
+      y: decodeSeries(s.y),
+      yBase: s.y_base ? decodeSeries(s.y_base) : null,
+    }));
+
+    const xDomain = categories
+      ? [0, categories.length]
+      : extent(series.flatMap((s) => s.x).concat(
+          (spec.annotations || []).filter((a) => a.type === 'vline').map((a) => a.x)
+        ));
+    const onAxis = (axis) => series.filter((s) => s.axis === axis);
+    const barsFromZero = (axis) => onAxis(axis).some((s) => s.type === 'bar');
+    const yDomain = extent(
+      onAxis('y').flatMap((s) => s.y.concat(s.yBase || [])),
+      barsFromZero('y') || spec.y_axis?.min === 0
+    );
+    const y2Domain = spec.y2_axis ? extent(onAxis('y2').flatMap((s) => s.y), barsFromZero('y2')) : null;
+
+    const plotWidth = WIDTH - MARGIN.left - MARGIN.right;
+    const plotHeight = HEIGHT - MARGIN.top - MARGIN.bottom;
+    const scaleX = (value) => {
+      const position = categories ? categories.indexOf(value) + 0.5 : value;
+      return MARGIN.left + ((position - xDomain[0]) / (xDomain[1] - xDomain[0])) * plotWidth;
+    };
+    const scaleY = (domain) => (value) =>
+      MARGIN.top + plotHeight - ((value - domain[0]) / (domain[1] - domain[0])) * plotHeight;
+
+    return { categories, series, xDomain, yDomain, y2Domain, plotWidth, plotHeight, scaleX, scaleY };
+  }, [spec]);
+
+  if (!chart) return null;
+
+  const { categories, series, xDomain, yDomain, y2Domain, plotWidth, plotHeight, scaleX, scaleY } = chart;
+  const y = scaleY(yDomain);
+  const y2 = y2Domain ? scaleY(y2Domain) : y;
+  const scaleFor = (s) => (s.axis === 'y2' ? y2 : y);
+
+  const points = (xs, ys, scale) =>
+    xs
+      .map((xValue, i) => (isNumber(xValue) && isNumber(ys[i]) ? `${scaleX(xValue)},${scale(ys[i])}` : null))
+      .filter(Boolean)
+      .join(' ');
+
+  const renderSeries = (s, index) => {
+    const scale = scaleFor(s);
+    if (s.type === 'scatter') {
+      return s.x.map((xValue, i) =>
+        isNumber(xValue) && isNumber(s.y[i]) ? (
+          <circle key={`${index}-${i}`} cx={scaleX(xValue)} cy={scale(s.y[i])} r={5} fill={s.color} />
+        ) : null
+      );
+    }
+    if (s.type === 'bar') {
+      const slot = categories ? plotWidth / categories.length : plotWidth / Math.max(s.x.length, 1);
+      const barWidth = slot * (categories ? 0.6 : 0.5);
+      return s.x.map((xValue, i) => {
+        if (!isNumber(s.y[i])) return null;
+        const top = scale(Math.max(s.y[i], 0));
+        const bottom = scale(Math.min(s.y[i], 0));
+        return (
+          <g key={`${index}-${i}`}>
+            <rect x={scaleX(xValue) - barWidth / 2} y={top} width={barWidth} height={Math.max(bottom - top, 0)}
+              fill={s.color} fillOpacity={categories ? 0.7 : 0.3} stroke={categories ? '#000' : 'none'} />
+            {s.label && (
+              <text x={scaleX(xValue)} y={top - 6} textAnchor="middle" fontSize="12" fontWeight="bold">{s.label}</text>
+            )}
+          </g>
+        );
+      });
+    }
+    if (s.type === 'area' && s.yBase) {
+      const upper = points(s.x, s.y, scale);
+      const lower = points([...s.x].reverse(), [...s.yBase].reverse(), scale);
+      return <polygon key={index} points={`${upper} ${lower}`} fill={s.color} fillOpacity={0.3} />;
+    }
+    return (
+      <polyline key={index} points={points(s.x, s.y, scale)} fill="none" stroke={s.color}
+        strokeWidth={s.width || 2} strokeDasharray={s.dashed ? '6 4' : undefined} />
+    );
+  };
+
+  const renderAnnotation = (annotation, index) => {
+    if (annotation.type === 'vline' && isNumber(annotation.x)) {
+      const xPos = scaleX(annotation.x);
+      return (
+        <g key={`annotation-${index}`}>
+          <line x1={xPos} x2={xPos} y1={MARGIN.top} y2={MARGIN.top + plotHeight} stroke={annotation.color}
+            strokeWidth={2} strokeDasharray="2 4" />
+          {annotation.text && (
+            <text x={xPos + 6} y={MARGIN.top + 16} fill={annotation.color} fontSize="12" fontWeight="bold">
+              {annotation.text}
+            </text>
+          )}
+        </g>
+      );
+    }
+    if (annotation.type === 'text') {
+      return (
+        <text key={`annotation-${index}`} x={scaleX(annotation.x)} y={y(annotation.y) - 26} textAnchor="middle"
+          fill={annotation.color} fontSize="13" fontWeight="bold">
+          {annotation.text}
+        </text>
+      );
+    }
+    return null;
+  };
+
+  const legendItems = series.filter((s) => !categories);
+
+  return (
+    <svg viewBox={`0 0 ${WIDTH} ${HEIGHT}`} className="plot-image plot-spec-chart" role="img" aria-label={spec.title}>
+      <text x={WIDTH / 2} y={22} textAnchor="middle" fontSize="15" fontWeight="bold">{spec.title}</text>
+
+      {ticks(yDomain).map((tick) => (
+        <g key={`y-${tick}`}>
+          <line x1={MARGIN.left} x2={MARGIN.left + plotWidth} y1={y(tick)} y2={y(tick)} stroke="#000" strokeOpacity={0.1} />
+          <text x={MARGIN.left - 8} y={y(tick) + 4} textAnchor="end" fontSize="11">{formatTick(tick)}</text>
+        </g>
+      ))}
+      {y2Domain && ticks(y2Domain).map((tick) => (
+        <text key={`y2-${tick}`} x={MARGIN.left + plotWidth + 8} y={y2(tick) + 4} fontSize="11">{formatTick(tick)}</text>
+      ))}
+      {categories
+        ? categories.map((category) => (
+            <text key={category} x={scaleX(category)} y={MARGIN.top + plotHeight + 20} textAnchor="middle" fontSize="12">
+              {category}
+            </text>
+          ))
+        : ticks(xDomain).map((tick) => (
+            <g key={`x-${tick}`}>
+              <line x1={scaleX(tick)} x2={scaleX(tick)} y1={MARGIN.top} y2={MARGIN.top + plotHeight} stroke="#000" strokeOpacity={0.1} />
+              <text x={scaleX(tick)} y={MARGIN.top + plotHeight + 18} textAnchor="middle" fontSize="11">{formatTick(tick)}</text>
+            </g>
+          ))}
+
+      <rect x={MARGIN.left} y={MARGIN.top} width={plotWidth} height={plotHeight} fill="none" stroke="#333" />
+      {series.map(renderSeries)}
+      {(spec.annotations || []).map(renderAnnotation)}
+
+      <text x={MARGIN.left + plotWidth / 2} y={HEIGHT - 12} textAnchor="middle" fontSize="12">{spec.x_axis?.label}</text>
+      <text transform={`translate(18 ${MARGIN.top + plotHeight / 2}) rotate(-90)`} textAnchor="middle" fontSize="12">
+        {spec.y_axis?.label}
+      </text>
+      {spec.y2_axis && (
+        <text transform={`translate(${WIDTH - 12} ${MARGIN.top + plotHeight / 2}) rotate(90)`} textAnchor="middle" fontSize="12">
+          {spec.y2_axis.label}
+        </text>
+      )}
+
+      {legendItems.map((s, index) => (
+        <g key={`legend-${index}`} transform={`translate(${MARGIN.left + 10} ${MARGIN.top + 12 + index * 16})`}>
+          <line x1={0} x2={18} y1={0} y2={0} stroke={s.color} strokeWidth={3} strokeDasharray={s.dashed ? '4 3' : undefined} />
+          <text x={24} y={4} fontSize="11">{s.name}</text>
+        </g>
+      ))}
+    </svg>
+  );
+};
+
+export default PlotSpecChart;
@@ -55,6 +55,18 @@ export const energyOptimizationService = {
 
       const result = await response.json();
       console.log('Success response:', result);
+
+      // Analysis runs in the background; wait for it and merge the results
+      if (response.status === 202 && result.data?.submission?.id) {
+        const analysis = await this.waitForEnergyOptimizationResults(result.data.submission.id, {
+          accessToken: result.data.access_token,
+        });
+        result.data = { ...result.data, ...analysis.data };
+        if (analysis.error) {
+          result.data.error = analysis.error;
+        }
+      }
+
       return result;
     } catch (error) {
       console.error('Error submitting energy optimization:', error);
@@ -68,6 +80,39 @@ export const energyOptimizationService = {
     }
   },
 
+  async getEnergyOptimizationResults(submissionId, accessToken) {
+    const headers = {
+      'Content-Type': 'application/json',
+    };
+
+    // Anonymous submissions are only readable with the token returned at submit time
+    if (accessToken) {
+      headers['X-Submission-Token'] = accessToken;
+    }
+
+    const response = await fetch(`${API_BASE_URL}/energy-optimization/${submissionId}/results/`, {
+      method: 'GET',
+      credentials: 'include',
+      headers: headers,
+    });
+    const result = await response.json();
+    return { httpStatus: response.status, ...result };
+  },
+
+  async waitForEnergyOptimizationResults(submissionId, { accessToken, intervalMs = 2000, timeoutMs = 300000 } = {}) {
+    const startedAt = Date.now();
+    while (Date.now() - startedAt < timeoutMs) {
+      const result = await this.getEnergyOptimizationResults(submissionId, accessToken);
+      if (result.httpStatus !== 202) {
+        console.log('Analysis finished:', result.status?.analysis_status);
+        return result;
+      }
+      console.log('Analysis stage:', result.status?.analysis_stage);
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+    return { success: false, error: 'Analysis is taking longer than expected. Please check back later.' };
+  },
+
   async getEnergyOptimizationSubmissions() {
     try {
       const response = await fetch(`${API_BASE_URL}/energy-optimization-submissions/`, {